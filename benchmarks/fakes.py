@@ -0,0 +1,272 @@
+import asyncio
+import random
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+BOT_ID = 7000000001
+BOT_USERNAME = "loadtest_bot"
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+class FakeServer:
+    """A local aiohttp app on a free port; subclasses add their routes."""
+
+    def __init__(self, host: str = "127.0.0.1"):
+        self.host = host
+        self.port: Optional[int] = None
+        self.app = web.Application(client_max_size=16 * 1024 * 1024)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host=self.host, port=0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+
+class FakeTelegramServer(FakeServer):
+    """Bot API stand-in: accepts every method and answers with plausible objects.
+
+    Calls are counted per method; the last invoice payload of each chat is
+    kept so a scenario can complete a Stars payment the bot has just started.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", latency_ms: float = 0.0):
+        super().__init__(host)
+        self.latency_ms = latency_ms
+        self.calls: Counter = Counter()
+        self.invoices: Dict[int, str] = {}
+        self._message_id = 0
+        self.app.router.add_post("/bot{token}/{method}", self._handle)
+        self.app.router.add_get("/bot{token}/{method}", self._handle)
+
+    def _message(self, chat_id: Any, text: Optional[str]) -> Dict[str, Any]:
+        self._message_id += 1
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id or 0), "type": "private"},
+            "from": {"id": BOT_ID, "is_bot": True, "first_name": "Loadtest",
+                     "username": BOT_USERNAME},
+            "text": text or "",
+        }
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        self.calls[method] += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        chat_id = params.get("chat_id")
+        result: Any = True
+        if method == "getme":
+            result = {"id": BOT_ID, "is_bot": True, "first_name": "Loadtest",
+                      "username": BOT_USERNAME}
+        elif method == "getwebhookinfo":
+            result = {"url": "", "has_custom_certificate": False,
+                      "pending_update_count": 0}
+        elif method == "sendinvoice":
+            self.invoices[int(chat_id)] = str(params.get("payload", ""))
+            result = self._message(chat_id, params.get("title"))
+        elif method == "copymessage":
+            self._message_id += 1
+            result = {"message_id": self._message_id}
+        elif method.startswith("send") or method.startswith("edit"):
+            result = self._message(chat_id, params.get("text") or params.get("caption"))
+        return web.json_response({"ok": True, "result": result})
+
+
+class FakePanelServer(FakeServer):
+    """Remnawave panel API stand-in backed by an in-memory user table.
+
+    Routes sit under ``/api`` like the real panel, and every response is
+    wrapped in ``{"response": ...}``.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0):
+        super().__init__(host)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.calls: Counter = Counter()
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.by_telegram_id: Dict[int, List[str]] = defaultdict(list)
+        routes = self.app.router
+        routes.add_get("/api/users", self._list_users)
+        routes.add_post("/api/users", self._create_user)
+        routes.add_patch("/api/users", self._update_user)
+        routes.add_get("/api/users/by-telegram-id/{telegram_id}", self._users_by_telegram_id)
+        routes.add_get("/api/users/by-username/{username}", self._user_by_username)
+        routes.add_post("/api/users/bulk/{action:.+}", self._bulk)
+        routes.add_post("/api/users/{uuid}/actions/{action}", self._user_action)
+        routes.add_get("/api/users/{uuid}", self._get_user)
+        routes.add_delete("/api/users/{uuid}", self._delete_user)
+        routes.add_get("/api/hwid/devices/{uuid}", self._hwid_devices)
+        routes.add_get("/api/system/stats", self._system_stats)
+        routes.add_get("/api/system/stats/{kind}", self._system_stats)
+        routes.add_get("/api/nodes", self._nodes)
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}/api"
+
+    async def _delay(self, name: str) -> None:
+        self.calls[name] += 1
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+    @staticmethod
+    def _ok(payload: Any) -> web.Response:
+        return web.json_response({"response": payload})
+
+    @staticmethod
+    def _not_found() -> web.Response:
+        return web.json_response(
+            {"message": "User not found", "errorCode": "A063"}, status=404)
+
+    def _new_user(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        user_uuid = str(uuid.uuid4())
+        short_uuid = uuid.uuid4().hex[:16]
+        now = datetime.now(timezone.utc)
+        return {
+            "uuid": user_uuid,
+            "shortUuid": short_uuid,
+            "subscriptionUuid": str(uuid.uuid4()),
+            "username": body.get("username"),
+            "status": body.get("status", "ACTIVE"),
+            "expireAt": body.get("expireAt") or _iso(now + timedelta(days=1)),
+            "telegramId": body.get("telegramId"),
+            "email": body.get("email"),
+            "description": body.get("description"),
+            "tag": body.get("tag"),
+            "trafficLimitBytes": body.get("trafficLimitBytes", 0),
+            "trafficLimitStrategy": body.get("trafficLimitStrategy", "NO_RESET"),
+            "usedTrafficBytes": 0,
+            "lifetimeUsedTrafficBytes": 0,
+            "hwidDeviceLimit": body.get("hwidDeviceLimit"),
+            "activeInternalSquads": body.get("activeInternalSquads", []),
+            "subscriptionUrl": f"https://sub.loadtest.local/{short_uuid}",
+            "createdAt": _iso(now),
+            "updatedAt": _iso(now),
+        }
+
+    async def _list_users(self, request: web.Request) -> web.Response:
+        await self._delay("list_users")
+        start = int(request.query.get("start", 0))
+        size = int(request.query.get("size", 100))
+        users = list(self.users.values())
+        return self._ok({"users": users[start:start + size], "total": len(users)})
+
+    async def _create_user(self, request: web.Request) -> web.Response:
+        await self._delay("create_user")
+        body = await request.json()
+        if any(u["username"] == body.get("username") for u in self.users.values()):
+            return web.json_response(
+                {"message": "User username already exists", "errorCode": "A019"},
+                status=400)
+        user = self._new_user(body)
+        self.users[user["uuid"]] = user
+        if user["telegramId"] is not None:
+            self.by_telegram_id[int(user["telegramId"])].append(user["uuid"])
+        return self._ok(user)
+
+    async def _update_user(self, request: web.Request) -> web.Response:
+        await self._delay("update_user")
+        body = await request.json()
+        user = self.users.get(str(body.get("uuid")))
+        if not user:
+            return self._not_found()
+        user.update({k: v for k, v in body.items() if k != "uuid"})
+        user["updatedAt"] = _iso(datetime.now(timezone.utc))
+        return self._ok(user)
+
+    async def _users_by_telegram_id(self, request: web.Request) -> web.Response:
+        await self._delay("users_by_telegram_id")
+        telegram_id = int(request.match_info["telegram_id"])
+        return self._ok([self.users[u] for u in self.by_telegram_id.get(telegram_id, [])
+                         if u in self.users])
+
+    async def _user_by_username(self, request: web.Request) -> web.Response:
+        await self._delay("user_by_username")
+        username = request.match_info["username"]
+        for user in self.users.values():
+            if user["username"] == username:
+                return self._ok(user)
+        return self._not_found()
+
+    async def _get_user(self, request: web.Request) -> web.Response:
+        await self._delay("get_user")
+        user = self.users.get(request.match_info["uuid"])
+        return self._ok(user) if user else self._not_found()
+
+    async def _delete_user(self, request: web.Request) -> web.Response:
+        await self._delay("delete_user")
+        user = self.users.pop(request.match_info["uuid"], None)
+        return self._ok({"isDeleted": bool(user)}) if user else self._not_found()
+
+    async def _user_action(self, request: web.Request) -> web.Response:
+        await self._delay("user_action")
+        user = self.users.get(request.match_info["uuid"])
+        if not user:
+            return self._not_found()
+        user["status"] = "DISABLED" if request.match_info["action"] == "disable" else "ACTIVE"
+        return self._ok(user)
+
+    async def _bulk(self, request: web.Request) -> web.Response:
+        await self._delay("bulk")
+        body = await request.json()
+        uuids = [u for u in body.get("uuids", []) if u in self.users]
+        action = request.match_info["action"]
+        for user_uuid in uuids:
+            user = self.users[user_uuid]
+            if action == "extend-expiration-date":
+                expire_at = datetime.fromisoformat(user["expireAt"].replace("Z", "+00:00"))
+                user["expireAt"] = _iso(expire_at + timedelta(
+                    days=int(body.get("extendDays", 0))))
+            elif action == "delete":
+                del self.users[user_uuid]
+            elif action == "update":
+                user.update(body.get("fields", {}))
+        return self._ok({"affectedRows": len(uuids)})
+
+    async def _hwid_devices(self, request: web.Request) -> web.Response:
+        await self._delay("hwid_devices")
+        return self._ok({"devices": [], "total": 0})
+
+    async def _system_stats(self, request: web.Request) -> web.Response:
+        await self._delay("system_stats")
+        return self._ok({
+            "users": {"totalUsers": len(self.users),
+                      "statusCounts": dict(Counter(u["status"] for u in self.users.values()))},
+            "onlineStats": {"onlineNow": 0, "lastDay": 0, "lastWeek": 0},
+            "nodes": {"totalOnline": 0},
+            "memory": {"total": 0, "used": 0, "free": 0},
+            "cpu": {"cores": 1},
+            "uptime": 0,
+        })
+
+    async def _nodes(self, request: web.Request) -> web.Response:
+        await self._delay("nodes")
+        return self._ok([])
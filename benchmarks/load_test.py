@@ -0,0 +1,668 @@
+import argparse
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import math
+import os
+import socket
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import aiohttp
+from aiogram import Bot, Dispatcher
+from aiogram.client.telegram import TelegramAPIServer
+
+from benchmarks.fakes import FakePanelServer, FakeTelegramServer
+from db import query_budget
+
+BOT_TOKEN = "123456789:LOADTEST-loadtest-loadtest-loadtest"
+PANEL_WEBHOOK_SECRET = "loadtest-panel-secret"
+TRIBUTE_API_KEY = "loadtest-tribute-key"
+CRYPTOPAY_TOKEN = "12345:LOADTESTloadtestloadtest"
+STARS_PRICE = 100
+
+SCENARIOS = ("start", "menu", "subscription", "payment", "webhooks", "broadcast")
+MENU_CALLBACKS = ("main_action:subscribe", "main_action:referral",
+                  "main_action:back_to_main")
+SUBSCRIPTION_CALLBACKS = ("main_action:my_subscription", "my_subscription:refresh")
+PANEL_EVENTS = ("user.expires_in_72_hours", "user.expires_in_48_hours",
+                "user.expires_in_24_hours")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class QueryCounter:
+    """Query observer for ``enable_query_timing``: counts statements by DAL caller."""
+
+    def __init__(self):
+        self.by_caller: Counter = Counter()
+
+    def __call__(self, caller: str, seconds: float) -> None:
+        self.by_caller[caller] += 1
+
+    def reset(self) -> Counter:
+        counted, self.by_caller = self.by_caller, Counter()
+        return counted
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+    queries: Counter = field(default_factory=Counter)
+    telegram_calls: Counter = field(default_factory=Counter)
+    panel_calls: Counter = field(default_factory=Counter)
+    budget_violations: Counter = field(default_factory=Counter)
+    notes: Dict[str, Any] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        ops = len(ordered)
+        total_queries = sum(self.queries.values())
+        return {
+            "scenario": self.name,
+            "ops": ops,
+            "errors": self.errors,
+            "throughput": ops / self.elapsed if self.elapsed else 0.0,
+            "p50_ms": _percentile(ordered, 50) * 1000,
+            "p95_ms": _percentile(ordered, 95) * 1000,
+            "p99_ms": _percentile(ordered, 99) * 1000,
+            "max_ms": (ordered[-1] if ordered else 0.0) * 1000,
+            "queries": total_queries,
+            "queries_per_op": total_queries / ops if ops else 0.0,
+            "top_queries": self.queries.most_common(5),
+            "telegram_calls": dict(self.telegram_calls),
+            "panel_calls": dict(self.panel_calls),
+            "budget_violations": {f"{kind} {unit}": count for (kind, unit), count
+                                  in self.budget_violations.most_common()},
+            "notes": self.notes,
+        }
+
+
+class UpdateFactory:
+    """Raw Bot API updates as Telegram would deliver them to the webhook."""
+
+    def __init__(self, bot_id: int):
+        self.bot_id = bot_id
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    @staticmethod
+    def _user(user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": f"Load{user_id}",
+                "username": f"load{user_id}", "language_code": "ru"}
+
+    def _message(self, user_id: int, **fields) -> Dict[str, Any]:
+        return {"message_id": next(self._message_ids), "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": self._user(user_id), **fields}
+
+    def _update(self, **fields) -> Dict[str, Any]:
+        return {"update_id": next(self._update_ids), **fields}
+
+    def text(self, user_id: int, text: str) -> Dict[str, Any]:
+        fields: Dict[str, Any] = {"text": text}
+        if text.startswith("/"):
+            fields["entities"] = [{"type": "bot_command", "offset": 0,
+                                   "length": len(text.split()[0])}]
+        return self._update(message=self._message(user_id, **fields))
+
+    def callback(self, user_id: int, data: str) -> Dict[str, Any]:
+        bot_message = self._message(user_id, text="menu")
+        bot_message["from"] = {"id": self.bot_id, "is_bot": True,
+                               "first_name": "Loadtest"}
+        return self._update(callback_query={
+            "id": uuid.uuid4().hex, "from": self._user(user_id),
+            "chat_instance": str(user_id), "data": data, "message": bot_message})
+
+    def pre_checkout(self, user_id: int, payload: str, amount: int) -> Dict[str, Any]:
+        return self._update(pre_checkout_query={
+            "id": uuid.uuid4().hex, "from": self._user(user_id), "currency": "XTR",
+            "total_amount": amount, "invoice_payload": payload})
+
+    def successful_payment(self, user_id: int, payload: str, amount: int) -> Dict[str, Any]:
+        return self._update(message=self._message(user_id, successful_payment={
+            "currency": "XTR", "total_amount": amount, "invoice_payload": payload,
+            "telegram_payment_charge_id": uuid.uuid4().hex,
+            "provider_payment_charge_id": uuid.uuid4().hex}))
+
+
+@dataclass
+class Harness:
+    args: argparse.Namespace
+    dp: Dispatcher
+    bot: Bot
+    settings: Any
+    session_factory: Any
+    telegram: FakeTelegramServer
+    panel: FakePanelServer
+    updates: UpdateFactory
+    http: aiohttp.ClientSession
+    web_url: str
+    admin_id: int
+    users: List[int]
+    fresh_user_ids: Any
+    queries: QueryCounter
+    user_locks: Dict[int, asyncio.Lock] = field(
+        default_factory=lambda: defaultdict(asyncio.Lock))
+
+    async def feed(self, raw_update: Dict[str, Any]) -> None:
+        await self.dp.feed_raw_update(self.bot, raw_update)
+
+    async def post_webhook(self, path: str, body: bytes,
+                           headers: Optional[Dict[str, str]] = None) -> None:
+        async with self.http.post(
+                f"{self.web_url}{path}", data=body,
+                headers={"Content-Type": "application/json", **(headers or {})}) as response:
+            await response.read()
+            if response.status >= 400:
+                raise RuntimeError(f"{path} answered {response.status}")
+
+
+async def _gather_limited(coros: List[Awaitable[Any]], limit: int) -> None:
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro: Awaitable[Any]) -> None:
+        async with semaphore:
+            await coro
+
+    await asyncio.gather(*(run(coro) for coro in coros))
+
+
+async def run_open_loop(result: ScenarioResult, rate: float, total_ops: int,
+                        max_inflight: int,
+                        operation: Callable[[int], Awaitable[None]]) -> None:
+    """Start ``total_ops`` operations at ``rate`` per second, whatever their latency.
+
+    Latency counts from the scheduled start, so time spent waiting for an
+    in-flight slot is included rather than silently lowering the offered load.
+    """
+    semaphore = asyncio.Semaphore(max_inflight)
+    tasks: List[asyncio.Task] = []
+
+    async def timed(index: int, scheduled: float) -> None:
+        async with semaphore:
+            try:
+                await operation(index)
+            except Exception as e:
+                result.errors += 1
+                logging.debug(f"{result.name} operation {index} failed: {e}", exc_info=True)
+            finally:
+                result.latencies.append(time.perf_counter() - scheduled)
+
+    started = time.perf_counter()
+    for index in range(total_ops):
+        scheduled = started + index / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(timed(index, scheduled)))
+    await asyncio.gather(*tasks)
+    result.elapsed = time.perf_counter() - started
+
+
+async def _seed_users(h: Harness) -> None:
+    """Register the user pool and the admin through the real /start handler."""
+    await _gather_limited([h.feed(h.updates.text(user_id, "/start"))
+                           for user_id in [h.admin_id, *h.users]],
+                          h.args.max_inflight)
+
+
+async def _create_pending_payments(h: Harness, provider: str, count: int) -> List[Dict[str, Any]]:
+    from db.dal import payment_dal
+
+    payments = []
+    async with h.session_factory() as session:
+        for index in range(count):
+            user_id = h.users[index % len(h.users)]
+            payment = await payment_dal.create_payment_record(session, {
+                "user_id": user_id,
+                "amount": 100.0,
+                "currency": "RUB",
+                "status": "pending",
+                "description": "Load test payment",
+                "subscription_duration_months": 1,
+                "provider": provider,
+            })
+            payments.append({"payment_id": payment.payment_id, "user_id": user_id})
+        await session.commit()
+    return payments
+
+
+async def scenario_start(h: Harness, result: ScenarioResult) -> Callable[[int], Awaitable[None]]:
+    async def operation(index: int) -> None:
+        await h.feed(h.updates.text(next(h.fresh_user_ids), "/start"))
+    return operation
+
+
+async def scenario_menu(h: Harness, result: ScenarioResult) -> Callable[[int], Awaitable[None]]:
+    async def operation(index: int) -> None:
+        await h.feed(h.updates.callback(h.users[index % len(h.users)],
+                                        MENU_CALLBACKS[index % len(MENU_CALLBACKS)]))
+    return operation
+
+
+async def scenario_subscription(h: Harness, result: ScenarioResult) -> Callable[[int], Awaitable[None]]:
+    subscription_service = h.dp["subscription_service"]
+
+    async def activate(user_id: int) -> None:
+        async with h.session_factory() as session:
+            await subscription_service.activate_trial_subscription(session, user_id)
+            await session.commit()
+
+    await _gather_limited([activate(user_id) for user_id in h.users],
+                          h.args.max_inflight)
+
+    async def operation(index: int) -> None:
+        await h.feed(h.updates.callback(
+            h.users[index % len(h.users)],
+            SUBSCRIPTION_CALLBACKS[index % len(SUBSCRIPTION_CALLBACKS)]))
+    return operation
+
+
+async def scenario_payment(h: Harness, result: ScenarioResult) -> Callable[[int], Awaitable[None]]:
+    async def operation(index: int) -> None:
+        user_id = h.users[index % len(h.users)]
+        # The invoice payload is read back per chat, so one payment per user at a time
+        async with h.user_locks[user_id]:
+            await h.feed(h.updates.callback(user_id, f"pay_stars:1:{STARS_PRICE}"))
+            payload = h.telegram.invoices.pop(user_id, None)
+            if not payload:
+                raise RuntimeError("no invoice was sent")
+            await h.feed(h.updates.pre_checkout(user_id, payload, STARS_PRICE))
+            await h.feed(h.updates.successful_payment(user_id, payload, STARS_PRICE))
+    return operation
+
+
+def _signed(secret: str, body: bytes) -> str:
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+async def scenario_webhooks(h: Harness, result: ScenarioResult) -> Callable[[int], Awaitable[None]]:
+    settings = h.settings
+    per_provider = math.ceil(h.args.rate * h.args.duration / 4) + 1
+    yookassa_payments = await _create_pending_payments(h, "yookassa", per_provider)
+    cryptopay_payments = await _create_pending_payments(h, "cryptopay", per_provider)
+    run_id = uuid.uuid4().hex[:8]
+    now = datetime.now(timezone.utc)
+    cryptopay_key = hashlib.sha256(CRYPTOPAY_TOKEN.encode()).digest()
+
+    async def panel(index: int) -> None:
+        user_id = h.users[index % len(h.users)]
+        # A distinct expireAt keeps the inbox from deduplicating the notices
+        body = json.dumps({
+            "event": PANEL_EVENTS[index % len(PANEL_EVENTS)],
+            "data": {"uuid": str(uuid.uuid4()), "username": f"tg_{user_id}",
+                     "telegramId": user_id, "status": "ACTIVE",
+                     "expireAt": (now + timedelta(days=3, seconds=index)).isoformat()},
+        }).encode()
+        await h.post_webhook(settings.panel_webhook_path, body,
+                             {"X-Remnawave-Signature": _signed(PANEL_WEBHOOK_SECRET, body)})
+
+    async def tribute(index: int) -> None:
+        body = json.dumps({
+            "name": "new_subscription",
+            "sent_at": now.isoformat(),
+            "payload": {"subscription_id": f"{run_id}-{index}", "period": "monthly",
+                        "amount": 10000, "currency": "rub",
+                        "telegram_user_id": h.users[index % len(h.users)]},
+        }).encode()
+        await h.post_webhook(settings.tribute_webhook_path, body,
+                             {"trbt-signature": _signed(TRIBUTE_API_KEY, body)})
+
+    async def yookassa(index: int) -> None:
+        payment = yookassa_payments[index % len(yookassa_payments)]
+        body = json.dumps({
+            "type": "notification",
+            "event": "payment.succeeded",
+            "object": {
+                "id": str(uuid.uuid4()), "status": "succeeded", "paid": True,
+                "amount": {"value": "100.00", "currency": "RUB"},
+                "created_at": now.isoformat(), "description": "Load test payment",
+                "test": True, "refundable": False,
+                "metadata": {"user_id": str(payment["user_id"]),
+                             "subscription_months": "1",
+                             "payment_db_id": str(payment["payment_id"])},
+            },
+        }).encode()
+        await h.post_webhook(settings.yookassa_webhook_path, body)
+
+    async def cryptopay(index: int) -> None:
+        payment = cryptopay_payments[index % len(cryptopay_payments)]
+        invoice_id = 10_000_000 + index
+        body = json.dumps({
+            "update_id": invoice_id,
+            "update_type": "invoice_paid",
+            "request_date": now.isoformat(),
+            "payload": {
+                "invoice_id": invoice_id, "status": "paid", "hash": uuid.uuid4().hex,
+                "asset": "USDT", "amount": "1.5", "currency_type": "crypto",
+                "bot_invoice_url": "https://t.me/CryptoBot", "web_app_invoice_url": "",
+                "mini_app_invoice_url": "", "created_at": now.isoformat(),
+                "paid_at": now.isoformat(), "allow_comments": False,
+                "allow_anonymous": False,
+                "payload": json.dumps({"user_id": str(payment["user_id"]),
+                                       "subscription_months": "1",
+                                       "payment_db_id": str(payment["payment_id"])}),
+            },
+        }).encode()
+        signature = hmac.new(cryptopay_key, body, hashlib.sha256).hexdigest()
+        await h.post_webhook(settings.cryptopay_webhook_path, body,
+                             {"Crypto-Pay-Api-Signature": signature})
+
+    senders = (panel, tribute, yookassa, cryptopay)
+
+    async def operation(index: int) -> None:
+        await senders[index % len(senders)](index // len(senders))
+    return operation
+
+
+async def _wait_for_inbox(h: Harness, result: ScenarioResult) -> None:
+    """Wait until the webhook inbox has worked off what the scenario stored."""
+    from db.dal import inbound_event_dal
+
+    started = time.perf_counter()
+    counts: Dict[str, int] = {}
+    while time.perf_counter() - started < h.args.drain_timeout:
+        async with h.session_factory() as session:
+            counts = await inbound_event_dal.count_events_by_status(session)
+        if not counts.get(inbound_event_dal.STATUS_PENDING) and not counts.get(
+                inbound_event_dal.STATUS_PROCESSING):
+            break
+        await asyncio.sleep(0.25)
+    result.notes["inbox_drain_s"] = round(time.perf_counter() - started, 2)
+    result.notes["inbox_status"] = counts
+
+
+async def run_broadcast(h: Harness, result: ScenarioResult) -> None:
+    """One broadcast to every user in the database, timed until the queue is empty."""
+    from bot.utils.message_queue import get_queue_manager
+
+    queue_manager = get_queue_manager()
+    await h.feed(h.updates.callback(h.admin_id, "admin_action:broadcast"))
+    await h.feed(h.updates.text(h.admin_id, "Load test broadcast"))
+    sent_before = h.telegram.calls["sendmessage"]
+
+    started = time.perf_counter()
+    await h.feed(h.updates.callback(h.admin_id, "broadcast_final_action:send"))
+    queued_at = time.perf_counter()
+    while time.perf_counter() - started < h.args.drain_timeout:
+        stats = queue_manager.get_queue_stats()
+        if not stats["user_queue_size"] and not stats["user_queue_processing"]:
+            break
+        await asyncio.sleep(0.1)
+    finished = time.perf_counter()
+
+    sent = h.telegram.calls["sendmessage"] - sent_before
+    result.latencies.append(finished - started)
+    result.elapsed = finished - started
+    result.notes.update({
+        "queue_s": round(queued_at - started, 3),
+        "delivery_s": round(finished - queued_at, 3),
+        "messages_sent": sent,
+        "messages_per_s": round(sent / (finished - queued_at), 1) if finished > queued_at else 0,
+    })
+
+
+SCENARIO_BUILDERS = {
+    "start": scenario_start,
+    "menu": scenario_menu,
+    "subscription": scenario_subscription,
+    "payment": scenario_payment,
+    "webhooks": scenario_webhooks,
+}
+
+
+async def run_scenario(h: Harness, name: str) -> ScenarioResult:
+    result = ScenarioResult(name)
+    if name == "broadcast":
+        operation = None
+    else:
+        operation = await SCENARIO_BUILDERS[name](h, result)
+        if name == "webhooks":
+            # Drain what seeding left behind before measuring
+            await _wait_for_inbox(h, result)
+
+    # Setup traffic above is not part of the measurement
+    h.queries.reset()
+    query_budget.take_violations()
+    telegram_before = Counter(h.telegram.calls)
+    panel_before = Counter(h.panel.calls)
+
+    logging.warning(f"Running scenario '{name}'...")
+    if operation is None:
+        await run_broadcast(h, result)
+    else:
+        total_ops = max(1, int(h.args.rate * h.args.duration))
+        await run_open_loop(result, h.args.rate, total_ops, h.args.max_inflight, operation)
+        if name == "webhooks":
+            await _wait_for_inbox(h, result)
+
+    result.queries = h.queries.reset()
+    result.budget_violations = query_budget.take_violations()
+    result.telegram_calls = Counter(h.telegram.calls) - telegram_before
+    result.panel_calls = Counter(h.panel.calls) - panel_before
+    return result
+
+
+def print_report(results: List[ScenarioResult]) -> None:
+    header = (f"{'scenario':<13}{'ops':>7}{'errors':>8}{'ops/s':>9}{'p50 ms':>9}"
+              f"{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'queries':>9}{'q/op':>7}")
+    print()
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        s = result.summary()
+        print(f"{s['scenario']:<13}{s['ops']:>7}{s['errors']:>8}{s['throughput']:>9.1f}"
+              f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}"
+              f"{s['max_ms']:>9.1f}{s['queries']:>9}{s['queries_per_op']:>7.1f}")
+    print()
+    for result in results:
+        s = result.summary()
+        print(f"[{s['scenario']}]")
+        if s["top_queries"]:
+            print("  queries: " + ", ".join(f"{caller}={count}"
+                                            for caller, count in s["top_queries"]))
+        if s["panel_calls"]:
+            print(f"  panel: {s['panel_calls']}")
+        if s["telegram_calls"]:
+            print(f"  telegram: {s['telegram_calls']}")
+        if s["budget_violations"]:
+            print("  query budget: " + ", ".join(
+                f"{label} x{count}" for label, count in s["budget_violations"].items()))
+        if s["notes"]:
+            print(f"  notes: {s['notes']}")
+
+
+def _configure_environment(args: argparse.Namespace, telegram: FakeTelegramServer,
+                           panel: FakePanelServer, web_port: int, admin_id: int) -> None:
+    # Settings are read from the environment only (no .env), so the fakes win
+    os.environ.update({
+        "BOT_TOKEN": BOT_TOKEN,
+        "ADMIN_IDS": str(admin_id),
+        "PANEL_API_URL": panel.api_url,
+        "PANEL_API_KEY": "loadtest",
+        "WEBHOOK_BASE_URL": f"http://127.0.0.1:{web_port}",
+        "WEB_SERVER_HOST": "127.0.0.1",
+        "WEB_SERVER_PORT": str(web_port),
+        "TRIAL_ENABLED": "true",
+        "STARS_ENABLED": "true",
+        "1_MONTH_ENABLED": "true",
+        "STARS_PRICE_1_MONTH": str(STARS_PRICE),
+        "PANEL_WEBHOOK_SECRET": PANEL_WEBHOOK_SECRET,
+        "TRIBUTE_API_KEY": TRIBUTE_API_KEY,
+        "CRYPTOPAY_TOKEN": CRYPTOPAY_TOKEN,
+        "EVENT_LOOP_LAG_MONITOR_ENABLED": "false",
+    })
+    if args.database:
+        os.environ["POSTGRES_DB"] = args.database
+    if args.query_budget is not None:
+        os.environ.update({
+            "DB_QUERY_BUDGET_ENABLED": "true",
+            "DB_QUERY_BUDGET_PER_UPDATE": str(args.query_budget),
+            "DB_QUERY_BUDGET_PER_WEBHOOK": str(args.webhook_query_budget),
+            "DB_QUERY_REPEAT_THRESHOLD": str(args.repeat_threshold),
+            "DB_QUERY_BUDGET_STRICT": "true" if args.strict_budget else "false",
+        })
+
+
+async def main(args: argparse.Namespace) -> int:
+    from config.settings import Settings
+    from db.database_setup import (enable_query_budget, enable_query_timing, init_db,
+                                   init_db_connection)
+    from bot.app.controllers.dispatcher_controller import build_dispatcher
+    from bot.app.factories.build_services import build_core_services
+    from bot.app.web.web_server import build_and_start_web_app
+    from bot.main_bot import on_shutdown_configured, register_all_routers
+    from bot.utils.message_queue import init_queue_manager
+
+    telegram = FakeTelegramServer(latency_ms=args.telegram_latency_ms)
+    panel = FakePanelServer(latency_ms=args.panel_latency_ms,
+                            jitter_ms=args.panel_jitter_ms)
+    await telegram.start()
+    await panel.start()
+
+    # Ids unique per run, so repeated runs against one database do not collide
+    run_base = 10 ** 12 + (int(time.time()) % 10 ** 6) * 10 ** 6
+    admin_id = run_base
+    web_port = _free_port()
+    _configure_environment(args, telegram, panel, web_port, admin_id)
+
+    settings = Settings(_env_file=None)
+    session_factory = init_db_connection(settings)
+    await init_db(settings, session_factory)
+    queries = QueryCounter()
+    enable_query_timing(queries)
+    if settings.DB_QUERY_BUDGET_ENABLED:
+        enable_query_budget(settings.DB_QUERY_REPEAT_THRESHOLD,
+                            settings.DB_QUERY_BUDGET_STRICT)
+
+    dp, bot, extra = build_dispatcher(settings, session_factory)
+    bot.session.api = TelegramAPIServer.from_base(telegram.base_url)
+    services = build_core_services(settings, bot, session_factory,
+                                   extra["i18n_instance"], "loadtest_bot")
+    for key, service in services.items():
+        dp[key] = service
+    dp["async_session_factory"] = session_factory
+    dp["queue_manager"] = init_queue_manager(bot)
+    await register_all_routers(dp, settings)
+    web_task = asyncio.create_task(
+        build_and_start_web_app(dp, bot, settings, session_factory))
+
+    http = aiohttp.ClientSession()
+    harness = Harness(
+        args=args, dp=dp, bot=bot, settings=settings,
+        session_factory=session_factory, telegram=telegram, panel=panel,
+        updates=UpdateFactory(bot.id), http=http,
+        web_url=f"http://127.0.0.1:{web_port}", admin_id=admin_id,
+        users=[run_base + 1 + index for index in range(args.users)],
+        fresh_user_ids=itertools.count(run_base + 500_000), queries=queries)
+
+    results: List[ScenarioResult] = []
+    try:
+        # The web app starts the inbox and outbox once it listens
+        for _ in range(100):
+            if web_task.done():
+                web_task.result()
+            try:
+                async with http.get(harness.web_url):
+                    break
+            except aiohttp.ClientConnectionError:
+                await asyncio.sleep(0.1)
+        await _seed_users(harness)
+        for name in args.scenarios:
+            results.append(await run_scenario(harness, name))
+    finally:
+        web_task.cancel()
+        await http.close()
+        await on_shutdown_configured(dp)
+        await telegram.close()
+        await panel.close()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as report_file:
+            json.dump([result.summary() for result in results], report_file,
+                      indent=2, default=str)
+    over_budget = any(kind == query_budget.BUDGET_EXCEEDED
+                      for result in results for kind, _ in result.budget_violations)
+    return 1 if over_budget or any(result.errors for result in results) else 0
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.load_test",
+        description=(
+            "Drive the real dispatcher, web app and database with synthetic "
+            "traffic against local Telegram and panel stand-ins. Writes to the "
+            "configured PostgreSQL database: use a throwaway one."))
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated scenarios to run in order ({', '.join(SCENARIOS)}).")
+    parser.add_argument("--rate", type=float, default=20.0,
+                        help="Operations started per second in each scenario.")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="Seconds of load per scenario (broadcast runs once).")
+    parser.add_argument("--users", type=int, default=200,
+                        help="Size of the seeded user pool.")
+    parser.add_argument("--max-inflight", type=int, default=100,
+                        help="Upper bound on concurrently running operations.")
+    parser.add_argument("--database", default=None,
+                        help="PostgreSQL database name (overrides POSTGRES_DB).")
+    parser.add_argument("--panel-latency-ms", type=float, default=20.0,
+                        help="Base latency of the fake panel API.")
+    parser.add_argument("--panel-jitter-ms", type=float, default=10.0,
+                        help="Random extra latency of the fake panel API.")
+    parser.add_argument("--telegram-latency-ms", type=float, default=5.0,
+                        help="Latency of the fake Bot API.")
+    parser.add_argument("--drain-timeout", type=float, default=120.0,
+                        help="Seconds to wait for the webhook inbox or broadcast queue to empty.")
+    parser.add_argument("--query-budget", type=int, default=None,
+                        help="Enable query budget tracking with this many statements per update; "
+                             "the run fails when any update or webhook exceeds its budget.")
+    parser.add_argument("--webhook-query-budget", type=int, default=40,
+                        help="Statements allowed per webhook request or processed inbox event.")
+    parser.add_argument("--repeat-threshold", type=int, default=5,
+                        help="Parameter sets after which a repeated statement is flagged as N+1.")
+    parser.add_argument("--strict-budget", action="store_true",
+                        help="Make over-budget updates fail (counted as errors) instead of only logging.")
+    parser.add_argument("--json", default=None,
+                        help="Also write the report to this JSON file.")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    if args.rate <= 0 or args.users <= 0:
+        parser.error("--rate and --users must be positive")
+    return args
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    logging.basicConfig(
+        level=getattr(logging, arguments.log_level.upper(), logging.WARNING),
+        stream=sys.stdout,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(asyncio.run(main(arguments)))
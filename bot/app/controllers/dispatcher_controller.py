@@ -4,20 +4,21 @@ from typing import Dict
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 from sqlalchemy.orm import sessionmaker
 
 from config.settings import Settings
+from bot.app.factories.build_fsm_storage import build_fsm_storage
 from bot.middlewares.db_session import DBSessionMiddleware
 from bot.middlewares.i18n import I18nMiddleware, get_i18n_instance, JsonI18n
 from bot.middlewares.ban_check_middleware import BanCheckMiddleware
 from bot.middlewares.action_logger_middleware import ActionLoggerMiddleware
 from bot.middlewares.profile_sync import ProfileSyncMiddleware
 from bot.middlewares.channel_subscription import ChannelSubscriptionMiddleware
+from bot.middlewares.metrics import TimedMiddleware, register_handler_timing
 
 
 def build_dispatcher(settings: Settings, async_session_factory: sessionmaker) -> tuple[Dispatcher, Bot, Dict]:
-    storage = MemoryStorage()
+    storage = build_fsm_storage(settings)
     default_props = DefaultBotProperties(parse_mode=ParseMode.HTML)
     bot = Bot(token=settings.BOT_TOKEN, default=default_props)
 
@@ -28,12 +29,20 @@ def build_dispatcher(settings: Settings, async_session_factory: sessionmaker) ->
     dp["i18n_instance"] = i18n_instance
     dp["async_session_factory"] = async_session_factory
 
-    dp.update.outer_middleware(DBSessionMiddleware(async_session_factory))
-    dp.update.outer_middleware(I18nMiddleware(i18n=i18n_instance, settings=settings))
-    dp.update.outer_middleware(ProfileSyncMiddleware())
-    dp.update.outer_middleware(BanCheckMiddleware(settings=settings, i18n_instance=i18n_instance))
-    dp.update.outer_middleware(ChannelSubscriptionMiddleware(settings=settings, i18n_instance=i18n_instance))
-    dp.update.outer_middleware(ActionLoggerMiddleware(settings=settings))
+    update_middlewares = [
+        DBSessionMiddleware(async_session_factory,
+                            query_budget=settings.DB_QUERY_BUDGET_PER_UPDATE),
+        I18nMiddleware(i18n=i18n_instance, settings=settings),
+        ProfileSyncMiddleware(),
+        BanCheckMiddleware(settings=settings, i18n_instance=i18n_instance),
+        ChannelSubscriptionMiddleware(settings=settings, i18n_instance=i18n_instance),
+        ActionLoggerMiddleware(settings=settings),
+    ]
+    for middleware in update_middlewares:
+        dp.update.outer_middleware(
+            TimedMiddleware(middleware) if settings.METRICS_ENABLED else middleware)
+    if settings.METRICS_ENABLED:
+        register_handler_timing(dp)
 
     return dp, bot, {"i18n_instance": i18n_instance}
 
@@ -0,0 +1,46 @@
+import logging
+
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from config.settings import Settings
+
+FSM_STORAGE_MEMORY = "memory"
+FSM_STORAGE_REDIS = "redis"
+
+
+def build_fsm_storage(settings: Settings) -> BaseStorage:
+    """Create the FSM storage selected by FSM_STORAGE.
+
+    ``memory`` keeps states in the process (single instance, tests); ``redis``
+    shares them between bot replicas and survives restarts.
+    """
+    backend = (settings.FSM_STORAGE or FSM_STORAGE_MEMORY).strip().lower()
+
+    if backend == FSM_STORAGE_MEMORY:
+        logging.info("FSM storage: in-process memory.")
+        return MemoryStorage()
+
+    if backend == FSM_STORAGE_REDIS:
+        if not settings.FSM_REDIS_URL:
+            raise ValueError("FSM_STORAGE=redis requires FSM_REDIS_URL to be set.")
+        try:
+            from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+        except ImportError as e:
+            raise RuntimeError(
+                "FSM_STORAGE=redis requires the 'redis' package to be installed."
+            ) from e
+
+        storage = RedisStorage.from_url(
+            settings.FSM_REDIS_URL,
+            key_builder=DefaultKeyBuilder(prefix=settings.FSM_REDIS_KEY_PREFIX,
+                                          with_bot_id=True),
+            state_ttl=settings.FSM_STATE_TTL_SECONDS or None,
+            data_ttl=settings.FSM_STATE_TTL_SECONDS or None,
+        )
+        logging.info("FSM storage: Redis.")
+        return storage
+
+    raise ValueError(
+        f"Unknown FSM_STORAGE '{settings.FSM_STORAGE}'. Use '{FSM_STORAGE_MEMORY}' or '{FSM_STORAGE_REDIS}'."
+    )
@@ -13,6 +13,13 @@ from bot.services.tribute_service import TributeService
 from bot.services.crypto_pay_service import CryptoPayService
 from bot.services.panel_webhook_service import PanelWebhookService
 from bot.services.freekassa_service import FreeKassaService
+from bot.services.webhook_inbox_service import WebhookInboxService
+from bot.services.outbox_service import OutboxService
+from bot.services.payment_effects_service import PaymentEffectsService
+from bot.services.renewal_scheduler import RenewalScheduler
+from bot.services.subscription_extension_service import SubscriptionExtensionService
+from bot.utils.http_transport import HttpTransport
+from bot.app.factories.lazy_service import LazyService
 
 
 def build_core_services(
@@ -22,12 +29,17 @@ def build_core_services(
     i18n: JsonI18n,
     bot_username_for_default_return: str,
 ):
-    panel_service = PanelApiService(settings)
+    http_transport = HttpTransport(settings)
+    panel_service = PanelApiService(settings, http_transport)
     subscription_service = SubscriptionService(settings, panel_service, bot, i18n)
     referral_service = ReferralService(settings, subscription_service, bot, i18n)
     promo_code_service = PromoCodeService(settings, subscription_service, bot, i18n)
-    stars_service = StarsService(bot, settings, i18n, subscription_service, referral_service)
-    cryptopay_service = CryptoPayService(
+    # Payment providers are built on first use: most updates never touch them
+    stars_service = LazyService("stars_service", lambda: StarsService(
+        bot, settings, i18n, subscription_service, referral_service),
+        service_class=StarsService,
+        configured=lambda: settings.STARS_ENABLED)
+    cryptopay_service = LazyService("cryptopay_service", lambda: CryptoPayService(
         settings.CRYPTOPAY_TOKEN,
         settings.CRYPTOPAY_NETWORK,
         bot,
@@ -36,16 +48,19 @@ def build_core_services(
         async_session_factory,
         subscription_service,
         referral_service,
-    )
-    freekassa_service = FreeKassaService(
+        http_transport,
+    ), service_class=CryptoPayService, configured=lambda: bool(settings.CRYPTOPAY_TOKEN))
+    freekassa_service = LazyService("freekassa_service", lambda: FreeKassaService(
         bot=bot,
         settings=settings,
         i18n=i18n,
         async_session_factory=async_session_factory,
         subscription_service=subscription_service,
         referral_service=referral_service,
-    )
-    tribute_service = TributeService(
+        http_transport=http_transport,
+    ), service_class=FreeKassaService, configured=lambda: bool(
+        settings.FREEKASSA_ENABLED and settings.FREEKASSA_MERCHANT_ID and settings.FREEKASSA_API_KEY))
+    tribute_service = LazyService("tribute_service", lambda: TributeService(
         bot,
         settings,
         i18n,
@@ -53,15 +68,25 @@ def build_core_services(
         panel_service,
         subscription_service,
         referral_service,
-    )
+    ), service_class=TributeService, configured=lambda: settings.TRIBUTE_ENABLED)
     panel_webhook_service = PanelWebhookService(bot, settings, i18n, async_session_factory, panel_service)
-    yookassa_service = YooKassaService(
+    yookassa_service = LazyService("yookassa_service", lambda: YooKassaService(
         shop_id=settings.YOOKASSA_SHOP_ID,
         secret_key=settings.YOOKASSA_SECRET_KEY,
         configured_return_url=settings.YOOKASSA_RETURN_URL,
         bot_username_for_default_return=bot_username_for_default_return,
         settings_obj=settings,
-    )
+        http_transport=http_transport,
+    ), service_class=YooKassaService, configured=lambda: bool(
+        settings.YOOKASSA_SHOP_ID and settings.YOOKASSA_SECRET_KEY))
+
+    webhook_inbox = WebhookInboxService(settings, async_session_factory)
+    outbox = OutboxService(settings, async_session_factory)
+    PaymentEffectsService(bot, settings, i18n, referral_service,
+                          subscription_service).register(outbox)
+    renewal_scheduler = RenewalScheduler(settings, async_session_factory, subscription_service)
+    subscription_extension_service = SubscriptionExtensionService(
+        settings, async_session_factory, panel_service)
 
     # Wire services that depend on each other
     try:
@@ -69,10 +94,12 @@ def build_core_services(
         setattr(subscription_service, "yookassa_service", yookassa_service)
         # Allow panel webhook to trigger renewals through subscription service
         setattr(panel_webhook_service, "subscription_service", subscription_service)
+        setattr(panel_webhook_service, "renewal_scheduler", renewal_scheduler)
     except Exception:
         pass
 
     return {
+        "http_transport": http_transport,
         "panel_service": panel_service,
         "subscription_service": subscription_service,
         "referral_service": referral_service,
@@ -83,5 +110,9 @@ def build_core_services(
         "tribute_service": tribute_service,
         "panel_webhook_service": panel_webhook_service,
         "yookassa_service": yookassa_service,
+        "webhook_inbox": webhook_inbox,
+        "outbox": outbox,
+        "renewal_scheduler": renewal_scheduler,
+        "subscription_extension_service": subscription_extension_service,
     }
 
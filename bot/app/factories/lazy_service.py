@@ -0,0 +1,67 @@
+import logging
+import time
+from typing import Any, Callable, Optional, Type
+
+_OWN_PREFIX = "_lazy_"
+
+
+class LazyService:
+    """Stands in for a service and builds it on the first attribute access.
+
+    Handlers and webhook routes receive the proxy under the service's usual
+    key and use it as the service itself. ``close`` only closes a service
+    that was actually built.
+
+    ``isinstance`` checks against ``service_class`` pass without building
+    the service. Truthiness follows ``configured`` (computed from settings,
+    also without building); without it the built service's ``configured``
+    flag is used.
+    """
+
+    def __init__(self,
+                 name: str,
+                 factory: Callable[[], Any],
+                 service_class: Optional[Type] = None,
+                 configured: Optional[Callable[[], bool]] = None):
+        self._lazy_name = name
+        self._lazy_factory = factory
+        self._lazy_class = service_class
+        self._lazy_configured = configured
+        self._lazy_instance: Optional[Any] = None
+
+    @property
+    def __class__(self):
+        return self._lazy_class or type(self)
+
+    def __bool__(self) -> bool:
+        if self._lazy_configured is not None:
+            return bool(self._lazy_configured())
+        return bool(getattr(self._lazy_get(), "configured", True))
+
+    def _lazy_get(self) -> Any:
+        if self._lazy_instance is None:
+            started = time.perf_counter()
+            self._lazy_instance = self._lazy_factory()
+            logging.info(
+                f"{self._lazy_name} created on first use "
+                f"({(time.perf_counter() - started) * 1000:.1f} ms).")
+        return self._lazy_instance
+
+    def __getattr__(self, item: str) -> Any:
+        if item.startswith(_OWN_PREFIX):
+            raise AttributeError(item)
+        return getattr(self._lazy_get(), item)
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        if key.startswith(_OWN_PREFIX):
+            object.__setattr__(self, key, value)
+        else:
+            setattr(self._lazy_get(), key, value)
+
+    async def close(self) -> None:
+        instance = self._lazy_instance
+        if instance is None:
+            return
+        close = getattr(instance, "close", None) or getattr(instance, "close_session", None)
+        if callable(close):
+            await close()
@@ -0,0 +1,17 @@
+from aiohttp import web
+
+
+async def health_route(request: web.Request) -> web.Response:
+    """Liveness: answers 200 while the web server runs, with the startup state."""
+    startup_state = request.app.get("startup_state")
+    body = startup_state.snapshot() if startup_state else {"ready": True}
+    return web.json_response(body)
+
+
+async def readiness_route(request: web.Request) -> web.Response:
+    """Readiness: 503 until the web server listens and the initial sync has finished."""
+    startup_state = request.app.get("startup_state")
+    if startup_state is None:
+        return web.json_response({"ready": True})
+    return web.json_response(startup_state.snapshot(),
+                             status=200 if startup_state.ready else 503)
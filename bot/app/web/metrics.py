@@ -0,0 +1,69 @@
+import hmac
+from typing import List
+
+from aiohttp import web
+
+from config.settings import Settings
+from bot.utils.metrics import render_gauge, render_histograms
+from db.database_setup import get_db_pool_stats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _runtime_gauges(app: web.Application) -> List[str]:
+    """Pool, circuit breaker and loop lag state, read at scrape time."""
+    lines: List[str] = []
+
+    pool_stats = get_db_pool_stats()
+    if pool_stats:
+        lines.extend(render_gauge(
+            "bot_db_pool_connections", "Database pool connections by state.",
+            [({"state": "checked_out"}, pool_stats["checked_out"]),
+             ({"state": "checked_in"}, pool_stats["checked_in"]),
+             ({"state": "overflow"}, pool_stats["overflow"])]))
+        if "checkouts" in pool_stats:
+            lines.extend(render_gauge(
+                "bot_db_pool_checkout_timeouts_total",
+                "Pool checkouts that timed out waiting for a connection.",
+                [({}, pool_stats["timeouts"])], metric_type="counter"))
+
+    http_transport = app.get("http_transport")
+    if http_transport:
+        http_stats = http_transport.stats()
+        lines.extend(render_gauge(
+            "bot_http_pool_connections", "Shared outbound HTTP pool connections by state.",
+            [({"state": "in_use"}, http_stats["in_use"]),
+             ({"state": "idle"}, http_stats["idle"])]))
+        lines.extend(render_gauge(
+            "bot_http_pool_events_total", "Shared outbound HTTP pool events.",
+            [({"event": key}, http_stats[key])
+             for key in ("requests", "new_connections", "reused_connections",
+                         "queued_for_connection", "dns_cache_hits", "dns_cache_misses")],
+            metric_type="counter"))
+
+    panel_service = app.get("panel_service")
+    if panel_service:
+        lines.extend(render_gauge(
+            "bot_panel_circuit_open", "1 while a panel API circuit breaker is open or half-open.",
+            [({"circuit": name}, 0 if state == "closed" else 1)
+             for name, state in panel_service.circuit_states().items()]))
+
+    loop_lag_monitor = app.get("loop_lag_monitor")
+    if loop_lag_monitor:
+        snapshot = loop_lag_monitor.snapshot()
+        lines.extend(render_gauge(
+            "bot_event_loop_lag_max_seconds", "Largest event loop lag seen since start.",
+            [({}, snapshot["max_ms"] / 1000)]))
+    return lines
+
+
+async def metrics_route(request: web.Request) -> web.Response:
+    settings: Settings = request.app["settings"]
+    token = settings.METRICS_AUTH_TOKEN
+    if token:
+        provided = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(provided.encode(), f"Bearer {token}".encode()):
+            return web.Response(status=401)
+    body = render_histograms(_runtime_gauges(request.app))
+    return web.Response(body=body.encode(),
+                        headers={"Content-Type": CONTENT_TYPE})
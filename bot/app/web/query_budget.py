@@ -0,0 +1,26 @@
+from typing import Awaitable, Callable, Collection
+
+from aiohttp import web
+
+from db.query_budget import query_scope
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+def build_query_budget_middleware(paths: Collection[str], budget: int):
+    """aiohttp middleware counting the SQL statements of each provider webhook request.
+
+    The Telegram route is left out: its update is processed in the
+    background and counted by DBSessionMiddleware instead.
+    """
+    paths = frozenset(paths)
+
+    @web.middleware
+    async def query_budget_middleware(request: web.Request,
+                                      handler: Handler) -> web.StreamResponse:
+        if request.path not in paths:
+            return await handler(request)
+        with query_scope(f"webhook {request.path}", budget):
+            return await handler(request)
+
+    return query_budget_middleware
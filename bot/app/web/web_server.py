@@ -1,5 +1,6 @@
 import asyncio
 import logging
+from functools import partial
 from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
@@ -14,7 +15,9 @@ async def build_and_start_web_app(
     settings: Settings,
     async_session_factory: sessionmaker,
 ):
-    app = web.Application()
+    # Per-route limits are checked in the webhook handlers; this caps everything else
+    app = web.Application(client_max_size=max(settings.WEBHOOK_MAX_BODY_BYTES,
+                                              settings.PANEL_WEBHOOK_MAX_BODY_BYTES))
     app["bot"] = bot
     app["dp"] = dp
     app["settings"] = settings
@@ -31,11 +34,27 @@ async def build_and_start_web_app(
         "cryptopay_service",
         "tribute_service",
         "panel_webhook_service",
+        "webhook_inbox",
+        "outbox",
+        "renewal_scheduler",
+        "subscription_extension_service",
+        "http_transport",
+        "loop_lag_monitor",
+        "startup_state",
     ):
         # Access dispatcher workflow_data directly to avoid sequence protocol issues
         if hasattr(dp, "workflow_data") and key in dp.workflow_data:  # type: ignore
             app[key] = dp.workflow_data[key]  # type: ignore
 
+    if settings.DB_QUERY_BUDGET_ENABLED:
+        from bot.app.web.query_budget import build_query_budget_middleware
+
+        app.middlewares.append(build_query_budget_middleware(
+            (settings.yookassa_webhook_path, settings.tribute_webhook_path,
+             settings.cryptopay_webhook_path, settings.freekassa_webhook_path,
+             settings.panel_webhook_path),
+            settings.DB_QUERY_BUDGET_PER_WEBHOOK))
+
     setup_application(app, dp, bot=bot)
 
     telegram_uses_webhook_mode = bool(settings.WEBHOOK_BASE_URL)
@@ -53,6 +72,8 @@ async def build_and_start_web_app(
     from bot.services.panel_webhook_service import panel_webhook_route
     from bot.services.freekassa_service import freekassa_webhook_route
 
+    _register_inbox_processors(app)
+
     tribute_path = settings.tribute_webhook_path
     if tribute_path.startswith("/"):
         app.router.add_post(tribute_path, tribute_webhook_route)
@@ -74,6 +95,19 @@ async def build_and_start_web_app(
         app.router.add_post(yk_path, yookassa_webhook_route)
         logging.info(f"YooKassa webhook route configured at: [POST] {yk_path}")
 
+    if settings.METRICS_ENABLED and settings.METRICS_PATH.startswith("/"):
+        from bot.app.web.metrics import metrics_route
+
+        app.router.add_get(settings.METRICS_PATH, metrics_route)
+        logging.info(f"Metrics route configured at: [GET] {settings.METRICS_PATH}")
+
+    from bot.app.web.health import health_route, readiness_route
+
+    if settings.HEALTH_CHECK_PATH.startswith("/"):
+        app.router.add_get(settings.HEALTH_CHECK_PATH, health_route)
+    if settings.READINESS_CHECK_PATH.startswith("/"):
+        app.router.add_get(settings.READINESS_CHECK_PATH, readiness_route)
+
     panel_path = settings.panel_webhook_path
     if panel_path.startswith("/"):
         app.router.add_post(panel_path, panel_webhook_route)
@@ -92,6 +126,52 @@ async def build_and_start_web_app(
         f"AIOHTTP server started on http://{settings.WEB_SERVER_HOST}:{settings.WEB_SERVER_PORT}"
     )
 
+    inbox = app.get("webhook_inbox")
+    if inbox:
+        await inbox.start()
+    outbox = app.get("outbox")
+    if outbox:
+        await outbox.start()
+    renewal_scheduler = app.get("renewal_scheduler")
+    if renewal_scheduler:
+        await renewal_scheduler.start()
+    subscription_extension_service = app.get("subscription_extension_service")
+    if subscription_extension_service:
+        await subscription_extension_service.start()
+
+    startup_state = app.get("startup_state")
+    if startup_state:
+        startup_state.serving = True
+        startup_state.mark("serving")
+
     # Run until cancelled
     await asyncio.Event().wait()
 
+
+
+def _register_inbox_processors(app: web.Application) -> None:
+    """Connect each provider's stored-event processor to the webhook inbox."""
+    inbox = app.get("webhook_inbox")
+    if inbox is None:
+        return
+
+    from bot.handlers.user.payment import process_yookassa_event
+
+    inbox.register_processor("yookassa", partial(process_yookassa_event, app))
+    # Looked up per event so lazily built providers are only created when needed.
+    # Registered whenever present: events stored while a provider was configured
+    # must still be processed.
+    if app.get("tribute_service") is not None:
+        inbox.register_processor(
+            "tribute", lambda event: app["tribute_service"].process_inbound_event(event))
+    if app.get("freekassa_service") is not None:
+        inbox.register_processor(
+            "freekassa", lambda event: app["freekassa_service"].process_inbound_event(event))
+    if app.get("cryptopay_service") is not None:
+        inbox.register_processor(
+            "cryptopay", lambda event: app["cryptopay_service"].process_inbound_event(app, event))
+    if app.get("panel_webhook_service"):
+        inbox.register_batch_processor(
+            "panel",
+            app["panel_webhook_service"].process_inbound_events,
+            batch_size=app["settings"].PANEL_WEBHOOK_BATCH_SIZE)
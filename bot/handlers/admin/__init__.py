@@ -9,6 +9,8 @@ from . import sync_admin
 from . import logs_admin
 from . import payments
 from . import ads
+from . import webhook_inbox
+from . import subscription_extension
 
 admin_router_aggregate = Router(name="admin_features_router")
 
@@ -21,5 +23,7 @@ admin_router_aggregate.include_router(sync_admin.router)
 admin_router_aggregate.include_router(logs_admin.router)
 admin_router_aggregate.include_router(payments.router)
 admin_router_aggregate.include_router(ads.router)
+admin_router_aggregate.include_router(webhook_inbox.router)
+admin_router_aggregate.include_router(subscription_extension.router)
 
 __all__ = ("admin_router_aggregate", )
@@ -8,7 +8,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from config.settings import Settings
 from bot.middlewares.i18n import JsonI18n
 from db.dal import ad_dal
+from db.database_setup import run_read_only
 from bot.states.admin_states import AdminStates
+from bot.utils.pagination import PageRef, build_keyset_page
 
 router = Router(name="admin_ads_router")
 
@@ -16,6 +18,19 @@ router = Router(name="admin_ads_router")
 PAGE_SIZE = 5
 
 
+async def _build_ads_list_keyboard(session: AsyncSession, i18n: JsonI18n, lang: str,
+                                   page_ref: PageRef, total_count: int):
+    campaigns = await ad_dal.list_campaigns_paged(
+        session, page_size=PAGE_SIZE + 1, cursor=page_ref.cursor, direction=page_ref.direction
+    )
+    campaigns_page = build_keyset_page(
+        campaigns, page_ref, PAGE_SIZE, lambda c: (c.created_at, c.ad_campaign_id)
+    )
+    from bot.keyboards.inline.admin_keyboards import get_ads_list_keyboard
+    return get_ads_list_keyboard(
+        i18n, lang, campaigns_page, campaigns_page.total_pages(total_count, PAGE_SIZE)
+    )
+
 @router.callback_query(F.data == "admin_action:ads")
 async def show_ads_menu(callback: types.CallbackQuery, settings: Settings, i18n_data: dict, session: AsyncSession):
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
@@ -26,7 +41,7 @@ async def show_ads_menu(callback: types.CallbackQuery, settings: Settings, i18n_
         await callback.answer("Language error.", show_alert=True)
         return
 
-    totals = await ad_dal.get_totals(session)
+    totals = await run_read_only(ad_dal.get_totals)
     total_cost = totals.get("cost", 0.0)
     total_revenue = totals.get("revenue", 0.0)
     overview = _("admin_ads_overview", revenue=f"{total_revenue:.2f}", cost=f"{total_cost:.2f}")
@@ -37,12 +52,8 @@ async def show_ads_menu(callback: types.CallbackQuery, settings: Settings, i18n_
         from bot.keyboards.inline.admin_keyboards import get_ads_menu_keyboard
         reply_markup = get_ads_menu_keyboard(i18n, current_lang)
     else:
-        current_page = 0
-        total_pages = max(1, (total_count + PAGE_SIZE - 1) // PAGE_SIZE)
-        campaigns = await ad_dal.list_campaigns_paged(session, page=current_page, page_size=PAGE_SIZE)
         text = overview + "\n\n" + _("admin_ads_header")
-        from bot.keyboards.inline.admin_keyboards import get_ads_list_keyboard
-        reply_markup = get_ads_list_keyboard(i18n, current_lang, campaigns, current_page, total_pages)
+        reply_markup = await _build_ads_list_keyboard(session, i18n, current_lang, PageRef(), total_count)
     await callback.message.edit_text(text, reply_markup=reply_markup)
     try:
         await callback.answer()
@@ -59,21 +70,13 @@ async def ads_list_pagination(callback: types.CallbackQuery, settings: Settings,
         await callback.answer("Language error.", show_alert=True)
         return
 
-    try:
-        page = int(callback.data.split(":")[2])
-    except Exception:
-        page = 0
+    page_ref = PageRef.parse(callback.data.split(":", 2)[2])
 
-    totals = await ad_dal.get_totals(session)
+    totals = await run_read_only(ad_dal.get_totals)
     overview = _("admin_ads_overview", revenue=f"{totals.get('revenue', 0.0):.2f}", cost=f"{totals.get('cost', 0.0):.2f}")
     total_count = await ad_dal.count_campaigns(session)
-    total_pages = max(1, (total_count + PAGE_SIZE - 1) // PAGE_SIZE)
-    page = max(0, min(page, total_pages - 1))
-
-    campaigns = await ad_dal.list_campaigns_paged(session, page=page, page_size=PAGE_SIZE)
     text = overview + "\n\n" + _("admin_ads_header")
-    from bot.keyboards.inline.admin_keyboards import get_ads_list_keyboard
-    reply_markup = get_ads_list_keyboard(i18n, current_lang, campaigns, page, total_pages)
+    reply_markup = await _build_ads_list_keyboard(session, i18n, current_lang, page_ref, total_count)
     try:
         await callback.message.edit_text(text, reply_markup=reply_markup)
         await callback.answer()
@@ -91,16 +94,17 @@ async def show_ad_card(callback: types.CallbackQuery, settings: Settings, i18n_d
         await callback.answer("Language error.", show_alert=True)
         return
 
-    parts = callback.data.split(":")
+    parts = callback.data.split(":", 3)
     camp_id = int(parts[2])
-    back_page = int(parts[3]) if len(parts) > 3 else 0
+    back_token = PageRef.parse(parts[3] if len(parts) > 3 else None).token()
 
     camp = await ad_dal.get_campaign_by_id(session, camp_id)
     if not camp:
         await callback.answer(_("admin_promo_not_found"), show_alert=True)
         return
     try:
-        stats = await ad_dal.get_campaign_stats(session, camp_id)
+        stats = await run_read_only(
+            lambda report_session: ad_dal.get_campaign_stats(report_session, camp_id))
     except Exception:
         stats = {"starts": 0, "trials": 0, "payers": 0, "revenue": 0.0}
 
@@ -118,7 +122,7 @@ async def show_ad_card(callback: types.CallbackQuery, settings: Settings, i18n_d
     )
 
     from bot.keyboards.inline.admin_keyboards import get_ad_card_keyboard
-    reply_markup = get_ad_card_keyboard(i18n, current_lang, camp.ad_campaign_id, back_page)
+    reply_markup = get_ad_card_keyboard(i18n, current_lang, camp.ad_campaign_id, back_token)
     try:
         await callback.message.edit_text(text, reply_markup=reply_markup, parse_mode="HTML")
         await callback.answer()
@@ -136,9 +140,9 @@ async def ads_delete_prompt(callback: types.CallbackQuery, settings: Settings, i
         return
 
     try:
-        _, _, camp_id_str, back_page_str = callback.data.split(":", 3)
+        _, _, camp_id_str, back_token = callback.data.split(":", 3)
         camp_id = int(camp_id_str)
-        back_page = int(back_page_str)
+        back_token = PageRef.parse(back_token).token()
     except Exception:
         await callback.answer(i18n.gettext(current_lang, "error_try_again"), show_alert=True)
         return
@@ -146,8 +150,8 @@ async def ads_delete_prompt(callback: types.CallbackQuery, settings: Settings, i
     from bot.keyboards.inline.admin_keyboards import get_confirmation_keyboard
     confirm_text = i18n.gettext(current_lang, "admin_ads_delete_confirm", id=camp_id)
     kb = get_confirmation_keyboard(
-        yes_callback_data=f"admin_ads:delete_confirm:{camp_id}:{back_page}",
-        no_callback_data=f"admin_ads:delete_cancel:{camp_id}:{back_page}",
+        yes_callback_data=f"admin_ads:delete_confirm:{camp_id}:{back_token}",
+        no_callback_data=f"admin_ads:delete_cancel:{camp_id}:{back_token}",
         i18n_instance=i18n,
         lang=current_lang,
     )
@@ -171,7 +175,7 @@ async def ads_delete_cancel(callback: types.CallbackQuery, settings: Settings, i
     try:
         parts = callback.data.split(":", 3)
         camp_id = int(parts[2])
-        back_page = int(parts[3])
+        back_ref = PageRef.parse(parts[3])
     except Exception:
         await callback.answer(_("error_try_again"), show_alert=True)
         return
@@ -181,7 +185,8 @@ async def ads_delete_cancel(callback: types.CallbackQuery, settings: Settings, i
         await callback.answer(_("admin_ads_not_found", default="Кампания не найдена."), show_alert=True)
         return
     try:
-        stats = await ad_dal.get_campaign_stats(session, camp_id)
+        stats = await run_read_only(
+            lambda report_session: ad_dal.get_campaign_stats(report_session, camp_id))
     except Exception:
         stats = {"starts": 0, "trials": 0, "payers": 0, "revenue": 0.0}
     text = _(
@@ -197,7 +202,7 @@ async def ads_delete_cancel(callback: types.CallbackQuery, settings: Settings, i
         revenue=f"{stats['revenue']:.2f}",
     )
     from bot.keyboards.inline.admin_keyboards import get_ad_card_keyboard
-    reply_markup = get_ad_card_keyboard(i18n, current_lang, camp.ad_campaign_id, back_page)
+    reply_markup = get_ad_card_keyboard(i18n, current_lang, camp.ad_campaign_id, back_token)
     try:
         await callback.message.edit_text(text, reply_markup=reply_markup, parse_mode="HTML")
         await callback.answer()
@@ -217,7 +222,7 @@ async def ads_delete_confirm(callback: types.CallbackQuery, settings: Settings,
     try:
         parts = callback.data.split(":", 3)
         camp_id = int(parts[2])
-        back_page = int(parts[3])
+        back_ref = PageRef.parse(parts[3])
     except Exception:
         await callback.answer(_("error_try_again"), show_alert=True)
         return
@@ -236,12 +241,8 @@ async def ads_delete_confirm(callback: types.CallbackQuery, settings: Settings,
         cost=f"{totals.get('cost', 0.0):.2f}",
     )
     total_count = await ad_dal.count_campaigns(session)
-    total_pages = max(1, (total_count + PAGE_SIZE - 1) // PAGE_SIZE)
-    page = max(0, min(back_page, total_pages - 1))
-    campaigns = await ad_dal.list_campaigns_paged(session, page=page, page_size=PAGE_SIZE)
     text = overview + "\n\n" + _("admin_ads_header")
-    from bot.keyboards.inline.admin_keyboards import get_ads_list_keyboard
-    reply_markup = get_ads_list_keyboard(i18n, current_lang, campaigns, page, total_pages)
+    reply_markup = await _build_ads_list_keyboard(session, i18n, current_lang, back_ref, total_count)
     try:
         await callback.message.edit_text(text, reply_markup=reply_markup)
         await callback.answer(_("admin_ads_deleted_success"), show_alert=True)
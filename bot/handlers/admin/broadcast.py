@@ -10,6 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from config.settings import Settings
 
 from db.dal import user_dal, message_log_dal
+from db.database_setup import run_read_only
 
 from bot.states.admin_states import AdminStates
 from bot.keyboards.inline.admin_keyboards import (
@@ -89,7 +90,10 @@ async def process_broadcast_message_handler(
     # Сохраняем данные для рассылки
     await state.update_data(
         broadcast_text=content.text,
-        broadcast_entities=entities,
+        # Plain dicts keep the FSM data serializable for non-memory storages
+        broadcast_entities=[
+            entity.model_dump(exclude_none=True) for entity in entities
+        ],
         broadcast_content_type=content.content_type,
         broadcast_file_id=content.file_id,
         broadcast_target="all",
@@ -239,7 +243,10 @@ async def confirm_broadcast_callback_handler(
             file_id=user_fsm_data.get("broadcast_file_id"),
             text=user_fsm_data.get("broadcast_text")
         )
-        entities = user_fsm_data.get("broadcast_entities", [])
+        entities = [
+            types.MessageEntity.model_validate(entity)
+            for entity in user_fsm_data.get("broadcast_entities", [])
+        ]
         
         if not content.text and content.content_type == "text":
             await callback.message.edit_text(_("admin_broadcast_error_no_message"))
@@ -254,11 +261,12 @@ async def confirm_broadcast_callback_handler(
 
         target = user_fsm_data.get("broadcast_target", "all")
         if target == "active":
-            user_ids = await user_dal.get_user_ids_with_active_subscription(session)
+            select_user_ids = user_dal.get_user_ids_with_active_subscription
         elif target == "inactive":
-            user_ids = await user_dal.get_user_ids_without_active_subscription(session)
+            select_user_ids = user_dal.get_user_ids_without_active_subscription
         else:
-            user_ids = await user_dal.get_all_active_user_ids_for_broadcast(session)
+            select_user_ids = user_dal.get_all_active_user_ids_for_broadcast
+        user_ids = await run_read_only(select_user_ids)
 
         sent_count = 0
         failed_count = 0
@@ -15,6 +15,8 @@ from bot.middlewares.i18n import JsonI18n
 from bot.services.panel_api_service import PanelApiService
 from bot.services.subscription_service import SubscriptionService
 from bot.utils.message_queue import get_queue_manager
+from db.database_setup import get_db_pool_stats
+from bot.utils.pagination import PageRef
 
 from . import broadcast as admin_broadcast_handlers
 from .promo import create as admin_promo_create_handlers
@@ -75,7 +77,7 @@ async def admin_panel_actions_callback_handler(
 
     if action == "stats":
         await admin_stats_handlers.show_statistics_handler(
-            callback, i18n_data, settings, session)
+            callback, i18n_data, settings, session, panel_service)
     elif action == "broadcast":
         await admin_broadcast_handlers.broadcast_message_prompt_handler(
             callback, state, i18n_data, settings, session)
@@ -105,12 +107,9 @@ async def admin_panel_actions_callback_handler(
     elif action == "users_list" and len(action_parts) > 2:
         # Route to users list handler with page number
         from . import user_management as admin_user_management_handlers
-        try:
-            page = int(action_parts[2])
-            await admin_user_management_handlers.users_list_handler(
-                callback, i18n_data, settings, session, page)
-        except (IndexError, ValueError):
-            await callback.answer("Invalid page number", show_alert=True)
+        page_ref = PageRef.parse(callback.data.split(":", 2)[2])
+        await admin_user_management_handlers.users_list_handler(
+            callback, i18n_data, settings, session, page_ref)
     elif action == "users_search_prompt":
         from . import user_management as admin_user_management_handlers
         await admin_user_management_handlers.user_search_prompt_handler(
@@ -255,6 +254,21 @@ async def show_queue_status_handler(callback: types.CallbackQuery, i18n_data: di
             group_processing="✅ Да" if stats['group_queue_processing'] else "❌ Нет",
             group_recent=stats['group_recent_sends']
         )
+
+        pool_stats = get_db_pool_stats()
+        if pool_stats:
+            message_text += "\n\n" + _(
+                "admin_db_pool_status_info",
+                checked_out=pool_stats["checked_out"],
+                size=pool_stats["size"],
+                overflow=pool_stats["overflow"],
+                max_overflow=pool_stats["max_overflow"],
+                checked_in=pool_stats["checked_in"],
+                avg_wait_ms=f"{pool_stats.get('avg_wait_ms', 0.0):.1f}",
+                max_wait_ms=f"{pool_stats.get('max_wait_ms', 0.0):.1f}",
+                timeouts=pool_stats.get("timeouts", 0),
+                checkouts=pool_stats.get("checkouts", 0),
+            )
         
         from bot.keyboards.inline.admin_keyboards import get_back_to_admin_panel_keyboard
         
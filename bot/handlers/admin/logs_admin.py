@@ -1,5 +1,4 @@
 import logging
-import math
 import re
 import csv
 import io
@@ -13,6 +12,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from config.settings import Settings
 
 from db.dal import message_log_dal, user_dal
+from db.database_setup import run_read_only
 from db.models import MessageLog, User
 
 from bot.states.admin_states import AdminStates
@@ -20,6 +20,7 @@ from bot.keyboards.inline.admin_keyboards import (
     get_logs_menu_keyboard, get_logs_pagination_keyboard,
     get_back_to_admin_panel_keyboard)
 from bot.middlewares.i18n import JsonI18n
+from bot.utils.pagination import KeysetPage, PageRef, build_keyset_page
 
 router = Router(name="admin_logs_router")
 USERNAME_REGEX = re.compile(r"^[a-zA-Z0-9_]{5,32}$")
@@ -48,10 +49,13 @@ async def display_logs_menu(callback: types.CallbackQuery, i18n_data: dict,
     await callback.answer()
 
 
+def _log_cursor(log_entry: MessageLog):
+    return log_entry.timestamp, log_entry.log_id
+
+
 async def _display_formatted_logs(target_message: types.Message,
-                                  logs: List[MessageLog],
+                                  logs_page: KeysetPage,
                                   total_logs: int,
-                                  current_page_idx: int,
                                   settings: Settings,
                                   title_key: str,
                                   base_pagination_callback_data: str,
@@ -62,23 +66,26 @@ async def _display_formatted_logs(target_message: types.Message,
     _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
     page_size = settings.LOGS_PAGE_SIZE
     actual_title_kwargs = title_kwargs or {}
-
-    if not logs and total_logs == 0:
+    logs = logs_page.items
+    reply_markup = get_logs_pagination_keyboard(
+        logs_page.prev_ref,
+        logs_page.next_ref,
+        base_pagination_callback_data,
+        i18n,
+        current_lang,
+        back_to_logs_menu=True)
+
+    if not logs:
         text = _(
-            title_key, current_page=1, total_pages=1, **
-            actual_title_kwargs) + "\n\n" + _("admin_no_logs_found")
-        reply_markup = get_logs_pagination_keyboard(
-            current_page_idx,
-            1,
-            base_pagination_callback_data,
-            i18n,
-            current_lang,
-            back_to_logs_menu=True)
+            title_key,
+            current_page=logs_page.page + 1,
+            total_pages=logs_page.page + 1,
+            **actual_title_kwargs) + "\n\n" + _("admin_no_logs_found")
     else:
-        total_pages = math.ceil(total_logs / page_size) if page_size > 0 else 1
+        total_pages = logs_page.total_pages(total_logs, page_size)
         text = _(title_key,
-                 current_page=current_page_idx + 1,
-                 total_pages=max(1, total_pages),
+                 current_page=logs_page.page + 1,
+                 total_pages=total_pages,
                  **actual_title_kwargs) + "\n"
 
         log_entries_text = []
@@ -115,13 +122,6 @@ async def _display_formatted_logs(target_message: types.Message,
                   event_type=log_entry_model.event_type or 'N/A',
                   content_preview=content_preview).replace("\n", "\n  "))
         text += "\n\n".join(log_entries_text)
-        reply_markup = get_logs_pagination_keyboard(
-            current_page_idx,
-            total_pages,
-            base_pagination_callback_data,
-            i18n,
-            current_lang,
-            back_to_logs_menu=True)
 
     try:
         await target_message.edit_text(text,
@@ -157,13 +157,8 @@ async def _display_formatted_logs(target_message: types.Message,
 async def view_all_logs_handler(callback: types.CallbackQuery,
                                 settings: Settings, i18n_data: dict,
                                 session: AsyncSession):
-    page_idx = 0
-    parts = callback.data.split(":")
-    if len(parts) == 3:
-        try:
-            page_idx = int(parts[2])
-        except ValueError:
-            page_idx = 0
+    parts = callback.data.split(":", 2)
+    page_ref = PageRef.parse(parts[2] if len(parts) == 3 else None)
 
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
@@ -171,15 +166,21 @@ async def view_all_logs_handler(callback: types.CallbackQuery,
         await callback.answer("Error processing request.", show_alert=True)
         return
 
-    logs_models = await message_log_dal.get_all_message_logs(
-        session, settings.LOGS_PAGE_SIZE, page_idx * settings.LOGS_PAGE_SIZE)
-    total_logs_count = await message_log_dal.count_all_message_logs(session)
+    async def load_logs(report_session: AsyncSession):
+        return (await message_log_dal.get_all_message_logs(
+            report_session,
+            settings.LOGS_PAGE_SIZE + 1,
+            cursor=page_ref.cursor,
+            direction=page_ref.direction),
+                await message_log_dal.count_all_message_logs(report_session))
+
+    logs_models, total_logs_count = await run_read_only(load_logs)
 
     await _display_formatted_logs(
         target_message=callback.message,
-        logs=logs_models,
+        logs_page=build_keyset_page(logs_models, page_ref,
+                                    settings.LOGS_PAGE_SIZE, _log_cursor),
         total_logs=total_logs_count,
-        current_page_idx=page_idx,
         settings=settings,
         title_key="admin_all_logs_title",
         base_pagination_callback_data="admin_logs:view_all",
@@ -247,16 +248,19 @@ async def process_user_id_for_logs_handler(message: types.Message,
         f"@{user_model_for_logs.username}"
         if user_model_for_logs.username else f"ID {target_user_id}")
 
-    logs_models = await message_log_dal.get_user_message_logs(
-        session, target_user_id, settings.LOGS_PAGE_SIZE, 0)
-    total_user_logs_count = await message_log_dal.count_user_message_logs(
-        session, target_user_id)
+    async def load_logs(report_session: AsyncSession):
+        return (await message_log_dal.get_user_message_logs(
+            report_session, target_user_id, settings.LOGS_PAGE_SIZE + 1),
+                await message_log_dal.count_user_message_logs(
+                    report_session, target_user_id))
+
+    logs_models, total_user_logs_count = await run_read_only(load_logs)
 
     await _display_formatted_logs(
         target_message=message,
-        logs=logs_models,
+        logs_page=build_keyset_page(logs_models, PageRef(),
+                                    settings.LOGS_PAGE_SIZE, _log_cursor),
         total_logs=total_user_logs_count,
-        current_page_idx=0,
         settings=settings,
         title_key="admin_user_logs_title",
         base_pagination_callback_data=f"admin_logs:view_user:{target_user_id}",
@@ -270,9 +274,9 @@ async def view_user_logs_paginated_handler(callback: types.CallbackQuery,
                                            settings: Settings, i18n_data: dict,
                                            session: AsyncSession):
     try:
-        parts = callback.data.split(":")
+        parts = callback.data.split(":", 3)
         target_user_id = int(parts[2])
-        page_idx = int(parts[3])
+        page_ref = PageRef.parse(parts[3])
     except (IndexError, ValueError):
         await callback.answer("Invalid log request format.", show_alert=True)
         return
@@ -294,17 +298,23 @@ async def view_user_logs_paginated_handler(callback: types.CallbackQuery,
         f"@{user_model_for_logs.username}"
         if user_model_for_logs.username else f"ID {target_user_id}")
 
-    logs_models = await message_log_dal.get_user_message_logs(
-        session, target_user_id, settings.LOGS_PAGE_SIZE,
-        page_idx * settings.LOGS_PAGE_SIZE)
-    total_user_logs_count = await message_log_dal.count_user_message_logs(
-        session, target_user_id)
+    async def load_logs(report_session: AsyncSession):
+        return (await message_log_dal.get_user_message_logs(
+            report_session,
+            target_user_id,
+            settings.LOGS_PAGE_SIZE + 1,
+            cursor=page_ref.cursor,
+            direction=page_ref.direction),
+                await message_log_dal.count_user_message_logs(
+                    report_session, target_user_id))
+
+    logs_models, total_user_logs_count = await run_read_only(load_logs)
 
     await _display_formatted_logs(
         target_message=callback.message,
-        logs=logs_models,
+        logs_page=build_keyset_page(logs_models, page_ref,
+                                    settings.LOGS_PAGE_SIZE, _log_cursor),
         total_logs=total_user_logs_count,
-        current_page_idx=page_idx,
         settings=settings,
         title_key="admin_user_logs_title",
         base_pagination_callback_data=f"admin_logs:view_user:{target_user_id}",
@@ -344,8 +354,9 @@ async def export_logs_csv_handler(callback: types.CallbackQuery,
 
     try:
         # Get all logs (limit to 10000 for performance)
-        logs_models = await message_log_dal.get_all_message_logs(
-            session, limit=10000, offset=0)
+        logs_models = await run_read_only(
+            lambda report_session: message_log_dal.get_all_message_logs(
+                report_session, limit=10000))
         
         if not logs_models:
             await callback.message.answer(_(
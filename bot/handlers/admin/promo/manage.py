@@ -15,6 +15,7 @@ from bot.states.admin_states import AdminStates
 from bot.keyboards.inline.admin_keyboards import get_back_to_admin_panel_keyboard, get_admin_panel_keyboard
 from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardButton
 from bot.middlewares.i18n import JsonI18n
+from bot.utils.pagination import PageRef, build_keyset_page
 
 router = Router(name="promo_manage_router")
 
@@ -87,7 +88,7 @@ async def view_promo_codes_handler(callback: types.CallbackQuery, i18n_data: dic
     await callback.answer()
 
 
-async def promo_management_handler(callback: types.CallbackQuery, i18n_data: dict, settings: Settings, session: AsyncSession, page: int = 0):
+async def promo_management_handler(callback: types.CallbackQuery, i18n_data: dict, settings: Settings, session: AsyncSession, page_ref: Optional[PageRef] = None):
     current_lang = i18n_data.get("current_language", "ru")
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
     if not i18n or not callback.message:
@@ -96,34 +97,35 @@ async def promo_management_handler(callback: types.CallbackQuery, i18n_data: dic
     _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
 
     page_size = 10  # Количество промокодов на странице
-    offset = page * page_size
+    page_ref = page_ref or PageRef()
     
-    # Получаем общее количество промокодов
+    # Приблизительное общее количество промокодов (кэшируется)
     total_count = await promo_code_dal.get_promo_codes_count(session)
-    total_pages = (total_count + page_size - 1) // page_size if total_count > 0 else 1
     
-    promo_models = await promo_code_dal.get_all_promo_codes_with_details(session, limit=page_size, offset=offset)
-    if not promo_models and page == 0:
+    promo_models = await promo_code_dal.get_all_promo_codes_with_details(
+        session, limit=page_size + 1, cursor=page_ref.cursor, direction=page_ref.direction)
+    promo_page = build_keyset_page(
+        promo_models, page_ref, page_size, lambda p: (p.created_at, p.promo_code_id))
+    total_pages = promo_page.total_pages(total_count, page_size)
+    if not promo_page.items and page_ref.cursor is None:
         await callback.message.edit_text(_("admin_promo_management_empty"), reply_markup=get_back_to_admin_panel_keyboard(current_lang, i18n), parse_mode="HTML")
         await callback.answer()
         return
 
     builder = InlineKeyboardBuilder()
-    for promo in promo_models:
+    for promo in promo_page.items:
         status_emoji, status_text = get_promo_status_emoji_and_text(promo, i18n, current_lang)
         button_text = f"{status_emoji} {promo.code} ({promo.current_activations}/{promo.max_activations})"
         builder.row(InlineKeyboardButton(text=button_text, callback_data=f"promo_detail:{promo.promo_code_id}"))
     
-    # Добавляем кнопки пагинации если есть больше одной страницы
-    if total_pages > 1:
-        pagination_buttons = []
-        if page > 0:
-            pagination_buttons.append(InlineKeyboardButton(text=_("prev_page_button"), callback_data=f"promo_management:{page-1}"))
-        if page < total_pages - 1:
-            pagination_buttons.append(InlineKeyboardButton(text=_("next_page_button"), callback_data=f"promo_management:{page+1}"))
-        
-        if pagination_buttons:
-            builder.row(*pagination_buttons)
+    # Добавляем кнопки пагинации если есть соседние страницы
+    pagination_buttons = []
+    if promo_page.prev_ref:
+        pagination_buttons.append(InlineKeyboardButton(text=_("prev_page_button"), callback_data=f"promo_management:{promo_page.prev_ref.token()}"))
+    if promo_page.next_ref:
+        pagination_buttons.append(InlineKeyboardButton(text=_("next_page_button"), callback_data=f"promo_management:{promo_page.next_ref.token()}"))
+    if pagination_buttons:
+        builder.row(*pagination_buttons)
     
     # Добавляем кнопки экспорта и возврата
     builder.row(InlineKeyboardButton(text=_("admin_promo_export_csv_button"), callback_data="promo_export_all"))
@@ -132,7 +134,7 @@ async def promo_management_handler(callback: types.CallbackQuery, i18n_data: dic
     # Формируем заголовок с информацией о страницах
     title = _("admin_promo_management_title")
     if total_pages > 1:
-        title += f"\n{_('admin_promo_list_page_info', current=page+1, total=total_pages, count=total_count)}"
+        title += f"\n{_('admin_promo_list_page_info', current=promo_page.page+1, total=total_pages, count=total_count)}"
     
     await callback.message.edit_text(title, reply_markup=builder.as_markup(), parse_mode="HTML")
     await callback.answer()
@@ -140,11 +142,8 @@ async def promo_management_handler(callback: types.CallbackQuery, i18n_data: dic
 
 @router.callback_query(F.data.startswith("promo_management:"))
 async def promo_management_pagination_handler(callback: types.CallbackQuery, i18n_data: dict, settings: Settings, session: AsyncSession):
-    try:
-        page = int(callback.data.split(":")[1])
-        await promo_management_handler(callback, i18n_data, settings, session, page)
-    except (ValueError, IndexError):
-        await callback.answer("Error processing pagination.", show_alert=True)
+    page_ref = PageRef.parse(callback.data.split(":", 1)[1])
+    await promo_management_handler(callback, i18n_data, settings, session, page_ref)
 
 
 @router.callback_query(F.data.startswith("promo_detail:"))
@@ -292,7 +291,7 @@ async def promo_export_all_handler(callback: types.CallbackQuery, i18n_data: dic
         await callback.answer(i18n.gettext(export_lang, "admin_promo_export_all_generating"), show_alert=True)
         
         # Получаем все промокоды
-        all_promos = await promo_code_dal.get_all_promo_codes_with_details(session, limit=10000, offset=0)
+        all_promos = await promo_code_dal.get_all_promo_codes_with_details(session, limit=10000)
         
         output = io.StringIO()
         writer = csv.writer(output)
@@ -1,4 +1,5 @@
 import logging
+from contextlib import nullcontext
 from aiogram import Router, F, types
 from typing import Optional, Dict, List
 from datetime import datetime
@@ -7,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from config.settings import Settings
 
 from db.dal import user_dal, payment_dal, panel_sync_dal
+from db.database_setup import run_read_only
 from db.models import Payment, PanelSyncStatus
 from bot.services.panel_api_service import PanelApiService
 
@@ -18,7 +20,8 @@ router = Router(name="admin_statistics_router")
 
 async def show_statistics_handler(callback: types.CallbackQuery,
                                   i18n_data: dict, settings: Settings,
-                                  session: AsyncSession):
+                                  session: AsyncSession,
+                                  panel_service: Optional[PanelApiService] = None):
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
     if not i18n or not callback.message:
@@ -30,8 +33,16 @@ async def show_statistics_handler(callback: types.CallbackQuery,
 
     stats_text_parts = [f"<b>{_('admin_stats_header')}</b>"]
 
+    # Heavy aggregates are served by the read replica when one is configured
+    async def load_reports(report_session: AsyncSession):
+        return (await user_dal.get_enhanced_user_statistics(report_session),
+                await payment_dal.get_financial_statistics(report_session),
+                await payment_dal.get_recent_payment_logs_with_user(
+                    report_session, limit=5))
+
+    user_stats, financial_stats, last_payments_models = await run_read_only(load_reports)
+
     # Enhanced user statistics
-    user_stats = await user_dal.get_enhanced_user_statistics(session)
     
     stats_text_parts.append(
         f"\n<b>👥 {_('admin_enhanced_users_stats_header', default='Пользователи')}</b>"
@@ -60,11 +71,11 @@ async def show_statistics_handler(callback: types.CallbackQuery,
     stats_text_parts.append(f"\n<b>🖥 {_('admin_panel_stats_header', default='Статистика панели')}</b>")
     
     try:
-        async with PanelApiService(settings) as panel_service:
-            # Get system stats
-            system_stats = await panel_service.get_system_stats()
-            bandwidth_stats = await panel_service.get_bandwidth_stats()
-            nodes_stats = await panel_service.get_nodes_statistics()
+        # The shared service coalesces and briefly caches the stats requests
+        async with (nullcontext(panel_service) if panel_service
+                    else PanelApiService(settings)) as stats_panel_service:
+            system_stats, bandwidth_stats, nodes_stats = (
+                await stats_panel_service.get_panel_stats())
             
             logging.info(f"Panel stats response: system={system_stats}, bandwidth={bandwidth_stats}, nodes={nodes_stats}")
             
@@ -137,8 +148,6 @@ async def show_statistics_handler(callback: types.CallbackQuery,
         stats_text_parts.append(f"⚠️ {_('admin_panel_stats_error_details', default='Детали')}: {str(e)}")
 
     # Financial statistics
-    financial_stats = await payment_dal.get_financial_statistics(session)
-    
     stats_text_parts.append(
         f"\n<b>💰 {_('admin_financial_stats_header', default='Финансовая статистика')}</b>"
     )
@@ -155,9 +164,6 @@ async def show_statistics_handler(callback: types.CallbackQuery,
         f"🏆 {_('admin_financial_all_time_label', default='За все время')}: <b>{financial_stats['all_time_revenue']:.2f} RUB</b>"
     )
 
-    last_payments_models: List[
-        Payment] = await payment_dal.get_recent_payment_logs_with_user(session,
-                                                                       limit=5)
     if last_payments_models:
         stats_text_parts.append(
             f"\n<b>{_('admin_stats_recent_payments_header')}</b>")
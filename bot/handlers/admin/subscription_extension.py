@@ -0,0 +1,135 @@
+import html
+import logging
+import time
+from typing import Optional
+
+from aiogram import Bot, Router, types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import Settings
+from db.dal import subscription_extension_dal
+from db.models import SubscriptionExtensionJob
+from bot.middlewares.i18n import JsonI18n
+from bot.services.subscription_extension_service import SubscriptionExtensionService
+
+router = Router(name="admin_subscription_extension_router")
+
+# Telegram rate-limits message edits, so progress is shown at most this often
+PROGRESS_EDIT_INTERVAL_SECONDS = 3.0
+
+
+def _job_line(_, job: SubscriptionExtensionJob) -> str:
+    return _("admin_extend_job_line",
+             id=job.id,
+             days=job.days,
+             status=job.status,
+             pushed=job.pushed,
+             total=job.total,
+             failed=job.failed,
+             reason=html.escape(job.reason or "-"))
+
+
+def _progress_reporter(bot: Bot, chat_id: int, message_id: int, _):
+    last_edit = 0.0
+
+    async def report(job: SubscriptionExtensionJob) -> None:
+        nonlocal last_edit
+        finished = job.status != subscription_extension_dal.JOB_APPLIED
+        now = time.monotonic()
+        if not finished and now - last_edit < PROGRESS_EDIT_INTERVAL_SECONDS:
+            return
+        last_edit = now
+        key = "admin_extend_finished" if finished else "admin_extend_progress"
+        try:
+            await bot.edit_message_text(
+                _(key, id=job.id, pushed=job.pushed, total=job.total,
+                  failed=job.failed),
+                chat_id=chat_id, message_id=message_id)
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e).lower():
+                raise
+
+    return report
+
+
+@router.message(Command("extend_all"))
+async def extend_all_command_handler(
+        message: types.Message, command: CommandObject, i18n_data: dict,
+        settings: Settings, bot: Bot,
+        subscription_extension_service: Optional[SubscriptionExtensionService] = None):
+    current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
+    i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
+    if not i18n or not subscription_extension_service:
+        await message.answer("Service error.")
+        return
+    _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
+
+    parts = (command.args or "").strip().split(maxsplit=1)
+    if not parts or not parts[0].isdigit() or not 0 < int(parts[0]) <= 3650:
+        await message.answer(_("admin_extend_usage"), parse_mode="HTML")
+        return
+    days = int(parts[0])
+    reason = parts[1] if len(parts) > 1 else None
+
+    status_message = await message.answer(_("admin_extend_started", days=days))
+    admin_id = message.from_user.id if message.from_user else None
+    job = await subscription_extension_service.start_job(
+        days, reason, admin_id,
+        _progress_reporter(bot, status_message.chat.id,
+                           status_message.message_id, _))
+    logging.info(
+        f"Admin {admin_id} started subscription extension job {job.id} "
+        f"(+{days} days, {job.total} subscription(s)).")
+
+
+@router.message(Command("extend_jobs"))
+async def extend_jobs_command_handler(message: types.Message, i18n_data: dict,
+                                      settings: Settings, session: AsyncSession):
+    current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
+    i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
+    if not i18n:
+        await message.answer("Language error.")
+        return
+    _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
+
+    jobs = await subscription_extension_dal.get_recent_jobs(session, limit=10)
+    if not jobs:
+        await message.answer(_("admin_extend_no_jobs"))
+        return
+    lines = [_("admin_extend_jobs_header")]
+    lines.extend(_job_line(_, job) for job in jobs)
+    lines.append("")
+    lines.append(_("admin_extend_resume_hint"))
+    await message.answer("\n".join(lines), parse_mode="HTML")
+
+
+@router.message(Command("extend_resume"))
+async def extend_resume_command_handler(
+        message: types.Message, command: CommandObject, i18n_data: dict,
+        settings: Settings, session: AsyncSession, bot: Bot,
+        subscription_extension_service: Optional[SubscriptionExtensionService] = None):
+    current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
+    i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
+    if not i18n or not subscription_extension_service:
+        await message.answer("Service error.")
+        return
+    _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
+
+    target = (command.args or "").strip()
+    job = (await subscription_extension_dal.get_job(session, int(target))
+           if target.isdigit() else None)
+    if not job or job.status in (subscription_extension_dal.JOB_PENDING,
+                                 subscription_extension_dal.JOB_DONE):
+        await message.answer(_("admin_extend_resume_usage"), parse_mode="HTML")
+        return
+
+    status_message = await message.answer(
+        _("admin_extend_progress", id=job.id, pushed=job.pushed,
+          total=job.total, failed=job.failed))
+    if not subscription_extension_service.resume(
+            job.id,
+            _progress_reporter(bot, status_message.chat.id,
+                               status_message.message_id, _)):
+        await message.answer(_("admin_extend_already_running", id=job.id))
@@ -1,7 +1,7 @@
 import logging
 from aiogram import Router, types, Bot
 from aiogram.filters import Command
-from typing import Optional, Union
+from typing import Any, Dict, Optional, Union
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import update, or_
 from datetime import datetime, timezone
@@ -41,6 +41,8 @@ async def perform_sync(
     users_uuid_updated = 0
     subscriptions_created = 0
     subscriptions_updated = 0
+    # Panel description fixes are pushed in bulk after the loop
+    description_updates: Dict[str, Dict[str, Any]] = {}
 
     try:
         panel_users_data = await panel_service.get_all_panel_users()
@@ -195,9 +197,9 @@ async def perform_sync(
                             desired_description
                             and desired_description != current_panel_description
                         ):
-                            await panel_service.update_user_details_on_panel(
-                                panel_uuid, {"description": description_text}
-                            )
+                            description_updates[panel_uuid] = {
+                                "description": description_text
+                            }
                 except Exception as e_desc:
                     logging.warning(
                         f"Sync: Failed to update description for panel user {panel_uuid} (tg {actual_user_id}): {e_desc}"
@@ -340,6 +342,15 @@ async def perform_sync(
                 )
                 logging.error(f"Error syncing user: {e_user}")
 
+        if description_updates:
+            description_result = await panel_service.apply_user_updates(
+                description_updates
+            )
+            if description_result["failed"]:
+                logging.warning(
+                    f"Sync: Failed to update description for {len(description_result['failed'])} panel user(s)"
+                )
+
         # Update sync status
         status = "completed_with_errors" if sync_errors else "completed"
         # Build additional stats
@@ -18,6 +18,7 @@ from bot.services.panel_api_service import PanelApiService
 from bot.services.referral_service import ReferralService
 from bot.middlewares.i18n import JsonI18n
 from bot.utils import get_message_content, send_direct_message
+from bot.utils.pagination import PageRef, build_keyset_page
 from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardButton
 from bot.utils.text_sanitizer import (
     sanitize_display_name,
@@ -27,11 +28,13 @@ from bot.utils.text_sanitizer import (
 
 router = Router(name="admin_user_management_router")
 USERNAME_REGEX = re.compile(r"^[a-zA-Z0-9_]{5,32}$")
+USERS_LIST_PAGE_SIZE = 15
 
 
 async def users_list_handler(callback: types.CallbackQuery,
                               i18n_data: dict, settings: Settings,
-                              session: AsyncSession, page: int = 0):
+                              session: AsyncSession,
+                              page_ref: Optional[PageRef] = None):
     """Display paginated list of all users"""
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
@@ -45,20 +48,32 @@ async def users_list_handler(callback: types.CallbackQuery,
         from bot.keyboards.inline.admin_keyboards import get_users_list_keyboard
         from db.dal import user_dal
         
-        users = await user_dal.get_all_users_paginated(session, page=page, page_size=15)
+        page_ref = page_ref or PageRef()
+        users = await user_dal.get_all_users_paginated(
+            session,
+            page_size=USERS_LIST_PAGE_SIZE + 1,
+            cursor=page_ref.cursor,
+            direction=page_ref.direction,
+        )
+        users_page = build_keyset_page(
+            users,
+            page_ref,
+            USERS_LIST_PAGE_SIZE,
+            lambda u: (u.registration_date, u.user_id),
+        )
         total_users = await user_dal.count_all_users(session)
-        total_pages = max(1, (total_users + 14) // 15)
+        total_pages = users_page.total_pages(total_users, USERS_LIST_PAGE_SIZE)
         
         # Format message
         header_text = _(
             "admin_users_list_header",
             default="👥 <b>Список пользователей</b>\n\nСтраница {current}/{total} ({total_users} пользователей)",
-            current=page + 1,
+            current=users_page.page + 1,
             total=total_pages,
             total_users=total_users
         )
         
-        keyboard = get_users_list_keyboard(users, page, total_users, i18n, current_lang, page_size=15)
+        keyboard = get_users_list_keyboard(users_page, total_pages, i18n, current_lang)
         
         await callback.message.edit_text(
             header_text,
@@ -531,12 +546,9 @@ async def handle_toggle_ban(callback: types.CallbackQuery, user: User,
         
         # Refresh user card with updated ban status
         user.is_banned = new_ban_status  # Update local object
-        from config.settings import Settings
-        from bot.services.panel_api_service import PanelApiService
-        settings = Settings()
-        async with PanelApiService(settings) as panel_service:
-            subscription_service = SubscriptionService(settings, panel_service)
-            await handle_refresh_user_card(callback, user, subscription_service, session, i18n_instance, lang)
+        # Reuse the shared panel service and its pooled connections
+        subscription_service = SubscriptionService(panel_service.settings, panel_service)
+        await handle_refresh_user_card(callback, user, subscription_service, session, i18n_instance, lang)
         
     except Exception as e:
         logging.error(f"Error toggling ban for user {user.user_id}: {e}")
@@ -577,7 +589,7 @@ async def handle_view_user_logs(callback: types.CallbackQuery, user: User,
     
     try:
         # Get recent logs for user
-        logs = await message_log_dal.get_user_message_logs(session, user.user_id, limit=10, offset=0)
+        logs = await message_log_dal.get_user_message_logs(session, user.user_id, limit=10)
         
         if not logs:
             await callback.answer(_(
@@ -981,7 +993,9 @@ async def process_subscription_days_handler(message: types.Message, state: FSMCo
 @router.message(AdminStates.waiting_for_direct_message_to_user)
 async def process_direct_message_handler(message: types.Message, state: FSMContext,
                                        settings: Settings, i18n_data: dict,
-                                       bot: Bot, session: AsyncSession):
+                                       bot: Bot, session: AsyncSession,
+                                       subscription_service: SubscriptionService,
+                                       referral_service: ReferralService):
     """Process direct message to user"""
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
@@ -1057,25 +1071,21 @@ async def process_direct_message_handler(message: types.Message, state: FSMConte
         ))
         
         # Show user card again  
-        from bot.services.panel_api_service import PanelApiService
-        async with PanelApiService(settings) as panel_service:
-            subscription_service = SubscriptionService(settings, panel_service)
-            referral_service = ReferralService(settings, subscription_service, bot, i18n)
-            user_card_text = await format_user_card(target_user, session, subscription_service, i18n, current_lang, referral_service)
-            keyboard = get_user_card_keyboard(
-                target_user.user_id,
-                i18n,
-                current_lang,
-                target_user.referred_by_id
-            )
-            
-            await _send_with_profile_link_fallback(
-                message.answer,
-                text=user_card_text,
-                markup=keyboard.as_markup(),
-                user_id=target_user.user_id,
-                parse_mode="HTML"
-            )
+        user_card_text = await format_user_card(target_user, session, subscription_service, i18n, current_lang, referral_service)
+        keyboard = get_user_card_keyboard(
+            target_user.user_id,
+            i18n,
+            current_lang,
+            target_user.referred_by_id
+        )
+        
+        await _send_with_profile_link_fallback(
+            message.answer,
+            text=user_card_text,
+            markup=keyboard.as_markup(),
+            user_id=target_user.user_id,
+            parse_mode="HTML"
+        )
         
     except Exception as e:
         logging.error(f"Error sending direct message to user {target_user_id}: {e}")
@@ -1347,9 +1357,9 @@ async def user_card_from_list_handler(callback: types.CallbackQuery,
                                      session: AsyncSession):
     """Display user card when clicked from user list"""
     try:
-        parts = callback.data.split(":")
+        parts = callback.data.split(":", 2)
         user_id = int(parts[1])
-        page = int(parts[2])
+        back_token = PageRef.parse(parts[2] if len(parts) > 2 else None).token()
     except (IndexError, ValueError):
         await callback.answer("Invalid user data", show_alert=True)
         return
@@ -1376,7 +1386,7 @@ async def user_card_from_list_handler(callback: types.CallbackQuery,
     )
     keyboard.button(
         text=_("admin_user_back_to_list_button", default="⬅️ К списку"),
-        callback_data=f"admin_action:users_list:{page}"
+        callback_data=f"admin_action:users_list:{back_token}"
     )
     quick_links_width = 2 if user.referred_by_id else 1
     keyboard.adjust(2, 2, 2, quick_links_width, 1, 2, 1)
@@ -0,0 +1,105 @@
+import html
+import logging
+from typing import Optional
+
+from aiogram import Router, types
+from aiogram.filters import Command, CommandObject
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import Settings
+from db.dal import inbound_event_dal, outbox_dal
+from bot.middlewares.i18n import JsonI18n
+from bot.services.webhook_inbox_service import WebhookInboxService
+from bot.services.outbox_service import OutboxService
+
+router = Router(name="admin_webhook_inbox_router")
+
+
+@router.message(Command("inbox"))
+async def inbox_status_command_handler(message: types.Message, i18n_data: dict,
+                                       settings: Settings,
+                                       session: AsyncSession):
+    current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
+    i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
+    if not i18n:
+        await message.answer("Language error.")
+        return
+    _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
+
+    counts = await inbound_event_dal.count_events_by_status(session)
+    lines = [
+        _("admin_inbox_status_header"),
+        _("admin_inbox_status_counts",
+          pending=counts.get(inbound_event_dal.STATUS_PENDING, 0),
+          processing=counts.get(inbound_event_dal.STATUS_PROCESSING, 0),
+          failed=counts.get(inbound_event_dal.STATUS_FAILED, 0),
+          dead=counts.get(inbound_event_dal.STATUS_DEAD, 0),
+          done=counts.get(inbound_event_dal.STATUS_DONE, 0)),
+    ]
+    dead_events = await inbound_event_dal.get_dead_events(session, limit=10)
+    if dead_events:
+        lines.append("")
+        lines.append(_("admin_inbox_dead_header"))
+        for event in dead_events:
+            error_preview = (event.last_error or "")[:120]
+            lines.append(
+                f"<code>{event.id}</code> {event.provider} {event.event_type or ''} — "
+                f"{html.escape(error_preview)}")
+        lines.append("")
+        lines.append(_("admin_inbox_replay_hint"))
+
+    outbox_counts = await outbox_dal.count_effects_by_status(session)
+    lines.append("")
+    lines.append(_("admin_outbox_status_header"))
+    lines.append(
+        _("admin_inbox_status_counts",
+          pending=outbox_counts.get(outbox_dal.STATUS_PENDING, 0),
+          processing=outbox_counts.get(outbox_dal.STATUS_PROCESSING, 0),
+          failed=outbox_counts.get(outbox_dal.STATUS_FAILED, 0),
+          dead=outbox_counts.get(outbox_dal.STATUS_DEAD, 0),
+          done=outbox_counts.get(outbox_dal.STATUS_DONE, 0)))
+    if outbox_counts.get(outbox_dal.STATUS_DEAD):
+        lines.append(_("admin_outbox_replay_hint"))
+    await message.answer("\n".join(lines), parse_mode="HTML")
+
+
+@router.message(Command("inbox_replay"))
+async def inbox_replay_command_handler(message: types.Message,
+                                       command: CommandObject,
+                                       i18n_data: dict, settings: Settings,
+                                       session: AsyncSession,
+                                       webhook_inbox: Optional[WebhookInboxService] = None,
+                                       outbox: Optional[OutboxService] = None):
+    current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
+    i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
+    if not i18n:
+        await message.answer("Language error.")
+        return
+    _ = lambda key, **kwargs: i18n.gettext(current_lang, key, **kwargs)
+
+    target = (command.args or "").strip()
+    if not target:
+        await message.answer(_("admin_inbox_replay_usage"), parse_mode="HTML")
+        return
+
+    if target.lower() == "outbox":
+        count = await outbox_dal.requeue_effects(session)
+        await session.commit()
+        if outbox:
+            outbox.wake()
+        await message.answer(_("admin_inbox_replay_done", count=count))
+        return
+
+    if target.isdigit():
+        count = await inbound_event_dal.requeue_events(session,
+                                                       event_row_id=int(target))
+    else:
+        provider = None if target.lower() == "all" else target.lower()
+        count = await inbound_event_dal.requeue_events(session, provider=provider)
+    await session.commit()
+    logging.info(
+        f"Admin {message.from_user.id if message.from_user else '?'} requeued {count} inbound event(s) ({target}).")
+
+    if webhook_inbox:
+        webhook_inbox.wake()
+    await message.answer(_("admin_inbox_replay_done", count=count))
@@ -1,4 +1,5 @@
 import logging
+from contextlib import nullcontext
 from aiogram import Router, types, Bot
 from aiogram.types import InlineQuery, InlineQueryResultArticle, InputTextMessageContent
 from typing import List, Optional
@@ -7,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from config.settings import Settings
 from db.dal import user_dal, payment_dal
 from bot.services.referral_service import ReferralService
+from bot.services.panel_api_service import PanelApiService
 from bot.middlewares.i18n import JsonI18n
 
 router = Router(name="inline_mode_router")
@@ -18,7 +20,8 @@ async def inline_query_handler(inline_query: InlineQuery,
                                i18n_data: dict,
                                referral_service: ReferralService,
                                bot: Bot,
-                               session: AsyncSession):
+                               session: AsyncSession,
+                               panel_service: Optional[PanelApiService] = None):
     """Handle inline queries for referral links and admin statistics"""
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
     i18n: Optional[JsonI18n] = i18n_data.get("i18n_instance")
@@ -52,7 +55,7 @@ async def inline_query_handler(inline_query: InlineQuery,
         # For admins: statistics
         if is_admin and (not query or "стат" in query or "stat" in query or "админ" in query or "admin" in query):
             stats_results = await create_admin_stats_results(
-                session, i18n, current_lang, settings
+                session, i18n, current_lang, settings, panel_service
             )
             results.extend(stats_results)
         
@@ -130,7 +133,8 @@ async def create_referral_result(
         return None
 
 
-async def create_admin_stats_results(session: AsyncSession, i18n_instance, lang: str, settings: Settings) -> List[InlineQueryResultArticle]:
+async def create_admin_stats_results(session: AsyncSession, i18n_instance, lang: str, settings: Settings,
+                                     panel_service: Optional[PanelApiService] = None) -> List[InlineQueryResultArticle]:
     """Create admin statistics results for inline query"""
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     results = []
@@ -147,7 +151,7 @@ async def create_admin_stats_results(session: AsyncSession, i18n_instance, lang:
             results.append(financial_stats_result)
         
         # Quick system stats
-        system_stats_result = await create_system_stats_result(session, i18n_instance, lang, settings)
+        system_stats_result = await create_system_stats_result(session, i18n_instance, lang, settings, panel_service)
         if system_stats_result:
             results.append(system_stats_result)
             
@@ -253,18 +257,17 @@ async def create_financial_stats_result(session: AsyncSession, i18n_instance, la
         return None
 
 
-async def create_system_stats_result(session: AsyncSession, i18n_instance, lang: str, settings: Settings) -> Optional[InlineQueryResultArticle]:
+async def create_system_stats_result(session: AsyncSession, i18n_instance, lang: str, settings: Settings,
+                                     panel_service: Optional[PanelApiService] = None) -> Optional[InlineQueryResultArticle]:
     """Create panel statistics result with system/nodes/bandwidth info"""
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     
     try:
-        from bot.services.panel_api_service import PanelApiService
-        
-        # Get panel stats similar to main statistics
-        async with PanelApiService(settings) as panel_service:
-            system_stats = await panel_service.get_system_stats()
-            bandwidth_stats = await panel_service.get_bandwidth_stats()
-            nodes_stats = await panel_service.get_nodes_statistics()
+        # Get panel stats similar to main statistics; the shared service
+        # coalesces and briefly caches them across inline query keystrokes
+        async with (nullcontext(panel_service) if panel_service
+                    else PanelApiService(settings)) as stats_panel_service:
+            system_stats, bandwidth_stats, nodes_stats = await stats_panel_service.get_panel_stats()
             
             if system_stats:
                 users = system_stats.get('users', {})
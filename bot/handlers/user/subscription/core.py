@@ -1,5 +1,6 @@
 import logging
 from aiogram import Router, F, types, Bot
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 from typing import Optional, Union
@@ -83,6 +84,7 @@ async def my_subscription_command_handler(
     subscription_service: SubscriptionService,
     session: AsyncSession,
     bot: Bot,
+    refresh: bool = False,
 ):
     target = event.message if isinstance(event, types.CallbackQuery) else event
     current_lang = i18n_data.get("current_language", settings.DEFAULT_LANGUAGE)
@@ -98,7 +100,10 @@ async def my_subscription_command_handler(
         await target.answer(get_text("error_service_unavailable"))
         return
 
-    active = await subscription_service.get_active_subscription_details(session, event.from_user.id)
+    # Render from the cached panel snapshot; the refresh button fetches live data
+    active = await subscription_service.get_active_subscription_details(
+        session, event.from_user.id, use_snapshot=not refresh
+    )
 
     if not active:
         text = get_text("subscription_not_active")
@@ -148,6 +153,9 @@ async def my_subscription_command_handler(
         ),
     )
 
+    if active.get("is_degraded"):
+        text += "\n\n" + get_text("my_subscription_degraded_notice")
+
     base_markup = get_back_to_main_menu_markup(current_lang, i18n)
     kb = base_markup.inline_keyboard
     try:
@@ -242,6 +250,10 @@ async def my_subscription_command_handler(
                 InlineKeyboardButton(text=get_text("payment_methods_manage_button"), callback_data="pm:manage")
             ])
 
+        prepend_rows.append([
+            InlineKeyboardButton(text=get_text("my_subscription_refresh_button"), callback_data="my_subscription:refresh")
+        ])
+
         if prepend_rows:
             kb = prepend_rows + kb
     except Exception:
@@ -255,6 +267,16 @@ async def my_subscription_command_handler(
             pass
         try:
             await event.message.edit_text(text + tribute_hint, reply_markup=markup, parse_mode="HTML", disable_web_page_preview=True)
+        except TelegramBadRequest as e:
+            # Refreshing an unchanged screen is not an error
+            if "message is not modified" not in str(e).lower():
+                await bot.send_message(
+                    chat_id=target.chat.id,
+                    text=text + tribute_hint,
+                    reply_markup=markup,
+                    parse_mode="HTML",
+                    disable_web_page_preview=True,
+                )
         except Exception:
             await bot.send_message(
                 chat_id=target.chat.id,
@@ -267,6 +289,21 @@ async def my_subscription_command_handler(
         await target.answer(text + tribute_hint, reply_markup=markup, parse_mode="HTML", disable_web_page_preview=True)
 
 
+@router.callback_query(F.data == "my_subscription:refresh")
+async def my_subscription_refresh_handler(
+    callback: types.CallbackQuery,
+    i18n_data: dict,
+    settings: Settings,
+    panel_service: PanelApiService,
+    subscription_service: SubscriptionService,
+    session: AsyncSession,
+    bot: Bot,
+):
+    await my_subscription_command_handler(
+        callback, i18n_data, settings, panel_service, subscription_service, session, bot, refresh=True
+    )
+
+
 @router.callback_query(F.data == "main_action:my_devices")
 async def my_devices_command_handler(
     event: Union[types.Message, types.CallbackQuery],
@@ -6,6 +6,7 @@ import math
 from config.settings import Settings
 from bot.middlewares.i18n import JsonI18n
 from db.models import User
+from bot.utils.pagination import KeysetPage, PageRef
 
 
 def get_admin_panel_keyboard(i18n_instance, lang: str,
@@ -136,41 +137,41 @@ def get_ads_menu_keyboard(i18n_instance, lang: str) -> InlineKeyboardMarkup:
 def get_ads_list_keyboard(
     i18n_instance,
     lang: str,
-    campaigns: list,
-    current_page: int,
+    campaigns_page: KeysetPage,
     total_pages: int,
 ) -> InlineKeyboardMarkup:
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     builder = InlineKeyboardBuilder()
+    back_token = campaigns_page.anchor_ref.token()
 
-    for c in campaigns:
+    for c in campaigns_page.items:
         title = f"{c.source}"
         builder.button(
             text=title,
-            callback_data=f"admin_ads:card:{c.ad_campaign_id}:{current_page}",
+            callback_data=f"admin_ads:card:{c.ad_campaign_id}:{back_token}",
         )
 
     # Pagination row (only when needed)
-    if total_pages > 1:
+    if campaigns_page.prev_ref or campaigns_page.next_ref:
         row = []
-        if current_page > 0:
+        if campaigns_page.prev_ref:
             row.append(
                 InlineKeyboardButton(
                     text="⬅️ " + _("prev_page_button", default="Prev"),
-                    callback_data=f"admin_ads:page:{current_page - 1}",
+                    callback_data=f"admin_ads:page:{campaigns_page.prev_ref.token()}",
                 )
             )
         row.append(
             InlineKeyboardButton(
-                text=f"{current_page + 1}/{total_pages}",
+                text=f"{campaigns_page.page + 1}/{total_pages}",
                 callback_data="ads_page_display",
             )
         )
-        if current_page < total_pages - 1:
+        if campaigns_page.next_ref:
             row.append(
                 InlineKeyboardButton(
                     text=_("next_page_button", default="Next") + " ➡️",
-                    callback_data=f"admin_ads:page:{current_page + 1}",
+                    callback_data=f"admin_ads:page:{campaigns_page.next_ref.token()}",
                 )
             )
         if row:
@@ -184,14 +185,14 @@ def get_ads_list_keyboard(
     return builder.as_markup()
 
 
-def get_ad_card_keyboard(i18n_instance, lang: str, campaign_id: int, back_page: int) -> InlineKeyboardMarkup:
+def get_ad_card_keyboard(i18n_instance, lang: str, campaign_id: int, back_token: str) -> InlineKeyboardMarkup:
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     builder = InlineKeyboardBuilder()
     # Dangerous action: Delete campaign
     builder.button(text=_(key="admin_ads_delete_button", default="🗑 Удалить кампанию"),
-                   callback_data=f"admin_ads:delete:{campaign_id}:{back_page}")
+                   callback_data=f"admin_ads:delete:{campaign_id}:{back_token}")
     builder.button(text=_(key="back_to_ads_list_button", default="⬅️ К списку"),
-                   callback_data=f"admin_ads:page:{back_page}")
+                   callback_data=f"admin_ads:page:{back_token}")
     builder.button(text=_(key="back_to_admin_panel_button"),
                    callback_data="admin_action:main")
     builder.adjust(1)
@@ -215,8 +216,8 @@ def get_logs_menu_keyboard(i18n_instance, lang: str) -> InlineKeyboardMarkup:
 
 
 def get_logs_pagination_keyboard(
-        current_page: int,
-        total_pages: int,
+        prev_ref: Optional[PageRef],
+        next_ref: Optional[PageRef],
         base_callback_data: str,
         i18n_instance,
         lang: str,
@@ -224,16 +225,16 @@ def get_logs_pagination_keyboard(
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     builder = InlineKeyboardBuilder()
     row_buttons = []
-    if current_page > 0:
+    if prev_ref is not None:
         row_buttons.append(
             InlineKeyboardButton(
                 text="⬅️ " + _("prev_page_button", default="Prev"),
-                callback_data=f"{base_callback_data}:{current_page - 1}"))
-    if current_page < total_pages - 1:
+                callback_data=f"{base_callback_data}:{prev_ref.token()}"))
+    if next_ref is not None:
         row_buttons.append(
             InlineKeyboardButton(
                 text=_("next_page_button", default="Next") + " ➡️",
-                callback_data=f"{base_callback_data}:{current_page + 1}"))
+                callback_data=f"{base_callback_data}:{next_ref.token()}"))
 
     if row_buttons: builder.row(*row_buttons)
 
@@ -307,15 +308,15 @@ def get_banned_users_keyboard(banned_users: List[User], current_page: int,
     return builder.as_markup()
 
 
-def get_users_list_keyboard(users: List[User], current_page: int,
-                            total_users: int, i18n_instance, lang: str,
-                            page_size: int = 15) -> InlineKeyboardMarkup:
-    """Generate keyboard for paginated user list"""
+def get_users_list_keyboard(users_page: KeysetPage, total_pages: int,
+                            i18n_instance, lang: str) -> InlineKeyboardMarkup:
+    """Generate keyboard for keyset-paginated user list"""
     _ = lambda key, **kwargs: i18n_instance.gettext(lang, key, **kwargs)
     builder = InlineKeyboardBuilder()
+    back_token = users_page.anchor_ref.token()
     
     # Add user buttons
-    for user in users:
+    for user in users_page.items:
         user_display_parts = []
         if user.username:
             user_display_parts.append(f"@{user.username}")
@@ -327,32 +328,31 @@ def get_users_list_keyboard(users: List[User], current_page: int,
         builder.row(
             InlineKeyboardButton(
                 text=button_text,
-                callback_data=f"admin_user_card_from_list:{user.user_id}:{current_page}"
+                callback_data=f"admin_user_card_from_list:{user.user_id}:{back_token}"
             )
         )
     
     # Pagination buttons
-    if total_users > page_size:
-        total_pages = math.ceil(total_users / page_size)
+    if users_page.prev_ref or users_page.next_ref:
         pagination_buttons = []
-        if current_page > 0:
+        if users_page.prev_ref:
             pagination_buttons.append(
                 InlineKeyboardButton(
                     text=_("prev_page_button"),
-                    callback_data=f"admin_action:users_list:{current_page - 1}"
+                    callback_data=f"admin_action:users_list:{users_page.prev_ref.token()}"
                 )
             )
         pagination_buttons.append(
             InlineKeyboardButton(
-                text=f"{current_page + 1}/{total_pages}",
+                text=f"{users_page.page + 1}/{total_pages}",
                 callback_data="stub_page_display"
             )
         )
-        if current_page < total_pages - 1:
+        if users_page.next_ref:
             pagination_buttons.append(
                 InlineKeyboardButton(
                     text=_("next_page_button"),
-                    callback_data=f"admin_action:users_list:{current_page + 1}"
+                    callback_data=f"admin_action:users_list:{users_page.next_ref.token()}"
                 )
             )
         if pagination_buttons:
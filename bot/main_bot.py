@@ -14,7 +14,8 @@ from sqlalchemy.orm import sessionmaker
 
 from config.settings import Settings
 
-from db.database_setup import init_db_connection
+from db.database_setup import (enable_query_budget, enable_query_timing,
+                               init_db_connection, maintain_message_log_partitions)
 
 from bot.middlewares.i18n import I18nMiddleware, get_i18n_instance, JsonI18n
 from bot.middlewares.db_session import DBSessionMiddleware
@@ -39,6 +40,10 @@ from bot.services.crypto_pay_service import CryptoPayService, cryptopay_webhook_
 from bot.handlers.user import payment as user_payment_webhook_module
 from bot.handlers.admin.sync_admin import perform_sync
 from bot.utils.message_queue import init_queue_manager
+from bot.utils.loop_lag import EventLoopLagMonitor
+from bot.utils.startup_state import (StartupState, SYNC_COMPLETED, SYNC_DISABLED,
+                                     SYNC_FAILED, SYNC_RUNNING)
+from bot.utils import metrics
 
 
 async def register_all_routers(dp: Dispatcher, settings: Settings):
@@ -49,10 +54,6 @@ async def register_all_routers(dp: Dispatcher, settings: Settings):
 async def on_startup_configured(dispatcher: Dispatcher):
     bot: Bot = dispatcher["bot_instance"]
     settings: Settings = dispatcher["settings"]
-    i18n_instance: JsonI18n = dispatcher["i18n_instance"]
-    panel_service: PanelApiService = dispatcher["panel_service"]
-
-    async_session_factory: sessionmaker = dispatcher["async_session_factory"]
 
     logging.info("STARTUP: on_startup_configured executing...")
 
@@ -112,6 +113,30 @@ async def on_startup_configured(dispatcher: Dispatcher):
         )
         raise SystemExit("WEBHOOK_BASE_URL is required. Polling mode is disabled.")
 
+    # Initialize message queue manager
+    try:
+        queue_manager = init_queue_manager(bot)
+        dispatcher["queue_manager"] = queue_manager
+        logging.info("STARTUP: Message queue manager initialized")
+    except Exception as e:
+        logging.error(f"STARTUP: Failed to initialize message queue manager: {e}", exc_info=True)
+
+    # The rest of startup is not needed to serve updates
+    dispatcher["startup_background_task"] = asyncio.create_task(
+        run_background_startup(dispatcher), name="StartupBackgroundTask")
+
+    logging.info("STARTUP: Bot on_startup_configured completed.")
+
+
+async def run_background_startup(dispatcher: Dispatcher):
+    """Menu button, commands and the initial panel sync, run while already serving."""
+    bot: Bot = dispatcher["bot_instance"]
+    settings: Settings = dispatcher["settings"]
+    i18n_instance: JsonI18n = dispatcher["i18n_instance"]
+    panel_service: PanelApiService = dispatcher["panel_service"]
+    async_session_factory: sessionmaker = dispatcher["async_session_factory"]
+    startup_state: Optional[StartupState] = dispatcher.get("startup_state")
+
     if settings.SUBSCRIPTION_MINI_APP_URL:
         try:
             menu_text = i18n_instance.gettext(
@@ -142,17 +167,18 @@ async def on_startup_configured(dispatcher: Dispatcher):
         except Exception as e:
             logging.error(f"STARTUP: Failed to set bot commands: {e}", exc_info=True)
 
-    # Initialize message queue manager
-    try:
-        queue_manager = init_queue_manager(bot)
-        dispatcher["queue_manager"] = queue_manager
-        logging.info("STARTUP: Message queue manager initialized")
-    except Exception as e:
-        logging.error(f"STARTUP: Failed to initialize message queue manager: {e}", exc_info=True)
+    if not settings.STARTUP_SYNC_ENABLED:
+        if startup_state:
+            startup_state.initial_sync = SYNC_DISABLED
+        logging.info("STARTUP: Automatic panel sync is disabled.")
+        return
 
     # Automatic sync on startup
+    sync_status = SYNC_FAILED
+    if startup_state:
+        startup_state.initial_sync = SYNC_RUNNING
     try:
-        logging.info("STARTUP: Running automatic panel sync...")
+        logging.info("STARTUP: Running automatic panel sync in the background...")
         
         async with async_session_factory() as session:
             sync_result = await perform_sync(
@@ -163,19 +189,32 @@ async def on_startup_configured(dispatcher: Dispatcher):
             )
             
         if sync_result.get("status") == "completed":
+            sync_status = SYNC_COMPLETED
             logging.info(f"STARTUP: Automatic sync completed successfully. Details: {sync_result.get('details', 'N/A')}")
         else:
             logging.warning(f"STARTUP: Automatic sync completed with issues. Status: {sync_result.get('status', 'unknown')}")
             
     except Exception as e:
         logging.error(f"STARTUP: Failed to run automatic sync: {e}", exc_info=True)
-
-    logging.info("STARTUP: Bot on_startup_configured completed.")
+    finally:
+        if startup_state:
+            startup_state.initial_sync = sync_status
+            startup_state.mark("initial_sync_finished")
 
 
 async def on_shutdown_configured(dispatcher: Dispatcher):
     logging.warning("SHUTDOWN: on_shutdown_configured executing...")
 
+    startup_task: Optional[asyncio.Task] = dispatcher.get("startup_background_task")
+    if startup_task and not startup_task.done():
+        startup_task.cancel()
+        try:
+            await startup_task
+        except asyncio.CancelledError:
+            logging.info("SHUTDOWN: Background startup task cancelled.")
+        except Exception as e:
+            logging.warning(f"SHUTDOWN: Background startup task failed: {e}")
+
     async def close_service(key: str) -> None:
         service = dispatcher.get(key)
         if not service:
@@ -197,6 +236,11 @@ async def on_shutdown_configured(dispatcher: Dispatcher):
                     logging.warning(f"Failed to close session for {key}: {e}")
 
     for service_key in (
+        "loop_lag_monitor",
+        "renewal_scheduler",
+        "webhook_inbox",
+        "outbox",
+        "subscription_extension_service",
         "panel_service",
         "cryptopay_service",
         "freekassa_service",
@@ -207,6 +251,7 @@ async def on_shutdown_configured(dispatcher: Dispatcher):
         "stars_service",
         "subscription_service",
         "referral_service",
+        "http_transport",
     ):
         await close_service(service_key)
 
@@ -218,6 +263,12 @@ async def on_shutdown_configured(dispatcher: Dispatcher):
         except Exception as e:
             logging.warning(f"SHUTDOWN: Failed to close bot session: {e}")
 
+    try:
+        await dispatcher.storage.close()
+        logging.info("SHUTDOWN: FSM storage closed.")
+    except Exception as e:
+        logging.warning(f"SHUTDOWN: Failed to close FSM storage: {e}")
+
     from db.database_setup import async_engine as global_async_engine
 
     if global_async_engine:
@@ -229,12 +280,18 @@ async def on_shutdown_configured(dispatcher: Dispatcher):
 
 
 async def run_bot(settings_param: Settings):
+    startup_state = StartupState()
     local_async_session_factory = init_db_connection(settings_param)
     if local_async_session_factory is None:
         logging.critical(
             "Failed to initialize database connection and session factory. Exiting."
         )
         return
+    if settings_param.METRICS_ENABLED:
+        enable_query_timing(metrics.observe_query)
+    if settings_param.DB_QUERY_BUDGET_ENABLED:
+        enable_query_budget(settings_param.DB_QUERY_REPEAT_THRESHOLD,
+                            settings_param.DB_QUERY_BUDGET_STRICT)
     dp, bot, extra = build_dispatcher(settings_param, local_async_session_factory)
     i18n_instance = extra["i18n_instance"]
 
@@ -260,6 +317,16 @@ async def run_bot(settings_param: Settings):
         dp[key] = service
     dp["panel_service"] = services["panel_service"]
     dp["async_session_factory"] = local_async_session_factory
+    dp["startup_state"] = startup_state
+    startup_state.mark("services_built")
+    if settings_param.EVENT_LOOP_LAG_MONITOR_ENABLED:
+        loop_lag_monitor = EventLoopLagMonitor(
+            interval=settings_param.EVENT_LOOP_LAG_INTERVAL_SECONDS,
+            warn_threshold_ms=settings_param.EVENT_LOOP_LAG_WARN_MS,
+            on_sample=metrics.observe_loop_lag if settings_param.METRICS_ENABLED else None,
+        )
+        loop_lag_monitor.start()
+        dp["loop_lag_monitor"] = loop_lag_monitor
 
     # Wrap startup/shutdown handlers to satisfy aiogram event signature (no args passed)
     async def _on_startup_wrapper():
@@ -294,7 +361,18 @@ async def run_bot(settings_param: Settings):
 
     main_tasks.append(asyncio.create_task(web_server_task(), name="AIOHTTPServerTask"))
 
-    # Recurring billing moved to panel webhook (24h before expiry). No periodic task needed here.
+    async def message_log_maintenance_task():
+        interval_seconds = max(1, settings_param.MESSAGE_LOGS_MAINTENANCE_INTERVAL_HOURS) * 3600
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await maintain_message_log_partitions(settings_param)
+            except Exception as e:
+                logging.error(f"Message log partition maintenance failed: {e}", exc_info=True)
+
+    main_tasks.append(asyncio.create_task(message_log_maintenance_task(), name="MessageLogMaintenanceTask"))
+
+    # Recurring billing runs in the renewal scheduler, started together with the web server.
 
     logging.info("Starting bot in Webhook mode with AIOHTTP server...")
     logging.info(f"Starting bot with main tasks: {[task.get_name() for task in main_tasks]}")
@@ -5,12 +5,31 @@ from aiogram import BaseMiddleware
 from aiogram.types import Update
 from sqlalchemy.orm import sessionmaker
 
+from db.query_budget import query_scope
+
+
+def describe_update(update: Update) -> str:
+    """Short label of an update for query budget reports, e.g. ``callback_query:pay_stars``."""
+    event_type = update.event_type
+    if update.message and update.message.text and update.message.text.startswith("/"):
+        return f"message:{update.message.text.split()[0].split('@')[0]}"
+    if update.message:
+        return f"message:{update.message.content_type}"
+    if update.callback_query and update.callback_query.data:
+        # Drop ids and prices so one handler gets one label
+        parts = [part for part in update.callback_query.data.split(":")[:2]
+                 if not part.lstrip("-").isdigit()]
+        return f"callback_query:{':'.join(parts)}"
+    return event_type
+
 
 class DBSessionMiddleware(BaseMiddleware):
 
-    def __init__(self, async_session_factory: sessionmaker):
+    def __init__(self, async_session_factory: sessionmaker, query_budget: int = 0):
         super().__init__()
         self.async_session_factory = async_session_factory
+        # Only used when query budget tracking is enabled (DB_QUERY_BUDGET_ENABLED)
+        self.query_budget = query_budget
 
     async def __call__(
         self,
@@ -24,17 +43,18 @@ class DBSessionMiddleware(BaseMiddleware):
                 "async_session_factory not provided to DBSessionMiddleware"
             )
 
-        async with self.async_session_factory() as session:
-            data["session"] = session
-            try:
-                result = await handler(event, data)
-
-                await session.commit()
-                return result
-            except Exception:
-                await session.rollback()
-                logging.error(
-                    "DBSessionMiddleware: Exception caused rollback.", exc_info=True
-                )
-                raise
+        with query_scope(f"update {describe_update(event)}", self.query_budget):
+            async with self.async_session_factory() as session:
+                data["session"] = session
+                try:
+                    result = await handler(event, data)
+
+                    await session.commit()
+                    return result
+                except Exception:
+                    await session.rollback()
+                    logging.error(
+                        "DBSessionMiddleware: Exception caused rollback.", exc_info=True
+                    )
+                    raise
 
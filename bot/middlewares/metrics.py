@@ -0,0 +1,79 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject
+
+from bot.utils.metrics import HANDLER_LATENCY, MIDDLEWARE_LATENCY
+
+
+class HandlerTimingMiddleware(BaseMiddleware):
+    """Inner middleware timing the matched handler by router and function name.
+
+    Registered on the dispatcher's observers, it applies to every nested
+    router (aiogram resolves inner middlewares along the router chain).
+    """
+
+    def __init__(self, event_name: str):
+        super().__init__()
+        self.event_name = event_name
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            handler_object = data.get("handler")
+            callback = getattr(handler_object, "callback", None)
+            router = data.get("event_router")
+            HANDLER_LATENCY.observe(
+                time.perf_counter() - started,
+                self.event_name,
+                getattr(router, "name", None) or "unknown",
+                getattr(callback, "__name__", None) or "unknown",
+            )
+
+
+class TimedMiddleware(BaseMiddleware):
+    """Wraps an outer middleware and records its own time, minus what it wraps."""
+
+    def __init__(self, middleware: BaseMiddleware):
+        super().__init__()
+        self.middleware = middleware
+        self.name = type(middleware).__name__
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        downstream = 0.0
+
+        async def timed_handler(inner_event: TelegramObject,
+                                inner_data: Dict[str, Any]) -> Any:
+            nonlocal downstream
+            handler_started = time.perf_counter()
+            try:
+                return await handler(inner_event, inner_data)
+            finally:
+                downstream += time.perf_counter() - handler_started
+
+        started = time.perf_counter()
+        try:
+            return await self.middleware(timed_handler, event, data)
+        finally:
+            MIDDLEWARE_LATENCY.observe(
+                time.perf_counter() - started - downstream, self.name)
+
+
+def register_handler_timing(dp: Dispatcher) -> None:
+    for event_name, observer in dp.observers.items():
+        if event_name in ("update", "error"):
+            continue
+        observer.middleware(HandlerTimingMiddleware(event_name))
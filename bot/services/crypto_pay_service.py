@@ -13,10 +13,34 @@ from config.settings import Settings
 from bot.middlewares.i18n import JsonI18n
 from bot.services.subscription_service import SubscriptionService
 from bot.services.referral_service import ReferralService
-from bot.keyboards.inline.user_keyboards import get_connect_and_main_keyboard
-from bot.services.notification_service import NotificationService
+from bot.services.payment_effects_service import enqueue_payment_effects
+from bot.services.webhook_inbox_service import WebhookInboxService
+from bot.utils.http_transport import HttpTransport
 from db.dal import payment_dal, user_dal
-from bot.utils.text_sanitizer import sanitize_display_name, username_for_display
+from db.models import InboundEvent
+
+
+class SharedSessionCryptoPay(AioCryptoPay):
+    """AioCryptoPay that sends its requests over the shared HTTP transport.
+
+    aiocryptopay (pinned in requirements.txt) obtains its session through
+    ``get_session`` on every request; this returns the shared session instead
+    of creating a private pool, and ``close`` leaves it to the transport.
+    """
+
+    def __init__(self, token: str, network: Networks, http_transport: HttpTransport):
+        if not callable(getattr(AioCryptoPay, "get_session", None)):
+            raise RuntimeError(
+                "aiocryptopay no longer provides get_session(); "
+                "SharedSessionCryptoPay needs updating")
+        super().__init__(token=token, network=network)
+        self._http_transport = http_transport
+
+    def get_session(self, **kwargs):
+        return self._http_transport.session("cryptopay", operation="payment")
+
+    async def close(self):
+        """The shared session belongs to the HTTP transport."""
 
 
 class CryptoPayService:
@@ -30,6 +54,7 @@ class CryptoPayService:
         async_session_factory: sessionmaker,
         subscription_service: SubscriptionService,
         referral_service: ReferralService,
+        http_transport: Optional[HttpTransport] = None,
     ):
         self.bot = bot
         self.settings = settings
@@ -37,10 +62,14 @@ class CryptoPayService:
         self.async_session_factory = async_session_factory
         self.subscription_service = subscription_service
         self.referral_service = referral_service
+        self.http_transport = http_transport
         if token:
             net = Networks.TEST_NET if str(network).lower() == "testnet" else Networks.MAIN_NET
-            self.client = AioCryptoPay(token=token, network=net)
-            self.client.register_pay_handler(self._invoice_paid_handler)
+            if http_transport is not None:
+                self.client = SharedSessionCryptoPay(token, net, http_transport)
+            else:
+                self.client = AioCryptoPay(token=token, network=net)
+            self.client.register_pay_handler(self._enqueue_paid_update)
             self.configured = True
         else:
             logging.warning("CryptoPay token not provided. CryptoPay disabled")
@@ -124,6 +153,17 @@ class CryptoPayService:
             logging.error(f"CryptoPay invoice creation failed: {e}", exc_info=True)
             return None
 
+    async def _enqueue_paid_update(self, update: Update, app: web.Application):
+        """Called by aiocryptopay after the signature check; stores the update in the inbox."""
+        inbox: WebhookInboxService = app["webhook_inbox"]
+        await inbox.submit("cryptopay",
+                           str(update.update_id),
+                           update.model_dump_json(),
+                           event_type=update.update_type)
+
+    async def process_inbound_event(self, app: web.Application, event: InboundEvent) -> None:
+        await self._invoice_paid_handler(Update.model_validate_json(event.body), app)
+
     async def _invoice_paid_handler(self, update: Update, app: web.Application):
         invoice = update.payload
         if not invoice.payload:
@@ -139,20 +179,22 @@ class CryptoPayService:
             return
 
         async_session_factory: sessionmaker = app["async_session_factory"]
-        bot: Bot = app["bot"]
         settings: Settings = app["settings"]
-        i18n: JsonI18n = app["i18n"]
         subscription_service: SubscriptionService = app["subscription_service"]
-        referral_service: ReferralService = app["referral_service"]
 
         async with async_session_factory() as session:
             try:
-                await payment_dal.update_provider_payment_and_status(
+                updated_payment = await payment_dal.update_provider_payment_and_status(
                     session,
                     payment_db_id,
                     str(invoice.invoice_id),
                     "succeeded",
                 )
+                if not updated_payment:
+                    logging.info(
+                        f"CryptoPay invoice {invoice.invoice_id}: payment {payment_db_id} "
+                        f"missing or already final")
+                    return
                 activation = await subscription_service.activate_subscription(
                     session,
                     user_id,
@@ -161,82 +203,23 @@ class CryptoPayService:
                     payment_db_id,
                     provider="cryptopay",
                 )
-                referral_bonus = await referral_service.apply_referral_bonuses_for_payment(
+                db_user = await user_dal.get_user_by_id(session, user_id)
+                await enqueue_payment_effects(
                     session,
-                    user_id,
-                    months,
-                    current_payment_db_id=payment_db_id,
-                    skip_if_active_before_payment=False,
-                )
-                await session.commit()
-            except Exception as e:
-                await session.rollback()
-                logging.error(f"Failed to process CryptoPay invoice: {e}", exc_info=True)
-                return
-
-            db_user = await user_dal.get_user_by_id(session, user_id)
-            # Use DB language for user-facing messages
-            lang = db_user.language_code if db_user and db_user.language_code else settings.DEFAULT_LANGUAGE
-            _ = lambda k, **kw: i18n.gettext(lang, k, **kw)
-
-            config_link = activation.get("subscription_url") or _("config_link_not_available")
-            final_end = activation.get("end_date")
-            applied_days = 0
-            if referral_bonus and referral_bonus.get("referee_new_end_date"):
-                final_end = referral_bonus["referee_new_end_date"]
-                applied_days = referral_bonus.get("referee_bonus_applied_days", 0)
-
-            if applied_days:
-                inviter_name_display = _("friend_placeholder")
-                if db_user and db_user.referred_by_id:
-                    inviter = await user_dal.get_user_by_id(session, db_user.referred_by_id)
-                    if inviter:
-                        safe_name = sanitize_display_name(inviter.first_name) if inviter.first_name else None
-                        if safe_name:
-                            inviter_name_display = safe_name
-                        elif inviter.username:
-                            inviter_name_display = username_for_display(inviter.username, with_at=False)
-                text = _("payment_successful_with_referral_bonus_full",
-                         months=months,
-                         base_end_date=activation["end_date"].strftime('%Y-%m-%d'),
-                         bonus_days=applied_days,
-                         final_end_date=final_end.strftime('%Y-%m-%d'),
-                         inviter_name=inviter_name_display,
-                         config_link=config_link)
-            else:
-                text = _("payment_successful_full",
-                         months=months,
-                         end_date=final_end.strftime('%Y-%m-%d'),
-                         config_link=config_link)
-
-            markup = get_connect_and_main_keyboard(
-                lang, i18n, settings, config_link, preserve_message=True
-            )
-            try:
-                await bot.send_message(
-                    user_id,
-                    text,
-                    reply_markup=markup,
-                    parse_mode="HTML",
-                    disable_web_page_preview=True,
-                )
-            except Exception as e:
-                logging.error(f"Failed to send CryptoPay success message: {e}")
-
-            # Send notification about payment
-            try:
-                notification_service = NotificationService(bot, settings, i18n)
-                user = await user_dal.get_user_by_id(session, user_id)
-                await notification_service.notify_payment_received(
+                    db_user=db_user,
                     user_id=user_id,
+                    payment_db_id=payment_db_id,
+                    months=months,
                     amount=float(invoice.amount),
                     currency=invoice.asset or settings.DEFAULT_CURRENCY_SYMBOL,
-                    months=months,
-                    payment_provider="crypto_pay",
-                    username=user.username if user else None
+                    provider="crypto_pay",
+                    activation=activation,
                 )
+                await session.commit()
             except Exception as e:
-                logging.error(f"Failed to send crypto_pay payment notification: {e}")
+                await session.rollback()
+                logging.error(f"Failed to process CryptoPay invoice: {e}", exc_info=True)
+                raise
 
     async def webhook_route(self, request: web.Request) -> web.Response:
         if not self.configured or not self.client:
@@ -1,5 +1,4 @@
 import asyncio
-from datetime import datetime
 import hashlib
 import hmac
 import json
@@ -16,10 +15,11 @@ from config.settings import Settings
 from bot.middlewares.i18n import JsonI18n
 from bot.services.subscription_service import SubscriptionService
 from bot.services.referral_service import ReferralService
-from bot.keyboards.inline.user_keyboards import get_connect_and_main_keyboard
-from bot.services.notification_service import NotificationService
+from bot.services.payment_effects_service import enqueue_payment_effects
+from bot.services.webhook_inbox_service import PermanentEventError, WebhookInboxService
+from bot.utils.http_transport import HttpTransport
 from db.dal import payment_dal, user_dal
-from bot.utils.text_sanitizer import sanitize_display_name, username_for_display
+from db.models import InboundEvent
 
 
 class FreeKassaService:
@@ -32,6 +32,7 @@ class FreeKassaService:
         async_session_factory: sessionmaker,
         subscription_service: SubscriptionService,
         referral_service: ReferralService,
+        http_transport: Optional[HttpTransport] = None,
     ):
         self.bot = bot
         self.settings = settings
@@ -50,6 +51,7 @@ class FreeKassaService:
         self.api_base_url: str = "https://api.fk.life/v1"
         self._timeout = ClientTimeout(total=15)
         self._session: Optional[ClientSession] = None
+        self.http_transport = http_transport
         self._nonce_lock = asyncio.Lock()
         self._last_nonce = int(time.time() * 1000)
 
@@ -138,6 +140,8 @@ class FreeKassaService:
             return False, {"message": str(exc)}
 
     async def _get_session(self) -> ClientSession:
+        if self.http_transport is not None:
+            return self.http_transport.session("freekassa", operation="payment")
         if self._session is None or self._session.closed:
             self._session = ClientSession(timeout=self._timeout)
         return self._session
@@ -251,15 +255,52 @@ class FreeKassaService:
             logging.error(f"FreeKassa webhook: invalid order_id value '{order_id_str}'")
             return web.Response(status=400, text="invalid_order_id")
 
+        inbox: WebhookInboxService = request.app["webhook_inbox"]
+        try:
+            async with self.async_session_factory() as session:
+                if not await payment_dal.payment_exists(session, payment_db_id):
+                    logging.error(f"FreeKassa webhook: payment {payment_db_id} not found")
+                    return web.Response(status=404, text="payment_not_found")
+            await inbox.submit(
+                "freekassa",
+                str(provider_payment_id or f"order:{order_id_str}"),
+                json.dumps({
+                    "order_id": order_id_str,
+                    "amount": amount_str,
+                    "provider_payment_id": provider_payment_id,
+                }),
+                event_type="payment",
+            )
+        except Exception as e:
+            logging.error(f"FreeKassa webhook: failed to accept event for order {order_id_str}: {e}",
+                          exc_info=True)
+            return web.Response(status=503, text="retry_later")
+        return web.Response(text="YES")
+
+    async def process_inbound_event(self, event: InboundEvent) -> None:
+        """Apply a stored FreeKassa notification; raising makes the inbox retry it."""
+        data = json.loads(event.body)
+        order_id_str = data["order_id"]
+        amount_str = data["amount"]
+        provider_payment_id = data.get("provider_payment_id")
+        payment_db_id = int(order_id_str)
+
         async with self.async_session_factory() as session:
-            payment = await payment_dal.get_payment_by_db_id(session, payment_db_id)
+            # Moving the payment to succeeded is the duplicate check: a repeated
+            # notification finds it final and changes nothing.
+            payment = await payment_dal.update_provider_payment_and_status(
+                session=session,
+                payment_db_id=payment_db_id,
+                provider_payment_id=str(provider_payment_id or f"freekassa:{order_id_str}"),
+                new_status="succeeded",
+            )
             if not payment:
-                logging.error(f"FreeKassa webhook: payment {payment_db_id} not found")
-                return web.Response(status=404, text="payment_not_found")
-
-            if payment.status == "succeeded":
-                logging.info(f"FreeKassa webhook: payment {payment_db_id} already succeeded")
-                return web.Response(text="YES")
+                if not await payment_dal.payment_exists(session, payment_db_id):
+                    # Checked at ingest, so the payment was deleted since; retrying cannot help
+                    raise PermanentEventError(
+                        f"FreeKassa webhook: payment {payment_db_id} not found")
+                logging.info(f"FreeKassa webhook: payment {payment_db_id} already final")
+                return
 
             # Optional amount verification
             try:
@@ -273,16 +314,7 @@ class FreeKassaService:
             except Exception as e:
                 logging.warning(f"FreeKassa webhook: failed to compare amount for payment {payment_db_id}: {e}")
 
-            activation = None
-            referral_bonus = None
             try:
-                await payment_dal.update_provider_payment_and_status(
-                    session=session,
-                    payment_db_id=payment.payment_id,
-                    provider_payment_id=str(provider_payment_id or f"freekassa:{order_id_str}"),
-                    new_status="succeeded",
-                )
-
                 months = payment.subscription_duration_months or 1
 
                 activation = await self.subscription_service.activate_subscription(
@@ -294,112 +326,25 @@ class FreeKassaService:
                     provider="freekassa",
                 )
 
-                referral_bonus = await self.referral_service.apply_referral_bonuses_for_payment(
+                db_user = await user_dal.get_user_by_id(session, payment.user_id)
+                await enqueue_payment_effects(
                     session,
-                    payment.user_id,
-                    months,
-                    current_payment_db_id=payment.payment_id,
-                    skip_if_active_before_payment=False,
+                    db_user=db_user,
+                    user_id=payment.user_id,
+                    payment_db_id=payment.payment_id,
+                    months=months,
+                    amount=float(payment.amount),
+                    currency=self.default_currency,
+                    provider="freekassa",
+                    activation=activation,
+                    order_id=str(provider_payment_id) if provider_payment_id else None,
                 )
 
                 await session.commit()
             except Exception as e:
                 await session.rollback()
                 logging.error(f"FreeKassa webhook: failed to process payment {payment_db_id}: {e}", exc_info=True)
-                return web.Response(status=500, text="processing_error")
-
-            db_user = payment.user or await user_dal.get_user_by_id(session, payment.user_id)
-            lang = db_user.language_code if db_user and db_user.language_code else self.settings.DEFAULT_LANGUAGE
-            _ = lambda k, **kw: self.i18n.gettext(lang, k, **kw) if self.i18n else k
-
-            config_link = None
-            final_end = None
-            months = payment.subscription_duration_months or 1
-            if activation:
-                config_link = activation.get("subscription_url")
-                final_end = activation.get("end_date")
-
-            applied_days = 0
-            if referral_bonus and referral_bonus.get("referee_new_end_date"):
-                final_end = referral_bonus["referee_new_end_date"]
-                applied_days = referral_bonus.get("referee_bonus_applied_days", 0)
-
-            if not final_end and activation and activation.get("end_date"):
-                final_end = activation["end_date"]
-
-            if not config_link:
-                config_link = _("config_link_not_available")
-            if final_end:
-                end_date_str = final_end.strftime("%Y-%m-%d")
-            else:
-                end_date_str = _("config_link_not_available")
-
-            if applied_days:
-                inviter_name_display = _("friend_placeholder")
-                if db_user and db_user.referred_by_id:
-                    inviter = await user_dal.get_user_by_id(session, db_user.referred_by_id)
-                    if inviter:
-                        safe_name = sanitize_display_name(inviter.first_name) if inviter.first_name else None
-                        if safe_name:
-                            inviter_name_display = safe_name
-                        elif inviter.username:
-                            inviter_name_display = username_for_display(inviter.username, with_at=False)
-                text = _(
-                    "payment_successful_with_referral_bonus_full",
-                    months=months,
-                    base_end_date=activation["end_date"].strftime("%Y-%m-%d") if activation and activation.get("end_date") else end_date_str,
-                    bonus_days=applied_days,
-                    final_end_date=end_date_str,
-                    inviter_name=inviter_name_display,
-                    config_link=config_link,
-                )
-            else:
-                text = _(
-                    "payment_successful_full",
-                    months=months,
-                    end_date=end_date_str,
-                    config_link=config_link,
-                )
-            if provider_payment_id:
-                order_info_text = _(
-                    "free_kassa_order_full",
-                    order_id=provider_payment_id,
-                    date=datetime.now().strftime("%Y-%m-%d"),
-                )
-                text = f"{order_info_text}\n{text}"
-
-            markup = get_connect_and_main_keyboard(
-                lang,
-                self.i18n,
-                self.settings,
-                config_link,
-                preserve_message=True,
-            )
-            try:
-                await self.bot.send_message(
-                    payment.user_id,
-                    text,
-                    reply_markup=markup,
-                    parse_mode="HTML",
-                    disable_web_page_preview=True,
-                )
-            except Exception as e:
-                logging.error(f"FreeKassa notification: failed to send message to user {payment.user_id}: {e}")
-
-            try:
-                notification_service = NotificationService(self.bot, self.settings, self.i18n)
-                await notification_service.notify_payment_received(
-                    user_id=payment.user_id,
-                    amount=float(payment.amount),
-                    currency=self.default_currency,
-                    months=months,
-                    payment_provider="freekassa",
-                    username=db_user.username if db_user else None,
-                )
-            except Exception as e:
-                logging.error(f"FreeKassa notification: failed to notify admins: {e}")
-
-        return web.Response(text="YES")
+                raise
 
 
 async def freekassa_webhook_route(request: web.Request) -> web.Response:
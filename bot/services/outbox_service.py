@@ -0,0 +1,195 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+
+from config.settings import Settings
+from db.dal import outbox_dal
+from db.models import OutboxEvent
+
+OutboxHandler = Callable[[AsyncSession, Dict[str, Any]], Awaitable[None]]
+
+_PURGE_INTERVAL_SECONDS = 3600
+
+
+class OutboxService:
+    """Runs side effects recorded with ``outbox_dal.enqueue_effect``.
+
+    Effects are written in the same transaction as the change that caused
+    them, so they exist exactly when that change committed. Each effect runs
+    its handler in a fresh session that also marks it done; DB writes of the
+    handler therefore commit together with the completion mark. Failures are
+    retried with exponential backoff and dead-lettered after
+    OUTBOX_MAX_ATTEMPTS.
+    """
+
+    def __init__(self, settings: Settings, async_session_factory: sessionmaker):
+        self.settings = settings
+        self.async_session_factory = async_session_factory
+        self._handlers: Dict[str, OutboxHandler] = {}
+        self._wakeup = asyncio.Event()
+        self._inflight: Set[asyncio.Task] = set()
+        self._runner: Optional[asyncio.Task] = None
+        self._last_purge = 0.0
+        # Commit hooks go on the factory's own session class, never on the
+        # global Session, so other sessions in the process are not touched.
+        self._session_class = async_session_factory.kw.get("sync_session_class")
+        self._listening = False
+
+    def register_handler(self, kind: str, handler: OutboxHandler) -> None:
+        self._handlers[kind] = handler
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def _on_commit(self, session: Session) -> None:
+        if session.info.pop(outbox_dal.WAKEUP_INFO_KEY, False):
+            self._wakeup.set()
+
+    @staticmethod
+    def _on_rollback(session: Session, previous_transaction) -> None:
+        session.info.pop(outbox_dal.WAKEUP_INFO_KEY, None)
+
+    def _listen(self) -> None:
+        if self._listening:
+            return
+        if self._session_class is None or self._session_class is Session:
+            logging.warning(
+                "Outbox: session factory has no dedicated sync_session_class; "
+                "effects are picked up on the next poll.")
+            return
+        event.listen(self._session_class, "after_commit", self._on_commit)
+        event.listen(self._session_class, "after_soft_rollback", self._on_rollback)
+        self._listening = True
+
+    def _unlisten(self) -> None:
+        if not self._listening:
+            return
+        event.remove(self._session_class, "after_commit", self._on_commit)
+        event.remove(self._session_class, "after_soft_rollback", self._on_rollback)
+        self._listening = False
+
+    async def start(self) -> None:
+        if self._runner is not None:
+            return
+        self._listen()
+        self._runner = asyncio.create_task(self._run(), name="OutboxDispatcher")
+        logging.info(
+            f"Outbox started with {self.settings.OUTBOX_WORKERS} worker(s) "
+            f"for effects: {', '.join(sorted(self._handlers)) or 'none'}")
+
+    async def close(self) -> None:
+        if self._runner:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        self._unlisten()
+        if self._inflight:
+            # Unfinished effects are reclaimed after their lease.
+            await asyncio.wait(self._inflight, timeout=10)
+
+    async def _run(self) -> None:
+        workers = max(1, self.settings.OUTBOX_WORKERS)
+        poll_seconds = max(0.5, self.settings.OUTBOX_POLL_SECONDS)
+        while True:
+            if len(self._inflight) >= workers:
+                await asyncio.wait(self._inflight,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            self._wakeup.clear()
+            try:
+                claimed = await self._claim(workers - len(self._inflight))
+                await self._maybe_purge()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Outbox: failed to claim effects: {e}",
+                              exc_info=True)
+                claimed = 0
+
+            if claimed:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self, limit: int) -> int:
+        async with self.async_session_factory() as session:
+            effects = await outbox_dal.claim_due_effects(
+                session,
+                limit=limit,
+                lease_seconds=self.settings.OUTBOX_LEASE_SECONDS)
+            await session.commit()
+        for effect in effects:
+            task = asyncio.create_task(self._process(effect),
+                                       name=f"Outbox-{effect.kind}-{effect.id}")
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+        return len(effects)
+
+    async def _process(self, effect: OutboxEvent) -> None:
+        handler = self._handlers.get(effect.kind)
+        async with self.async_session_factory() as session:
+            try:
+                if handler is None:
+                    raise LookupError(
+                        f"No outbox handler registered for '{effect.kind}'")
+                await handler(session, json.loads(effect.payload))
+                await outbox_dal.mark_effect_done(session, effect.id)
+                await session.commit()
+                return
+            except Exception as e:
+                await session.rollback()
+                error = e
+        await self._record_failure(effect, error)
+
+    async def _record_failure(self, effect: OutboxEvent, error: Exception) -> None:
+        attempts = effect.attempts or 1
+        retry_at: Optional[datetime] = None
+        if attempts < self.settings.OUTBOX_MAX_ATTEMPTS:
+            delay = min(self.settings.OUTBOX_RETRY_BASE_SECONDS * 2**(attempts - 1),
+                        self.settings.OUTBOX_RETRY_MAX_SECONDS)
+            retry_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+            logging.warning(
+                f"Outbox: {effect.kind} effect {effect.id} failed "
+                f"(attempt {attempts}), retrying at {retry_at.isoformat()}: {error}")
+        else:
+            logging.error(
+                f"Outbox: {effect.kind} effect {effect.id} dead-lettered "
+                f"after {attempts} attempt(s): {error}",
+                exc_info=error)
+        try:
+            async with self.async_session_factory() as session:
+                await outbox_dal.mark_effect_failed(
+                    session, effect.id, f"{type(error).__name__}: {error}",
+                    retry_at)
+                await session.commit()
+        except Exception as e:
+            logging.error(
+                f"Outbox: failed to record failure of effect {effect.id}: {e}")
+
+    async def _maybe_purge(self) -> None:
+        retention_days = self.settings.OUTBOX_RETENTION_DAYS
+        if retention_days <= 0:
+            return
+        now = time.monotonic()
+        if now - self._last_purge < _PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        async with self.async_session_factory() as session:
+            removed = await outbox_dal.purge_processed_effects(
+                session, retention_days)
+            await session.commit()
+        if removed:
+            logging.info(f"Outbox: purged {removed} processed effect(s).")
@@ -1,7 +1,8 @@
 import aiohttp
+import copy
 import logging
-import json
-from typing import Optional, List, Dict, Any
+import random
+from typing import Optional, List, Dict, Any, Hashable, Iterable, Iterator, Tuple
 from datetime import datetime, timedelta, timezone
 import asyncio
 from urllib.parse import urlencode
@@ -9,18 +10,50 @@ from urllib.parse import urlencode
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.settings import Settings
+from bot.utils.circuit_breaker import STATE_OPEN, CircuitBreaker
+from bot.utils.http_transport import HttpTransport
+from bot.utils.ttl_cache import TTLCache
+from bot.utils.webhook_payload import json_loads
 from db.dal import panel_sync_dal
 from db.models import PanelSyncStatus
 
+# Returned in place of a response while an endpoint's circuit is open
+STATUS_CIRCUIT_OPEN = -5
+# Connection error, client error, timeout, circuit open (see _send)
+_UNAVAILABLE_STATUS_CODES = {-1, -2, -3, STATUS_CIRCUIT_OPEN}
+
+
+class PanelUnavailableError(Exception):
+    """The panel did not answer: network error, timeout, 5xx or open circuit."""
+
+
+class PanelUserNotFoundError(Exception):
+    """The panel answered 404 for a user UUID."""
+
 
 class PanelApiService:
 
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings,
+                 http_transport: Optional[HttpTransport] = None):
         self.settings = settings
         self.base_url = settings.PANEL_API_URL
         self.api_key = settings.PANEL_API_KEY
+        self.http_transport = http_transport
         self._session: Optional[aiohttp.ClientSession] = None
         self.default_client_ip = "127.0.0.1"
+        # Last known panel user payloads by uuid, refreshed by every API call
+        # returning a user, by panel webhooks and by the sync engine.
+        self.user_snapshots: TTLCache[Dict[str, Any]] = TTLCache(
+            settings.PANEL_USER_SNAPSHOT_TTL_SECONDS,
+            settings.PANEL_USER_SNAPSHOT_MAX_ENTRIES,
+            copy_values=True)
+        # Identical GETs running at the same moment share one request; some
+        # endpoints additionally keep their result for a few seconds.
+        self._inflight_gets: Dict[Hashable, asyncio.Task] = {}
+        self._get_cache: TTLCache[Dict[str, Any]] = TTLCache(0, max_entries=1000,
+                                                             copy_values=True)
+        # One breaker per endpoint class ("users", "hwid", "system", ...)
+        self._breakers: Dict[str, CircuitBreaker] = {}
 
     async def __aenter__(self):
         """Context manager entry"""
@@ -31,6 +64,8 @@ class PanelApiService:
         await self.close_session()
 
     async def _get_session(self) -> aiohttp.ClientSession:
+        if self.http_transport is not None:
+            return self.http_transport.session("panel")
         if self._session is None or self._session.closed:
             timeout = aiohttp.ClientTimeout(total=30)
             self._session = aiohttp.ClientSession(timeout=timeout)
@@ -46,6 +81,25 @@ class PanelApiService:
         """Alias for close_session for API consistency."""
         await self.close_session()
 
+    def remember_user_snapshot(self, panel_user: Optional[Dict[str, Any]]) -> None:
+        if not isinstance(panel_user, dict) or not panel_user.get("uuid"):
+            return
+        cached = self.user_snapshots.get(panel_user["uuid"])
+        if (cached and cached.get("updatedAt") and panel_user.get("updatedAt")
+                and panel_user["updatedAt"] < cached["updatedAt"]):
+            # A late webhook retry must not overwrite newer data
+            return
+        self.user_snapshots.set(panel_user["uuid"], panel_user)
+
+    def get_user_snapshot(self, user_uuid: str,
+                          allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        """Cached panel user payload, or None when missing or expired.
+
+        ``allow_stale`` also returns an expired payload, for degraded
+        rendering while the panel is unavailable.
+        """
+        return self.user_snapshots.get(user_uuid, allow_stale=allow_stale)
+
     async def _prepare_headers(self) -> Dict[str, str]:
         headers = {
             "Content-Type": "application/json",
@@ -58,11 +112,146 @@ class PanelApiService:
             headers["Authorization"] = f"Bearer {self.api_key}"
         return headers
 
+    @staticmethod
+    def _get_key(endpoint: str, params: Optional[Dict[str, Any]]) -> Hashable:
+        return (endpoint, tuple(sorted((str(k), str(v)) for k, v in (params or {}).items())))
+
     async def _request(self,
                        method: str,
                        endpoint: str,
                        log_full_response: bool = False,
+                       cache_ttl: float = 0,
                        **kwargs) -> Optional[Dict[str, Any]]:
+        """Send a panel API request.
+
+        Concurrent identical GETs (same endpoint and params) are coalesced
+        into a single request whose result every caller receives; with
+        ``cache_ttl`` a successful GET result is also reused for that many
+        seconds. Every caller gets its own copy of a shared result.
+        """
+        if method.upper() != "GET" or "json" in kwargs:
+            return await self._call(method, endpoint, log_full_response, **kwargs)
+
+        key = self._get_key(endpoint, kwargs.get("params"))
+        if cache_ttl > 0:
+            cached = self._get_cache.get(key)
+            if cached is not None:
+                return cached
+
+        if not self.settings.PANEL_API_COALESCE_GETS:
+            result = await self._call(method, endpoint, log_full_response, **kwargs)
+        else:
+            task = self._inflight_gets.get(key)
+            if task is None:
+                task = asyncio.create_task(
+                    self._call(method, endpoint, log_full_response, **kwargs))
+                self._inflight_gets[key] = task
+                task.add_done_callback(
+                    lambda _, k=key: self._inflight_gets.pop(k, None))
+            # One caller being cancelled must not cancel the shared request
+            result = copy.deepcopy(await asyncio.shield(task))
+
+        if cache_ttl > 0 and result and not result.get("error"):
+            self._get_cache.set(key, result, ttl=cache_ttl)
+        return result
+
+    def _breaker_for(self, endpoint: str) -> CircuitBreaker:
+        endpoint_class = endpoint.strip("/").split("/", 1)[0] or "root"
+        breaker = self._breakers.get(endpoint_class)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                f"panel:{endpoint_class}",
+                failure_threshold=self.settings.PANEL_API_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=self.settings.PANEL_API_BREAKER_RESET_SECONDS)
+            self._breakers[endpoint_class] = breaker
+        return breaker
+
+    def circuit_states(self) -> Dict[str, str]:
+        return {breaker.name: breaker.state for breaker in self._breakers.values()}
+
+    def is_available(self, endpoint: str = "/users") -> bool:
+        """False while the breaker of ``endpoint``'s class is open."""
+        return self._breaker_for(endpoint).state != STATE_OPEN
+
+    @staticmethod
+    def is_unavailable_response(response: Optional[Dict[str, Any]]) -> bool:
+        """The panel did not answer: network error, timeout, 5xx or open circuit."""
+        if not response or not response.get("error"):
+            return False
+        status_code = response.get("status_code") or 0
+        return status_code in _UNAVAILABLE_STATUS_CODES or status_code >= 500
+
+    async def _call(self,
+                    method: str,
+                    endpoint: str,
+                    log_full_response: bool = False,
+                    **kwargs) -> Optional[Dict[str, Any]]:
+        """``_send`` guarded by the endpoint class circuit breaker.
+
+        Idempotent GETs get a shorter timeout and are retried with
+        full-jitter exponential backoff; other methods are sent once.
+        """
+        breaker = self._breaker_for(endpoint)
+        is_get = method.upper() == "GET"
+        attempts = max(1, self.settings.PANEL_API_GET_MAX_ATTEMPTS) if is_get else 1
+        if is_get and self.settings.PANEL_API_GET_TIMEOUT_SECONDS > 0:
+            kwargs.setdefault("timeout", aiohttp.ClientTimeout(
+                total=self.settings.PANEL_API_GET_TIMEOUT_SECONDS))
+
+        result: Optional[Dict[str, Any]] = None
+        for attempt in range(attempts):
+            if not breaker.allow():
+                if result is not None:
+                    return result
+                logging.warning(
+                    f"Panel API {method.upper()} {endpoint} skipped: circuit '{breaker.name}' is open.")
+                return {
+                    "error": True,
+                    "status_code": STATUS_CIRCUIT_OPEN,
+                    "message": "Panel API temporarily unavailable (circuit open)."
+                }
+            result = await self._send(method, endpoint, log_full_response, **kwargs)
+            if self.is_unavailable_response(result):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+                if not (result and result.get("status_code") == 429):
+                    return result
+            if attempt + 1 < attempts:
+                delay = random.uniform(
+                    0, self.settings.PANEL_API_RETRY_BASE_DELAY_SECONDS * 2 ** attempt)
+                await asyncio.sleep(delay)
+        return result
+
+    def _should_log_full_response(self, log_full_response: bool) -> bool:
+        if not logging.getLogger().isEnabledFor(logging.INFO):
+            return False
+        if log_full_response:
+            return True
+        sample_rate = self.settings.PANEL_API_RESPONSE_LOG_SAMPLE_RATE
+        return sample_rate > 0 and random.random() < sample_rate
+
+    @staticmethod
+    def _describe_request(method: str, url: str, kwargs: Dict[str, Any]) -> str:
+        """Log prefix of a request; only built when something is logged."""
+        params = kwargs.get("params")
+        if params:
+            try:
+                url += "?" + urlencode(params)
+            except Exception:
+                pass
+        description = f"Panel API Req: {method.upper()} {url}"
+        payload = kwargs.get("json") if method.upper() in ("POST", "PATCH", "PUT") else None
+        if payload:
+            payload_str = str(payload)
+            description += f" | Payload: {payload_str[:300]}{'...' if len(payload_str) > 300 else ''}"
+        return description
+
+    async def _send(self,
+                    method: str,
+                    endpoint: str,
+                    log_full_response: bool = False,
+                    **kwargs) -> Optional[Dict[str, Any]]:
         if not self.base_url:
             logging.error(
                 "Panel API URL (PANEL_API_URL) not configured in settings.")
@@ -77,87 +266,63 @@ class PanelApiService:
 
         url_for_request = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
 
-        current_params = kwargs.get("params")
-        url_with_params_for_log = url_for_request
-        if current_params:
-            try:
-                url_with_params_for_log += "?" + urlencode(current_params)
-            except Exception:
-                pass
-
-        json_payload_for_log = kwargs.get('json') if method.upper() in [
-            "POST", "PATCH", "PUT"
-        ] else None
-        log_prefix = f"Panel API Req: {method.upper()} {url_with_params_for_log}"
-        if json_payload_for_log:
-            try:
-                payload_str = json.dumps(json_payload_for_log)
-                log_prefix += f" | Payload: {payload_str[:300]}{'...' if len(payload_str) > 300 else ''}"
-            except Exception:
-                log_prefix += f" | Payload: {str(json_payload_for_log)[:300]}..."
         try:
             async with aiohttp_session.request(method.upper(),
                                                url_for_request,
                                                headers=headers,
                                                **kwargs) as response:
                 response_status = response.status
-                response_text = await response.text()
-
-                log_suffix = f"| Status: {response_status}"
-
-                if log_full_response or not (200 <= response_status < 300):
-                    try:
-                        parsed_json_for_log = json.loads(response_text)
-                        pretty_response_text = json.dumps(parsed_json_for_log,
-                                                          indent=2,
-                                                          ensure_ascii=False)
-                        logging.info(
-                            f"{log_prefix} {log_suffix} | Full Response Body:\n{pretty_response_text}"
-                        )
-                    except json.JSONDecodeError:
-                        logging.info(
-                            f"{log_prefix} {log_suffix} | Full Response Text (not JSON):\n{response_text[:2000]}{'...' if len(response_text) > 2000 else ''}"
-                        )
-                else:
+                raw_body = await response.read()
+                is_json = 'application/json' in response.headers.get(
+                    'Content-Type', '').lower()
+                is_ok = 200 <= response_status < 300
+
+                if not is_ok or self._should_log_full_response(log_full_response):
+                    body_text = raw_body.decode("utf-8", errors="replace")
+                    logging.info(
+                        "%s | Status: %s | Response Body:\n%s%s",
+                        self._describe_request(method, url_for_request, kwargs),
+                        response_status, body_text[:4000],
+                        '...' if len(body_text) > 4000 else '')
+                elif logging.getLogger().isEnabledFor(logging.DEBUG):
                     logging.debug(
-                        f"{log_prefix} {log_suffix} | OK. Response Body Preview: {response_text[:200]}{'...' if len(response_text) > 200 else ''}"
-                    )
+                        "%s | Status: %s | OK. Response Body Preview: %s",
+                        self._describe_request(method, url_for_request, kwargs),
+                        response_status,
+                        raw_body[:200].decode("utf-8", errors="replace"))
 
-                if 200 <= response_status < 300:
+                if is_ok:
+                    if not is_json:
+                        return {
+                            "status": "success",
+                            "code": response_status,
+                            "data_text": raw_body.decode("utf-8", errors="replace")
+                        }
                     try:
-                        if 'application/json' in response.headers.get(
-                                'Content-Type', '').lower():
-                            data = json.loads(response_text)
-                            return data
-                        else:
-                            return {
-                                "status": "success",
-                                "code": response_status,
-                                "data_text": response_text
-                            }
-                    except json.JSONDecodeError as e_json_ok:
+                        return json_loads(raw_body)
+                    except ValueError as e_json_ok:
                         logging.error(
-                            f"{log_prefix} {log_suffix} | OK but JSON Parse Error. Error: {e_json_ok}. Body was logged above."
+                            f"Panel API Req: {method.upper()} {url_for_request} | Status: {response_status} | OK but JSON Parse Error: {e_json_ok}"
                         )
                         return {
                             "status": "success_parse_error",
                             "code": response_status,
-                            "data_text": response_text,
+                            "data_text": raw_body.decode("utf-8", errors="replace"),
                             "parse_error": str(e_json_ok)
                         }
                 else:
                     error_details = {
                         "message":
                         f"Request failed with status {response_status}",
-                        "raw_response_text": response_text
+                        "raw_response_text": raw_body.decode("utf-8", errors="replace")
                     }
-                    try:
-                        if 'application/json' in response.headers.get(
-                                'Content-Type', '').lower():
-                            error_json_data = json.loads(response_text)
-                            error_details.update(error_json_data)
-                    except json.JSONDecodeError:
-                        pass
+                    if is_json:
+                        try:
+                            error_json_data = json_loads(raw_body)
+                            if isinstance(error_json_data, dict):
+                                error_details.update(error_json_data)
+                        except ValueError:
+                            pass
                     return {
                         "error": True,
                         "status_code": response_status,
@@ -217,6 +382,8 @@ class PanelApiService:
                 return None
             users_batch = response_data.get("response", {}).get("users", [])
             if not users_batch: break
+            for panel_user in users_batch:
+                self.remember_user_snapshot(panel_user)
             all_users.extend(users_batch)
             if len(users_batch) < page_size: break
             start_offset += page_size
@@ -227,15 +394,26 @@ class PanelApiService:
     async def get_user_by_uuid(
             self,
             user_uuid: str,
-            log_response: bool = True) -> Optional[Dict[str, Any]]:
+            log_response: bool = False,
+            raise_on_unavailable: bool = False) -> Optional[Dict[str, Any]]:
+        """The panel user, or None when it is missing or the call failed.
+
+        With ``raise_on_unavailable`` a panel that did not answer raises
+        PanelUnavailableError instead, so callers can tell it apart from a
+        user that does not exist.
+        """
         endpoint = f"/users/{user_uuid}"
         full_response = await self._request("GET",
                                             endpoint,
                                             log_full_response=log_response)
         if full_response and not full_response.get(
                 "error") and "response" in full_response:
+            self.remember_user_snapshot(full_response.get("response"))
             return full_response.get("response")
 
+        if raise_on_unavailable and self.is_unavailable_response(full_response):
+            raise PanelUnavailableError(full_response.get("message") or str(
+                full_response.get("status_code")))
         return None
 
     async def get_user(
@@ -245,7 +423,7 @@ class PanelApiService:
         telegram_id: Optional[int] = None,
         username: Optional[str] = None,
         email: Optional[str] = None,
-        log_response: bool = True,
+        log_response: bool = False,
     ) -> Optional[Dict[str, Any]]:
         if uuid:
             return await self.get_user_by_uuid(uuid, log_response=log_response)
@@ -265,7 +443,7 @@ class PanelApiService:
             telegram_id: Optional[int] = None,
             username: Optional[str] = None,
             email: Optional[str] = None,
-            log_response: bool = True) -> Optional[List[Dict[str, Any]]]:
+            log_response: bool = False) -> Optional[List[Dict[str, Any]]]:
 
         response_data = None
         filter_used_log = "No filter specified"
@@ -342,7 +520,7 @@ class PanelApiService:
             description: Optional[str] = None,
             tag: Optional[str] = None,
             status: str = "ACTIVE",
-            log_response: bool = True) -> Optional[Dict[str, Any]]:
+            log_response: bool = False) -> Optional[Dict[str, Any]]:
 
         if not (6 <= len(username_on_panel) <= 34 and
                 username_on_panel.replace('_', '').replace('-', '').isalnum()):
@@ -393,6 +571,7 @@ class PanelApiService:
                                        json=payload,
                                        log_full_response=log_response)
         if response and not response.get("error") and "response" in response:
+            self.remember_user_snapshot(response.get("response"))
             logging.info(
                 f"Panel user '{username_on_panel}' created successfully (UUID: {response.get('response',{}).get('uuid')})."
             )
@@ -407,7 +586,13 @@ class PanelApiService:
             self,
             user_uuid: str,
             update_payload: Dict[str, Any],
-            log_response: bool = True) -> Optional[Dict[str, Any]]:
+            log_response: bool = False,
+            raise_on_not_found: bool = False) -> Optional[Dict[str, Any]]:
+        """The updated panel user, or None when the update failed.
+
+        With ``raise_on_not_found`` a 404 raises PanelUserNotFoundError, so
+        callers holding an unverified UUID can re-resolve the user.
+        """
         if 'uuid' not in update_payload:
             update_payload['uuid'] = user_uuid
 
@@ -418,8 +603,13 @@ class PanelApiService:
         if full_response and not full_response.get(
                 "error") and "response" in full_response:
             logging.info(f"User {user_uuid} details updated on panel.")
+            self.remember_user_snapshot(full_response.get("response"))
             return full_response.get("response")
 
+        if (raise_on_not_found and full_response
+                and full_response.get("status_code") == 404):
+            self.user_snapshots.pop(user_uuid)
+            raise PanelUserNotFoundError(user_uuid)
         logging.error(
             f"Failed to update user {user_uuid} details on panel. Payload: {update_payload}, Response: {full_response if not log_response else '(logged above)'}"
         )
@@ -428,7 +618,7 @@ class PanelApiService:
     async def update_user_status_on_panel(self,
                                           user_uuid: str,
                                           enable: bool,
-                                          log_response: bool = True) -> bool:
+                                          log_response: bool = False) -> bool:
         action = "enable" if enable else "disable"
         endpoint = f"/users/{user_uuid}/actions/{action}"
         response_data = await self._request("POST",
@@ -437,6 +627,7 @@ class PanelApiService:
 
         if response_data and not response_data.get(
                 "error") and "response" in response_data:
+            self.remember_user_snapshot(response_data.get("response"))
             actual_status = response_data.get("response", {}).get("status")
             expected_status = "ACTIVE" if enable else "DISABLED"
             if actual_status == expected_status:
@@ -457,8 +648,9 @@ class PanelApiService:
 
     async def delete_user_from_panel(self,
                                      user_uuid: str,
-                                     log_response: bool = True) -> bool:
+                                     log_response: bool = False) -> bool:
         """Delete a user from the panel. Treat not-found as already deleted."""
+        self.user_snapshots.pop(user_uuid)
         endpoint = f"/users/{user_uuid}"
         response_data = await self._request(
             "DELETE", endpoint, log_full_response=log_response
@@ -499,6 +691,106 @@ class PanelApiService:
             return f"{base_sub_url}/{client_type.lower()}"
         return base_sub_url
 
+    def _bulk_chunks(self, user_uuids: Iterable[str]) -> Iterator[List[str]]:
+        unique_uuids = list(dict.fromkeys(u for u in user_uuids if u))
+        chunk_size = max(1, self.settings.PANEL_BULK_CHUNK_SIZE)
+        for start in range(0, len(unique_uuids), chunk_size):
+            yield unique_uuids[start:start + chunk_size]
+
+    async def _bulk_post(self, endpoint: str, user_uuids: Iterable[str],
+                         body: Dict[str, Any]) -> Dict[str, Any]:
+        """POST ``body`` plus a ``uuids`` chunk to a bulk endpoint, chunk by chunk.
+
+        Returns ``{"succeeded": int, "failed": [uuid, ...]}``; a failed chunk
+        does not stop the remaining ones.
+        """
+        succeeded = 0
+        failed: List[str] = []
+        for chunk in self._bulk_chunks(user_uuids):
+            response_data = await self._request(
+                "POST", endpoint, json={"uuids": chunk, **body})
+            for user_uuid in chunk:
+                # Cached payloads of these users are outdated now
+                self.user_snapshots.pop(user_uuid)
+            if response_data and not response_data.get("error"):
+                affected = (response_data.get("response") or {}).get("affectedRows")
+                succeeded += affected if isinstance(affected, int) else len(chunk)
+            else:
+                failed.extend(chunk)
+                logging.error(
+                    f"Panel bulk request {endpoint} failed for {len(chunk)} user(s). Response: {response_data}"
+                )
+        return {"succeeded": succeeded, "failed": failed}
+
+    async def bulk_update_users(self, user_uuids: Iterable[str],
+                                fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Set the same ``fields`` (description, expireAt, trafficLimitBytes...) on many users."""
+        return await self._bulk_post("/users/bulk/update", user_uuids,
+                                     {"fields": fields})
+
+    async def bulk_extend_users_expiration(self, user_uuids: Iterable[str],
+                                           days: int) -> Dict[str, Any]:
+        """Move each user's own expireAt ``days`` days forward."""
+        return await self._bulk_post("/users/bulk/extend-expiration-date",
+                                     user_uuids, {"extendDays": days})
+
+    async def apply_user_updates(
+            self, updates: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Apply per-user update payloads with as few requests as possible.
+
+        Users sharing an identical payload are updated through the bulk
+        endpoint; the remaining ones are PATCHed individually with at most
+        PANEL_BULK_CONCURRENCY requests in flight.
+        """
+        groups: Dict[str, List[str]] = {}
+        payloads: Dict[str, Dict[str, Any]] = {}
+        for user_uuid, payload in updates.items():
+            group_key = repr(sorted(payload.items()))
+            groups.setdefault(group_key, []).append(user_uuid)
+            payloads[group_key] = payload
+
+        succeeded = 0
+        failed: List[str] = []
+        singles: List[str] = []
+        for group_key, user_uuids in groups.items():
+            if len(user_uuids) == 1:
+                singles.append(user_uuids[0])
+                continue
+            result = await self.bulk_update_users(user_uuids, payloads[group_key])
+            succeeded += result["succeeded"]
+            failed.extend(result["failed"])
+
+        semaphore = asyncio.Semaphore(max(1, self.settings.PANEL_BULK_CONCURRENCY))
+
+        async def update_one(user_uuid: str) -> bool:
+            async with semaphore:
+                return await self.update_user_details_on_panel(
+                    user_uuid, dict(updates[user_uuid])) is not None
+
+        results = await asyncio.gather(*(update_one(u) for u in singles))
+        for user_uuid, ok in zip(singles, results):
+            if ok:
+                succeeded += 1
+            else:
+                failed.append(user_uuid)
+        return {"succeeded": succeeded, "failed": failed}
+
+    async def get_users_by_uuids(
+            self, user_uuids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch many users by UUID, PANEL_BULK_CONCURRENCY at a time.
+
+        Missing users and failed lookups are left out of the result.
+        """
+        semaphore = asyncio.Semaphore(max(1, self.settings.PANEL_BULK_CONCURRENCY))
+
+        async def fetch_one(user_uuid: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await self.get_user_by_uuid(user_uuid)
+
+        unique_uuids = list(dict.fromkeys(u for u in user_uuids if u))
+        users = await asyncio.gather(*(fetch_one(u) for u in unique_uuids))
+        return {u: user for u, user in zip(unique_uuids, users) if user}
+
     async def get_user_devices(self, user_uuid: str) -> Optional[List[Dict[str, Any]]]:
         endpoint = f"/hwid/devices/{user_uuid}"
         response_data = await self._request("GET", endpoint, log_full_response=False)
@@ -539,21 +831,35 @@ class PanelApiService:
 
     async def get_system_stats(self) -> Optional[Dict[str, Any]]:
         """Get system statistics (CPU, memory, users counts)"""
-        response_data = await self._request("GET", "/system/stats", log_full_response=False)
+        response_data = await self._request("GET", "/system/stats", log_full_response=False,
+                                            cache_ttl=self.settings.PANEL_STATS_CACHE_SECONDS)
         if response_data and not response_data.get("error") and "response" in response_data:
             return response_data.get("response")
         return None
 
     async def get_bandwidth_stats(self) -> Optional[Dict[str, Any]]:
         """Get bandwidth statistics"""
-        response_data = await self._request("GET", "/system/stats/bandwidth", log_full_response=False)
+        response_data = await self._request("GET", "/system/stats/bandwidth", log_full_response=False,
+                                            cache_ttl=self.settings.PANEL_STATS_CACHE_SECONDS)
         if response_data and not response_data.get("error") and "response" in response_data:
             return response_data.get("response")
         return None
 
     async def get_nodes_statistics(self) -> Optional[Dict[str, Any]]:
         """Get nodes statistics"""
-        response_data = await self._request("GET", "/system/stats/nodes", log_full_response=False)
+        response_data = await self._request("GET", "/system/stats/nodes", log_full_response=False,
+                                            cache_ttl=self.settings.PANEL_STATS_CACHE_SECONDS)
         if response_data and not response_data.get("error") and "response" in response_data:
             return response_data.get("response")
         return None
+
+    async def get_panel_stats(
+        self,
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """System, bandwidth and nodes statistics, fetched concurrently."""
+        system_stats, bandwidth_stats, nodes_stats = await asyncio.gather(
+            self.get_system_stats(),
+            self.get_bandwidth_stats(),
+            self.get_nodes_statistics(),
+        )
+        return system_stats, bandwidth_stats, nodes_stats
@@ -1,18 +1,22 @@
-import json
 import logging
-import hmac
 import hashlib
+import time
 from aiohttp import web
 from aiogram import Bot
 from aiogram.types import InlineKeyboardMarkup
 from sqlalchemy.orm import sessionmaker
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from config.settings import Settings
 from .panel_api_service import PanelApiService
+from .webhook_inbox_service import WebhookInboxService
 from bot.middlewares.i18n import JsonI18n
 from bot.keyboards.inline.user_keyboards import get_subscribe_only_markup, get_autorenew_cancel_keyboard
-from db.dal import user_dal
+from db.dal import renewal_dal, subscription_dal, user_dal
+from db.models import InboundEvent, Subscription, User
+from bot.utils.message_queue import get_queue_manager
 from bot.utils.date_utils import add_months
+from bot.utils.webhook_payload import (WebhookPayloadError, json_loads,
+                                       read_limited_body, verify_and_parse_async)
 
 EVENT_MAP = {
     "user.expires_in_72_hours": (3, "subscription_72h_notification"),
@@ -37,10 +41,16 @@ class PanelWebhookService:
         **kwargs,
     ):
         _ = lambda k, **kw: self.i18n.gettext(lang, k, **kw)
+        await self._queue_text(user_id, _(message_key, **kwargs), reply_markup=reply_markup)
+
+    async def _queue_text(self, user_id: int, text: str, **kwargs):
+        """Send through the rate-limited queue; expiry notices arrive in bursts."""
         try:
-            await self.bot.send_message(
-                user_id, _(message_key, **kwargs), reply_markup=reply_markup
-            )
+            queue_manager = get_queue_manager()
+            if queue_manager:
+                await queue_manager.send_message(user_id, text=text, **kwargs)
+            else:
+                await self.bot.send_message(user_id, text, **kwargs)
         except Exception as e:
             logging.error(f"Failed to send notification to {user_id}: {e}")
 
@@ -50,7 +60,7 @@ class PanelWebhookService:
 
         Returns True if an auto-renewal was performed (and renewal message sent), False otherwise.
         """
-        from db.dal import subscription_dal, payment_dal
+        from db.dal import payment_dal
         from datetime import datetime, timezone
         
         try:
@@ -147,16 +157,11 @@ class PanelWebhookService:
                         end_date=new_end_date.strftime('%Y-%m-%d')
                     )
                     
-                    try:
-                        await self.bot.send_message(
-                            user_id,
-                            auto_renewal_msg,
-                            reply_markup=markup,
-                            parse_mode="HTML"
-                        )
-                        auto_renewed = True
-                    except Exception as e:
-                        logging.error(f"Failed to send auto-renewal notification to user {user_id}: {e}")
+                    await self._queue_text(user_id,
+                                           auto_renewal_msg,
+                                           reply_markup=markup,
+                                           parse_mode="HTML")
+                    auto_renewed = True
                         
             await session.commit()
             return auto_renewed
@@ -167,19 +172,66 @@ class PanelWebhookService:
             return False
 
     async def handle_event(self, event_name: str, user_payload: dict):
-        telegram_id = user_payload.get("telegramId")
-        if not telegram_id:
-            logging.warning("Panel webhook without telegramId received")
-            return
-        user_id = int(telegram_id)
+        failures = await self._handle_events([(event_name, user_payload)])
+        if failures:
+            raise failures[0]
+
+    async def _handle_events(
+            self, events: List[Tuple[Optional[str], dict]]) -> Dict[int, Exception]:
+        """Handle a batch of panel events; returns errors by position in ``events``.
 
+        Users and active subscriptions of the whole batch are loaded with one
+        query each. Identical (event, user, expireAt) tuples are handled once.
+        """
+        for _, user_payload in events:
+            # Keeps the "My subscription" snapshot fresh without a panel call
+            self.panel_service.remember_user_snapshot(user_payload)
         if not self.settings.SUBSCRIPTION_NOTIFICATIONS_ENABLED:
-            return
+            return {}
+
+        failures: Dict[int, Exception] = {}
+        seen = set()
+        to_handle: List[Tuple[int, str, dict, int]] = []
+        for index, (event_name, user_payload) in enumerate(events):
+            telegram_id = user_payload.get("telegramId")
+            if not telegram_id:
+                logging.warning("Panel webhook without telegramId received")
+                continue
+            dedupe_key = self._dedupe_tuple(event_name, user_payload)
+            if dedupe_key in seen:
+                logging.info(f"Panel webhook: duplicate {event_name} for user {telegram_id} skipped")
+                continue
+            seen.add(dedupe_key)
+            to_handle.append((index, event_name, user_payload, int(telegram_id)))
+        if not to_handle:
+            return failures
 
+        user_ids = [user_id for _, _, _, user_id in to_handle]
+        sub_user_ids = [
+            user_id for _, event_name, _, user_id in to_handle
+            if EVENT_MAP.get(event_name, (None, ))[0] in (1, 2)
+        ]
         async with self.async_session_factory() as session:
-            db_user = await user_dal.get_user_by_id(session, user_id)
-            lang = db_user.language_code if db_user and db_user.language_code else self.settings.DEFAULT_LANGUAGE
-            first_name = db_user.first_name or f"User {user_id}" if db_user else f"User {user_id}"
+            users = await user_dal.get_users_by_ids(session, user_ids)
+            subscriptions = await subscription_dal.get_active_subscriptions_by_user_ids(
+                session, sub_user_ids)
+
+        for index, event_name, user_payload, user_id in to_handle:
+            try:
+                await self._handle_preloaded_event(event_name, user_payload,
+                                                   user_id, users.get(user_id),
+                                                   subscriptions.get(user_id))
+            except Exception as e:
+                logging.error(f"Panel webhook: failed to handle {event_name} for user {user_id}: {e}",
+                              exc_info=True)
+                failures[index] = e
+        return failures
+
+    async def _handle_preloaded_event(self, event_name: str, user_payload: dict,
+                                      user_id: int, db_user: Optional[User],
+                                      sub: Optional[Subscription]):
+        lang = db_user.language_code if db_user and db_user.language_code else self.settings.DEFAULT_LANGUAGE
+        first_name = db_user.first_name or f"User {user_id}" if db_user else f"User {user_id}"
 
         markup = get_subscribe_only_markup(lang, self.i18n)
 
@@ -187,49 +239,51 @@ class PanelWebhookService:
             days_left, msg_key = EVENT_MAP[event_name]
             if days_left == 1:
                 # Trigger auto-renew via SubscriptionService (wired in at factory)
-                try:
-                    subscription_service = getattr(self, "subscription_service", None)
-                    if subscription_service:
+                subscription_service = getattr(self, "subscription_service", None)
+                renewal_scheduler = getattr(self, "renewal_scheduler", None)
+                if renewal_scheduler and renewal_scheduler.enabled:
+                    # The scheduler charges ahead of this event; only suppress
+                    # the reminder when it actually started a charge for this cycle.
+                    if sub and sub.auto_renew_enabled and sub.provider != 'tribute':
                         async with self.async_session_factory() as session:
-                            from db.dal import subscription_dal
-                            sub = await subscription_dal.get_active_subscription_by_user_id(session, user_id)
-                            if sub and sub.auto_renew_enabled and sub.provider != 'tribute':
-                                try:
-                                    ok = await subscription_service.charge_subscription_renewal(session, sub)
-                                    # If initiation succeeded, suppress the 24h reminder by returning early
-                                    if ok:
-                                        await session.commit()
-                                        return
-                                    else:
-                                        await session.rollback()
-                                except Exception:
-                                    await session.rollback()
-                                    logging.exception("Auto-renew attempt (24h) failed")
-                except Exception:
-                    logging.exception("Auto-renew trigger (24h) failed pre-check")
+                            attempt = await renewal_dal.get_latest_cycle_attempt(
+                                session, sub.subscription_id, sub.end_date)
+                        if attempt and attempt.status == renewal_dal.STATUS_INITIATED:
+                            return
+                        renewal_scheduler.wake()
+                elif subscription_service and sub and sub.auto_renew_enabled and sub.provider != 'tribute':
+                    async with self.async_session_factory() as session:
+                        try:
+                            sub_in_session = await subscription_dal.get_active_subscription_by_user_id(session, user_id)
+                            ok = bool(sub_in_session) and await subscription_service.charge_subscription_renewal(session, sub_in_session)
+                            # If initiation succeeded, suppress the 24h reminder by returning early
+                            if ok:
+                                await session.commit()
+                                return
+                            await session.rollback()
+                        except Exception:
+                            await session.rollback()
+                            logging.exception("Auto-renew attempt (24h) failed")
             if days_left <= self.settings.SUBSCRIPTION_NOTIFY_DAYS_BEFORE:
                 # For 48h event, if auto-renew is enabled and not tribute, show special notice with cancel button
                 if days_left == 2:
-                    async with self.async_session_factory() as session:
-                        from db.dal import subscription_dal
-                        sub = await subscription_dal.get_active_subscription_by_user_id(session, user_id)
-                        logging.info(
-                            "48h webhook check: user_id=%s sub_found=%s auto_renew=%s provider=%s",
+                    logging.info(
+                        "48h webhook check: user_id=%s sub_found=%s auto_renew=%s provider=%s",
+                        user_id,
+                        bool(sub),
+                        getattr(sub, 'auto_renew_enabled', None) if sub else None,
+                        getattr(sub, 'provider', None) if sub else None,
+                    )
+                    if sub and sub.auto_renew_enabled and sub.provider != 'tribute':
+                        cancel_kb = get_autorenew_cancel_keyboard(lang, self.i18n)
+                        await self._send_message(
                             user_id,
-                            bool(sub),
-                            getattr(sub, 'auto_renew_enabled', None) if sub else None,
-                            getattr(sub, 'provider', None) if sub else None,
+                            lang,
+                            "autorenew_48h_charge_tomorrow_notice",
+                            reply_markup=cancel_kb,
+                            user_name=first_name,
                         )
-                        if sub and sub.auto_renew_enabled and sub.provider != 'tribute':
-                            cancel_kb = get_autorenew_cancel_keyboard(lang, self.i18n)
-                            await self._send_message(
-                                user_id,
-                                lang,
-                                "autorenew_48h_charge_tomorrow_notice",
-                                reply_markup=cancel_kb,
-                                user_name=first_name,
-                            )
-                            return
+                        return
                 await self._send_message(
                     user_id,
                     lang,
@@ -239,9 +293,10 @@ class PanelWebhookService:
                     end_date=user_payload.get("expireAt", "")[:10],
                 )
         elif event_name == "user.expired":
-            # Check if this is a tribute user that should be auto-renewed (regardless of notification settings)
-            auto_renewed = await self._handle_expired_subscription(session, user_id, user_payload, lang, markup, first_name)
-            
+            # Check if this is a tribute user that should be auto-renewed
+            async with self.async_session_factory() as session:
+                auto_renewed = await self._handle_expired_subscription(session, user_id, user_payload, lang, markup, first_name)
+
             # If auto-renewed via Tribute, suppress expiration notification. Otherwise, send it if enabled.
             if not auto_renewed and self.settings.SUBSCRIPTION_NOTIFY_ON_EXPIRE:
                 await self._send_message(
@@ -262,44 +317,75 @@ class PanelWebhookService:
                 end_date=user_payload.get("expireAt", "")[:10],
             )
 
-    async def handle_webhook(self, raw_body: bytes, signature_header: Optional[str]) -> web.Response:
-        if self.settings.PANEL_WEBHOOK_SECRET:
-            if not signature_header:
-                return web.Response(status=403, text="no_signature")
-            expected_sig = hmac.new(
-                self.settings.PANEL_WEBHOOK_SECRET.encode(),
-                raw_body,
-                hashlib.sha256,
-            ).hexdigest()
-            if not hmac.compare_digest(expected_sig, signature_header):
-                return web.Response(status=403, text="invalid_signature")
+    @staticmethod
+    def _dedupe_tuple(event_name: Optional[str], user_payload: dict) -> Tuple[str, str, str]:
+        return (str(event_name), str(user_payload.get("telegramId")),
+                str(user_payload.get("expireAt") or ""))
+
+    def _inbox_event_id(self, event_name: str, user_data: dict, raw_body: bytes) -> str:
+        window = self.settings.PANEL_WEBHOOK_DEDUPE_WINDOW_SECONDS
+        if window > 0 and user_data.get("telegramId"):
+            # The same notice for the same expiry is stored once per window,
+            # whatever else differs between the deliveries.
+            bucket = int(time.time() // window)
+            return ":".join((*self._dedupe_tuple(event_name, user_data), str(bucket)))
+        # Identical re-deliveries share the body hash
+        return hashlib.sha256(raw_body).hexdigest()
 
+    async def handle_webhook(self, raw_body: bytes, signature_header: Optional[str],
+                             inbox: WebhookInboxService) -> web.Response:
         try:
-            payload = json.loads(raw_body.decode())
-        except Exception:
+            payload = await verify_and_parse_async(
+                raw_body, self.settings.PANEL_WEBHOOK_SECRET, signature_header,
+                self.settings.WEBHOOK_OFFLOAD_THRESHOLD_BYTES)
+        except WebhookPayloadError as e:
+            return web.Response(status=e.status,
+                                text="bad_request" if e.status == 400 else e.reason)
+        if not isinstance(payload, dict):
             return web.Response(status=400, text="bad_request")
 
+        event_name, user_data = self._extract_event(payload)
+        if not event_name:
+            return web.Response(status=200, text="ok_no_event")
+
+        # The panel sends no delivery id
+        event_id = self._inbox_event_id(event_name, user_data, raw_body)
+        try:
+            await inbox.submit("panel", event_id, raw_body.decode(), event_type=event_name)
+        except Exception as e:
+            logging.error(f"Panel webhook: failed to store event: {e}", exc_info=True)
+            return web.Response(status=503, text="retry_later")
+        return web.Response(status=200, text="ok")
+
+    @staticmethod
+    def _extract_event(payload: dict) -> tuple[Optional[str], dict]:
         event_name = payload.get("name") or payload.get("event")
         user_data = payload.get("payload") or payload.get("data", {})
         if isinstance(user_data, dict) and "user" in user_data:
             user_data = user_data.get("user") or user_data
+        return event_name, user_data if isinstance(user_data, dict) else {}
 
-        telegram_id = user_data.get("telegramId") if isinstance(user_data, dict) else None
+    async def process_inbound_events(self, events: List[InboundEvent]) -> Dict[int, Exception]:
+        """Inbox batch processor: returns the errors of failed events by row id."""
+        parsed: List[Tuple[Optional[str], dict]] = []
+        parse_failures: Dict[int, Exception] = {}
+        batch_events: List[InboundEvent] = []
+        for event in events:
+            try:
+                parsed.append(self._extract_event(json_loads(event.body)))
+                batch_events.append(event)
+            except Exception as e:
+                parse_failures[event.id] = e
+        logging.info(f"Panel webhook: processing batch of {len(parsed)} event(s)")
 
-        if not event_name:
-            return web.Response(status=200, text="ok_no_event")
-
-        logging.info(
-            "Panel webhook event received: %s; telegramId=%s",
-            event_name,
-            telegram_id if telegram_id is not None else "N/A",
-        )
+        failures = await self._handle_events(parsed)
+        result = {batch_events[index].id: error for index, error in failures.items()}
+        result.update(parse_failures)
+        return result
 
-        await self.handle_event(event_name, user_data)
-        return web.Response(status=200, text="ok")
 
 async def panel_webhook_route(request: web.Request):
     service: PanelWebhookService = request.app["panel_webhook_service"]
-    raw = await request.read()
+    raw = await read_limited_body(request, service.settings.PANEL_WEBHOOK_MAX_BODY_BYTES)
     signature_header = request.headers.get("X-Remnawave-Signature")
-    return await service.handle_webhook(raw, signature_header)
+    return await service.handle_webhook(raw, signature_header, request.app["webhook_inbox"])
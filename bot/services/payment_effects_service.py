@@ -0,0 +1,252 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import Settings
+from bot.middlewares.i18n import JsonI18n
+from bot.keyboards.inline.user_keyboards import get_connect_and_main_keyboard
+from bot.services.notification_service import NotificationService
+from bot.services.outbox_service import OutboxService
+from bot.services.referral_service import ReferralService
+from bot.services.subscription_service import SubscriptionService
+from bot.utils.text_sanitizer import sanitize_display_name, username_for_display
+from db.dal import outbox_dal, user_dal
+from db.models import User
+
+EFFECT_REFERRAL_BONUS = "payment.referral_bonus"
+EFFECT_USER_CONFIRMATION = "payment.user_confirmation"
+EFFECT_ADMIN_NOTIFICATION = "payment.admin_notification"
+EFFECT_PANEL_EXPIRY = "payment.panel_expiry"
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+async def enqueue_payment_effects(session: AsyncSession,
+                                  *,
+                                  db_user: Optional[User],
+                                  user_id: int,
+                                  payment_db_id: int,
+                                  months: int,
+                                  amount: float,
+                                  currency: str,
+                                  provider: str,
+                                  activation: Optional[Dict[str, Any]],
+                                  is_auto_renew: bool = False,
+                                  promo_bonus_days: int = 0,
+                                  order_id: Optional[str] = None) -> None:
+    """Record what has to happen after a payment commits.
+
+    Call inside the payment transaction, after the subscription has been
+    activated. Referral bonuses run first when the user was invited, and the
+    user confirmation is sent afterwards so it can mention the referee bonus.
+    ``provider`` is the label shown in the admin/log channel notification.
+    """
+    activation = activation or {}
+    confirmation = {
+        "user_id": user_id,
+        "months": months,
+        "base_end_date": _iso(activation.get("end_date")),
+        "config_link": activation.get("subscription_url"),
+        "promo_bonus_days": promo_bonus_days or 0,
+        "is_auto_renew": is_auto_renew,
+        "order_id": order_id,
+    }
+    if db_user and db_user.referred_by_id:
+        await outbox_dal.enqueue_effect(
+            session,
+            EFFECT_REFERRAL_BONUS, {
+                "user_id": user_id,
+                "months": months,
+                "payment_db_id": payment_db_id,
+                "confirmation": confirmation,
+            },
+            dedupe_key=f"payment:{payment_db_id}:referral")
+    else:
+        await outbox_dal.enqueue_effect(
+            session,
+            EFFECT_USER_CONFIRMATION,
+            confirmation,
+            dedupe_key=f"payment:{payment_db_id}:confirmation")
+    await outbox_dal.enqueue_effect(
+        session,
+        EFFECT_ADMIN_NOTIFICATION, {
+            "user_id": user_id,
+            "amount": amount,
+            "currency": currency,
+            "months": months,
+            "payment_provider": provider,
+            "username": db_user.username if db_user else None,
+        },
+        dedupe_key=f"payment:{payment_db_id}:admin_notification")
+
+
+class PaymentEffectsService:
+    """Outbox handlers for everything that follows a successful payment."""
+
+    def __init__(self, bot: Bot, settings: Settings, i18n: JsonI18n,
+                 referral_service: ReferralService,
+                 subscription_service: SubscriptionService):
+        self.bot = bot
+        self.settings = settings
+        self.i18n = i18n
+        self.referral_service = referral_service
+        self.subscription_service = subscription_service
+
+    def register(self, outbox: OutboxService) -> None:
+        outbox.register_handler(EFFECT_REFERRAL_BONUS, self.apply_referral_bonus)
+        outbox.register_handler(EFFECT_USER_CONFIRMATION, self.send_user_confirmation)
+        outbox.register_handler(EFFECT_ADMIN_NOTIFICATION, self.notify_admins)
+        outbox.register_handler(EFFECT_PANEL_EXPIRY, self.push_panel_expiry)
+
+    async def apply_referral_bonus(self, session: AsyncSession,
+                                   payload: Dict[str, Any]) -> None:
+        user_id = int(payload["user_id"])
+        payment_db_id = int(payload["payment_db_id"])
+        # The bonuses are only recorded locally here and commit together with
+        # this effect's completion mark, so a retry never grants them twice.
+        # The panel learns the resulting absolute end dates from separate
+        # effects that can be repeated safely.
+        panel_updates: List[Dict[str, Any]] = []
+        referral_bonus = await self.referral_service.apply_referral_bonuses_for_payment(
+            session,
+            user_id,
+            int(payload["months"]),
+            current_payment_db_id=payment_db_id,
+            skip_if_active_before_payment=False,
+            deferred_panel_updates=panel_updates,
+        )
+        for update in panel_updates:
+            await outbox_dal.enqueue_effect(
+                session,
+                EFFECT_PANEL_EXPIRY,
+                update,
+                dedupe_key=f"payment:{payment_db_id}:panel_expiry:{update['user_id']}")
+
+        confirmation = dict(payload["confirmation"])
+        if referral_bonus and referral_bonus.get("referee_new_end_date"):
+            confirmation["referee_bonus_days"] = referral_bonus.get(
+                "referee_bonus_applied_days")
+            confirmation["final_end_date"] = _iso(
+                referral_bonus["referee_new_end_date"])
+            confirmation["inviter_name"] = await self._inviter_display_name(
+                session, user_id)
+        # Committed together with this effect's completion mark
+        await outbox_dal.enqueue_effect(
+            session,
+            EFFECT_USER_CONFIRMATION,
+            confirmation,
+            dedupe_key=f"payment:{payment_db_id}:confirmation")
+
+    async def push_panel_expiry(self, session: AsyncSession,
+                                payload: Dict[str, Any]) -> None:
+        user_id = int(payload["user_id"])
+        pushed = await self.subscription_service.push_subscription_expiry(
+            session,
+            user_id,
+            datetime.fromisoformat(payload["expire_at"]),
+            traffic_limit_bytes=payload.get("traffic_limit_bytes"),
+            status=payload.get("status"),
+        )
+        if not pushed:
+            raise RuntimeError(f"Panel expiry update for user {user_id} failed")
+
+    async def _inviter_display_name(self, session: AsyncSession,
+                                    user_id: int) -> Optional[str]:
+        db_user = await user_dal.get_user_by_id(session, user_id)
+        if not db_user or not db_user.referred_by_id:
+            return None
+        inviter = await user_dal.get_user_by_id(session, db_user.referred_by_id)
+        if not inviter:
+            return None
+        safe_name = sanitize_display_name(inviter.first_name) if inviter.first_name else None
+        if safe_name:
+            return safe_name
+        if inviter.username:
+            return username_for_display(inviter.username, with_at=False)
+        return None
+
+    async def send_user_confirmation(self, session: AsyncSession,
+                                     payload: Dict[str, Any]) -> None:
+        user_id = int(payload["user_id"])
+        db_user = await user_dal.get_user_by_id(session, user_id)
+        # Use user's DB language for all user-facing messages
+        lang = db_user.language_code if db_user and db_user.language_code else self.settings.DEFAULT_LANGUAGE
+        _ = lambda key, **kwargs: self.i18n.gettext(lang, key, **kwargs)
+
+        months = payload["months"]
+        base_end = payload.get("base_end_date")
+        final_end = payload.get("final_end_date") or base_end
+        base_end_str = datetime.fromisoformat(base_end).strftime('%Y-%m-%d') if base_end else None
+        final_end_str = datetime.fromisoformat(final_end).strftime('%Y-%m-%d') if final_end else None
+        referee_bonus_days = payload.get("referee_bonus_days")
+        promo_bonus_days = payload.get("promo_bonus_days") or 0
+        config_link = payload.get("config_link") or _("config_link_not_available")
+        markup = None
+
+        # For auto-renew charges, avoid re-sending config link; send concise message
+        if payload.get("is_auto_renew") and final_end_str:
+            text = _("yookassa_auto_renewal", months=months, end_date=final_end_str)
+        else:
+            if referee_bonus_days and final_end_str:
+                text = _(
+                    "payment_successful_with_referral_bonus_full",
+                    months=months,
+                    base_end_date=base_end_str or final_end_str,
+                    bonus_days=referee_bonus_days,
+                    final_end_date=final_end_str,
+                    inviter_name=payload.get("inviter_name") or _("friend_placeholder"),
+                    config_link=config_link,
+                )
+            elif promo_bonus_days > 0 and final_end_str:
+                text = _(
+                    "payment_successful_with_promo_full",
+                    months=months,
+                    bonus_days=promo_bonus_days,
+                    end_date=final_end_str,
+                    config_link=config_link,
+                )
+            elif final_end_str:
+                text = _(
+                    "payment_successful_full",
+                    months=months,
+                    end_date=final_end_str,
+                    config_link=config_link,
+                )
+            else:
+                logging.error(
+                    f"Payment confirmation for user {user_id} has no end date: {payload}")
+                text = _("payment_successful_error_details")
+            if payload.get("order_id"):
+                order_info_text = _(
+                    "free_kassa_order_full",
+                    order_id=payload["order_id"],
+                    date=datetime.now().strftime("%Y-%m-%d"),
+                )
+                text = f"{order_info_text}\n{text}"
+            markup = get_connect_and_main_keyboard(
+                lang, self.i18n, self.settings, config_link, preserve_message=True
+            )
+
+        try:
+            await self.bot.send_message(
+                user_id,
+                text,
+                reply_markup=markup,
+                parse_mode="HTML",
+                disable_web_page_preview=True,
+            )
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Retrying will not help when the user blocked the bot or the chat is gone
+            logging.warning(
+                f"Failed to send payment details message to user {user_id}: {e}")
+
+    async def notify_admins(self, session: AsyncSession,
+                            payload: Dict[str, Any]) -> None:
+        notification_service = NotificationService(self.bot, self.settings, self.i18n)
+        await notification_service.notify_payment_received(**payload)
@@ -1,7 +1,7 @@
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from aiogram import Bot
 from datetime import datetime, timezone, timedelta
 
@@ -30,7 +30,13 @@ class ReferralService:
             referee_user_id: int,
             purchased_subscription_months: int,
             current_payment_db_id: Optional[int] = None,
-            skip_if_active_before_payment: bool = True) -> Dict[str, Any]:
+            skip_if_active_before_payment: bool = True,
+            deferred_panel_updates: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Grant the inviter and referee bonuses for a referee's payment.
+
+        With ``deferred_panel_updates`` the bonuses are only recorded locally
+        and the panel updates to make are appended to that list.
+        """
 
         referee_final_end_date: Optional[datetime] = None
         referee_bonus_applied_days: Optional[int] = None
@@ -119,7 +125,8 @@ class ReferralService:
                             session=session,
                             user_id=inviter_user_id,
                             bonus_days=inviter_bonus_days,
-                            reason=f"referral bonus from {referee_name_for_msg}"
+                            reason=f"referral bonus from {referee_name_for_msg}",
+                            deferred_panel_updates=deferred_panel_updates,
                         )
 
                         if new_end_date_inviter:
@@ -187,15 +194,23 @@ class ReferralService:
                                     bonus_sub = await subscription_dal.upsert_subscription(
                                         session, bonus_sub_payload)
 
-                                    panel_update_success = await self.subscription_service.panel_service.update_user_details_on_panel(
-                                        inviter_panel_uuid, {
-                                            "expireAt":
-                                            bonus_end_date.isoformat(
-                                                timespec='milliseconds').
-                                            replace('+00:00', 'Z'),
-                                            "status":
-                                            "ACTIVE",
+                                    if deferred_panel_updates is not None:
+                                        deferred_panel_updates.append({
+                                            "user_id": inviter_user_id,
+                                            "expire_at": bonus_end_date.isoformat(),
+                                            "status": "ACTIVE",
                                         })
+                                        panel_update_success = True
+                                    else:
+                                        panel_update_success = await self.subscription_service.panel_service.update_user_details_on_panel(
+                                            inviter_panel_uuid, {
+                                                "expireAt":
+                                                bonus_end_date.isoformat(
+                                                    timespec='milliseconds').
+                                                replace('+00:00', 'Z'),
+                                                "status":
+                                                "ACTIVE",
+                                            })
                                     if panel_update_success:
                                         inviter_bonus_successfully_applied = True
                                         logging.info(
@@ -230,7 +245,8 @@ class ReferralService:
                     user_id=referee_user_id,
                     bonus_days=referee_bonus_days,
                     reason=
-                    f"referee bonus (invited by {inviter_name_for_referee_msg})"
+                    f"referee bonus (invited by {inviter_name_for_referee_msg})",
+                    deferred_panel_updates=deferred_panel_updates,
                 )
                 if new_end_date_referee:
                     referee_final_end_date = new_end_date_referee
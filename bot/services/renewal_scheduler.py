@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import sessionmaker
+
+from config.settings import Settings
+from bot.services.subscription_service import SubscriptionService
+from bot.utils.rate_limiter import TokenBucket, parse_rate_limits
+from db.dal import renewal_dal
+from db.models import Subscription
+
+# The only provider that supports merchant-initiated charges of a saved card
+CHARGE_PROVIDER = "yookassa"
+
+
+def renewal_idempotence_key(subscription_id: int, cycle_end_date: datetime,
+                            failed_attempts: int) -> str:
+    """Idempotence-Key for charging one billing cycle of a subscription.
+
+    Stable for the same cycle and number of definite failures, so a charge
+    with an unknown outcome is retried with the same key; a new key only
+    follows a charge YooKassa refused or canceled.
+    """
+    return str(
+        uuid.uuid5(
+            uuid.NAMESPACE_URL,
+            f"renewal:{subscription_id}:{cycle_end_date.isoformat()}:{failed_attempts}"))
+
+
+class RenewalScheduler:
+    """Charges auto-renew subscriptions shortly before they end.
+
+    Due subscriptions are claimed in batches (SKIP LOCKED, so several bot
+    instances can run side by side) and charged by a bounded pool of
+    workers, throttled per provider by AUTO_RENEW_PROVIDER_RATE_LIMITS. Every
+    charge is recorded as a renewal attempt; the Idempotence-Key is derived
+    from the subscription, its billing cycle and the number of attempts
+    YooKassa definitely refused. A charge that timed out or was interrupted
+    midway is retried with the same key and never billed twice.
+    """
+
+    def __init__(self, settings: Settings, async_session_factory: sessionmaker,
+                 subscription_service: SubscriptionService):
+        self.settings = settings
+        self.async_session_factory = async_session_factory
+        self.subscription_service = subscription_service
+        self._limiters: Dict[str, TokenBucket] = {
+            name: TokenBucket(rate)
+            for name, rate in parse_rate_limits(
+                settings.AUTO_RENEW_PROVIDER_RATE_LIMITS).items()
+        }
+        self._wakeup = asyncio.Event()
+        self._inflight: Set[asyncio.Task] = set()
+        self._runner: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settings.AUTO_RENEW_SCHEDULER_ENABLED
+                    and self.settings.YOOKASSA_AUTOPAYMENTS_ENABLED)
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        if self._runner is not None or not self.enabled:
+            return
+        self._runner = asyncio.create_task(self._run(), name="RenewalScheduler")
+        logging.info(
+            f"Auto-renew scheduler started with {self.settings.AUTO_RENEW_WORKERS} "
+            f"worker(s), window {self.settings.AUTO_RENEW_WINDOW_HOURS}h")
+
+    async def close(self) -> None:
+        if self._runner:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        if self._inflight:
+            # Unfinished attempts are retried with the same key after their lease.
+            await asyncio.wait(self._inflight, timeout=10)
+
+    async def _run(self) -> None:
+        workers = max(1, self.settings.AUTO_RENEW_WORKERS)
+        poll_seconds = max(1.0, self.settings.AUTO_RENEW_POLL_SECONDS)
+        while True:
+            if len(self._inflight) >= workers:
+                await asyncio.wait(self._inflight,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            self._wakeup.clear()
+            free_slots = workers - len(self._inflight)
+            try:
+                claimed = await self._claim(free_slots)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Auto-renew: failed to claim subscriptions: {e}",
+                              exc_info=True)
+                claimed = 0
+
+            if claimed >= free_slots:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self, limit: int) -> int:
+        async with self.async_session_factory() as session:
+            claimed = await renewal_dal.claim_due_renewals(
+                session,
+                limit=limit,
+                window_hours=self.settings.AUTO_RENEW_WINDOW_HOURS,
+                charge_provider=CHARGE_PROVIDER,
+                max_attempts=max(1, self.settings.AUTO_RENEW_MAX_ATTEMPTS),
+                retry_after_seconds=self.settings.AUTO_RENEW_RETRY_MINUTES * 60,
+                lease_seconds=self.settings.AUTO_RENEW_LEASE_SECONDS)
+            jobs: List[Tuple[int, int, datetime]] = [
+                (attempt.id, sub.subscription_id, sub.end_date)
+                for attempt, sub in claimed
+            ]
+            await session.commit()
+        for attempt_id, subscription_id, cycle_end_date in jobs:
+            task = asyncio.create_task(
+                self._charge(attempt_id, subscription_id, cycle_end_date),
+                name=f"AutoRenew-{subscription_id}")
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+        return len(jobs)
+
+    async def _charge(self, attempt_id: int, subscription_id: int,
+                      cycle_end_date: datetime) -> None:
+        limiter = self._limiters.get(CHARGE_PROVIDER)
+        if limiter:
+            await limiter.acquire()
+
+        provider_payment_id: Optional[str] = None
+        error: Optional[str] = None
+        async with self.async_session_factory() as session:
+            try:
+                sub = await session.get(Subscription, subscription_id)
+                if (not sub or not sub.auto_renew_enabled
+                        or sub.end_date != cycle_end_date):
+                    # Cancelled or already extended since it was claimed
+                    status = renewal_dal.STATUS_SKIPPED
+                else:
+                    failures = await renewal_dal.count_failed_attempts(
+                        session, subscription_id, cycle_end_date)
+                    idempotence_key = renewal_idempotence_key(
+                        subscription_id, cycle_end_date, failures)
+                    ok, provider_payment_id, error = (
+                        await self.subscription_service.initiate_subscription_renewal(
+                            session, sub, idempotence_key=idempotence_key))
+                    if not ok:
+                        status = renewal_dal.STATUS_FAILED
+                    elif provider_payment_id:
+                        status = renewal_dal.STATUS_INITIATED
+                    else:
+                        status = renewal_dal.STATUS_SKIPPED
+            except Exception as e:
+                # YooKassa may still have accepted the charge: keep the key
+                await session.rollback()
+                logging.error(
+                    f"Auto-renew: charge of subscription {subscription_id} "
+                    f"has an unknown outcome: {e}",
+                    exc_info=True)
+                status = renewal_dal.STATUS_UNKNOWN
+                error = f"{type(e).__name__}: {e}"
+
+            try:
+                await renewal_dal.finish_attempt(session, attempt_id, status,
+                                                 provider_payment_id, error)
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                logging.error(
+                    f"Auto-renew: failed to record attempt {attempt_id} "
+                    f"for subscription {subscription_id}: {e}")
+                return
+
+        if status in (renewal_dal.STATUS_FAILED, renewal_dal.STATUS_UNKNOWN):
+            logging.warning(
+                f"Auto-renew: charge of subscription {subscription_id} "
+                f"(cycle ending {cycle_end_date.isoformat()}) failed: {error}")
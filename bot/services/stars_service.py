@@ -10,9 +10,7 @@ from db.dal import payment_dal, user_dal
 from .subscription_service import SubscriptionService
 from .referral_service import ReferralService
 from bot.middlewares.i18n import JsonI18n
-from .notification_service import NotificationService
-from bot.keyboards.inline.user_keyboards import get_connect_and_main_keyboard
-from bot.utils.text_sanitizer import sanitize_display_name, username_for_display
+from .payment_effects_service import enqueue_payment_effects
 
 
 class StarsService:
@@ -71,7 +69,7 @@ class StarsService:
                                          stars_amount: int,
                                          i18n_data: dict) -> None:
         try:
-            await payment_dal.update_provider_payment_and_status(
+            updated_payment = await payment_dal.update_provider_payment_and_status(
                 session, payment_db_id,
                 message.successful_payment.provider_payment_charge_id,
                 "succeeded")
@@ -82,6 +80,11 @@ class StarsService:
                 f"Failed to update stars payment record {payment_db_id}: {e_upd}",
                 exc_info=True)
             return
+        if not updated_payment:
+            logging.info(
+                f"Stars payment {payment_db_id} is missing or already final; "
+                f"not activating again")
+            return
 
         activation_details = await self.subscription_service.activate_subscription(
             session,
@@ -96,83 +99,16 @@ class StarsService:
                 f"Failed to activate subscription after stars payment for user {message.from_user.id}")
             return
 
-        referral_bonus = await self.referral_service.apply_referral_bonuses_for_payment(
+        db_user = await user_dal.get_user_by_id(session, message.from_user.id)
+        await enqueue_payment_effects(
             session,
-            message.from_user.id,
-            months,
-            current_payment_db_id=payment_db_id,
-            skip_if_active_before_payment=False,
+            db_user=db_user,
+            user_id=message.from_user.id,
+            payment_db_id=payment_db_id,
+            months=months,
+            amount=float(stars_amount),
+            currency="XTR",
+            provider="stars",
+            activation=activation_details,
         )
         await session.commit()
-
-        applied_days = referral_bonus.get("referee_bonus_applied_days") if referral_bonus else None
-        final_end = referral_bonus.get("referee_new_end_date") if referral_bonus else None
-        if not final_end:
-            final_end = activation_details["end_date"]
-
-        # Always use user's language from DB for user-facing messages
-        db_user = await user_dal.get_user_by_id(session, message.from_user.id)
-        current_lang = db_user.language_code if db_user and db_user.language_code else self.settings.DEFAULT_LANGUAGE
-        i18n: JsonI18n = i18n_data.get("i18n_instance")
-        _ = lambda k, **kw: i18n.gettext(current_lang, k, **kw) if i18n else k
-
-        config_link = activation_details.get("subscription_url") or _(
-            "config_link_not_available"
-        )
-
-        if applied_days:
-            inviter_name_display = _("friend_placeholder")
-            db_user = await user_dal.get_user_by_id(session, message.from_user.id)
-            if db_user and db_user.referred_by_id:
-                inviter = await user_dal.get_user_by_id(session, db_user.referred_by_id)
-                if inviter:
-                    safe_name = sanitize_display_name(inviter.first_name) if inviter.first_name else None
-                    if safe_name:
-                        inviter_name_display = safe_name
-                    elif inviter.username:
-                        inviter_name_display = username_for_display(inviter.username, with_at=False)
-            success_msg = _(
-                "payment_successful_with_referral_bonus_full",
-                months=months,
-                base_end_date=activation_details["end_date"].strftime('%Y-%m-%d'),
-                bonus_days=applied_days,
-                final_end_date=final_end.strftime('%Y-%m-%d'),
-                inviter_name=inviter_name_display,
-                config_link=config_link,
-            )
-        else:
-            success_msg = _(
-                "payment_successful_full",
-                months=months,
-                end_date=final_end.strftime('%Y-%m-%d'),
-                config_link=config_link,
-            )
-        markup = get_connect_and_main_keyboard(
-            current_lang, i18n, self.settings, config_link, preserve_message=True
-        )
-        try:
-            await self.bot.send_message(
-                message.from_user.id,
-                success_msg,
-                reply_markup=markup,
-                parse_mode="HTML",
-                disable_web_page_preview=True,
-            )
-        except Exception as e_send:
-            logging.error(
-                f"Failed to send stars payment success message: {e_send}")
-
-        # Send notification about payment
-        try:
-            notification_service = NotificationService(self.bot, self.settings, self.i18n)
-            user = await user_dal.get_user_by_id(session, message.from_user.id)
-            await notification_service.notify_payment_received(
-                user_id=message.from_user.id,
-                amount=float(stars_amount),
-                currency="XTR",
-                months=months,
-                payment_provider="stars",
-                username=user.username if user else None
-            )
-        except Exception as e:
-            logging.error(f"Failed to send stars payment notification: {e}")
@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from config.settings import Settings
+from bot.services.panel_api_service import PanelApiService
+from db.dal import subscription_extension_dal
+from db.models import SubscriptionExtensionJob
+
+ProgressCallback = Callable[[SubscriptionExtensionJob], Awaitable[None]]
+
+
+class _LeaseLost(Exception):
+    """Another worker took over the job; stop pushing it."""
+
+
+class SubscriptionExtensionService:
+    """Extends every active subscription by N days, e.g. after an outage.
+
+    The database part is set-based and happens once per job: the cohort is
+    recorded as job items with one INSERT ... SELECT and all end dates move
+    with one UPDATE. The panel is then updated in PANEL_BULK_CHUNK_SIZE
+    batches through the bulk extend endpoint. Items are marked ``sending``
+    before their batch goes out, so after a crash or a failed batch nobody
+    is extended twice: unconfirmed items are re-pushed with an absolute
+    expireAt taken from the local end date. Jobs left unfinished are resumed
+    on startup.
+
+    Only the worker holding the job lease pushes it. The lease is renewed
+    before every batch, and another replica takes the job over only after
+    the lease expired, so ``sending`` items of a live worker are never
+    re-pushed while its relative extend request may still be in flight.
+    """
+
+    def __init__(self, settings: Settings, async_session_factory: sessionmaker,
+                 panel_service: PanelApiService):
+        self.settings = settings
+        self.async_session_factory = async_session_factory
+        self.panel_service = panel_service
+        self._running: Dict[int, asyncio.Task] = {}
+        self._worker_id = uuid.uuid4().hex
+
+    def is_running(self, job_id: int) -> bool:
+        task = self._running.get(job_id)
+        return task is not None and not task.done()
+
+    async def start(self) -> None:
+        async with self.async_session_factory() as session:
+            job_ids = await subscription_extension_dal.get_unfinished_job_ids(session)
+        for job_id in job_ids:
+            logging.info(f"Resuming unfinished subscription extension job {job_id}.")
+            self.resume(job_id)
+
+    async def close(self) -> None:
+        tasks = [task for task in self._running.values() if not task.done()]
+        for task in tasks:
+            # Interrupted items stay 'sending'; whoever takes the lease next re-pushes them
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._running.clear()
+
+    async def start_job(self, days: int, reason: Optional[str],
+                        admin_id: Optional[int],
+                        progress_cb: Optional[ProgressCallback] = None
+                        ) -> SubscriptionExtensionJob:
+        """Extend the cohort in the DB and start pushing it to the panel."""
+        async with self.async_session_factory() as session:
+            job = await subscription_extension_dal.create_job(
+                session, days, reason, admin_id)
+            await subscription_extension_dal.apply_job(session, job.id)
+            await session.commit()
+            await session.refresh(job)
+        logging.info(
+            f"Subscription extension job {job.id}: {job.total} subscription(s) "
+            f"extended by {days} day(s) in the DB by admin {admin_id}.")
+        self.resume(job.id, progress_cb)
+        return job
+
+    def resume(self, job_id: int,
+               progress_cb: Optional[ProgressCallback] = None) -> bool:
+        """Start the panel push of ``job_id`` unless it is already running."""
+        if self.is_running(job_id):
+            return False
+        task = asyncio.create_task(self._run(job_id, progress_cb),
+                                   name=f"SubscriptionExtension-{job_id}")
+        self._running[job_id] = task
+        task.add_done_callback(lambda _: self._running.pop(job_id, None))
+        return True
+
+    async def _run(self, job_id: int,
+                   progress_cb: Optional[ProgressCallback]) -> None:
+        try:
+            days = await self._acquire_lease(job_id)
+            if days is None:
+                return
+            try:
+                chunk_size = max(1, self.settings.PANEL_BULK_CHUNK_SIZE)
+                while await self._push_pending(job_id, days, chunk_size):
+                    await self._report(job_id, progress_cb)
+                after_id = 0
+                while True:
+                    after_id = await self._repush_unconfirmed(job_id, after_id, chunk_size)
+                    if after_id is None:
+                        break
+                    await self._report(job_id, progress_cb)
+                job = await self._report(job_id, progress_cb, finished=True)
+                if job:
+                    logging.info(
+                        f"Subscription extension job {job_id} finished: {job.pushed}/"
+                        f"{job.total} pushed to the panel, {job.failed} failed.")
+            finally:
+                await self._release_lease(job_id)
+        except asyncio.CancelledError:
+            raise
+        except _LeaseLost:
+            logging.warning(
+                f"Subscription extension job {job_id}: lease lost, another worker "
+                f"continues the panel push.")
+        except Exception as e:
+            logging.error(f"Subscription extension job {job_id} stopped: {e}",
+                          exc_info=True)
+
+    async def _acquire_lease(self, job_id: int) -> Optional[int]:
+        """Wait until this worker holds the job lease; returns the job's days.
+
+        Returns None when the job is not (or no longer) being pushed, e.g.
+        because the worker that held the lease finished it meanwhile.
+        """
+        lease_seconds = max(1, self.settings.SUBSCRIPTION_EXTENSION_LEASE_SECONDS)
+        while True:
+            async with self.async_session_factory() as session:
+                job = await subscription_extension_dal.get_job(session, job_id)
+                if not job or job.status != subscription_extension_dal.JOB_APPLIED:
+                    return None
+                days, locked_until = job.days, job.locked_until
+                acquired = await subscription_extension_dal.acquire_job_lease(
+                    session, job_id, self._worker_id, lease_seconds)
+                await session.commit()
+            if acquired:
+                return days
+
+            wait = float(lease_seconds)
+            if locked_until is not None:
+                remaining = (locked_until - datetime.now(timezone.utc)).total_seconds()
+                wait = min(max(remaining, 1.0), wait)
+            logging.info(
+                f"Subscription extension job {job_id} is pushed by another worker; "
+                f"checking again in {wait:.0f}s.")
+            await asyncio.sleep(wait)
+
+    async def _renew_lease(self, session: AsyncSession, job_id: int) -> None:
+        if not await subscription_extension_dal.acquire_job_lease(
+                session, job_id, self._worker_id,
+                max(1, self.settings.SUBSCRIPTION_EXTENSION_LEASE_SECONDS)):
+            raise _LeaseLost()
+
+    async def _release_lease(self, job_id: int) -> None:
+        try:
+            async with self.async_session_factory() as session:
+                await subscription_extension_dal.release_job_lease(
+                    session, job_id, self._worker_id)
+                await session.commit()
+        except Exception as e:
+            # The lease then simply expires
+            logging.warning(
+                f"Subscription extension job {job_id}: failed to release the lease: {e}")
+
+    async def _push_pending(self, job_id: int, days: int,
+                            chunk_size: int) -> bool:
+        async with self.async_session_factory() as session:
+            await self._renew_lease(session, job_id)
+            items = await subscription_extension_dal.claim_pending_items(
+                session, job_id, chunk_size)
+            await session.commit()
+        if not items:
+            return False
+
+        result = await self.panel_service.bulk_extend_users_expiration(
+            [panel_uuid for _, panel_uuid in items], days)
+        failed = set(result["failed"])
+        async with self.async_session_factory() as session:
+            await subscription_extension_dal.mark_items(
+                session, [item_id for item_id, uuid in items if uuid not in failed],
+                subscription_extension_dal.ITEM_DONE)
+            await subscription_extension_dal.mark_items(
+                session, [item_id for item_id, uuid in items if uuid in failed],
+                subscription_extension_dal.ITEM_FAILED)
+            await session.commit()
+        return True
+
+    async def _repush_unconfirmed(self, job_id: int, after_id: int,
+                                  chunk_size: int) -> Optional[int]:
+        """Push one page of unconfirmed items; returns the page cursor or None at the end."""
+        async with self.async_session_factory() as session:
+            await self._renew_lease(session, job_id)
+            items = await subscription_extension_dal.get_unconfirmed_items(
+                session, job_id, after_id, chunk_size)
+            await session.commit()
+        if not items:
+            return None
+
+        updates: Dict[str, Dict[str, str]] = {}
+        item_ids_by_uuid: Dict[str, List[int]] = {}
+        for item_id, panel_uuid, end_date in items:
+            if end_date.tzinfo is None:
+                end_date = end_date.replace(tzinfo=timezone.utc)
+            updates[panel_uuid] = {
+                "expireAt": end_date.astimezone(timezone.utc).isoformat(
+                    timespec="milliseconds").replace("+00:00", "Z")
+            }
+            item_ids_by_uuid.setdefault(panel_uuid, []).append(item_id)
+
+        result = await self.panel_service.apply_user_updates(updates)
+        failed = set(result["failed"])
+        done_ids = [item_id for panel_uuid, ids in item_ids_by_uuid.items()
+                    if panel_uuid not in failed for item_id in ids]
+        failed_ids = [item_id for panel_uuid, ids in item_ids_by_uuid.items()
+                      if panel_uuid in failed for item_id in ids]
+        async with self.async_session_factory() as session:
+            await subscription_extension_dal.mark_items(
+                session, done_ids, subscription_extension_dal.ITEM_DONE)
+            await subscription_extension_dal.mark_items(
+                session, failed_ids, subscription_extension_dal.ITEM_FAILED)
+            await session.commit()
+        return items[-1][0]
+
+    async def _report(self, job_id: int, progress_cb: Optional[ProgressCallback],
+                      finished: bool = False) -> Optional[SubscriptionExtensionJob]:
+        async with self.async_session_factory() as session:
+            job = await subscription_extension_dal.refresh_job_progress(
+                session, job_id, finished=finished)
+            await session.commit()
+        if job and progress_cb:
+            try:
+                await progress_cb(job)
+            except Exception as e:
+                logging.warning(
+                    f"Subscription extension job {job_id}: progress report failed: {e}")
+        return job
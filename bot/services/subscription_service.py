@@ -10,7 +10,8 @@ from bot.utils.date_utils import add_months
 from db.models import User, Subscription
 
 from config.settings import Settings
-from .panel_api_service import PanelApiService
+from .panel_api_service import (PanelApiService, PanelUnavailableError,
+                                PanelUserNotFoundError)
 
 
 class SubscriptionService:
@@ -69,8 +70,21 @@ class SubscriptionService:
                 )
 
     async def _get_or_create_panel_user_link_details(
-        self, session: AsyncSession, user_id: int, db_user: Optional[User] = None
+        self,
+        session: AsyncSession,
+        user_id: int,
+        db_user: Optional[User] = None,
+        *,
+        force_verify: bool = False,
     ) -> Tuple[Optional[str], Optional[str], Optional[str], bool]:
+        """Panel user UUID, subscription link ID and short UUID of a user.
+
+        The stored link is trusted without asking the panel while a cached
+        panel payload confirms it or it was verified within
+        PANEL_LINK_VERIFY_TTL_HOURS; callers detect a user deleted on the
+        panel by the 404 of their write (see _update_panel_user). Otherwise
+        the user is looked up on the panel and created there if missing.
+        """
         if not db_user:
             db_user = await user_dal.get_user_by_id(session, user_id)
 
@@ -80,6 +94,95 @@ class SubscriptionService:
             )
             return None, None, None, False
 
+        if not force_verify:
+            local_link = await self._get_trusted_panel_user_link(session, db_user)
+            if local_link:
+                return local_link
+
+        link_details = await self._resolve_panel_user_link_on_panel(
+            session, user_id, db_user
+        )
+        if link_details[0] and link_details[1]:
+            db_user.panel_link_verified_at = datetime.now(timezone.utc)
+            await session.flush()
+        return link_details
+
+    async def _get_trusted_panel_user_link(
+        self, session: AsyncSession, db_user: User
+    ) -> Optional[Tuple[str, str, Optional[str], bool]]:
+        panel_user_uuid = db_user.panel_user_uuid
+        if not panel_user_uuid:
+            return None
+
+        snapshot = self.panel_service.get_user_snapshot(panel_user_uuid)
+        if snapshot and str(snapshot.get("telegramId")) == str(db_user.user_id):
+            panel_sub_link_id = snapshot.get("subscriptionUuid") or snapshot.get("shortUuid")
+            if panel_sub_link_id:
+                return panel_user_uuid, panel_sub_link_id, snapshot.get("shortUuid"), False
+
+        verify_ttl_hours = self.settings.PANEL_LINK_VERIFY_TTL_HOURS
+        verified_at = db_user.panel_link_verified_at
+        if (
+            verify_ttl_hours <= 0
+            or not verified_at
+            or verified_at < datetime.now(timezone.utc) - timedelta(hours=verify_ttl_hours)
+        ):
+            return None
+
+        panel_sub_link_id = await subscription_dal.get_latest_panel_subscription_uuid(
+            session, db_user.user_id, panel_user_uuid
+        )
+        if not panel_sub_link_id:
+            return None
+        return panel_user_uuid, panel_sub_link_id, None, False
+
+    async def _update_panel_user(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        db_user: User,
+        panel_user_uuid: str,
+        update_payload: Dict[str, Any],
+        subscription: Optional[Subscription] = None,
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
+        """PATCH the panel user; returns the updated user and the UUID used.
+
+        A 404 means the stored link is stale: the user is resolved again on
+        the panel (and recreated there if needed), ``subscription`` is
+        re-pointed to the new link and the update is retried once.
+        """
+        try:
+            updated_panel_user = await self.panel_service.update_user_details_on_panel(
+                panel_user_uuid, update_payload, raise_on_not_found=True
+            )
+            return updated_panel_user, panel_user_uuid
+        except PanelUserNotFoundError:
+            logging.warning(
+                f"Panel user {panel_user_uuid} of TG user {user_id} no longer exists on the panel. Re-linking."
+            )
+
+        db_user.panel_link_verified_at = None
+        new_panel_uuid, new_panel_sub_link_id, _, _ = (
+            await self._get_or_create_panel_user_link_details(
+                session, user_id, db_user, force_verify=True
+            )
+        )
+        if not new_panel_uuid or not new_panel_sub_link_id:
+            return None, panel_user_uuid
+
+        if subscription is not None:
+            subscription.panel_user_uuid = new_panel_uuid
+            subscription.panel_subscription_uuid = new_panel_sub_link_id
+            await session.flush()
+        update_payload["uuid"] = new_panel_uuid
+        updated_panel_user = await self.panel_service.update_user_details_on_panel(
+            new_panel_uuid, update_payload
+        )
+        return updated_panel_user, new_panel_uuid
+
+    async def _resolve_panel_user_link_on_panel(
+        self, session: AsyncSession, user_id: int, db_user: User
+    ) -> Tuple[Optional[str], Optional[str], Optional[str], bool]:
         current_local_panel_uuid = db_user.panel_user_uuid
         panel_username_on_panel_standard = f"tg_{user_id}"
 
@@ -358,7 +461,7 @@ class SubscriptionService:
             "auto_renew_enabled": False,
         }
         try:
-            await subscription_dal.upsert_subscription(session, trial_sub_data)
+            trial_sub = await subscription_dal.upsert_subscription(session, trial_sub_data)
         except Exception as e_upsert:
             logging.error(
                 f"Failed to upsert trial subscription for user {user_id}: {e_upsert}",
@@ -387,8 +490,8 @@ class SubscriptionService:
             ]
         )
 
-        updated_panel_user = await self.panel_service.update_user_details_on_panel(
-            panel_user_uuid, panel_update_payload
+        updated_panel_user, panel_user_uuid = await self._update_panel_user(
+            session, user_id, db_user, panel_user_uuid, panel_update_payload, trial_sub
         )
         if not updated_panel_user or updated_panel_user.get("error"):
             logging.warning(
@@ -548,8 +651,8 @@ class SubscriptionService:
             ]
         )
 
-        updated_panel_user = await self.panel_service.update_user_details_on_panel(
-            panel_user_uuid, panel_update_payload
+        updated_panel_user, panel_user_uuid = await self._update_panel_user(
+            session, user_id, db_user, panel_user_uuid, panel_update_payload, new_or_updated_sub
         )
         if not updated_panel_user or updated_panel_user.get("error"):
             logging.warning(
@@ -576,7 +679,13 @@ class SubscriptionService:
         user_id: int,
         bonus_days: int,
         reason: str = "bonus",
+        deferred_panel_updates: Optional[List[Dict[str, Any]]] = None,
     ) -> Optional[datetime]:
+        """Add ``bonus_days`` to the user's active subscription or start a bonus one.
+
+        With ``deferred_panel_updates`` only the local subscription changes;
+        the panel update is appended there for ``push_subscription_expiry``.
+        """
         reason_lower = (reason or "").lower()
         apply_main_traffic_limit = any(
             keyword in reason_lower for keyword in ("admin", "promo code", "referral", "bonus")
@@ -656,6 +765,18 @@ class SubscriptionService:
                     {"traffic_limit_bytes": self.settings.user_traffic_limit_bytes},
                 )
 
+        if updated_sub_model and deferred_panel_updates is not None:
+            deferred_panel_updates.append({
+                "user_id": user_id,
+                "expire_at": new_end_date_obj.isoformat(),
+                "traffic_limit_bytes": (
+                    self.settings.user_traffic_limit_bytes if apply_main_traffic_limit else None
+                ),
+            })
+            logging.info(
+                f"Subscription for user {user_id} extended locally by {bonus_days} days ({reason}). New end date: {new_end_date_obj}."
+            )
+            return new_end_date_obj
         if updated_sub_model:
             # Prepare panel update payload
             panel_update_payload = self._build_panel_update_payload(
@@ -666,11 +787,8 @@ class SubscriptionService:
                 include_uuid=False,
             )
 
-            panel_update_success = (
-                await self.panel_service.update_user_details_on_panel(
-                    panel_uuid,
-                    panel_update_payload,
-                )
+            panel_update_success, panel_uuid = await self._update_panel_user(
+                session, user_id, user, panel_uuid, panel_update_payload, updated_sub_model
             )
             if not panel_update_success:
                 logging.warning(
@@ -687,9 +805,52 @@ class SubscriptionService:
             )
             return None
 
+    async def push_subscription_expiry(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        expire_at: datetime,
+        traffic_limit_bytes: Optional[int] = None,
+        status: Optional[str] = None,
+    ) -> bool:
+        """Set an absolute expiry on the user's panel account.
+
+        Repeating the call is harmless, so it is safe to retry after a change
+        that was already recorded locally.
+        """
+        user = await user_dal.get_user_by_id(session, user_id)
+        if not user:
+            logging.warning(f"Cannot push expiry for user {user_id}: user not found.")
+            return False
+        panel_uuid, _, _, _ = await self._get_or_create_panel_user_link_details(
+            session, user_id, user
+        )
+        if not panel_uuid:
+            logging.error(f"Cannot push expiry for user {user_id}: no panel user.")
+            return False
+        active_sub = await subscription_dal.get_active_subscription_by_user_id(
+            session, user_id, panel_uuid
+        )
+        payload = self._build_panel_update_payload(
+            expire_at=expire_at,
+            status=status,
+            traffic_limit_bytes=traffic_limit_bytes,
+            include_uuid=False,
+        )
+        updated, _ = await self._update_panel_user(
+            session, user_id, user, panel_uuid, payload, active_sub
+        )
+        return bool(updated)
+
     async def get_active_subscription_details(
-        self, session: AsyncSession, user_id: int
+        self, session: AsyncSession, user_id: int, *, use_snapshot: bool = False
     ) -> Optional[Dict[str, Any]]:
+        """Panel-backed subscription details for the "My subscription" screen.
+
+        With ``use_snapshot`` a recent panel snapshot (kept fresh by webhooks
+        and the sync) is used when one is cached, skipping the panel
+        round-trip and the reconciliation of the local row.
+        """
         db_user = await user_dal.get_user_by_id(session, user_id)
         if not db_user or not db_user.panel_user_uuid:
             logging.info(
@@ -701,7 +862,30 @@ class SubscriptionService:
         local_active_sub = await subscription_dal.get_active_subscription_by_user_id(
             session, user_id, panel_user_uuid
         )
-        panel_user_data = await self.panel_service.get_user_by_uuid(panel_user_uuid)
+        panel_user_data = (
+            self.panel_service.get_user_snapshot(panel_user_uuid)
+            if use_snapshot
+            else None
+        )
+        from_snapshot = panel_user_data is not None
+        is_degraded = False
+        if not from_snapshot:
+            try:
+                panel_user_data = await self.panel_service.get_user_by_uuid(
+                    panel_user_uuid, raise_on_unavailable=True
+                )
+            except PanelUnavailableError as e:
+                # Serve the last known data instead of failing the screen
+                logging.warning(
+                    f"Panel unavailable for 'my_subscription' of user {user_id} ({e}); serving cached/local data."
+                )
+                is_degraded = True
+                panel_user_data = self.panel_service.get_user_snapshot(
+                    panel_user_uuid, allow_stale=True
+                )
+                from_snapshot = panel_user_data is not None
+                if not from_snapshot:
+                    return self._local_subscription_details(db_user, local_active_sub)
 
         if not panel_user_data:
             logging.warning(
@@ -711,7 +895,7 @@ class SubscriptionService:
             await user_dal.update_user(session, user_id, {"panel_user_uuid": None})
             return None
 
-        if local_active_sub:
+        if local_active_sub and not from_snapshot:
             update_payload_local = {}
             panel_status = panel_user_data.get("status", "UNKNOWN").upper()
             panel_expire_at_str = panel_user_data.get("expireAt")
@@ -769,6 +953,14 @@ class SubscriptionService:
             if panel_user_data.get("expireAt")
             else None
         )
+        if (
+            from_snapshot
+            and local_active_sub
+            and local_active_sub.end_date
+            and (panel_end_date is None or local_active_sub.end_date > panel_end_date)
+        ):
+            # A payment may have extended the local row after the snapshot
+            panel_end_date = local_active_sub.end_date
         hwid_limit = panel_user_data.get("hwidDeviceLimit")
         if hwid_limit is None:
             hwid_limit = self.settings.USER_HWID_DEVICE_LIMIT
@@ -782,9 +974,29 @@ class SubscriptionService:
             "traffic_used_bytes": panel_user_data.get("usedTrafficBytes"),
             "user_bot_username": db_user.username,
             "is_panel_data": True,
+            "is_degraded": is_degraded,
             "max_devices": hwid_limit,
         }
 
+    def _local_subscription_details(
+        self, db_user: User, local_active_sub: Optional[Subscription]
+    ) -> Optional[Dict[str, Any]]:
+        """Subscription details from the local row alone, used while the panel is down."""
+        if not local_active_sub:
+            return None
+        return {
+            "user_id": db_user.panel_user_uuid,
+            "end_date": local_active_sub.end_date,
+            "status_from_panel": (local_active_sub.status_from_panel or "UNKNOWN").upper(),
+            "config_link": None,
+            "traffic_limit_bytes": local_active_sub.traffic_limit_bytes,
+            "traffic_used_bytes": local_active_sub.traffic_used_bytes,
+            "user_bot_username": db_user.username,
+            "is_panel_data": False,
+            "is_degraded": True,
+            "max_devices": self.settings.USER_HWID_DEVICE_LIMIT,
+        }
+
     async def get_subscriptions_ending_soon(
         self, session: AsyncSession, days_threshold: int
     ) -> List[Dict[str, Any]]:
@@ -823,55 +1035,82 @@ class SubscriptionService:
         sub: Subscription,
     ) -> bool:
         """Attempt to charge user using saved payment method. Return True on initiated/handled, False on failure."""
+        ok, _, _ = await self.initiate_subscription_renewal(session, sub)
+        return ok
+
+    async def initiate_subscription_renewal(
+        self,
+        session: AsyncSession,
+        sub: Subscription,
+        idempotence_key: Optional[str] = None,
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
+        """Create the merchant-initiated renewal payment for ``sub``.
+
+        Returns ``(ok, provider_payment_id, error)``. ``ok`` is True with no
+        payment id when there is nothing to charge and False when YooKassa
+        definitely refused the charge (4xx answer or a canceled payment).
+        Errors that leave the outcome unknown (timeouts, network errors,
+        5xx) propagate: the charge must then be retried with the same
+        ``idempotence_key``, which never creates a second payment.
+        """
         if not sub.auto_renew_enabled:
-            return True
+            return True, None, None
         # If autopayments are disabled globally, skip charging attempts
         if not getattr(self.settings, 'YOOKASSA_AUTOPAYMENTS_ENABLED', False):
-            return True
+            return True, None, None
         if sub.provider == "tribute":
             # Tribute is paid externally; we do not auto-charge here
-            return True
+            return True, None, None
 
         from db.dal.user_billing_dal import get_user_default_payment_method
         default_pm = await get_user_default_payment_method(session, sub.user_id)
         if not default_pm:
             logging.info(f"Auto-renew skipped: no saved payment method for user {sub.user_id}")
-            return False
+            return False, None, "no saved payment method"
 
         try:
-            from .yookassa_service import YooKassaService  # local import to avoid cycles
+            from .yookassa_service import YooKassaApiError, YooKassaService  # local import to avoid cycles
             yk: YooKassaService = self.yookassa_service  # type: ignore[attr-defined]
         except Exception:
             yk = None  # type: ignore
         if not yk or not getattr(yk, 'configured', False):
             logging.warning("YooKassa unavailable for auto-renew")
-            return False
+            return False, None, "yookassa unavailable"
 
         months = sub.duration_months or 1
         amount = self.settings.subscription_options.get(months)
         if not amount:
             logging.error(f"Auto-renew price missing for {months} months")
-            return False
+            return False, None, f"price missing for {months} months"
 
         metadata = {
             "user_id": str(sub.user_id),
             "auto_renew_for_subscription_id": str(sub.subscription_id),
             "subscription_months": str(months),
         }
-        resp = await yk.create_payment(
-            amount=float(amount),
-            currency="RUB",
-            description=f"Auto-renewal for {months} months",
-            metadata=metadata,
-            payment_method_id=default_pm.provider_payment_method_id,
-            save_payment_method=False,
-            capture=True,
-        )
+        try:
+            resp = await yk.create_payment(
+                amount=float(amount),
+                currency="RUB",
+                description=f"Auto-renewal for {months} months",
+                metadata=metadata,
+                payment_method_id=default_pm.provider_payment_method_id,
+                save_payment_method=False,
+                capture=True,
+                idempotence_key=idempotence_key,
+                raise_errors=True,
+            )
+        except YooKassaApiError as e:
+            if not 400 <= e.status < 500:
+                raise
+            logging.error(f"Auto-renew create_payment refused: {e}")
+            return False, None, str(e)
         if not resp or resp.get("status") not in {"pending", "waiting_for_capture", "succeeded"}:
             logging.error(f"Auto-renew create_payment failed: {resp}")
-            return False
+            status = resp.get("status") if resp else None
+            return False, resp.get("id") if resp else None, f"create_payment failed (status={status})"
         logging.info(f"Auto-renew initiated for user {sub.user_id} payment_id={resp.get('id')}")
-        return True
+        return True, resp.get("id"), None
 
     async def update_last_notification_sent(
         self, session: AsyncSession, user_id: int, subscription_end_date: datetime
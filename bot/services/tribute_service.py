@@ -1,7 +1,5 @@
 import logging
-import hmac
 import hashlib
-import json
 from typing import Optional
 
 from aiohttp import web
@@ -13,10 +11,12 @@ from bot.middlewares.i18n import JsonI18n
 from bot.services.subscription_service import SubscriptionService
 from bot.services.panel_api_service import PanelApiService
 from bot.services.referral_service import ReferralService
-from .notification_service import NotificationService
-from bot.keyboards.inline.user_keyboards import get_connect_and_main_keyboard
+from bot.utils.webhook_payload import (WebhookPayloadError, json_loads,
+                                       read_limited_body, verify_and_parse_async)
+from .webhook_inbox_service import WebhookInboxService
+from .payment_effects_service import enqueue_payment_effects
 from db.dal import payment_dal, user_dal, subscription_dal
-from bot.utils.text_sanitizer import sanitize_display_name, username_for_display
+from db.models import InboundEvent
 
 
 def convert_period_to_months(period: Optional[str]) -> int:
@@ -58,13 +58,10 @@ class TributeService:
         self.subscription_service = subscription_service
         self.referral_service = referral_service
 
-    async def handle_webhook(self, raw_body: bytes, signature_header: Optional[str]) -> web.Response:
+    async def handle_webhook(self, raw_body: bytes, signature_header: Optional[str],
+                             inbox: WebhookInboxService) -> web.Response:
+        """Verify a Tribute webhook and queue it in the webhook inbox."""
         settings = self.settings
-        bot = self.bot
-        i18n = self.i18n
-        async_session_factory = self.async_session_factory
-        subscription_service = self.subscription_service
-        referral_service = self.referral_service
 
         def ok(data: Optional[dict] = None) -> web.Response:
             payload = {"status": "ok"}
@@ -78,34 +75,67 @@ class TributeService:
         def bad_request(reason: str) -> web.Response:
             return web.json_response({"status": "error", "reason": reason}, status=400)
 
-        if settings.TRIBUTE_API_KEY:
-            if not signature_header:
-                return web.json_response({"status": "error", "reason": "no_signature"}, status=403)
-            expected_sig = hmac.new(settings.TRIBUTE_API_KEY.encode(), raw_body,
-                                    hashlib.sha256).hexdigest()
-            if not hmac.compare_digest(expected_sig, signature_header):
-                return web.json_response({"status": "error", "reason": "invalid_signature"}, status=403)
-
         try:
-            payload = json.loads(raw_body.decode())
-        except Exception:
+            payload = await verify_and_parse_async(
+                raw_body, settings.TRIBUTE_API_KEY, signature_header,
+                settings.WEBHOOK_OFFLOAD_THRESHOLD_BYTES)
+        except WebhookPayloadError as e:
+            return web.json_response({"status": "error", "reason": e.reason}, status=e.status)
+        if not isinstance(payload, dict):
             return bad_request("invalid_json")
 
-        logging.info(
-            "Tribute webhook data: %s",
-            json.dumps(payload, ensure_ascii=False),
+        event_name = payload.get("name")
+        data = payload.get("payload", {})
+        if not isinstance(data, dict) or not data.get("telegram_user_id"):
+            # Permanent format issue — acknowledge to avoid retries
+            return ignored("missing_telegram_user_id")
+
+        try:
+            await inbox.submit("tribute",
+                               self._inbox_event_id(event_name, data, raw_body),
+                               raw_body.decode(),
+                               event_type=event_name)
+        except Exception as e:
+            logging.error(f"Tribute webhook: failed to store event: {e}", exc_info=True)
+            return web.json_response({"status": "error", "reason": "retry_later"}, status=503)
+        # Acknowledge to Tribute that webhook was received and accepted
+        return ok({"event": event_name or "unknown"})
+
+    @staticmethod
+    def _provider_payment_id(data: dict, raw_body: bytes) -> str:
+        # Prefer explicit event/payment identifiers if present; otherwise fall back to payload hash suffix
+        candidate_event_id = (
+            str(data.get("event_id") or data.get("payment_id") or data.get("purchase_id") or data.get("invoice_id") or "")
         )
+        if candidate_event_id:
+            return candidate_event_id
+        # Combine subscription_id (if any) with a stable hash of the raw payload to ensure uniqueness per event
+        sub_id_part = str(data.get("subscription_id") or "sub")
+        payload_hash = hashlib.sha256(raw_body).hexdigest()[:16]
+        return f"{sub_id_part}:{payload_hash}"
+
+    def _inbox_event_id(self, event_name: Optional[str], data: dict, raw_body: bytes) -> str:
+        return f"{event_name or 'unknown'}:{self._provider_payment_id(data, raw_body)}"
+
+    async def process_inbound_event(self, event: InboundEvent) -> None:
+        """Apply a stored Tribute webhook; raising makes the inbox retry it."""
+        settings = self.settings
+        bot = self.bot
+        i18n = self.i18n
+        async_session_factory = self.async_session_factory
+        subscription_service = self.subscription_service
+
+        raw_body = event.body.encode()
+        payload = json_loads(raw_body)
+
+        logging.info(
+            "Tribute webhook %s (%s)", event.event_id, event.event_type)
 
         # Tribute webhook spec: only two events are sent
         # name: new_subscription | cancelled_subscription
         event_name = payload.get("name")
         data = payload.get("payload", {})
-
-        # Mandatory routing fields
         user_id = data.get("telegram_user_id")
-        if not user_id:
-            # Permanent format issue — acknowledge to avoid retries
-            return ignored("missing_telegram_user_id")
 
         period_val = data.get("period")
         months = convert_period_to_months(period_val)
@@ -125,17 +155,7 @@ class TributeService:
         async with async_session_factory() as session:
             if event_name == "new_subscription":
                 # Use a unique, idempotent provider payment id per webhook event
-                # Prefer explicit event/payment identifiers if present; otherwise fall back to payload hash suffix
-                candidate_event_id = (
-                    str(data.get("event_id") or data.get("payment_id") or data.get("purchase_id") or data.get("invoice_id") or "")
-                )
-                if candidate_event_id:
-                    provider_payment_id = candidate_event_id
-                else:
-                    # Combine subscription_id (if any) with a stable hash of the raw payload to ensure uniqueness per event
-                    sub_id_part = str(data.get("subscription_id") or "sub")
-                    payload_hash = hashlib.sha256(raw_body).hexdigest()[:16]
-                    provider_payment_id = f"{sub_id_part}:{payload_hash}"
+                provider_payment_id = self._provider_payment_id(data, raw_body)
 
                 # Idempotent ensure payment
                 payment_record = await payment_dal.ensure_payment_with_provider_id(
@@ -148,6 +168,10 @@ class TributeService:
                     provider="tribute",
                     provider_payment_id=provider_payment_id,
                 )
+                if payment_record is None:
+                    logging.info(
+                        f"Tribute payment {provider_payment_id} already processed; skipping duplicate")
+                    return
 
                 activation_details = await subscription_service.activate_subscription(
                     session,
@@ -157,98 +181,24 @@ class TributeService:
                     payment_record.payment_id,
                     provider="tribute",
                 )
-                referral_bonus = await referral_service.apply_referral_bonuses_for_payment(
+                db_user = await user_dal.get_user_by_id(session, int(user_id))
+                await enqueue_payment_effects(
                     session,
-                    int(user_id),
-                    months,
-                    current_payment_db_id=payment_record.payment_id,
-                    skip_if_active_before_payment=False,
+                    db_user=db_user,
+                    user_id=int(user_id),
+                    payment_db_id=payment_record.payment_id,
+                    months=months,
+                    amount=float(amount_float),
+                    currency=currency,
+                    provider="tribute",
+                    activation=activation_details,
                 )
                 await session.commit()
-
-                db_user = await user_dal.get_user_by_id(session, int(user_id))
-                lang = db_user.language_code if db_user and db_user.language_code else settings.DEFAULT_LANGUAGE
-                _ = lambda k, **kw: i18n.gettext(lang, k, **kw)
-
-                applied_ref_days = referral_bonus.get('referee_bonus_applied_days') if referral_bonus else None
-                final_end = (referral_bonus.get('referee_new_end_date')
-                             if referral_bonus else None)
-                if not final_end:
-                    final_end = activation_details.get('end_date')
-
-                if final_end:
-                    config_link = activation_details.get("subscription_url") or _(
-                        "config_link_not_available"
-                    )
-
-                    if applied_ref_days:
-                        inviter_name_display = _('friend_placeholder')
-                        if db_user and db_user.referred_by_id:
-                            inviter = await user_dal.get_user_by_id(session, db_user.referred_by_id)
-                            if inviter:
-                                safe_name = sanitize_display_name(inviter.first_name) if inviter.first_name else None
-                                if safe_name:
-                                    inviter_name_display = safe_name
-                                elif inviter.username:
-                                    inviter_name_display = username_for_display(inviter.username, with_at=False)
-                        success_msg = _(
-                            "payment_successful_with_referral_bonus_full",
-                            months=months,
-                            base_end_date=activation_details["end_date"].strftime('%Y-%m-%d'),
-                            bonus_days=applied_ref_days,
-                            final_end_date=final_end.strftime('%Y-%m-%d'),
-                            inviter_name=inviter_name_display,
-                            config_link=config_link,
-                        )
-                    else:
-                        success_msg = _(
-                            "payment_successful_full",
-                            months=months,
-                            end_date=final_end.strftime('%Y-%m-%d'),
-                            config_link=config_link,
-                        )
-                    markup = get_connect_and_main_keyboard(
-                        lang,
-                        i18n,
-                        settings,
-                        config_link,
-                        preserve_message=True,
-                    )
-
-                    try:
-                        # Use user's DB language in success messages prepared above
-                        await bot.send_message(
-                            int(user_id),
-                            success_msg,
-                            reply_markup=markup,
-                            parse_mode="HTML",
-                            disable_web_page_preview=True,
-                        )
-                    except Exception as e:
-                        logging.error(
-                            f"Failed to send Tribute payment success message to user {user_id}: {e}")
-
-                # Send notification about payment
-                try:
-                    notification_service = NotificationService(bot, settings, i18n)
-                    user = await user_dal.get_user_by_id(session, int(user_id))
-                    await notification_service.notify_payment_received(
-                        user_id=int(user_id),
-                        amount=float(amount_float),
-                        currency=currency,
-                        months=months,
-                        payment_provider="tribute",
-                        username=user.username if user else None
-                    )
-                except Exception as e:
-                    logging.error(f"Failed to send tribute payment notification: {e}")
             elif event_name == "cancelled_subscription":
                 await self._handle_tribute_cancellation(session, int(user_id), bot, i18n)
                 
             else:
                 await session.commit()
-        # Acknowledge to Tribute that webhook was received and processed/accepted
-        return ok({"event": event_name or "unknown"})
 
     async def _handle_tribute_cancellation(self, session, user_id: int, bot: Bot, i18n: JsonI18n):
         """Handle tribute subscription cancellation - set subscription to 1 day grace period"""
@@ -330,6 +280,7 @@ class TributeService:
 async def tribute_webhook_route(request: web.Request):
     """AIOHTTP route handler for Tribute webhook calls."""
     tribute_service: TributeService = request.app['tribute_service']
-    raw_body = await request.read()
+    raw_body = await read_limited_body(request, tribute_service.settings.WEBHOOK_MAX_BODY_BYTES)
     signature_header = request.headers.get('trbt-signature')
-    return await tribute_service.handle_webhook(raw_body, signature_header)
+    return await tribute_service.handle_webhook(raw_body, signature_header,
+                                                request.app['webhook_inbox'])
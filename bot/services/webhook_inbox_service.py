@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import sessionmaker
+
+from config.settings import Settings
+from db.dal import inbound_event_dal
+from db.models import InboundEvent
+from db.query_budget import query_scope
+
+InboundEventProcessor = Callable[[InboundEvent], Awaitable[None]]
+# Returns the failed events of the batch (event row id -> error)
+InboundBatchProcessor = Callable[[List[InboundEvent]], Awaitable[Dict[int, Exception]]]
+
+_PURGE_INTERVAL_SECONDS = 3600
+
+
+class PermanentEventError(Exception):
+    """Raised by a processor for an event that can never succeed; it is
+    dead-lettered at once instead of being retried."""
+
+
+class WebhookInboxService:
+    """Durable inbox for provider webhooks.
+
+    Routes verify the request, store the raw event with ``submit`` and answer
+    immediately; a bounded pool of workers runs the registered provider
+    processor later. Failed events are retried with exponential backoff and
+    end up as ``dead`` after WEBHOOK_INBOX_MAX_ATTEMPTS, from where they can be
+    replayed. Processors must be idempotent: an event may run more than once.
+
+    Providers registered with ``register_batch_processor`` are claimed up to
+    ``batch_size`` events at a time and handed over as one batch that takes a
+    single worker slot; batches grow on their own while workers are busy.
+    """
+
+    def __init__(self, settings: Settings, async_session_factory: sessionmaker):
+        self.settings = settings
+        self.async_session_factory = async_session_factory
+        self._processors: Dict[str, InboundEventProcessor] = {}
+        self._batch_processors: Dict[str, Tuple[InboundBatchProcessor, int]] = {}
+        self._wakeup = asyncio.Event()
+        self._inflight: Set[asyncio.Task] = set()
+        self._runner: Optional[asyncio.Task] = None
+        self._last_purge = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.WEBHOOK_INBOX_ENABLED
+
+    def register_processor(self, provider: str,
+                           processor: InboundEventProcessor) -> None:
+        self._processors[provider] = processor
+
+    def register_batch_processor(self, provider: str,
+                                 processor: InboundBatchProcessor,
+                                 batch_size: int) -> None:
+        self._batch_processors[provider] = (processor, max(1, batch_size))
+
+    async def submit(self,
+                     provider: str,
+                     event_id: str,
+                     body: str,
+                     event_type: Optional[str] = None) -> bool:
+        """Store a verified webhook for processing.
+
+        Returns False when the same (provider, event_id) was already received.
+        Database errors propagate so the route can answer 5xx and the provider
+        retries the delivery. With the inbox disabled the event is processed
+        right here and processing errors propagate the same way.
+        """
+        if not self.enabled:
+            await self._process_inline(provider, event_id, body, event_type)
+            return True
+
+        async with self.async_session_factory() as session:
+            row_id = await inbound_event_dal.store_inbound_event(
+                session,
+                provider=provider,
+                event_id=event_id,
+                body=body,
+                event_type=event_type)
+            await session.commit()
+
+        if row_id is None:
+            logging.info(
+                f"Webhook inbox: duplicate {provider} event {event_id} ignored.")
+            return False
+        self.wake()
+        return True
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        if not self.enabled or self._runner is not None:
+            return
+        self._runner = asyncio.create_task(self._run(), name="WebhookInboxDispatcher")
+        logging.info(
+            f"Webhook inbox started with {self.settings.WEBHOOK_INBOX_WORKERS} worker(s) "
+            f"for providers: {', '.join(sorted({*self._processors, *self._batch_processors})) or 'none'}")
+
+    async def close(self) -> None:
+        if self._runner:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        if self._inflight:
+            # Let running events finish; unfinished ones are reclaimed after their lease.
+            await asyncio.wait(self._inflight, timeout=10)
+
+    async def _process_inline(self, provider: str, event_id: str, body: str,
+                              event_type: Optional[str]) -> None:
+        event = InboundEvent(id=0,
+                             provider=provider,
+                             event_id=event_id,
+                             event_type=event_type,
+                             body=body,
+                             attempts=1)
+        try:
+            if provider in self._batch_processors:
+                batch_processor, _ = self._batch_processors[provider]
+                failures = await batch_processor([event])
+                if failures:
+                    raise next(iter(failures.values()))
+                return
+            processor = self._processors.get(provider)
+            if processor is None:
+                raise LookupError(f"No processor registered for provider '{provider}'")
+            await processor(event)
+        except Exception:
+            logging.exception(
+                f"Webhook inbox: inline processing of {provider} event {event_id} failed")
+            # Nothing is stored; the route answers 5xx and the provider redelivers
+            raise
+
+    async def _run(self) -> None:
+        workers = max(1, self.settings.WEBHOOK_INBOX_WORKERS)
+        poll_seconds = max(0.5, self.settings.WEBHOOK_INBOX_POLL_SECONDS)
+        while True:
+            if len(self._inflight) >= workers:
+                await asyncio.wait(self._inflight,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            self._wakeup.clear()
+            try:
+                claimed = await self._claim(workers - len(self._inflight))
+                await self._maybe_purge()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Webhook inbox: failed to claim events: {e}",
+                              exc_info=True)
+                claimed = 0
+
+            if claimed:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self, free_slots: int) -> int:
+        claimed = 0
+        lease_seconds = self.settings.WEBHOOK_INBOX_LEASE_SECONDS
+        for provider, (_, batch_size) in self._batch_processors.items():
+            if free_slots <= 0:
+                break
+            async with self.async_session_factory() as session:
+                batch = await inbound_event_dal.claim_due_events(
+                    session,
+                    limit=batch_size,
+                    lease_seconds=lease_seconds,
+                    provider=provider)
+                await session.commit()
+            if batch:
+                self._spawn(self._process_batch(provider, batch),
+                            f"WebhookInbox-{provider}-batch-{batch[0].id}")
+                claimed += len(batch)
+                free_slots -= 1
+
+        if free_slots <= 0:
+            return claimed
+        async with self.async_session_factory() as session:
+            events = await inbound_event_dal.claim_due_events(
+                session,
+                limit=free_slots,
+                lease_seconds=lease_seconds,
+                exclude_providers=tuple(self._batch_processors))
+            await session.commit()
+        for event in events:
+            self._spawn(self._process(event),
+                        f"WebhookInbox-{event.provider}-{event.id}")
+        return claimed + len(events)
+
+    def _spawn(self, coro: Awaitable[None], name: str) -> None:
+        task = asyncio.create_task(coro, name=name)
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _process_batch(self, provider: str,
+                             events: List[InboundEvent]) -> None:
+        processor, _ = self._batch_processors[provider]
+        try:
+            with query_scope(f"inbox {provider} batch",
+                             self.settings.DB_QUERY_BUDGET_PER_WEBHOOK * len(events)):
+                failures = await processor(events)
+        except Exception as e:
+            failures = {event.id: e for event in events}
+
+        for event in events:
+            if event.id in failures:
+                await self._record_failure(event, failures[event.id])
+        done_ids = [event.id for event in events if event.id not in failures]
+        try:
+            async with self.async_session_factory() as session:
+                await inbound_event_dal.mark_events_done(session, done_ids)
+                await session.commit()
+        except Exception as e:
+            logging.error(
+                f"Webhook inbox: failed to mark {len(done_ids)} {provider} event(s) done: {e}")
+
+    async def _process(self, event: InboundEvent) -> None:
+        processor = self._processors.get(event.provider)
+        try:
+            if processor is None:
+                raise LookupError(
+                    f"No processor registered for provider '{event.provider}'")
+            with query_scope(f"inbox {event.provider}",
+                             self.settings.DB_QUERY_BUDGET_PER_WEBHOOK):
+                await processor(event)
+        except Exception as e:
+            await self._record_failure(event, e)
+            return
+
+        try:
+            async with self.async_session_factory() as session:
+                await inbound_event_dal.mark_event_done(session, event.id)
+                await session.commit()
+        except Exception as e:
+            # The lease will expire and the event is processed again; processors are idempotent.
+            logging.error(
+                f"Webhook inbox: failed to mark {event.provider} event {event.event_id} done: {e}")
+
+    async def _record_failure(self, event: InboundEvent, error: Exception) -> None:
+        attempts = event.attempts or 1
+        retry_at: Optional[datetime] = None
+        if (attempts < self.settings.WEBHOOK_INBOX_MAX_ATTEMPTS
+                and not isinstance(error, PermanentEventError)):
+            delay = min(
+                self.settings.WEBHOOK_INBOX_RETRY_BASE_SECONDS * 2**(attempts - 1),
+                self.settings.WEBHOOK_INBOX_RETRY_MAX_SECONDS)
+            retry_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+            logging.warning(
+                f"Webhook inbox: {event.provider} event {event.event_id} failed "
+                f"(attempt {attempts}), retrying at {retry_at.isoformat()}: {error}")
+        else:
+            logging.error(
+                f"Webhook inbox: {event.provider} event {event.event_id} dead-lettered "
+                f"after {attempts} attempt(s): {error}",
+                exc_info=error)
+        try:
+            async with self.async_session_factory() as session:
+                await inbound_event_dal.mark_event_failed(
+                    session, event.id, f"{type(error).__name__}: {error}",
+                    retry_at)
+                await session.commit()
+        except Exception as e:
+            logging.error(
+                f"Webhook inbox: failed to record failure of event {event.id}: {e}")
+
+    async def _maybe_purge(self) -> None:
+        retention_days = self.settings.WEBHOOK_INBOX_RETENTION_DAYS
+        if retention_days <= 0:
+            return
+        now = time.monotonic()
+        if now - self._last_purge < _PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        async with self.async_session_factory() as session:
+            removed = await inbound_event_dal.purge_processed_events(
+                session, retention_days)
+            await session.commit()
+        if removed:
+            logging.info(f"Webhook inbox: purged {removed} processed event(s).")
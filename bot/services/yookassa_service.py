@@ -3,11 +3,25 @@ import logging
 import asyncio
 from typing import Optional, Dict, Any, List
 
-from yookassa import Configuration, Payment as YooKassaPayment
-from yookassa.domain.request.payment_request_builder import PaymentRequestBuilder
-from yookassa.domain.common.confirmation_type import ConfirmationType
+import aiohttp
 
 from config.settings import Settings
+from bot.utils.http_transport import HttpTransport
+
+# YooKassa answers 202 while it is still processing a request and 500 when the
+# result is unknown; both must be retried with the same Idempotence-Key.
+_RETRYABLE_STATUSES = {202, 500, 502, 503, 504}
+_DEFAULT_RETRY_DELAY_SECONDS = 1.8
+
+
+class YooKassaApiError(Exception):
+
+    def __init__(self, status: int, payload: Optional[Dict[str, Any]]):
+        self.status = status
+        self.payload = payload or {}
+        super().__init__(
+            f"YooKassa API error {status}: {self.payload.get('code')} "
+            f"{self.payload.get('description') or ''}".strip())
 
 
 class YooKassaService:
@@ -17,9 +31,16 @@ class YooKassaService:
                  secret_key: Optional[str],
                  configured_return_url: Optional[str],
                  bot_username_for_default_return: Optional[str] = None,
-                 settings_obj: Optional[Settings] = None):
+                 settings_obj: Optional[Settings] = None,
+                 http_transport: Optional[HttpTransport] = None):
 
         self.settings = settings_obj
+        self.http_transport = http_transport
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._auth: Optional[aiohttp.BasicAuth] = None
+        self.api_base_url = (
+            settings_obj.YOOKASSA_API_URL if settings_obj else
+            "https://api.yookassa.ru/v3").rstrip("/")
 
         if not shop_id or not secret_key:
             logging.warning(
@@ -27,15 +48,10 @@ class YooKassaService:
                 "Payment functionality will be DISABLED.")
             self.configured = False
         else:
-            try:
-                Configuration.configure(shop_id, secret_key)
-                self.configured = True
-                logging.info(
-                    f"YooKassa SDK configured for shop_id: {shop_id[:5]}...")
-            except Exception as e:
-                logging.error(f"Failed to configure YooKassa SDK: {e}",
-                              exc_info=True)
-                self.configured = False
+            self._auth = aiohttp.BasicAuth(str(shop_id), secret_key)
+            self.configured = True
+            logging.info(
+                f"YooKassa API client configured for shop_id: {shop_id[:5]}...")
 
         if configured_return_url:
             self.return_url = configured_return_url
@@ -54,6 +70,84 @@ class YooKassaService:
             f"YooKassa Service effective return_url for payments: {self.return_url}"
         )
 
+    async def _get_session(self) -> aiohttp.ClientSession:
+        total_timeout = self.settings.YOOKASSA_HTTP_TIMEOUT_SECONDS if self.settings else 30.0
+        connect_timeout = self.settings.YOOKASSA_HTTP_CONNECT_TIMEOUT_SECONDS if self.settings else 5.0
+        timeout = aiohttp.ClientTimeout(total=total_timeout,
+                                        connect=connect_timeout)
+        if self.http_transport is not None:
+            return self.http_transport.session(
+                "yookassa",
+                timeout=timeout,
+                auth=self._auth,
+                headers={"Accept": "application/json"})
+        if self._session is None or self._session.closed:
+            pool_limit = self.settings.YOOKASSA_HTTP_POOL_LIMIT if self.settings else 20
+            connector = aiohttp.TCPConnector(limit=pool_limit,
+                                             keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                timeout=timeout,
+                connector=connector,
+                auth=self._auth,
+                headers={"Accept": "application/json"})
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+            self._session = None
+            logging.debug("YooKassa service HTTP session closed.")
+
+    async def _request(self,
+                       method: str,
+                       path: str,
+                       payload: Optional[Dict[str, Any]] = None,
+                       idempotence_key: Optional[str] = None) -> Dict[str, Any]:
+        """Call the YooKassa API and return the decoded JSON body.
+
+        Requests are retried while YooKassa reports them as still processing
+        (202), on 5xx and on network errors. POST requests always carry an
+        Idempotence-Key, reused across retries, so a retry never creates a
+        second payment. Raises YooKassaApiError for any other non-2xx answer.
+        """
+        session = await self._get_session()
+        url = f"{self.api_base_url}/{path.lstrip('/')}"
+        headers: Dict[str, str] = {}
+        if method.upper() == "POST":
+            headers["Idempotence-Key"] = idempotence_key or str(uuid.uuid4())
+
+        max_attempts = max(1, self.settings.YOOKASSA_HTTP_MAX_ATTEMPTS if self.settings else 3)
+        for attempt in range(1, max_attempts + 1):
+            retry_delay = _DEFAULT_RETRY_DELAY_SECONDS * 2**(attempt - 1)
+            try:
+                async with session.request(method.upper(),
+                                           url,
+                                           json=payload,
+                                           headers=headers) as response:
+                    try:
+                        body = await response.json(content_type=None)
+                    except ValueError:
+                        body = None
+                    if 200 <= response.status < 300 and response.status != 202:
+                        return body or {}
+                    if response.status not in _RETRYABLE_STATUSES or attempt == max_attempts:
+                        raise YooKassaApiError(response.status,
+                                               body if isinstance(body, dict) else None)
+                    if isinstance(body, dict) and body.get("retry_after"):
+                        # retry_after is given in milliseconds
+                        retry_delay = float(body["retry_after"]) / 1000
+                    logging.warning(
+                        f"YooKassa {method.upper()} {path} answered {response.status} "
+                        f"(attempt {attempt}/{max_attempts}), retrying in {retry_delay:.1f}s")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == max_attempts:
+                    raise
+                logging.warning(
+                    f"YooKassa {method.upper()} {path} failed (attempt {attempt}/{max_attempts}): "
+                    f"{type(e).__name__}: {e}; retrying in {retry_delay:.1f}s")
+            await asyncio.sleep(retry_delay)
+        raise RuntimeError("unreachable")
+
     async def create_payment(
             self,
             amount: float,
@@ -65,7 +159,14 @@ class YooKassaService:
             save_payment_method: bool = False,
             payment_method_id: Optional[str] = None,
             capture: bool = True,
-            bind_only: bool = False) -> Optional[Dict[str, Any]]:
+            bind_only: bool = False,
+            idempotence_key: Optional[str] = None,
+            raise_errors: bool = False) -> Optional[Dict[str, Any]]:
+        """Create a payment; None when the request failed.
+
+        With ``raise_errors`` a failed request raises instead: YooKassaApiError
+        for an error answer, the transport error when the outcome is unknown.
+        """
         if not self.configured:
             logging.error("YooKassa is not configured. Cannot create payment.")
             return None
@@ -101,28 +202,29 @@ class YooKassaService:
             }
 
         try:
-            builder = PaymentRequestBuilder()
-            builder.set_amount({
-                "value": str(round(amount, 2)),
-                "currency": currency.upper()
-            })
+            payment_request: Dict[str, Any] = {
+                "amount": {
+                    "value": f"{round(amount, 2):.2f}",
+                    "currency": currency.upper()
+                },
+            }
             # For binding cards only, do not capture and set minimal amount
             if bind_only:
                 capture = False
                 amount = max(amount, 1.00)
-            builder.set_capture(capture)
-            builder.set_confirmation({
-                "type": ConfirmationType.REDIRECT,
+            payment_request["capture"] = capture
+            payment_request["confirmation"] = {
+                "type": "redirect",
                 "return_url": self.return_url
-            })
-            builder.set_description(description)
-            builder.set_metadata(metadata)
+            }
+            payment_request["description"] = description
+            payment_request["metadata"] = metadata
             if save_payment_method:
                 # Ask YooKassa to save method for off-session charges
-                builder.set_save_payment_method(True)
+                payment_request["save_payment_method"] = True
             if payment_method_id:
                 # Use a previously saved payment method for merchant-initiated payments
-                builder.set_payment_method_id(payment_method_id)
+                payment_request["payment_method_id"] = payment_method_id
 
             receipt_items_list: List[Dict[str, Any]] = [{
                 "description":
@@ -130,11 +232,11 @@ class YooKassaService:
                 "quantity":
                 "1.00",
                 "amount": {
-                    "value": str(round(amount, 2)),
+                    "value": f"{round(amount, 2):.2f}",
                     "currency": currency.upper()
                 },
                 "vat_code":
-                str(self.settings.YOOKASSA_VAT_CODE),
+                int(self.settings.YOOKASSA_VAT_CODE),
                 "payment_mode":
                 getattr(self.settings, 'yk_receipt_payment_mode', self.settings.YOOKASSA_PAYMENT_MODE),
                 "payment_subject":
@@ -146,58 +248,58 @@ class YooKassaService:
                 "items": receipt_items_list
             }
 
-            builder.set_receipt(receipt_data_dict)
+            payment_request["receipt"] = receipt_data_dict
 
-            idempotence_key = str(uuid.uuid4())
-            payment_request = builder.build()
+            idempotence_key = idempotence_key or str(uuid.uuid4())
 
             logging.info(
                 f"Creating YooKassa payment (Idempotence-Key: {idempotence_key}). "
                 f"Amount: {amount} {currency}. Metadata: {metadata}. Receipt: {receipt_data_dict}"
             )
 
-            loop = asyncio.get_running_loop()
-            response = await loop.run_in_executor(
-                None, lambda: YooKassaPayment.create(payment_request,
-                                                     idempotence_key))
+            response = await self._request("POST",
+                                           "payments",
+                                           payload=payment_request,
+                                           idempotence_key=idempotence_key)
 
             logging.info(
-                f"YooKassa Payment.create response: ID={response.id}, Status={response.status}, Paid={response.paid}"
+                f"YooKassa Payment.create response: ID={response.get('id')}, Status={response.get('status')}, Paid={response.get('paid')}"
             )
 
+            confirmation = response.get("confirmation") or {}
+            amount_info = response.get("amount") or {}
             return {
                 "id":
-                response.id,
+                response.get("id"),
                 "confirmation_url":
-                response.confirmation.confirmation_url
-                if response.confirmation else None,
+                confirmation.get("confirmation_url"),
                 "status":
-                response.status,
+                response.get("status"),
                 "metadata":
-                response.metadata,
+                response.get("metadata") or {},
                 "amount_value":
-                float(response.amount.value),
+                float(amount_info.get("value", 0)),
                 "amount_currency":
-                response.amount.currency,
+                amount_info.get("currency"),
                 "idempotence_key_used":
                 idempotence_key,
                 "paid":
-                response.paid,
+                response.get("paid"),
                 "refundable":
-                response.refundable,
+                response.get("refundable"),
                 "created_at":
-                response.created_at.isoformat() if hasattr(
-                    response.created_at, 'isoformat') else str(
-                        response.created_at),
+                response.get("created_at"),
                 "description_from_yk":
-                response.description,
+                response.get("description"),
                 "test_mode":
-                response.test if hasattr(response, 'test') else None,
-                "payment_method": getattr(response, 'payment_method', None),
+                response.get("test"),
+                "payment_method": response.get("payment_method"),
             }
         except Exception as e:
             logging.error(f"YooKassa payment creation failed: {e}",
                           exc_info=True)
+            if raise_errors:
+                raise
             return None
 
     async def get_payment_info(
@@ -211,48 +313,49 @@ class YooKassaService:
                 f"Fetching payment info from YooKassa for ID: {payment_id_in_yookassa}"
             )
 
-            loop = asyncio.get_running_loop()
-            payment_info_yk = await loop.run_in_executor(
-                None, lambda: YooKassaPayment.find_one(payment_id_in_yookassa))
+            try:
+                payment_info_yk = await self._request(
+                    "GET", f"payments/{payment_id_in_yookassa}")
+            except YooKassaApiError as e:
+                if e.status != 404:
+                    raise
+                payment_info_yk = None
 
             if payment_info_yk:
                 logging.info(
-                    f"YooKassa payment info for {payment_id_in_yookassa}: Status={payment_info_yk.status}, Paid={payment_info_yk.paid}"
+                    f"YooKassa payment info for {payment_id_in_yookassa}: Status={payment_info_yk.get('status')}, Paid={payment_info_yk.get('paid')}"
                 )
-                pm = getattr(payment_info_yk, 'payment_method', None)
+                pm = payment_info_yk.get("payment_method")
                 pm_payload: Dict[str, Any] = {}
                 if pm:
                     # Collect common fields, including id and hints for last4
-                    pm_id = getattr(pm, 'id', None)
-                    pm_type = getattr(pm, 'type', None)
-                    pm_title = getattr(pm, 'title', None)
-                    account_number = getattr(pm, 'account_number', None) or getattr(pm, 'account', None)
-                    card_obj = getattr(pm, 'card', None)
+                    account_number = pm.get("account_number") or pm.get("account")
+                    card_obj = pm.get("card") or {}
                     last4_val = None
-                    if card_obj and hasattr(card_obj, 'last4'):
-                        last4_val = getattr(card_obj, 'last4')
+                    if card_obj.get("last4"):
+                        last4_val = card_obj.get("last4")
                     elif isinstance(account_number, str) and len(account_number) >= 4:
                         last4_val = account_number[-4:]
                     pm_payload = {
-                        "id": pm_id,
-                        "type": pm_type,
-                        "title": pm_title,
+                        "id": pm.get("id"),
+                        "type": pm.get("type"),
+                        "title": pm.get("title"),
                         "card_last4": last4_val,
                     }
+                amount_info = payment_info_yk.get("amount") or {}
                 return {
-                    "id": payment_info_yk.id,
-                    "status": payment_info_yk.status,
-                    "paid": payment_info_yk.paid,
-                    "amount_value": float(payment_info_yk.amount.value),
-                    "amount_currency": payment_info_yk.amount.currency,
-                    "metadata": payment_info_yk.metadata,
-                    "description": payment_info_yk.description,
-                    "refundable": payment_info_yk.refundable,
-                    "created_at": payment_info_yk.created_at.isoformat() if hasattr(
-                        payment_info_yk.created_at, 'isoformat') else str(payment_info_yk.created_at),
-                    "captured_at": payment_info_yk.captured_at.isoformat() if getattr(payment_info_yk, 'captured_at', None) and hasattr(payment_info_yk.captured_at, 'isoformat') else None,
+                    "id": payment_info_yk.get("id"),
+                    "status": payment_info_yk.get("status"),
+                    "paid": payment_info_yk.get("paid"),
+                    "amount_value": float(amount_info.get("value", 0)),
+                    "amount_currency": amount_info.get("currency"),
+                    "metadata": payment_info_yk.get("metadata") or {},
+                    "description": payment_info_yk.get("description"),
+                    "refundable": payment_info_yk.get("refundable"),
+                    "created_at": payment_info_yk.get("created_at"),
+                    "captured_at": payment_info_yk.get("captured_at"),
                     "payment_method": pm_payload,
-                    "test_mode": getattr(payment_info_yk, 'test', None),
+                    "test_mode": payment_info_yk.get("test"),
                 }
             else:
                 logging.warning(
@@ -270,8 +373,10 @@ class YooKassaService:
             logging.error("YooKassa is not configured. Cannot cancel payment.")
             return False
         try:
-            loop = asyncio.get_running_loop()
-            await loop.run_in_executor(None, lambda: YooKassaPayment.cancel(payment_id_in_yookassa))
+            await self._request("POST",
+                                f"payments/{payment_id_in_yookassa}/cancel",
+                                payload={},
+                                idempotence_key=str(uuid.uuid4()))
             logging.info(f"Cancelled YooKassa payment {payment_id_in_yookassa}")
             return True
         except Exception as e:
@@ -0,0 +1,54 @@
+import logging
+import time
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops calling a dependency after ``failure_threshold`` failures in a row.
+
+    While open every call is refused at once. After ``reset_timeout`` seconds
+    one probe is let through (half-open): its success closes the breaker, its
+    failure opens it for another ``reset_timeout``. A probe that never
+    reports back only blocks the next one for ``reset_timeout``.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5,
+                 reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self._opened_at = 0.0
+
+    def allow(self) -> bool:
+        if self.state == STATE_CLOSED:
+            return True
+        now = time.monotonic()
+        if now - self._opened_at >= self.reset_timeout:
+            self.state = STATE_HALF_OPEN
+            self._opened_at = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self.state != STATE_CLOSED:
+            logging.info(f"Circuit '{self.name}' closed, dependency recovered.")
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == STATE_HALF_OPEN or (
+                self.state == STATE_CLOSED
+                and self.consecutive_failures >= self.failure_threshold):
+            self.state = STATE_OPEN
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+            logging.warning(
+                f"Circuit '{self.name}' opened after {self.consecutive_failures} "
+                f"consecutive failure(s); failing fast for {self.reset_timeout:.0f}s.")
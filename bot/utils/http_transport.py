@@ -0,0 +1,202 @@
+import logging
+import re
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from config.settings import Settings
+from bot.utils.metrics import HTTP_REQUEST_LATENCY
+
+DEFAULT_TIMEOUTS = {
+    "panel": 30.0,
+    "payment": 15.0,
+}
+
+# Path segments that identify a record (UUIDs, numeric and hex IDs)
+_ID_SEGMENT = re.compile(r"^(?:\d+|[0-9a-fA-F-]{16,}|[A-Za-z0-9_-]{24,})$")
+
+
+def parse_timeouts(spec: Optional[str]) -> Dict[str, float]:
+    """Parse HTTP_TIMEOUTS (``"panel:30,payment:15"``) into seconds per operation.
+
+    Entries that are malformed or not positive are skipped.
+    """
+    timeouts: Dict[str, float] = {}
+    for item in (spec or "").split(","):
+        operation, _, seconds = item.partition(":")
+        operation = operation.strip().lower()
+        try:
+            value = float(seconds)
+        except ValueError:
+            continue
+        if operation and value > 0:
+            timeouts[operation] = value
+    return timeouts
+
+
+def endpoint_label(path: str) -> str:
+    """URL path with record IDs replaced by ``:id``, to keep metric labels bounded."""
+    return "/".join(":id" if _ID_SEGMENT.match(segment) else segment
+                    for segment in path.split("/"))
+
+
+class HttpTransport:
+    """One TCP connection pool shared by every outbound integration.
+
+    Services borrow a named ``aiohttp.ClientSession`` (own headers, auth and
+    timeout) built on a single connector with per-host limits, keep-alive and
+    a DNS cache, so repeated calls reuse warm TCP+TLS connections instead of
+    handshaking through a private pool each. Pool usage is counted through
+    aiohttp tracing and reported by :meth:`stats`; with METRICS_ENABLED each
+    request's duration is also recorded by service and endpoint.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self._timeouts: Dict[str, float] = {
+            **DEFAULT_TIMEOUTS,
+            **parse_timeouts(settings.HTTP_TIMEOUTS),
+        }
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._counters: Dict[str, float] = {
+            "requests": 0,
+            "new_connections": 0,
+            "reused_connections": 0,
+            "queued_for_connection": 0,
+            "queue_wait_ms": 0.0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0,
+        }
+        self._trace_config = self._build_trace_config()
+
+    def timeout(self, operation: str) -> aiohttp.ClientTimeout:
+        """Timeout for an operation class listed in HTTP_TIMEOUTS."""
+        total = self._timeouts.get(operation, self._timeouts["panel"])
+        return aiohttp.ClientTimeout(
+            total=total,
+            connect=min(total, self.settings.HTTP_CONNECT_TIMEOUT_SECONDS))
+
+    def _get_connector(self) -> aiohttp.TCPConnector:
+        if self._connector is None or self._connector.closed:
+            self._connector = aiohttp.TCPConnector(
+                limit=self.settings.HTTP_POOL_LIMIT,
+                limit_per_host=self.settings.HTTP_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=self.settings.HTTP_KEEPALIVE_SECONDS,
+                use_dns_cache=self.settings.HTTP_DNS_CACHE_SECONDS > 0,
+                ttl_dns_cache=self.settings.HTTP_DNS_CACHE_SECONDS or None,
+            )
+        return self._connector
+
+    def session(self, name: str, *, operation: Optional[str] = None,
+                **session_kwargs: Any) -> aiohttp.ClientSession:
+        """The session registered under ``name``, created on first use.
+
+        ``session_kwargs`` (auth, headers, ...) only apply when the session is
+        created. Services must not close borrowed sessions; the transport
+        closes them in :meth:`close`.
+        """
+        session = self._sessions.get(name)
+        if session is None or session.closed:
+            session_kwargs.setdefault("timeout", self.timeout(operation or name))
+            trace_configs = [self._trace_config]
+            if self.settings.METRICS_ENABLED:
+                trace_configs.append(self._build_timing_trace_config(name))
+            session = aiohttp.ClientSession(
+                connector=self._get_connector(),
+                connector_owner=False,
+                trace_configs=trace_configs,
+                **session_kwargs)
+            self._sessions[name] = session
+        return session
+
+    def stats(self) -> Dict[str, Any]:
+        connector = self._connector
+        in_use = 0
+        idle = 0
+        if connector is not None and not connector.closed:
+            # Private aiohttp bookkeeping, hence the defensive access
+            in_use = len(getattr(connector, "_acquired", ()))
+            idle = sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+        return {
+            "limit": self.settings.HTTP_POOL_LIMIT,
+            "limit_per_host": self.settings.HTTP_POOL_LIMIT_PER_HOST,
+            "in_use": in_use,
+            "idle": idle,
+            "sessions": len([s for s in self._sessions.values() if not s.closed]),
+            **{key: round(value, 2) if isinstance(value, float) else value
+               for key, value in self._counters.items()},
+        }
+
+    async def close(self) -> None:
+        for session in self._sessions.values():
+            if not session.closed:
+                await session.close()
+        self._sessions.clear()
+        if self._connector is not None and not self._connector.closed:
+            logging.info(f"HTTP transport pool stats on shutdown: {self.stats()}")
+            await self._connector.close()
+        self._connector = None
+
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        counters = self._counters
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            counters["requests"] += 1
+
+        async def on_connection_create_end(session, ctx, params):
+            counters["new_connections"] += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            counters["reused_connections"] += 1
+
+        async def on_connection_queued_start(session, ctx, params):
+            ctx.queued_at = time.monotonic()
+            counters["queued_for_connection"] += 1
+
+        async def on_connection_queued_end(session, ctx, params):
+            queued_at = getattr(ctx, "queued_at", None)
+            if queued_at is not None:
+                counters["queue_wait_ms"] += (time.monotonic() - queued_at) * 1000
+
+        async def on_dns_cache_hit(session, ctx, params):
+            counters["dns_cache_hits"] += 1
+
+        async def on_dns_cache_miss(session, ctx, params):
+            counters["dns_cache_misses"] += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    @staticmethod
+    def _build_timing_trace_config(service: str) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            ctx.started_at = time.perf_counter()
+
+        def observe(ctx, params, status: str) -> None:
+            started_at = getattr(ctx, "started_at", None)
+            if started_at is not None:
+                HTTP_REQUEST_LATENCY.observe(
+                    time.perf_counter() - started_at, service, params.method,
+                    endpoint_label(params.url.path), status)
+
+        async def on_request_end(session, ctx, params):
+            observe(ctx, params, str(params.response.status))
+
+        async def on_request_exception(session, ctx, params):
+            observe(ctx, params, "error")
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
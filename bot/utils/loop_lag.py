@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Optional
+
+
+class EventLoopLagMonitor:
+    """Measures how late the event loop wakes up a periodic sleeper.
+
+    Every ``interval`` seconds a task sleeps and records by how much the
+    wake-up overshot. Anything blocking the loop (CPU-heavy parsing, sync
+    I/O) shows up as lag, which is logged above ``warn_threshold_ms`` and
+    summarized by :meth:`snapshot`. ``on_sample`` receives every sample in
+    milliseconds, e.g. to feed a metrics histogram.
+    """
+
+    def __init__(self, interval: float = 0.5, warn_threshold_ms: float = 100.0,
+                 report_every_seconds: float = 300.0,
+                 on_sample: Optional[Callable[[float], None]] = None):
+        self.interval = max(0.05, interval)
+        self.warn_threshold_ms = warn_threshold_ms
+        self.report_every_seconds = report_every_seconds
+        self.on_sample = on_sample
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.samples = 0
+        self.total_lag_ms = 0.0
+        self.slow_samples = 0
+        self._window_max_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "last_ms": round(self.last_lag_ms, 2),
+            "max_ms": round(self.max_lag_ms, 2),
+            "avg_ms": round(self.total_lag_ms / self.samples, 2) if self.samples else 0.0,
+            "samples": self.samples,
+            "slow_samples": self.slow_samples,
+        }
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="EventLoopLagMonitor")
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _record(self, lag_ms: float) -> None:
+        self.last_lag_ms = lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        self._window_max_ms = max(self._window_max_ms, lag_ms)
+        self.samples += 1
+        self.total_lag_ms += lag_ms
+        if self.on_sample:
+            self.on_sample(lag_ms)
+        if lag_ms >= self.warn_threshold_ms:
+            self.slow_samples += 1
+            logging.warning(f"Event loop lag: {lag_ms:.1f} ms")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_report = loop.time()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self._record(max(0.0, (loop.time() - started - self.interval) * 1000))
+            if self.report_every_seconds > 0 and loop.time() - last_report >= self.report_every_seconds:
+                last_report = loop.time()
+                logging.info(
+                    f"Event loop lag: max {self._window_max_ms:.1f} ms over the last "
+                    f"{self.report_every_seconds:.0f}s, {self.snapshot()}")
+                self._window_max_ms = 0.0
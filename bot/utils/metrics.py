@@ -0,0 +1,136 @@
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; fine enough below 100 ms, where most handlers and queries land
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(label_names: Sequence[str], label_values: Sequence[str],
+                   extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"'
+             for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """A Prometheus histogram of durations in seconds, one series per label set.
+
+    Only the bucket an observation falls into is incremented; buckets are
+    made cumulative when rendered, so observing stays a bisect and an add.
+    """
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, seconds)
+        # SQLAlchemy events may fire from a worker thread (sync offloads)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[label_values] = series
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}",
+                 f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(series[0]), series[1], series[2])
+                        for labels, series in self._series.items()]
+        for label_values, counts, total, count in sorted(snapshot):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket"
+                    f"{_format_labels(self.label_names, label_values, le)} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {total!r}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def render_gauge(name: str, help_text: str,
+                 samples: Iterable[Tuple[Dict[str, str], float]],
+                 metric_type: str = "gauge") -> List[str]:
+    """Exposition lines of a gauge (or counter) read from elsewhere at scrape time."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        lines.append(
+            f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} "
+            f"{_format_value(value)}")
+    return lines
+
+
+HANDLER_LATENCY = Histogram(
+    "bot_handler_duration_seconds",
+    "Time spent in aiogram handlers, including their inner middlewares.",
+    ("event", "router", "handler"))
+MIDDLEWARE_LATENCY = Histogram(
+    "bot_middleware_duration_seconds",
+    "Time spent in each update middleware itself, excluding what it wraps.",
+    ("middleware", ))
+DB_QUERY_LATENCY = Histogram(
+    "bot_db_query_duration_seconds",
+    "SQL statement execution time by the DAL function that issued it.",
+    ("caller", ))
+HTTP_REQUEST_LATENCY = Histogram(
+    "bot_http_request_duration_seconds",
+    "Outbound HTTP request time by service, method, endpoint and status.",
+    ("service", "method", "endpoint", "status"))
+EVENT_LOOP_LAG = Histogram(
+    "bot_event_loop_lag_seconds",
+    "How late the event loop woke up a periodic sleeper.",
+    (),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+
+HISTOGRAMS: Tuple[Histogram, ...] = (
+    HANDLER_LATENCY,
+    MIDDLEWARE_LATENCY,
+    DB_QUERY_LATENCY,
+    HTTP_REQUEST_LATENCY,
+    EVENT_LOOP_LAG,
+)
+
+
+def observe_query(caller: str, seconds: float) -> None:
+    DB_QUERY_LATENCY.observe(seconds, caller)
+
+
+def observe_loop_lag(lag_ms: float) -> None:
+    EVENT_LOOP_LAG.observe(lag_ms / 1000)
+
+
+def render_histograms(extra_lines: Optional[List[str]] = None) -> str:
+    lines: List[str] = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    if extra_lines:
+        lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,135 @@
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, List, Optional, Sequence
+
+from db.dal.pagination import SEEK_AT, SEEK_NEXT, SEEK_PREV, KeysetCursor
+
+_SEEK_DIRECTIONS = {SEEK_NEXT, SEEK_PREV, SEEK_AT}
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _to_base36(value: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    if value == 0:
+        return "0"
+    out = []
+    while value:
+        value, rem = divmod(value, 36)
+        out.append(digits[rem])
+    return "".join(reversed(out))
+
+
+def encode_cursor(cursor: KeysetCursor) -> str:
+    """Pack a (timestamp, id) cursor into a short callback-data safe token.
+
+    A NULL timestamp leaves the part before the dot empty.
+    """
+    ts, row_id = cursor
+    if ts is None:
+        return f".{_to_base36(row_id)}"
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    delta = ts - _EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f"{_to_base36(micros)}.{_to_base36(row_id)}"
+
+
+def decode_cursor(token: str) -> Optional[KeysetCursor]:
+    try:
+        ts_part, id_part = token.split(".", 1)
+        micros = int(ts_part, 36) if ts_part else None
+        row_id = int(id_part, 36)
+    except (ValueError, AttributeError):
+        return None
+    if micros is None:
+        return None, row_id
+    seconds, micro = divmod(micros, 1_000_000)
+    ts = datetime.fromtimestamp(seconds, tz=timezone.utc).replace(microsecond=micro)
+    return ts, row_id
+
+
+@dataclass(frozen=True)
+class PageRef:
+    """Position of a page in a keyset-paginated list.
+
+    Serialized into callback data as ``<page>`` or ``<page>:<direction>:<cursor>``;
+    ``page`` is only a display counter, the cursor decides which rows are loaded.
+    """
+    page: int = 0
+    direction: Optional[str] = None
+    cursor: Optional[KeysetCursor] = None
+
+    def token(self) -> str:
+        if self.cursor is None or self.direction is None:
+            return str(self.page)
+        return f"{self.page}:{self.direction}:{encode_cursor(self.cursor)}"
+
+    @classmethod
+    def parse(cls, raw: Optional[str]) -> "PageRef":
+        """Parse a token produced by ``token()``; legacy bare page numbers open the first page."""
+        if not raw:
+            return cls()
+        parts = raw.split(":")
+        try:
+            page = max(0, int(parts[0]))
+        except ValueError:
+            return cls()
+        if len(parts) < 3 or parts[1] not in _SEEK_DIRECTIONS:
+            return cls()
+        cursor = decode_cursor(parts[2])
+        if cursor is None:
+            return cls()
+        return cls(page=page, direction=parts[1], cursor=cursor)
+
+
+@dataclass
+class KeysetPage:
+    items: List[Any]
+    ref: PageRef
+    prev_ref: Optional[PageRef] = None
+    next_ref: Optional[PageRef] = None
+    anchor_ref: PageRef = field(default_factory=PageRef)
+
+    @property
+    def page(self) -> int:
+        return self.ref.page
+
+    def total_pages(self, estimated_total: int, page_size: int) -> int:
+        """Page count for display; never smaller than what navigation proves to exist."""
+        estimated = math.ceil(estimated_total / page_size) if page_size > 0 else 1
+        known = self.page + (2 if self.next_ref else 1)
+        return max(1, estimated, known)
+
+
+def build_keyset_page(rows: Sequence[Any], ref: PageRef, page_size: int,
+                      key: Callable[[Any], KeysetCursor]) -> KeysetPage:
+    """Trim rows fetched with ``page_size + 1`` and work out prev/next links."""
+    rows = list(rows)
+    has_extra = len(rows) > page_size
+    if ref.cursor is not None and ref.direction == SEEK_PREV:
+        items = rows[-page_size:] if has_extra else rows
+        has_prev = has_extra or ref.page > 0
+        has_next = True
+    else:
+        items = rows[:page_size]
+        has_prev = ref.cursor is not None and ref.page > 0
+        has_next = has_extra
+
+    current = ref if ref.cursor is not None else PageRef()
+    page = KeysetPage(items=items, ref=current)
+    if not items:
+        if current.cursor is not None:
+            page.prev_ref = PageRef()
+        return page
+
+    page.anchor_ref = (PageRef(page=current.page, direction=SEEK_AT, cursor=key(items[0]))
+                       if current.page > 0 else PageRef())
+    if has_prev:
+        prev_page = max(current.page - 1, 0)
+        page.prev_ref = (PageRef(page=prev_page, direction=SEEK_PREV, cursor=key(items[0]))
+                         if prev_page > 0 else PageRef())
+    if has_next:
+        page.next_ref = PageRef(page=current.page + 1, direction=SEEK_NEXT,
+                                cursor=key(items[-1]))
+    return page
@@ -0,0 +1,49 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """An asyncio token bucket: at most ``rate`` acquisitions per second.
+
+    Up to ``burst`` tokens can be spent at once after an idle period. Waiters
+    are served in arrival order so one busy caller cannot starve the rest.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(burst if burst and burst > 0 else max(1, int(rate)))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+def parse_rate_limits(spec: Optional[str]) -> Dict[str, float]:
+    """Parse ``"name:rate,name2:rate"`` into a mapping; bad entries are skipped."""
+    limits: Dict[str, float] = {}
+    for item in (spec or "").split(","):
+        name, _, rate = item.partition(":")
+        name = name.strip().lower()
+        try:
+            value = float(rate)
+        except ValueError:
+            continue
+        if name and value > 0:
+            limits[name] = value
+    return limits
@@ -0,0 +1,41 @@
+import logging
+import time
+from typing import Any, Dict
+
+SYNC_PENDING = "pending"
+SYNC_RUNNING = "running"
+SYNC_COMPLETED = "completed"
+SYNC_FAILED = "failed"
+SYNC_DISABLED = "disabled"
+
+
+class StartupState:
+    """Startup phases and initial sync status, reported by the health routes.
+
+    The bot serves updates as soon as the web server listens; it counts as
+    ready once the initial panel sync has finished, successfully or not.
+    """
+
+    def __init__(self):
+        self._started = time.monotonic()
+        self.phases: Dict[str, float] = {}
+        self.serving = False
+        self.initial_sync = SYNC_PENDING
+
+    def mark(self, phase: str) -> None:
+        elapsed = time.monotonic() - self._started
+        self.phases[phase] = round(elapsed, 3)
+        logging.info(f"STARTUP: '{phase}' reached {elapsed:.2f}s after start.")
+
+    @property
+    def ready(self) -> bool:
+        return self.serving and self.initial_sync not in (SYNC_PENDING, SYNC_RUNNING)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "serving": self.serving,
+            "initial_sync": self.initial_sync,
+            "phases": dict(self.phases),
+            "uptime_seconds": round(time.monotonic() - self._started, 1),
+        }
@@ -0,0 +1,36 @@
+import asyncio
+import zlib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
+
+
+class StripedLock:
+    """A fixed set of asyncio locks selected by key hash.
+
+    Work on the same key is serialized while unrelated keys usually land on
+    different stripes and run concurrently. Several keys can be held at once;
+    stripes are always taken in index order so two holders cannot deadlock.
+    """
+
+    def __init__(self, stripes: int = 64):
+        if stripes < 1:
+            raise ValueError("stripes must be positive")
+        self._locks: List[asyncio.Lock] = [asyncio.Lock() for _ in range(stripes)]
+
+    def _index(self, key: str) -> int:
+        # crc32 is stable across processes, unlike the salted built-in hash()
+        return zlib.crc32(key.encode("utf-8")) % len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, *keys: str) -> AsyncIterator[None]:
+        indexes = sorted({self._index(key) for key in keys if key})
+        acquired: List[asyncio.Lock] = []
+        try:
+            for index in indexes:
+                lock = self._locks[index]
+                await lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
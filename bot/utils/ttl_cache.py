@@ -0,0 +1,58 @@
+import copy
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """A small in-process cache whose entries expire after ``ttl_seconds``.
+
+    Holds at most ``max_entries`` values and evicts the least recently
+    written one beyond that. A TTL of 0 disables caching. With
+    ``copy_values`` every value is deep-copied in and out, so callers may
+    mutate what they get without touching the cached entry.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10_000,
+                 copy_values: bool = False):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.copy_values = copy_values
+        self._entries: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, allow_stale: bool = False) -> Optional[V]:
+        """The cached value; expired ones only with ``allow_stale``.
+
+        Expired entries are kept until evicted or overwritten so they can
+        still serve as a last-known value when the source is unavailable.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic() and not allow_stale:
+            return None
+        return copy.deepcopy(value) if self.copy_values else value
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        """Store ``value``; ``ttl`` overrides the cache-wide TTL for this entry."""
+        ttl = self.ttl_seconds if ttl is None else ttl
+        if ttl <= 0:
+            return
+        if self.copy_values:
+            value = copy.deepcopy(value)
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
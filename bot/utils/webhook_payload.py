@@ -0,0 +1,75 @@
+import asyncio
+import hashlib
+import hmac
+import json
+from typing import Any, Optional, Union
+
+from aiohttp import web
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+class WebhookPayloadError(Exception):
+    """The body failed verification or parsing; ``reason`` is safe to return."""
+
+    def __init__(self, reason: str, status: int = 400):
+        self.reason = reason
+        self.status = status
+        super().__init__(reason)
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """Decode JSON with orjson when it is installed, the stdlib otherwise."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def verify_and_parse(raw_body: bytes, secret: Optional[str],
+                     signature: Optional[str]) -> Any:
+    """Check the hex HMAC-SHA256 ``signature`` of the body and decode it.
+
+    Verification is skipped when no ``secret`` is configured.
+    """
+    if secret:
+        if not signature:
+            raise WebhookPayloadError("no_signature", status=403)
+        expected_sig = hmac.new(secret.encode(), raw_body,
+                                hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected_sig, signature):
+            raise WebhookPayloadError("invalid_signature", status=403)
+    try:
+        return json_loads(raw_body)
+    except ValueError:
+        raise WebhookPayloadError("invalid_json") from None
+
+
+async def verify_and_parse_async(raw_body: bytes, secret: Optional[str],
+                                 signature: Optional[str],
+                                 offload_threshold: int) -> Any:
+    """``verify_and_parse`` that moves large bodies to a worker thread.
+
+    Hashing and decoding a multi-megabyte body blocks the event loop for
+    milliseconds; above ``offload_threshold`` bytes (0 disables offloading)
+    the work runs in the default executor instead.
+    """
+    if offload_threshold > 0 and len(raw_body) >= offload_threshold:
+        return await asyncio.to_thread(verify_and_parse, raw_body, secret,
+                                       signature)
+    return verify_and_parse(raw_body, secret, signature)
+
+
+async def read_limited_body(request: web.Request, max_bytes: int) -> bytes:
+    """Read the request body, rejecting it with 413 when over ``max_bytes``."""
+    if max_bytes > 0 and (request.content_length or 0) > max_bytes:
+        raise web.HTTPRequestEntityTooLarge(max_size=max_bytes,
+                                            actual_size=request.content_length)
+    raw_body = await request.read()
+    if max_bytes > 0 and len(raw_body) > max_bytes:
+        # Chunked bodies carry no Content-Length
+        raise web.HTTPRequestEntityTooLarge(max_size=max_bytes,
+                                            actual_size=len(raw_body))
+    return raw_body
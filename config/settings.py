@@ -17,6 +17,66 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int = Field(default=5432)
     POSTGRES_DB: str = Field(default="vpn_shop_db")
 
+    DB_POOL_SIZE: int = Field(
+        default=10,
+        description="Persistent connections kept in the SQLAlchemy pool")
+    DB_MAX_OVERFLOW: int = Field(
+        default=20,
+        description="Extra connections allowed above DB_POOL_SIZE under load")
+    DB_POOL_TIMEOUT_SECONDS: float = Field(
+        default=30.0,
+        description="How long a checkout waits for a free connection before failing")
+    DB_POOL_RECYCLE_SECONDS: int = Field(
+        default=1800,
+        description="Reconnect connections older than this (-1 disables recycling)")
+    DB_POOL_PRE_PING: bool = Field(
+        default=True,
+        description="Ping connections on checkout to detect dropped ones")
+    DB_STATEMENT_CACHE_SIZE: int = Field(
+        default=100,
+        description="asyncpg per-connection prepared statement cache (0 disables, e.g. behind PgBouncer)")
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = Field(
+        default=100,
+        description="SQLAlchemy asyncpg adaptor prepared statement cache size")
+    DB_STATEMENT_TIMEOUT_MS: Optional[int] = Field(
+        default=None,
+        description="Server-side statement_timeout for bot connections (empty = server default)")
+    DB_IDLE_IN_TRANSACTION_TIMEOUT_MS: Optional[int] = Field(
+        default=None,
+        description="Server-side idle_in_transaction_session_timeout (empty = server default)")
+    DB_APPLICATION_NAME: str = Field(
+        default="remnawave-tg-shop",
+        description="application_name reported to PostgreSQL (visible in pg_stat_activity)")
+    DATABASE_REPLICA_URL: Optional[str] = Field(
+        default=None,
+        description="Optional read replica DSN used for admin reporting queries")
+    DB_REPLICA_CONNECT_TIMEOUT_SECONDS: float = Field(
+        default=3.0,
+        description="Connect timeout for the read replica before falling back to the primary")
+    DB_REPLICA_RETRY_SECONDS: int = Field(
+        default=30,
+        description="How long to keep using the primary after the replica failed")
+    DB_REPLICA_MAX_LAG_SECONDS: float = Field(
+        default=0.0,
+        description="Use the primary while the replica replays WAL more than this many seconds behind (0 = do not check)")
+
+    HTTP_POOL_LIMIT: int = Field(
+        default=100,
+        description="Max connections in the pool shared by the panel and payment provider clients")
+    HTTP_POOL_LIMIT_PER_HOST: int = Field(
+        default=20,
+        description="Max simultaneous connections to a single host (0 = unlimited)")
+    HTTP_KEEPALIVE_SECONDS: float = Field(
+        default=60.0,
+        description="How long idle keep-alive connections stay in the pool")
+    HTTP_DNS_CACHE_SECONDS: int = Field(
+        default=300,
+        description="Resolved addresses are cached for N seconds (0 disables the DNS cache)")
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = Field(default=5.0)
+    HTTP_TIMEOUTS: str = Field(
+        default="panel:30,payment:15",
+        description="Total request timeout per operation class, 'class:seconds' comma-separated")
+
     DEFAULT_LANGUAGE: str = Field(default="ru")
     DEFAULT_CURRENCY_SYMBOL: str = Field(default="RUB")
 
@@ -45,6 +105,16 @@ class Settings(BaseSettings):
         default=True,
         description="When true, new YooKassa payments in autopay mode force card binding without a user checkbox."
     )
+    YOOKASSA_API_URL: str = Field(default="https://api.yookassa.ru/v3")
+    YOOKASSA_HTTP_TIMEOUT_SECONDS: float = Field(
+        default=30.0, description="Total timeout of a single YooKassa API request")
+    YOOKASSA_HTTP_CONNECT_TIMEOUT_SECONDS: float = Field(default=5.0)
+    YOOKASSA_HTTP_POOL_LIMIT: int = Field(
+        default=20,
+        description="Deprecated: YooKassa now uses the shared pool, see HTTP_POOL_LIMIT_PER_HOST")
+    YOOKASSA_HTTP_MAX_ATTEMPTS: int = Field(
+        default=3,
+        description="Attempts per request while YooKassa answers 202/5xx or the network fails")
 
     WEBHOOK_BASE_URL: Optional[str] = None
 
@@ -90,7 +160,111 @@ class Settings(BaseSettings):
     TRIBUTE_API_KEY: Optional[str] = Field(default=None)
     TRIBUTE_SKIP_NOTIFICATIONS: bool = Field(default=True, description="Skip renewal notifications for Tribute payments")
     TRIBUTE_SKIP_CANCELLATION_NOTIFICATIONS: bool = Field(default=False, description="Skip cancellation notifications for Tribute payments")
+    PANEL_USER_SNAPSHOT_TTL_SECONDS: int = Field(
+        default=120,
+        description="How long 'My subscription' renders from the cached panel user instead of fetching it (0 = always fetch)")
+    PANEL_USER_SNAPSHOT_MAX_ENTRIES: int = Field(default=20000)
+    PANEL_API_COALESCE_GETS: bool = Field(
+        default=True,
+        description="Concurrent identical panel GETs share one in-flight request")
+    PANEL_STATS_CACHE_SECONDS: int = Field(
+        default=15,
+        description="Panel system/bandwidth/nodes statistics are reused for N seconds (0 = always fetch)")
+    PANEL_API_RESPONSE_LOG_SAMPLE_RATE: float = Field(
+        default=0.0,
+        description="Fraction (0..1) of successful panel API responses whose body is logged at INFO")
+    PANEL_API_GET_TIMEOUT_SECONDS: float = Field(
+        default=10.0,
+        description="Total timeout of one panel GET attempt (0 = use the HTTP_TIMEOUTS panel value)")
+    PANEL_API_GET_MAX_ATTEMPTS: int = Field(
+        default=3,
+        description="Attempts for idempotent panel GETs on network errors, timeouts, 5xx and 429")
+    PANEL_API_RETRY_BASE_DELAY_SECONDS: float = Field(
+        default=0.3,
+        description="Base of the full-jitter exponential backoff between panel GET retries")
+    PANEL_API_BREAKER_FAILURE_THRESHOLD: int = Field(
+        default=5,
+        description="Consecutive failures of an endpoint class that open its circuit")
+    PANEL_API_BREAKER_RESET_SECONDS: float = Field(
+        default=30.0,
+        description="How long an open circuit fails fast before a probe request is let through")
+    PANEL_BULK_CHUNK_SIZE: int = Field(
+        default=500,
+        description="Max users per request to the panel bulk endpoints")
+    PANEL_BULK_CONCURRENCY: int = Field(
+        default=8,
+        description="Parallel per-user panel requests when a bulk endpoint does not fit")
+    SUBSCRIPTION_EXTENSION_LEASE_SECONDS: int = Field(
+        default=300,
+        description="How long a worker owns an extension job between panel batches; must outlast one bulk request")
+    PANEL_LINK_VERIFY_TTL_HOURS: int = Field(
+        default=24,
+        description="Trust a stored panel user UUID for N hours after it was verified on the panel (0 = always verify)")
     PANEL_WEBHOOK_SECRET: Optional[str] = Field(default=None)
+    PANEL_WEBHOOK_DEDUPE_WINDOW_SECONDS: int = Field(
+        default=3600,
+        description="Panel events with the same (event, user, expireAt) are handled once per window (0 = only exact re-deliveries)")
+    PANEL_WEBHOOK_BATCH_SIZE: int = Field(
+        default=200,
+        description="Max panel events handled together; users and subscriptions of a batch are loaded with one query each")
+
+    WEBHOOK_INBOX_ENABLED: bool = Field(
+        default=True,
+        description="Store provider webhooks and process them in background workers instead of inside the request")
+    WEBHOOK_INBOX_WORKERS: int = Field(default=4, description="Concurrent webhook inbox workers")
+    WEBHOOK_INBOX_MAX_ATTEMPTS: int = Field(
+        default=8,
+        description="Processing attempts before an inbound event is dead-lettered")
+    WEBHOOK_INBOX_RETRY_BASE_SECONDS: int = Field(default=10)
+    WEBHOOK_INBOX_RETRY_MAX_SECONDS: int = Field(default=1800)
+    WEBHOOK_INBOX_POLL_SECONDS: float = Field(
+        default=5.0,
+        description="How often workers look for due retries when idle")
+    WEBHOOK_INBOX_LEASE_SECONDS: int = Field(
+        default=300,
+        description="After this long a claimed event is considered abandoned and picked up again")
+    WEBHOOK_INBOX_RETENTION_DAYS: int = Field(
+        default=14,
+        description="Delete processed inbound events after N days (0 = keep forever)")
+
+    OUTBOX_WORKERS: int = Field(
+        default=4,
+        description="Concurrent workers running post-payment side effects (messages, referral bonuses)")
+    OUTBOX_MAX_ATTEMPTS: int = Field(
+        default=6,
+        description="Attempts before a side effect is dead-lettered")
+    OUTBOX_RETRY_BASE_SECONDS: int = Field(default=5)
+    OUTBOX_RETRY_MAX_SECONDS: int = Field(default=600)
+    OUTBOX_POLL_SECONDS: float = Field(
+        default=5.0,
+        description="How often workers look for due retries when idle")
+    OUTBOX_LEASE_SECONDS: int = Field(
+        default=120,
+        description="After this long a claimed side effect is considered abandoned and picked up again")
+    OUTBOX_RETENTION_DAYS: int = Field(
+        default=7,
+        description="Delete completed side effects after N days (0 = keep forever)")
+
+    AUTO_RENEW_SCHEDULER_ENABLED: bool = Field(
+        default=True,
+        description="Charge due auto-renew subscriptions from a background scheduler instead of inside panel webhooks")
+    AUTO_RENEW_WINDOW_HOURS: float = Field(
+        default=25.0,
+        description="Charge subscriptions that end within this many hours (before the panel's 24h reminder)")
+    AUTO_RENEW_WORKERS: int = Field(
+        default=4,
+        description="Concurrent renewal charges")
+    AUTO_RENEW_PROVIDER_RATE_LIMITS: str = Field(
+        default="yookassa:5",
+        description="Max charges per second per provider, e.g. 'yookassa:5'")
+    AUTO_RENEW_MAX_ATTEMPTS: int = Field(
+        default=3,
+        description="Failed charges per billing cycle before the scheduler gives up")
+    AUTO_RENEW_RETRY_MINUTES: int = Field(default=60)
+    AUTO_RENEW_POLL_SECONDS: float = Field(default=300.0)
+    AUTO_RENEW_LEASE_SECONDS: int = Field(
+        default=900,
+        description="After this long an unfinished charge attempt counts as failed and may be retried")
 
     SUBSCRIPTION_NOTIFICATIONS_ENABLED: bool = Field(default=True)
     SUBSCRIPTION_NOTIFY_ON_EXPIRE: bool = Field(default=True)
@@ -138,9 +312,77 @@ class Settings(BaseSettings):
     TRIAL_DURATION_DAYS: int = Field(default=3)
     TRIAL_TRAFFIC_LIMIT_GB: Optional[float] = Field(default=5.0)
 
+    FSM_STORAGE: str = Field(
+        default="memory",
+        description="FSM state backend: 'memory' (single instance) or 'redis' (shared between replicas)")
+    FSM_REDIS_URL: Optional[str] = Field(
+        default=None,
+        description="Redis URL for FSM_STORAGE=redis, e.g. redis://redis:6379/0")
+    FSM_REDIS_KEY_PREFIX: str = Field(default="fsm")
+    FSM_STATE_TTL_SECONDS: int = Field(
+        default=86400,
+        description="Expire abandoned FSM states/data in Redis after this many seconds (0 = never)")
+
     WEB_SERVER_HOST: str = Field(default="0.0.0.0")
     WEB_SERVER_PORT: int = Field(default=8080)
+    WEBHOOK_MAX_BODY_BYTES: int = Field(
+        default=1024 * 1024,
+        description="Reject provider webhook bodies larger than this with 413")
+    PANEL_WEBHOOK_MAX_BODY_BYTES: int = Field(
+        default=8 * 1024 * 1024,
+        description="Body size limit of the panel webhook, which may carry large batches")
+    WEBHOOK_OFFLOAD_THRESHOLD_BYTES: int = Field(
+        default=256 * 1024,
+        description="Verify and parse webhook bodies of at least this size in a worker thread (0 = never)")
+    EVENT_LOOP_LAG_MONITOR_ENABLED: bool = Field(default=True)
+    EVENT_LOOP_LAG_INTERVAL_SECONDS: float = Field(default=0.5)
+    EVENT_LOOP_LAG_WARN_MS: float = Field(
+        default=100.0,
+        description="Log a warning whenever the event loop is blocked for longer than this")
+    METRICS_ENABLED: bool = Field(
+        default=False,
+        description="Time handlers, middlewares, SQL queries, outbound HTTP and loop lag, exposed at METRICS_PATH")
+    METRICS_PATH: str = Field(default="/metrics")
+    METRICS_AUTH_TOKEN: Optional[str] = Field(
+        default=None,
+        description="When set, /metrics requires 'Authorization: Bearer <token>'")
+    STARTUP_SYNC_ENABLED: bool = Field(
+        default=True,
+        description="Sync users from the panel in the background after startup")
+    HEALTH_CHECK_PATH: str = Field(
+        default="/health",
+        description="Liveness route of the web server, always 200 with the startup state")
+    READINESS_CHECK_PATH: str = Field(
+        default="/ready",
+        description="Readiness route: 503 until the web server listens and the initial sync has finished")
+    DB_FORCE_SCHEMA_UPGRADE: bool = Field(
+        default=False,
+        description="Run create_all and migrations on every start, even when the schema fingerprint is unchanged")
+    DB_QUERY_BUDGET_ENABLED: bool = Field(
+        default=False,
+        description="Debug/test mode: count SQL statements per update and per webhook, flag repeats")
+    DB_QUERY_BUDGET_PER_UPDATE: int = Field(
+        default=25,
+        description="Statements one Telegram update may run before it is flagged (0 = no limit)")
+    DB_QUERY_BUDGET_PER_WEBHOOK: int = Field(
+        default=40,
+        description="Statements one webhook request or processed inbox event may run (0 = no limit)")
+    DB_QUERY_REPEAT_THRESHOLD: int = Field(
+        default=5,
+        description="Flag a statement run with this many parameter sets in one unit as a possible N+1 (0 = off)")
+    DB_QUERY_BUDGET_STRICT: bool = Field(
+        default=False,
+        description="Raise instead of only logging when a query budget is exceeded")
     LOGS_PAGE_SIZE: int = Field(default=10)
+    MESSAGE_LOGS_RETENTION_MONTHS: int = Field(
+        default=0,
+        description="Drop monthly message log partitions older than this many months (0 = keep forever)")
+    MESSAGE_LOGS_PARTITIONS_AHEAD: int = Field(
+        default=2,
+        description="How many future monthly message log partitions to keep pre-created")
+    MESSAGE_LOGS_MAINTENANCE_INTERVAL_HOURS: int = Field(
+        default=12,
+        description="How often partition creation and retention run for message logs")
 
     SUBSCRIPTION_MINI_APP_URL: Optional[str] = Field(default=None)
 
@@ -369,7 +611,8 @@ class Settings(BaseSettings):
     LOG_CHAT_ID: Optional[int] = Field(default=None, description="Telegram chat/group ID for sending notifications")
     LOG_THREAD_ID: Optional[int] = Field(default=None, description="Thread ID for supergroup messages (optional)")
     
-    @field_validator('LOG_CHAT_ID', 'LOG_THREAD_ID', mode='before')
+    @field_validator('LOG_CHAT_ID', 'LOG_THREAD_ID', 'DB_STATEMENT_TIMEOUT_MS',
+                     'DB_IDLE_IN_TRANSACTION_TIMEOUT_MS', mode='before')
     @classmethod
     def validate_optional_int_fields(cls, v):
         """Convert empty strings to None for optional integer fields"""
@@ -377,7 +620,7 @@ class Settings(BaseSettings):
             return None
         return v
 
-    @field_validator('REQUIRED_CHANNEL_LINK', mode='before')
+    @field_validator('REQUIRED_CHANNEL_LINK', 'DATABASE_REPLICA_URL', mode='before')
     @classmethod
     def sanitize_optional_link(cls, v):
         if isinstance(v, str) and not v.strip():
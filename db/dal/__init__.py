@@ -6,6 +6,10 @@ from . import panel_sync_dal
 from . import message_log_dal
 from . import user_billing_dal
 from . import ad_dal
+from . import inbound_event_dal
+from . import outbox_dal
+from . import renewal_dal
+from . import subscription_extension_dal
 
 __all__ = (
     "user_dal",
@@ -16,6 +20,10 @@ __all__ = (
     "message_log_dal",
     "user_billing_dal",
     "ad_dal",
+    "inbound_event_dal",
+    "outbox_dal",
+    "renewal_dal",
+    "subscription_extension_dal",
 )
 
 
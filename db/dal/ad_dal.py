@@ -6,6 +6,12 @@ from sqlalchemy.orm import selectinload
 from sqlalchemy import update, delete, func, and_
 
 from ..models import AdCampaign, AdAttribution, Payment
+from .pagination import (
+    KeysetCursor,
+    cached_count,
+    fetch_keyset_page,
+    invalidate_count_cache,
+)
 
 
 async def create_campaign(
@@ -19,6 +25,7 @@ async def create_campaign(
     session.add(campaign)
     await session.flush()
     await session.refresh(campaign)
+    invalidate_count_cache(_campaigns_count_key(False), _campaigns_count_key(True))
     logging.info(
         f"AdCampaign created id={campaign.ad_campaign_id}, source={source}, start={start_param}, cost={cost}"
     )
@@ -53,6 +60,7 @@ async def toggle_campaign_active(session: AsyncSession, campaign_id: int, is_act
         .values(is_active=is_active)
     )
     result = await session.execute(stmt)
+    invalidate_count_cache(_campaigns_count_key(True))
     return result.rowcount > 0
 
 
@@ -142,21 +150,37 @@ async def get_campaign_stats(session: AsyncSession, campaign_id: int) -> Dict[st
 
 
 async def count_campaigns(session: AsyncSession, *, only_active: bool = False) -> int:
+    """Campaign count for page counters, cached for a short TTL."""
     stmt = select(func.count(AdCampaign.ad_campaign_id))
     if only_active:
         stmt = stmt.where(AdCampaign.is_active == True)
-    return int((await session.execute(stmt)).scalar() or 0)
+    return await cached_count(session, _campaigns_count_key(only_active), stmt)
+
+
+def _campaigns_count_key(only_active: bool) -> str:
+    return f"ad_campaigns:{'active' if only_active else 'all'}"
 
 
 async def list_campaigns_paged(
-    session: AsyncSession, *, page: int, page_size: int, only_active: bool = False
+    session: AsyncSession,
+    *,
+    page_size: int,
+    only_active: bool = False,
+    cursor: Optional[KeysetCursor] = None,
+    direction: Optional[str] = None,
 ) -> List[AdCampaign]:
-    offset = max(0, page) * max(1, page_size)
-    stmt = select(AdCampaign).order_by(AdCampaign.created_at.desc()).offset(offset).limit(page_size)
+    stmt = select(AdCampaign)
     if only_active:
         stmt = stmt.where(AdCampaign.is_active == True)
-    result = await session.execute(stmt)
-    return result.scalars().all()
+    return await fetch_keyset_page(
+        session,
+        stmt,
+        AdCampaign.created_at,
+        AdCampaign.ad_campaign_id,
+        cursor=cursor,
+        direction=direction,
+        limit=page_size,
+    )
 
 
 async def get_totals(session: AsyncSession) -> Dict[str, float]:
@@ -199,6 +223,7 @@ async def delete_campaign(session: AsyncSession, campaign_id: int) -> bool:
             return False
         await session.delete(campaign)
         await session.flush()
+        invalidate_count_cache(_campaigns_count_key(False), _campaigns_count_key(True))
         logging.info(f"AdCampaign deleted id={campaign_id}")
         return True
     except Exception as e:
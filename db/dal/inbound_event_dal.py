@@ -0,0 +1,154 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, delete, func, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from db.models import InboundEvent
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_DEAD = "dead"
+
+
+async def store_inbound_event(session: AsyncSession, *, provider: str,
+                              event_id: str, body: str,
+                              event_type: Optional[str] = None) -> Optional[int]:
+    """Insert an event unless (provider, event_id) is already stored.
+
+    Returns the new row id, or None when the event is a duplicate delivery.
+    """
+    stmt = (pg_insert(InboundEvent).values(
+        provider=provider,
+        event_id=event_id[:255],
+        event_type=event_type[:128] if event_type else None,
+        body=body,
+        status=STATUS_PENDING,
+        attempts=0,
+    ).on_conflict_do_nothing(
+        constraint="uq_inbound_events_provider_event").returning(InboundEvent.id))
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+async def claim_due_events(session: AsyncSession,
+                           *,
+                           limit: int,
+                           lease_seconds: int,
+                           provider: Optional[str] = None,
+                           exclude_providers: Sequence[str] = ()) -> List[InboundEvent]:
+    """Mark up to ``limit`` due events as processing and return them.
+
+    Picks pending events, failed events whose retry time has come and
+    processing events whose lease expired (worker died). SKIP LOCKED lets
+    several bot replicas claim concurrently without handing out an event twice.
+    ``provider``/``exclude_providers`` restrict the claim to (or exclude)
+    providers that are processed in batches.
+    """
+    now = datetime.now(timezone.utc)
+    due_ids = (select(InboundEvent.id).where(
+        or_(
+            and_(InboundEvent.status.in_([STATUS_PENDING, STATUS_FAILED]),
+                 InboundEvent.next_attempt_at <= now),
+            and_(InboundEvent.status == STATUS_PROCESSING,
+                 InboundEvent.locked_until < now),
+        )).order_by(InboundEvent.next_attempt_at,
+                     InboundEvent.id).limit(max(limit, 1)).with_for_update(
+                         skip_locked=True))
+    if provider:
+        due_ids = due_ids.where(InboundEvent.provider == provider)
+    if exclude_providers:
+        due_ids = due_ids.where(InboundEvent.provider.notin_(exclude_providers))
+    stmt = (update(InboundEvent).where(
+        InboundEvent.id.in_(due_ids.scalar_subquery())).values(
+            status=STATUS_PROCESSING,
+            attempts=InboundEvent.attempts + 1,
+            locked_until=now + timedelta(seconds=lease_seconds),
+        ).returning(InboundEvent).execution_options(synchronize_session=False))
+    result = await session.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def mark_event_done(session: AsyncSession, event_row_id: int) -> None:
+    await mark_events_done(session, [event_row_id])
+
+
+async def mark_events_done(session: AsyncSession,
+                           event_row_ids: Sequence[int]) -> None:
+    if not event_row_ids:
+        return
+    await session.execute(
+        update(InboundEvent).where(InboundEvent.id.in_(event_row_ids)).values(
+            status=STATUS_DONE,
+            processed_at=func.now(),
+            locked_until=None,
+            last_error=None,
+        ))
+
+
+async def mark_event_failed(session: AsyncSession, event_row_id: int,
+                            error: str,
+                            retry_at: Optional[datetime]) -> None:
+    """Schedule a retry at ``retry_at``; without it the event is dead-lettered."""
+    await session.execute(
+        update(InboundEvent).where(InboundEvent.id == event_row_id).values(
+            status=STATUS_FAILED if retry_at else STATUS_DEAD,
+            next_attempt_at=retry_at or func.now(),
+            locked_until=None,
+            last_error=error[:4000],
+        ))
+
+
+async def requeue_events(session: AsyncSession,
+                         *,
+                         event_row_id: Optional[int] = None,
+                         provider: Optional[str] = None,
+                         statuses: tuple = (STATUS_DEAD, )) -> int:
+    """Put events back into the queue for replay. Returns the number requeued.
+
+    A single event can be replayed by id regardless of its status.
+    """
+    stmt = update(InboundEvent)
+    if event_row_id is not None:
+        stmt = stmt.where(InboundEvent.id == event_row_id)
+    else:
+        stmt = stmt.where(InboundEvent.status.in_(statuses))
+        if provider:
+            stmt = stmt.where(InboundEvent.provider == provider)
+    stmt = stmt.values(status=STATUS_PENDING,
+                       attempts=0,
+                       next_attempt_at=func.now(),
+                       locked_until=None)
+    result = await session.execute(stmt)
+    count = result.rowcount or 0
+    if count:
+        logging.info(f"Inbound events requeued for replay: {count}")
+    return count
+
+
+async def count_events_by_status(session: AsyncSession) -> Dict[str, int]:
+    stmt = select(InboundEvent.status, func.count()).group_by(InboundEvent.status)
+    result = await session.execute(stmt)
+    return {status: int(count) for status, count in result.all()}
+
+
+async def get_dead_events(session: AsyncSession,
+                          limit: int = 10) -> List[InboundEvent]:
+    stmt = (select(InboundEvent).where(InboundEvent.status == STATUS_DEAD)
+            .order_by(InboundEvent.id.desc()).limit(limit))
+    result = await session.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def purge_processed_events(session: AsyncSession,
+                                 older_than_days: int) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    result = await session.execute(
+        delete(InboundEvent).where(InboundEvent.status == STATUS_DONE,
+                                   InboundEvent.processed_at < cutoff))
+    return result.rowcount or 0
@@ -5,6 +5,12 @@ from sqlalchemy.future import select
 from sqlalchemy import func, or_
 
 from ..models import MessageLog, User
+from .pagination import (
+    KeysetCursor,
+    cached_count,
+    estimate_table_count,
+    fetch_keyset_page,
+)
 
 
 async def create_message_log(session: AsyncSession,
@@ -22,37 +28,57 @@ async def create_message_log(session: AsyncSession,
         return None
 
 
-async def get_all_message_logs(session: AsyncSession, limit: int,
-                               offset: int) -> List[MessageLog]:
-    stmt = select(MessageLog).order_by(
-        MessageLog.timestamp.desc()).limit(limit).offset(offset)
-    result = await session.execute(stmt)
-    return result.scalars().all()
+async def get_all_message_logs(
+        session: AsyncSession,
+        limit: int,
+        *,
+        cursor: Optional[KeysetCursor] = None,
+        direction: Optional[str] = None) -> List[MessageLog]:
+    """Newest-first logs. Pass a (timestamp, log_id) cursor to seek instead of offsetting."""
+    stmt = select(MessageLog)
+    return await fetch_keyset_page(session,
+                                   stmt,
+                                   MessageLog.timestamp,
+                                   MessageLog.log_id,
+                                   cursor=cursor,
+                                   direction=direction,
+                                   limit=limit)
 
 
 async def count_all_message_logs(session: AsyncSession) -> int:
-    stmt = select(func.count()).select_from(MessageLog)
-    result = await session.execute(stmt)
-    return result.scalar_one()
+    """Approximate total used for page counters (planner estimate, cached)."""
+    return await estimate_table_count(session, MessageLog)
 
 
-async def get_user_message_logs(session: AsyncSession, user_id_to_search: int,
-                                limit: int, offset: int) -> List[MessageLog]:
-    stmt = (select(MessageLog).where(
-        or_(MessageLog.user_id == user_id_to_search,
-            MessageLog.target_user_id == user_id_to_search)).order_by(
-                MessageLog.timestamp.desc()).limit(limit).offset(offset))
-    result = await session.execute(stmt)
-    return result.scalars().all()
+def _user_logs_filter(user_id_to_search: int):
+    return or_(MessageLog.user_id == user_id_to_search,
+               MessageLog.target_user_id == user_id_to_search)
+
+
+async def get_user_message_logs(
+        session: AsyncSession,
+        user_id_to_search: int,
+        limit: int,
+        *,
+        cursor: Optional[KeysetCursor] = None,
+        direction: Optional[str] = None) -> List[MessageLog]:
+    stmt = select(MessageLog).where(_user_logs_filter(user_id_to_search))
+    return await fetch_keyset_page(session,
+                                   stmt,
+                                   MessageLog.timestamp,
+                                   MessageLog.log_id,
+                                   cursor=cursor,
+                                   direction=direction,
+                                   limit=limit)
 
 
 async def count_user_message_logs(session: AsyncSession,
                                   user_id_to_search: int) -> int:
+    """Per-user log count, cached for a short TTL between page clicks."""
     stmt = (select(func.count()).select_from(MessageLog).where(
-        or_(MessageLog.user_id == user_id_to_search,
-            MessageLog.target_user_id == user_id_to_search)))
-    result = await session.execute(stmt)
-    return result.scalar_one()
+        _user_logs_filter(user_id_to_search)))
+    return await cached_count(session, f"message_logs:user:{user_id_to_search}",
+                              stmt)
 
 
 async def create_message_log_no_commit(session: AsyncSession,
@@ -0,0 +1,135 @@
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from db.models import OutboxEvent
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_DEAD = "dead"
+
+# Set on the session when an effect is enqueued; the outbox dispatcher is
+# woken up right after that session commits.
+WAKEUP_INFO_KEY = "outbox_wakeup"
+
+
+async def enqueue_effect(session: AsyncSession,
+                         kind: str,
+                         payload: Dict[str, Any],
+                         dedupe_key: Optional[str] = None) -> Optional[int]:
+    """Record a side effect to run after the current transaction commits.
+
+    Returns the new row id, or None when an effect with the same
+    ``dedupe_key`` already exists. Nothing is stored if the caller rolls back.
+    """
+    stmt = pg_insert(OutboxEvent).values(
+        kind=kind,
+        payload=json.dumps(payload, ensure_ascii=False, default=str),
+        dedupe_key=dedupe_key[:255] if dedupe_key else None,
+        status=STATUS_PENDING,
+        attempts=0,
+    )
+    if dedupe_key:
+        stmt = stmt.on_conflict_do_nothing(
+            constraint="uq_outbox_events_dedupe_key")
+    result = await session.execute(stmt.returning(OutboxEvent.id))
+    row_id = result.scalar_one_or_none()
+    if row_id is not None:
+        session.info[WAKEUP_INFO_KEY] = True
+    return row_id
+
+
+async def claim_due_effects(session: AsyncSession, *, limit: int,
+                            lease_seconds: int) -> List[OutboxEvent]:
+    """Mark up to ``limit`` due effects as processing and return them.
+
+    Same claiming rules as the webhook inbox: pending and due failed effects
+    plus processing effects whose lease expired, using SKIP LOCKED.
+    """
+    now = datetime.now(timezone.utc)
+    due_ids = (select(OutboxEvent.id).where(
+        or_(
+            and_(OutboxEvent.status.in_([STATUS_PENDING, STATUS_FAILED]),
+                 OutboxEvent.next_attempt_at <= now),
+            and_(OutboxEvent.status == STATUS_PROCESSING,
+                 OutboxEvent.locked_until < now),
+        )).order_by(OutboxEvent.next_attempt_at,
+                     OutboxEvent.id).limit(max(limit, 1)).with_for_update(
+                         skip_locked=True))
+    stmt = (update(OutboxEvent).where(
+        OutboxEvent.id.in_(due_ids.scalar_subquery())).values(
+            status=STATUS_PROCESSING,
+            attempts=OutboxEvent.attempts + 1,
+            locked_until=now + timedelta(seconds=lease_seconds),
+        ).returning(OutboxEvent).execution_options(synchronize_session=False))
+    result = await session.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def mark_effect_done(session: AsyncSession, effect_id: int) -> None:
+    await session.execute(
+        update(OutboxEvent).where(OutboxEvent.id == effect_id).values(
+            status=STATUS_DONE,
+            processed_at=func.now(),
+            locked_until=None,
+            last_error=None,
+        ))
+
+
+async def mark_effect_failed(session: AsyncSession, effect_id: int, error: str,
+                             retry_at: Optional[datetime]) -> None:
+    """Schedule a retry at ``retry_at``; without it the effect is dead-lettered."""
+    await session.execute(
+        update(OutboxEvent).where(OutboxEvent.id == effect_id).values(
+            status=STATUS_FAILED if retry_at else STATUS_DEAD,
+            next_attempt_at=retry_at or func.now(),
+            locked_until=None,
+            last_error=error[:4000],
+        ))
+
+
+async def requeue_effects(session: AsyncSession,
+                          *,
+                          effect_id: Optional[int] = None,
+                          kind: Optional[str] = None,
+                          statuses: tuple = (STATUS_DEAD, )) -> int:
+    """Put dead effects (or a single effect by id) back into the queue."""
+    stmt = update(OutboxEvent)
+    if effect_id is not None:
+        stmt = stmt.where(OutboxEvent.id == effect_id)
+    else:
+        stmt = stmt.where(OutboxEvent.status.in_(statuses))
+        if kind:
+            stmt = stmt.where(OutboxEvent.kind == kind)
+    stmt = stmt.values(status=STATUS_PENDING,
+                       attempts=0,
+                       next_attempt_at=func.now(),
+                       locked_until=None)
+    result = await session.execute(stmt)
+    count = result.rowcount or 0
+    if count:
+        logging.info(f"Outbox effects requeued: {count}")
+    return count
+
+
+async def count_effects_by_status(session: AsyncSession) -> Dict[str, int]:
+    stmt = select(OutboxEvent.status, func.count()).group_by(OutboxEvent.status)
+    result = await session.execute(stmt)
+    return {status: int(count) for status, count in result.all()}
+
+
+async def purge_processed_effects(session: AsyncSession,
+                                  older_than_days: int) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    result = await session.execute(
+        delete(OutboxEvent).where(OutboxEvent.status == STATUS_DONE,
+                                  OutboxEvent.processed_at < cutoff))
+    return result.rowcount or 0
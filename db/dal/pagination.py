@@ -0,0 +1,153 @@
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import Select, and_, func, or_, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Seek directions understood by apply_keyset (also used in callback data).
+SEEK_NEXT = "n"  # rows strictly older than the cursor
+SEEK_PREV = "p"  # rows strictly newer than the cursor
+SEEK_AT = "a"  # rows starting at the cursor (re-render the same page)
+
+# The timestamp is None for rows whose (nullable) timestamp column is NULL
+KeysetCursor = Tuple[Optional[datetime], int]
+
+COUNT_CACHE_TTL_SECONDS = 60.0
+# Below this planner estimate an exact COUNT(*) is cheap enough to run.
+EXACT_COUNT_THRESHOLD = 10_000
+
+_count_cache: Dict[str, Tuple[float, int]] = {}
+
+
+def apply_keyset(stmt: Select,
+                 ts_column: Any,
+                 id_column: Any,
+                 *,
+                 cursor: Optional[KeysetCursor],
+                 direction: Optional[str],
+                 limit: int) -> Select:
+    """Restrict a newest-first listing to one page using a (timestamp, id) seek.
+
+    Rows for SEEK_PREV come back oldest-first; callers reverse them to keep
+    the newest-first display order. Rows with a NULL timestamp sort before
+    all others, which is where the (timestamp DESC, id DESC) indexes keep
+    them.
+    """
+    newest_first = (ts_column.desc().nulls_first(), id_column.desc())
+    if cursor is None:
+        return stmt.order_by(*newest_first).limit(max(limit, 1))
+
+    if direction == SEEK_PREV:
+        condition = _seek_condition(ts_column, id_column, cursor, newer=True,
+                                    inclusive=False)
+        order = (ts_column.asc().nulls_last(), id_column.asc())
+    else:
+        condition = _seek_condition(ts_column, id_column, cursor, newer=False,
+                                    inclusive=direction == SEEK_AT)
+        order = newest_first
+    return stmt.where(condition).order_by(*order).limit(max(limit, 1))
+
+
+def _seek_condition(ts_column: Any, id_column: Any, cursor: KeysetCursor, *,
+                    newer: bool, inclusive: bool):
+    """Rows on one side of ``cursor`` in the NULLs-first newest-first order."""
+    ts, row_id = cursor
+    if newer:
+        id_matches = id_column >= row_id if inclusive else id_column > row_id
+    else:
+        id_matches = id_column <= row_id if inclusive else id_column < row_id
+
+    if ts is None:
+        same_group = and_(ts_column.is_(None), id_matches)
+        # Every dated row is older than an undated one
+        return same_group if newer else or_(same_group, ts_column.is_not(None))
+
+    key = tuple_(ts_column, id_column)
+    if newer:
+        condition = key >= tuple_(ts, row_id) if inclusive else key > tuple_(ts, row_id)
+        if getattr(ts_column, "nullable", True):
+            condition = or_(condition, ts_column.is_(None))
+        return condition
+    # A row comparison with a NULL timestamp is NULL, so undated rows drop out
+    return key <= tuple_(ts, row_id) if inclusive else key < tuple_(ts, row_id)
+
+
+async def fetch_keyset_page(session: AsyncSession, stmt: Select, ts_column: Any,
+                            id_column: Any, *, cursor: Optional[KeysetCursor],
+                            direction: Optional[str], limit: int) -> list:
+    stmt = apply_keyset(stmt,
+                        ts_column,
+                        id_column,
+                        cursor=cursor,
+                        direction=direction,
+                        limit=limit)
+    rows = list((await session.execute(stmt)).scalars().all())
+    if cursor is not None and direction == SEEK_PREV:
+        rows.reverse()
+    return rows
+
+
+def _get_cached_count(key: str) -> Optional[int]:
+    cached = _count_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    return None
+
+
+def _store_cached_count(key: str, value: int) -> int:
+    _count_cache[key] = (time.monotonic() + COUNT_CACHE_TTL_SECONDS, value)
+    return value
+
+
+def invalidate_count_cache(*keys: str) -> None:
+    """Drop cached counts; without arguments the whole cache is cleared."""
+    if not keys:
+        _count_cache.clear()
+        return
+    for key in keys:
+        _count_cache.pop(key, None)
+
+
+async def cached_count(session: AsyncSession, key: str, stmt: Select) -> int:
+    """Run an exact COUNT statement at most once per TTL for the given key."""
+    cached = _get_cached_count(key)
+    if cached is not None:
+        return cached
+    value = int((await session.execute(stmt)).scalar() or 0)
+    return _store_cached_count(key, value)
+
+
+async def estimate_table_count(session: AsyncSession, model: Any) -> int:
+    """Approximate row count of a whole table.
+
+    Uses the planner statistics from pg_class for large tables and falls back
+    to an exact COUNT(*) for small or never analysed ones. Results are cached.
+    """
+    table_name = model.__tablename__
+    key = f"table:{table_name}"
+    cached = _get_cached_count(key)
+    if cached is not None:
+        return cached
+
+    # Partitioned parents carry no statistics of their own, so sum the
+    # partitions when there are any.
+    result = await session.execute(
+        text("""
+            SELECT COALESCE(
+                (SELECT SUM(GREATEST(child.reltuples, 0))::bigint
+                 FROM pg_inherits
+                 JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                 WHERE pg_inherits.inhparent = to_regclass(:table_name)),
+                (SELECT reltuples::bigint FROM pg_class
+                 WHERE oid = to_regclass(:table_name))
+            )
+        """),
+        {"table_name": table_name})
+    estimate = result.scalar()
+    estimate = -1 if estimate is None else int(estimate)
+
+    if estimate < EXACT_COUNT_THRESHOLD:
+        estimate = int((await session.execute(
+            select(func.count()).select_from(model))).scalar() or 0)
+    return _store_cached_count(key, estimate)
@@ -1,12 +1,95 @@
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update, func, and_
+from sqlalchemy import update, func, and_, or_
 from sqlalchemy.orm import selectinload
 
 from db.models import Payment, User
 
+# Statuses a payment can still leave. Placeholders written at creation time
+# (pending_yookassa, pending_stars, ...) are matched by prefix; "active" is
+# CryptoPay's unpaid invoice status.
+OPEN_PAYMENT_STATUSES: Tuple[str, ...] = ("pending", "waiting_for_capture", "active")
+PENDING_STATUS_PREFIX = "pending_"
+
+# Target status -> statuses it may be reached from. Anything else, e.g. a
+# second "succeeded" for the same payment or "pending" after "canceled",
+# is a duplicate or out-of-order event and is rejected.
+PAYMENT_STATUS_TRANSITIONS: Dict[str, Tuple[str, ...]] = {
+    "pending": OPEN_PAYMENT_STATUSES,
+    "waiting_for_capture": OPEN_PAYMENT_STATUSES,
+    "active": OPEN_PAYMENT_STATUSES,
+    "succeeded": OPEN_PAYMENT_STATUSES,
+    "canceled": OPEN_PAYMENT_STATUSES,
+    "expired": OPEN_PAYMENT_STATUSES,
+    # Also covers failed_<reason>
+    "failed": OPEN_PAYMENT_STATUSES,
+}
+
+
+def allowed_source_statuses(new_status: str) -> Tuple[str, ...]:
+    """Statuses ``new_status`` may be reached from; empty for an unknown status."""
+    if new_status in PAYMENT_STATUS_TRANSITIONS:
+        return PAYMENT_STATUS_TRANSITIONS[new_status]
+    if new_status.startswith(PENDING_STATUS_PREFIX):
+        return PAYMENT_STATUS_TRANSITIONS["pending"]
+    if new_status.startswith("failed_"):
+        return PAYMENT_STATUS_TRANSITIONS["failed"]
+    return ()
+
+
+def _status_allows(sources: Tuple[str, ...]):
+    condition = Payment.status.in_(sources)
+    if "pending" in sources:
+        condition = or_(condition, Payment.status.startswith(PENDING_STATUS_PREFIX, autoescape=True))
+    return condition
+
+
+async def transition_payment_status(
+        session: AsyncSession,
+        payment_db_id: int,
+        new_status: str,
+        *,
+        provider_payment_id: Optional[str] = None,
+        yookassa_payment_id: Optional[str] = None) -> Optional[Payment]:
+    """Move a payment to ``new_status`` if PAYMENT_STATUS_TRANSITIONS allows it.
+
+    A single conditional ``UPDATE ... WHERE status IN (...) RETURNING``.
+    Returns the updated payment, or None when it does not exist or its
+    current status does not allow the move (duplicate or out-of-order
+    webhook). Concurrent callers, also on other bot instances, queue on the
+    row lock and re-check the condition, so only one of them wins. A status
+    outside PAYMENT_STATUS_TRANSITIONS, e.g. a new provider status, leaves
+    the payment unchanged.
+    """
+    sources = allowed_source_statuses(new_status)
+    if not sources:
+        logging.warning(
+            f"Payment record {payment_db_id} not moved to unknown status '{new_status}'.")
+        return None
+    values: Dict[str, Any] = {"status": new_status, "updated_at": func.now()}
+    if provider_payment_id is not None:
+        values["provider_payment_id"] = provider_payment_id
+    if yookassa_payment_id:
+        values["yookassa_payment_id"] = func.coalesce(Payment.yookassa_payment_id,
+                                                      yookassa_payment_id)
+    stmt = (update(Payment).where(Payment.payment_id == payment_db_id,
+                                  _status_allows(sources)).values(
+                                      **values).returning(Payment).execution_options(
+                                          synchronize_session="fetch"))
+    result = await session.execute(stmt)
+    payment = result.scalars().first()
+    if payment:
+        logging.info(
+            f"Payment record {payment.payment_id} status updated to {new_status}.")
+    else:
+        logging.info(
+            f"Payment record {payment_db_id} not moved to {new_status}: "
+            f"missing or already in a final status.")
+    return payment
+
 
 async def create_payment_record(session: AsyncSession,
                                 payment_data: Dict[str, Any]) -> Payment:
@@ -56,27 +139,36 @@ async def ensure_payment_with_provider_id(
         months: int,
         description: str,
         provider: str,
-        provider_payment_id: str) -> Payment:
+        provider_payment_id: str,
+        status: str = "succeeded",
+        yookassa_payment_id: Optional[str] = None) -> Optional[Payment]:
     """Idempotently create a payment record for a provider event.
 
-    If a payment with the same provider_payment_id already exists, returns it.
-    Otherwise creates a new succeeded payment with provided data.
+    Inserts with ON CONFLICT DO NOTHING on provider_payment_id and returns
+    the new payment, or None when this provider payment was already
+    recorded, i.e. the event is a duplicate.
     """
-    existing = await get_payment_by_provider_payment_id(session, provider_payment_id)
-    if existing:
-        return existing
-
-    payment_payload: Dict[str, Any] = {
-        "user_id": user_id,
-        "amount": float(amount),
-        "currency": currency,
-        "status": "succeeded",
-        "description": description,
-        "subscription_duration_months": months,
-        "provider_payment_id": provider_payment_id,
-        "provider": provider,
-    }
-    return await create_payment_record(session, payment_payload)
+    stmt = (pg_insert(Payment).values(
+        user_id=user_id,
+        amount=float(amount),
+        currency=currency,
+        status=status,
+        description=description,
+        subscription_duration_months=months,
+        provider_payment_id=provider_payment_id,
+        yookassa_payment_id=yookassa_payment_id,
+        provider=provider,
+    ).on_conflict_do_nothing(index_elements=[Payment.provider_payment_id]).returning(Payment))
+    result = await session.execute(stmt)
+    payment = result.scalars().first()
+    if payment:
+        logging.info(
+            f"Payment record {payment.payment_id} created for user {user_id} "
+            f"({provider} {provider_payment_id})")
+    else:
+        logging.info(
+            f"Payment for {provider} {provider_payment_id} already recorded; duplicate event.")
+    return payment
 
 
 async def get_payment_by_db_id(session: AsyncSession,
@@ -88,27 +180,20 @@ async def get_payment_by_db_id(session: AsyncSession,
     return result.scalar_one_or_none()
 
 
+async def payment_exists(session: AsyncSession, payment_db_id: int) -> bool:
+    stmt = select(Payment.payment_id).where(Payment.payment_id == payment_db_id)
+    return (await session.execute(stmt)).scalar_one_or_none() is not None
+
+
 async def update_payment_status_by_db_id(
         session: AsyncSession,
         payment_db_id: int,
         new_status: str,
         yk_payment_id: Optional[str] = None) -> Optional[Payment]:
-    payment = await get_payment_by_db_id(session, payment_db_id)
-    if payment:
-        payment.status = new_status
-        payment.updated_at = func.now()
-        if yk_payment_id and payment.yookassa_payment_id is None:
-            payment.yookassa_payment_id = yk_payment_id
-        await session.flush()
-        await session.refresh(payment)
-        logging.info(
-            f"Payment record {payment.payment_id} status updated to {new_status}."
-        )
-    else:
-        logging.warning(
-            f"Payment record with DB ID {payment_db_id} not found for status update."
-        )
-    return payment
+    return await transition_payment_status(session,
+                                           payment_db_id,
+                                           new_status,
+                                           yookassa_payment_id=yk_payment_id)
 
 
 async def get_recent_payment_logs_with_user(session: AsyncSession,
@@ -158,21 +243,10 @@ async def count_user_succeeded_payments(
 async def update_provider_payment_and_status(
         session: AsyncSession, payment_db_id: int,
         provider_payment_id: str, new_status: str) -> Optional[Payment]:
-    payment = await get_payment_by_db_id(session, payment_db_id)
-    if payment:
-        payment.status = new_status
-        payment.provider_payment_id = provider_payment_id
-        payment.updated_at = func.now()
-        await session.flush()
-        await session.refresh(payment)
-        logging.info(
-            f"Payment record {payment.payment_id} updated with provider id {provider_payment_id} and status {new_status}."
-        )
-    else:
-        logging.warning(
-            f"Payment record with DB ID {payment_db_id} not found for provider update."
-        )
-    return payment
+    return await transition_payment_status(session,
+                                           payment_db_id,
+                                           new_status,
+                                           provider_payment_id=provider_payment_id)
 
 
 async def get_financial_statistics(session: AsyncSession) -> Dict[str, Any]:
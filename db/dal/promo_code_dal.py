@@ -6,6 +6,12 @@ from sqlalchemy import update, func, and_, or_
 from datetime import datetime, timezone
 
 from db.models import PromoCode, PromoCodeActivation, User, Payment
+from .pagination import (
+    KeysetCursor,
+    estimate_table_count,
+    fetch_keyset_page,
+    invalidate_count_cache,
+)
 
 
 async def create_promo_code(session: AsyncSession,
@@ -14,6 +20,7 @@ async def create_promo_code(session: AsyncSession,
     session.add(new_promo)
     await session.flush()
     await session.refresh(new_promo)
+    invalidate_count_cache(f"table:{PromoCode.__tablename__}")
     logging.info(
         f"Promo code '{new_promo.code}' created with ID {new_promo.promo_code_id}"
     )
@@ -55,21 +62,25 @@ async def get_all_active_promo_codes(session: AsyncSession,
     return result.scalars().all()
 
 
-async def get_all_promo_codes_with_details(session: AsyncSession, limit: int = 50,
-                                         offset: int = 0) -> List[PromoCode]:
-    """Get all promo codes (active and inactive) with pagination for management"""
-    stmt = (select(PromoCode).order_by(
-        PromoCode.created_at.desc()).limit(limit).offset(offset))
-    result = await session.execute(stmt)
-    return result.scalars().all()
+async def get_all_promo_codes_with_details(
+        session: AsyncSession,
+        limit: int = 50,
+        *,
+        cursor: Optional[KeysetCursor] = None,
+        direction: Optional[str] = None) -> List[PromoCode]:
+    """Get all promo codes (active and inactive) newest first, seeking by (created_at, id)"""
+    return await fetch_keyset_page(session,
+                                   select(PromoCode),
+                                   PromoCode.created_at,
+                                   PromoCode.promo_code_id,
+                                   cursor=cursor,
+                                   direction=direction,
+                                   limit=limit)
 
 
 async def get_promo_codes_count(session: AsyncSession) -> int:
-    """Get total count of all promo codes"""
-    from sqlalchemy import func
-    stmt = select(func.count(PromoCode.promo_code_id))
-    result = await session.execute(stmt)
-    return result.scalar_one()
+    """Get approximate count of all promo codes (cached)"""
+    return await estimate_table_count(session, PromoCode)
 
 
 async def get_promo_activations_by_code_id(session: AsyncSession, promo_code_id: int, limit: Optional[int] = None, offset: int = 0) -> List[PromoCodeActivation]:
@@ -114,6 +125,7 @@ async def delete_promo_code(session: AsyncSession, promo_id: int) -> Optional[Pr
     
     await session.delete(promo)
     await session.flush()
+    invalidate_count_cache(f"table:{PromoCode.__tablename__}")
     return promo
 
 
@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, exists, func, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import aliased
+
+from db.models import RenewalAttempt, Subscription
+
+STATUS_PROCESSING = "processing"
+STATUS_INITIATED = "initiated"
+STATUS_FAILED = "failed"
+# The charge request got no definite answer (timeout, network error, 5xx);
+# it is retried with the same Idempotence-Key
+STATUS_UNKNOWN = "unknown"
+# Nothing to charge (e.g. the subscription no longer qualifies); blocks the cycle
+STATUS_SKIPPED = "skipped"
+
+
+def _same_cycle(attempt):
+    return and_(attempt.subscription_id == Subscription.subscription_id,
+                attempt.cycle_end_date == Subscription.end_date)
+
+
+async def claim_due_renewals(
+        session: AsyncSession,
+        *,
+        limit: int,
+        window_hours: float,
+        charge_provider: str,
+        max_attempts: int,
+        retry_after_seconds: int,
+        lease_seconds: int,
+        excluded_providers: Sequence[str] = ("tribute", ),
+) -> List[Tuple[RenewalAttempt, Subscription]]:
+    """Start a renewal attempt for up to ``limit`` subscriptions that are due.
+
+    A subscription is due when auto-renew is on and it ends within
+    ``window_hours``. It is skipped while its current cycle (identified by
+    ``end_date``) already has an initiated charge, a running attempt, a
+    failure or unknown outcome younger than ``retry_after_seconds``, or
+    ``max_attempts`` failed or unknown attempts. Rows are locked with SKIP LOCKED so concurrent schedulers
+    never claim the same subscription; the inserted ``processing`` attempt
+    keeps it claimed after commit until ``lease_seconds`` pass.
+    """
+    now = datetime.now(timezone.utc)
+    blocking = aliased(RenewalAttempt)
+    failed = aliased(RenewalAttempt)
+
+    blocking_attempt = exists().where(
+        _same_cycle(blocking),
+        or_(
+            blocking.status.in_([STATUS_INITIATED, STATUS_SKIPPED]),
+            and_(blocking.status == STATUS_PROCESSING,
+                 blocking.started_at > now - timedelta(seconds=lease_seconds)),
+            and_(blocking.status.in_([STATUS_FAILED, STATUS_UNKNOWN]),
+                 blocking.finished_at > now - timedelta(seconds=retry_after_seconds)),
+        ))
+    # Attempts abandoned in processing (worker died) count as failures
+    failures_in_cycle = (select(func.count(failed.id)).where(
+        _same_cycle(failed),
+        failed.status.in_([STATUS_FAILED, STATUS_UNKNOWN,
+                           STATUS_PROCESSING])).scalar_subquery())
+
+    stmt = (select(Subscription).where(
+        Subscription.auto_renew_enabled == True,
+        Subscription.is_active == True,
+        or_(Subscription.provider.is_(None),
+            Subscription.provider.notin_(excluded_providers)),
+        Subscription.end_date > now,
+        Subscription.end_date <= now + timedelta(hours=window_hours),
+        ~blocking_attempt,
+        failures_in_cycle < max_attempts,
+    ).order_by(Subscription.end_date).limit(max(limit, 1)).with_for_update(
+        of=Subscription, skip_locked=True))
+    result = await session.execute(stmt)
+    subscriptions = list(result.scalars().all())
+
+    claimed: List[Tuple[RenewalAttempt, Subscription]] = []
+    for sub in subscriptions:
+        attempt = RenewalAttempt(subscription_id=sub.subscription_id,
+                                 user_id=sub.user_id,
+                                 cycle_end_date=sub.end_date,
+                                 provider=charge_provider,
+                                 status=STATUS_PROCESSING)
+        session.add(attempt)
+        claimed.append((attempt, sub))
+    await session.flush()
+    return claimed
+
+
+async def count_failed_attempts(session: AsyncSession, subscription_id: int,
+                                cycle_end_date: datetime) -> int:
+    """Attempts of the cycle that YooKassa definitely rejected."""
+    stmt = select(func.count(RenewalAttempt.id)).where(
+        RenewalAttempt.subscription_id == subscription_id,
+        RenewalAttempt.cycle_end_date == cycle_end_date,
+        RenewalAttempt.status == STATUS_FAILED)
+    result = await session.execute(stmt)
+    return int(result.scalar() or 0)
+
+
+async def finish_attempt(session: AsyncSession,
+                         attempt_id: int,
+                         status: str,
+                         provider_payment_id: Optional[str] = None,
+                         error: Optional[str] = None) -> None:
+    await session.execute(
+        update(RenewalAttempt).where(RenewalAttempt.id == attempt_id).values(
+            status=status,
+            provider_payment_id=provider_payment_id,
+            error=error[:2000] if error else None,
+            finished_at=func.now(),
+        ))
+
+
+async def fail_initiated_attempt(session: AsyncSession, subscription_id: int,
+                                 provider_payment_id: str,
+                                 error: str) -> Optional[RenewalAttempt]:
+    """Mark the initiated attempt that created ``provider_payment_id`` failed.
+
+    Called when that payment is canceled, so the cycle can be charged again
+    once ``retry_after_seconds`` pass. Returns None when no initiated attempt
+    created the payment.
+    """
+    stmt = (update(RenewalAttempt).where(
+        RenewalAttempt.subscription_id == subscription_id,
+        RenewalAttempt.provider_payment_id == provider_payment_id,
+        RenewalAttempt.status == STATUS_INITIATED).values(
+            status=STATUS_FAILED,
+            error=error[:2000],
+            finished_at=func.now(),
+        ).returning(RenewalAttempt).execution_options(synchronize_session=False))
+    result = await session.execute(stmt)
+    return result.scalars().first()
+
+
+async def get_latest_cycle_attempt(
+        session: AsyncSession, subscription_id: int,
+        cycle_end_date: datetime) -> Optional[RenewalAttempt]:
+    stmt = (select(RenewalAttempt).where(
+        RenewalAttempt.subscription_id == subscription_id,
+        RenewalAttempt.cycle_end_date == cycle_end_date).order_by(
+            RenewalAttempt.id.desc()).limit(1))
+    result = await session.execute(stmt)
+    return result.scalars().first()
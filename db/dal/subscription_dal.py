@@ -25,6 +25,21 @@ async def get_active_subscription_by_user_id(
     return result.scalars().first()
 
 
+async def get_active_subscriptions_by_user_ids(
+        session: AsyncSession, user_ids: List[int]) -> Dict[int, Subscription]:
+    """Latest active subscription per user, like get_active_subscription_by_user_id for many users."""
+    if not user_ids:
+        return {}
+    stmt = select(Subscription).where(
+        Subscription.user_id.in_(set(user_ids)),
+        Subscription.is_active == True,
+        Subscription.end_date > datetime.now(timezone.utc),
+    ).distinct(Subscription.user_id).order_by(Subscription.user_id,
+                                             Subscription.end_date.desc())
+    result = await session.execute(stmt)
+    return {sub.user_id: sub for sub in result.scalars().all()}
+
+
 async def get_subscription_by_panel_subscription_uuid(
         session: AsyncSession, panel_sub_uuid: str) -> Optional[Subscription]:
     stmt = select(Subscription).where(
@@ -33,6 +48,19 @@ async def get_subscription_by_panel_subscription_uuid(
     return result.scalar_one_or_none()
 
 
+async def get_latest_panel_subscription_uuid(
+        session: AsyncSession, user_id: int,
+        panel_user_uuid: str) -> Optional[str]:
+    """Subscription link ID of the user's most recent subscription on this panel user."""
+    stmt = select(Subscription.panel_subscription_uuid).where(
+        Subscription.user_id == user_id,
+        Subscription.panel_user_uuid == panel_user_uuid,
+        Subscription.panel_subscription_uuid.is_not(None),
+    ).order_by(Subscription.end_date.desc()).limit(1)
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+
 async def get_active_subscriptions_for_user(session: AsyncSession, user_id: int) -> List[Subscription]:
     """Get all active subscriptions for a user."""
     stmt = select(Subscription).where(
@@ -0,0 +1,197 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, insert, literal, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from db.models import (Subscription, SubscriptionExtensionItem,
+                       SubscriptionExtensionJob, User)
+
+JOB_PENDING = "pending"
+JOB_APPLIED = "applied"
+JOB_DONE = "done"
+JOB_COMPLETED_WITH_ERRORS = "completed_with_errors"
+
+ITEM_PENDING = "pending"
+ITEM_SENDING = "sending"
+ITEM_DONE = "done"
+ITEM_FAILED = "failed"
+
+
+async def create_job(session: AsyncSession, days: int, reason: Optional[str],
+                     created_by: Optional[int]) -> SubscriptionExtensionJob:
+    job = SubscriptionExtensionJob(days=days, reason=reason,
+                                   created_by=created_by, status=JOB_PENDING)
+    session.add(job)
+    await session.flush()
+    return job
+
+
+async def get_job(session: AsyncSession,
+                  job_id: int) -> Optional[SubscriptionExtensionJob]:
+    return await session.get(SubscriptionExtensionJob, job_id)
+
+
+async def get_recent_jobs(session: AsyncSession,
+                          limit: int = 10) -> List[SubscriptionExtensionJob]:
+    stmt = select(SubscriptionExtensionJob).order_by(
+        SubscriptionExtensionJob.id.desc()).limit(limit)
+    result = await session.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def get_unfinished_job_ids(session: AsyncSession) -> List[int]:
+    """Jobs whose DB part is applied but whose panel push has not finished."""
+    stmt = select(SubscriptionExtensionJob.id).where(
+        SubscriptionExtensionJob.status == JOB_APPLIED).order_by(
+            SubscriptionExtensionJob.id)
+    result = await session.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def apply_job(session: AsyncSession, job_id: int) -> Optional[int]:
+    """Select the cohort and extend its subscriptions, once per job.
+
+    The cohort is the latest active, unexpired subscription of every
+    non-banned user linked to the panel. It is recorded as job items with
+    one INSERT ... SELECT, then every item's end_date is moved by the job's
+    days with one UPDATE. Returns the cohort size, or None when the job was
+    already applied (the job row is locked, so concurrent calls serialize).
+    """
+    job = (await session.execute(
+        select(SubscriptionExtensionJob).where(
+            SubscriptionExtensionJob.id == job_id).with_for_update())).scalars().first()
+    if not job or job.status != JOB_PENDING:
+        return None
+
+    cohort = select(
+        literal(job.id).label("job_id"),
+        Subscription.subscription_id,
+        Subscription.panel_user_uuid,
+    ).join(User, User.user_id == Subscription.user_id).where(
+        Subscription.is_active.is_(True),
+        Subscription.end_date > datetime.now(timezone.utc),
+        User.is_banned.is_(False),
+    ).distinct(Subscription.user_id).order_by(Subscription.user_id,
+                                              Subscription.end_date.desc())
+    await session.execute(
+        insert(SubscriptionExtensionItem).from_select(
+            ["job_id", "subscription_id", "panel_user_uuid"], cohort))
+
+    job_items = select(SubscriptionExtensionItem.subscription_id).where(
+        SubscriptionExtensionItem.job_id == job.id).scalar_subquery()
+    result = await session.execute(
+        update(Subscription).where(
+            Subscription.subscription_id.in_(job_items)).values(
+                end_date=Subscription.end_date + timedelta(days=job.days),
+                last_notification_sent=None,
+            ).execution_options(synchronize_session=False))
+
+    job.total = result.rowcount or 0
+    job.status = JOB_APPLIED
+    job.applied_at = datetime.now(timezone.utc)
+    await session.flush()
+    return job.total
+
+
+async def acquire_job_lease(session: AsyncSession, job_id: int, owner: str,
+                            lease_seconds: int) -> bool:
+    """Take or renew the push lease of an applied job for ``owner``.
+
+    Succeeds when the job is unleased, its lease expired or ``owner``
+    already holds it. A worker must hold the lease while it pushes items,
+    so a job is never pushed by two workers at once.
+    """
+    now = datetime.now(timezone.utc)
+    stmt = update(SubscriptionExtensionJob).where(
+        SubscriptionExtensionJob.id == job_id,
+        SubscriptionExtensionJob.status == JOB_APPLIED,
+        or_(SubscriptionExtensionJob.locked_until.is_(None),
+            SubscriptionExtensionJob.locked_until < now,
+            SubscriptionExtensionJob.locked_by == owner),
+    ).values(locked_by=owner,
+             locked_until=now + timedelta(seconds=lease_seconds)).returning(
+        SubscriptionExtensionJob.id).execution_options(synchronize_session=False)
+    return (await session.execute(stmt)).scalar_one_or_none() is not None
+
+
+async def release_job_lease(session: AsyncSession, job_id: int,
+                            owner: str) -> None:
+    await session.execute(
+        update(SubscriptionExtensionJob).where(
+            SubscriptionExtensionJob.id == job_id,
+            SubscriptionExtensionJob.locked_by == owner,
+        ).values(locked_by=None, locked_until=None).execution_options(
+            synchronize_session=False))
+
+
+async def claim_pending_items(session: AsyncSession, job_id: int,
+                              limit: int) -> List[Tuple[int, str]]:
+    """Mark up to ``limit`` pending items as sending; returns (item id, panel uuid)."""
+    stmt = select(SubscriptionExtensionItem.id,
+                  SubscriptionExtensionItem.panel_user_uuid).where(
+        SubscriptionExtensionItem.job_id == job_id,
+        SubscriptionExtensionItem.status == ITEM_PENDING,
+    ).order_by(SubscriptionExtensionItem.id).limit(limit).with_for_update(
+        skip_locked=True)
+    rows = list((await session.execute(stmt)).all())
+    if rows:
+        await mark_items(session, [row.id for row in rows], ITEM_SENDING)
+    return [(row.id, row.panel_user_uuid) for row in rows]
+
+
+async def get_unconfirmed_items(
+        session: AsyncSession, job_id: int, after_id: int,
+        limit: int) -> List[Tuple[int, str, datetime]]:
+    """Items whose panel push may or may not have happened, with the current end_date.
+
+    These are re-pushed with an absolute expireAt, which is safe to repeat.
+    """
+    stmt = select(SubscriptionExtensionItem.id,
+                  SubscriptionExtensionItem.panel_user_uuid,
+                  Subscription.end_date).join(
+        Subscription,
+        Subscription.subscription_id == SubscriptionExtensionItem.subscription_id,
+    ).where(
+        SubscriptionExtensionItem.job_id == job_id,
+        SubscriptionExtensionItem.status.in_((ITEM_SENDING, ITEM_FAILED)),
+        SubscriptionExtensionItem.id > after_id,
+    ).order_by(SubscriptionExtensionItem.id).limit(limit)
+    return [(row.id, row.panel_user_uuid, row.end_date)
+            for row in (await session.execute(stmt)).all()]
+
+
+async def mark_items(session: AsyncSession, item_ids: Sequence[int],
+                     status: str) -> None:
+    if not item_ids:
+        return
+    await session.execute(
+        update(SubscriptionExtensionItem).where(
+            SubscriptionExtensionItem.id.in_(list(item_ids))).values(
+                status=status).execution_options(synchronize_session=False))
+
+
+async def count_items_by_status(session: AsyncSession,
+                                job_id: int) -> Dict[str, int]:
+    stmt = select(SubscriptionExtensionItem.status,
+                  func.count()).where(
+        SubscriptionExtensionItem.job_id == job_id).group_by(
+            SubscriptionExtensionItem.status)
+    return {status: count for status, count in (await session.execute(stmt)).all()}
+
+
+async def refresh_job_progress(session: AsyncSession, job_id: int,
+                               finished: bool = False) -> Optional[SubscriptionExtensionJob]:
+    """Store pushed/failed counters on the job; ``finished`` also sets its final status."""
+    job = await session.get(SubscriptionExtensionJob, job_id)
+    if not job:
+        return None
+    counts = await count_items_by_status(session, job_id)
+    job.pushed = counts.get(ITEM_DONE, 0)
+    job.failed = counts.get(ITEM_FAILED, 0)
+    if finished:
+        job.status = JOB_DONE if job.pushed >= job.total else JOB_COMPLETED_WITH_ERRORS
+        job.finished_at = datetime.now(timezone.utc)
+    await session.flush()
+    return job
@@ -19,6 +19,7 @@ from ..models import (
     UserPaymentMethod,
     AdAttribution,
 )
+from .pagination import KeysetCursor, estimate_table_count, fetch_keyset_page
 
 REFERRAL_CODE_ALPHABET = string.ascii_uppercase + string.digits
 REFERRAL_CODE_LENGTH = 9
@@ -74,6 +75,15 @@ async def get_user_by_id(session: AsyncSession, user_id: int) -> Optional[User]:
     return result.scalar_one_or_none()
 
 
+async def get_users_by_ids(session: AsyncSession,
+                           user_ids: List[int]) -> Dict[int, User]:
+    if not user_ids:
+        return {}
+    stmt = select(User).where(User.user_id.in_(set(user_ids)))
+    result = await session.execute(stmt)
+    return {user.user_id: user for user in result.scalars().all()}
+
+
 async def get_user_by_username(session: AsyncSession, username: str) -> Optional[User]:
     clean_username = username.lstrip("@").lower()
     stmt = select(User).where(func.lower(User.username) == clean_username)
@@ -175,26 +185,30 @@ async def get_banned_users(session: AsyncSession) -> List[User]:
 
 
 async def get_all_users_paginated(
-    session: AsyncSession, *, page: int = 0, page_size: int = 15
+    session: AsyncSession,
+    *,
+    page_size: int = 15,
+    cursor: Optional[KeysetCursor] = None,
+    direction: Optional[str] = None,
 ) -> List[User]:
-    """Return a slice of users ordered by newest registration first."""
-    safe_page = max(page, 0)
-    safe_page_size = max(page_size, 1)
+    """Return one page of users ordered by newest registration first.
 
-    stmt = (
-        select(User)
-        .order_by(User.registration_date.desc())
-        .offset(safe_page * safe_page_size)
-        .limit(safe_page_size)
+    Pages are addressed by a (registration_date, user_id) cursor instead of an offset.
+    """
+    return await fetch_keyset_page(
+        session,
+        select(User),
+        User.registration_date,
+        User.user_id,
+        cursor=cursor,
+        direction=direction,
+        limit=page_size,
     )
-    result = await session.execute(stmt)
-    return result.scalars().all()
 
 
 async def count_all_users(session: AsyncSession) -> int:
-    """Count total number of users."""
-    result = await session.execute(select(func.count(User.user_id)))
-    return result.scalar_one()
+    """Approximate number of users (planner estimate, cached)."""
+    return await estimate_table_count(session, User)
 
 
 async def get_all_active_user_ids_for_broadcast(session: AsyncSession) -> List[int]:
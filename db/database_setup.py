@@ -1,16 +1,120 @@
+import asyncio
 import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from config.settings import Settings
 from .models import Base
-from .migrator import run_database_migrations
+from .migrator import (read_schema_fingerprint, run_database_migrations,
+                       schema_fingerprint, store_schema_fingerprint)
+from .pool_metrics import InstrumentedAsyncPool, get_pool_stats
+from .query_budget import install_query_budget
+from .query_metrics import QueryObserver, install_query_timing
+from .log_partitions import (
+    drop_expired_message_log_partitions,
+    ensure_message_log_partitions,
+)
 
 async_engine = None
+replica_engine = None
+
+# Read-only session factories: the primary one is always available, the
+# replica one only when DATABASE_REPLICA_URL is configured.
+_primary_read_session_factory: Optional[async_sessionmaker] = None
+_replica_session_factory: Optional[async_sessionmaker] = None
+_replica_retry_seconds = 30
+_replica_max_lag_seconds = 0.0
+_replica_unavailable_until = 0.0
+
+T = TypeVar("T")
+
+# Seconds the replica is behind the primary; 0 while it has replayed
+# everything it received, NULL when the server is not a standby.
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END")
+
+
+def _build_connect_args(settings: Settings) -> Dict[str, Any]:
+    server_settings = {"application_name": settings.DB_APPLICATION_NAME}
+    if settings.DB_STATEMENT_TIMEOUT_MS is not None:
+        server_settings["statement_timeout"] = str(
+            settings.DB_STATEMENT_TIMEOUT_MS)
+    if settings.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS is not None:
+        server_settings["idle_in_transaction_session_timeout"] = str(
+            settings.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS)
+    return {
+        # asyncpg's own per-connection statement cache
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        # SQLAlchemy adaptor cache of prepared statements
+        "prepared_statement_cache_size":
+        settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        "server_settings": server_settings,
+    }
+
+
+def _build_pool_kwargs(settings: Settings) -> Dict[str, Any]:
+    return {
+        "poolclass": InstrumentedAsyncPool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+class PrimarySession(Session):
+    """Sync session behind the app's read-write sessions.
+
+    Session event listeners attach to this class so they do not fire for
+    replica, read-only or migration sessions.
+    """
+
+
+def _asyncpg_url(url: str) -> str:
+    for prefix in ("postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+def _make_read_session_factory(engine) -> async_sessionmaker:
+    return async_sessionmaker(
+        bind=engine.execution_options(postgresql_readonly=True),
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False,
+    )
+
+
+def _init_read_replica(settings: Settings) -> None:
+    global replica_engine, _replica_session_factory, _replica_retry_seconds
+    global _replica_max_lag_seconds
+
+    _replica_retry_seconds = settings.DB_REPLICA_RETRY_SECONDS
+    _replica_max_lag_seconds = settings.DB_REPLICA_MAX_LAG_SECONDS
+    if not settings.DATABASE_REPLICA_URL or replica_engine is not None:
+        return
+    connect_args = _build_connect_args(settings)
+    connect_args["timeout"] = settings.DB_REPLICA_CONNECT_TIMEOUT_SECONDS
+    replica_engine = create_async_engine(
+        _asyncpg_url(settings.DATABASE_REPLICA_URL),
+        echo=False,
+        connect_args=connect_args,
+        **_build_pool_kwargs(settings),
+    )
+    _replica_session_factory = _make_read_session_factory(replica_engine)
+    logging.info("Read replica engine configured for reporting queries.")
 
 
 def init_db_connection(settings: Settings) -> sessionmaker:
-    global async_engine
+    global async_engine, _primary_read_session_factory
 
     if async_engine is None:
         logging.info(
@@ -19,12 +123,23 @@ def init_db_connection(settings: Settings) -> sessionmaker:
         async_engine = create_async_engine(
             settings.DATABASE_URL,
             echo=False,
-            pool_pre_ping=True,
+            connect_args=_build_connect_args(settings),
+            **_build_pool_kwargs(settings),
         )
+        logging.info(
+            f"DB pool configured: size={settings.DB_POOL_SIZE}, "
+            f"max_overflow={settings.DB_MAX_OVERFLOW}, "
+            f"timeout={settings.DB_POOL_TIMEOUT_SECONDS}s, "
+            f"recycle={settings.DB_POOL_RECYCLE_SECONDS}s")
+
+    if _primary_read_session_factory is None:
+        _primary_read_session_factory = _make_read_session_factory(async_engine)
+    _init_read_replica(settings)
 
     local_async_session_factory = async_sessionmaker(
         bind=async_engine,
         class_=AsyncSession,
+        sync_session_class=PrimarySession,
         expire_on_commit=False,
         autocommit=False,
         autoflush=False,
@@ -35,6 +150,86 @@ def init_db_connection(settings: Settings) -> sessionmaker:
     return local_async_session_factory
 
 
+def get_db_pool_stats() -> Dict[str, Any]:
+    return get_pool_stats(async_engine)
+
+
+def enable_query_timing(observe: QueryObserver) -> None:
+    """Time every statement on the primary and replica engines."""
+    for engine in (async_engine, replica_engine):
+        if engine is not None:
+            install_query_timing(engine.sync_engine, observe)
+
+
+def enable_query_budget(repeat_threshold: int, strict: bool) -> None:
+    """Count statements per unit of work (``query_scope``) on both engines."""
+    for engine in (async_engine, replica_engine):
+        if engine is not None:
+            install_query_budget(engine.sync_engine, repeat_threshold, strict)
+
+
+def _mark_replica_unavailable(reason: Any) -> None:
+    global _replica_unavailable_until
+
+    _replica_unavailable_until = time.monotonic() + _replica_retry_seconds
+    logging.warning(
+        f"Read replica unavailable, using primary for {_replica_retry_seconds}s: {reason}"
+    )
+
+
+async def _open_replica_session() -> Optional[AsyncSession]:
+    if (_replica_session_factory is None
+            or time.monotonic() < _replica_unavailable_until):
+        return None
+    session = _replica_session_factory()
+    try:
+        # Check out a connection up front so an unreachable replica is
+        # detected here and not in the middle of a report.
+        if _replica_max_lag_seconds > 0:
+            lag = (await session.execute(_REPLICA_LAG_SQL)).scalar()
+            if lag is not None and float(lag) > _replica_max_lag_seconds:
+                await session.close()
+                _mark_replica_unavailable(
+                    f"{float(lag):.1f}s behind (max {_replica_max_lag_seconds:g}s)")
+                return None
+        else:
+            await session.connection()
+    except (OSError, asyncio.TimeoutError, SQLAlchemyError) as e:
+        await session.close()
+        _mark_replica_unavailable(e)
+        return None
+    return session
+
+
+def _open_primary_read_session() -> AsyncSession:
+    if _primary_read_session_factory is None:
+        raise RuntimeError(
+            "Read session factory is not initialized. Call init_db_connection first."
+        )
+    return _primary_read_session_factory()
+
+
+async def run_read_only(work: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    """Run ``work`` in a read-only session and return its result.
+
+    Served by the read replica when one is configured, reachable and not
+    lagging; if the replica fails while ``work`` runs, it is marked
+    unavailable and ``work`` runs again on the primary. ``work`` must
+    therefore only read.
+    """
+    session = await _open_replica_session()
+    if session is not None:
+        try:
+            return await work(session)
+        except (DBAPIError, OSError, asyncio.TimeoutError) as e:
+            _mark_replica_unavailable(e)
+        finally:
+            await session.close()
+
+    async with _open_primary_read_session() as session:
+        return await work(session)
+
+
 async def get_async_session(session_factory: sessionmaker) -> AsyncSession:
 
     if session_factory is None:
@@ -61,12 +256,24 @@ async def init_db(settings: Settings, session_factory: sessionmaker):
             "async_engine is not initialized. Call init_db_connection and get session_factory first."
         )
 
-    async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        await conn.run_sync(run_database_migrations)
-    logging.info(
-        "PostgreSQL database initialized/checked successfully using SQLAlchemy."
-    )
+    fingerprint = schema_fingerprint(Base.metadata)
+    async with async_engine.connect() as conn:
+        stored_fingerprint = await conn.run_sync(read_schema_fingerprint)
+    if stored_fingerprint == fingerprint and not settings.DB_FORCE_SCHEMA_UPGRADE:
+        logging.info(
+            f"Database schema unchanged ({fingerprint[:12]}); skipping create_all and migrations."
+        )
+    else:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(run_database_migrations)
+            await conn.run_sync(store_schema_fingerprint, fingerprint)
+        logging.info(
+            f"PostgreSQL database initialized/checked successfully using SQLAlchemy "
+            f"(schema {fingerprint[:12]})."
+        )
+
+    await maintain_message_log_partitions(settings)
 
     async with session_factory() as session:
         from .dal.panel_sync_dal import get_panel_sync_status, update_panel_sync_status
@@ -85,3 +292,16 @@ async def init_db(settings: Settings, session_factory: sessionmaker):
             logging.error(
                 f"Failed to initialize PanelSyncStatus: {e_sync_init}",
                 exc_info=True)
+
+
+async def maintain_message_log_partitions(settings: Settings) -> None:
+    """Pre-create upcoming message log partitions and drop expired ones."""
+    if async_engine is None:
+        raise RuntimeError("async_engine is not initialized.")
+
+    async with async_engine.begin() as conn:
+        await conn.run_sync(ensure_message_log_partitions,
+                            settings.MESSAGE_LOGS_PARTITIONS_AHEAD)
+        if settings.MESSAGE_LOGS_RETENTION_MONTHS > 0:
+            await conn.run_sync(drop_expired_message_log_partitions,
+                                settings.MESSAGE_LOGS_RETENTION_MONTHS)
@@ -0,0 +1,171 @@
+import logging
+import re
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+MESSAGE_LOGS_TABLE = "message_logs"
+DEFAULT_PARTITION = f"{MESSAGE_LOGS_TABLE}_default"
+_PARTITION_NAME_RE = re.compile(rf"^{MESSAGE_LOGS_TABLE}_p(\d{{4}})(\d{{2}})$")
+
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc) if value.tzinfo else value.replace(
+        tzinfo=timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def shift_months(value: datetime, months: int) -> datetime:
+    """Move a month-start datetime by a number of whole months."""
+    index = value.year * 12 + (value.month - 1) + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{MESSAGE_LOGS_TABLE}_p{month.year:04d}{month.month:02d}"
+
+
+def is_partitioned(connection: Connection) -> bool:
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table_name)"),
+        {"table_name": MESSAGE_LOGS_TABLE},
+    ).scalar()
+    return relkind == "p"
+
+
+def list_monthly_partitions(connection: Connection) -> List[Tuple[str, datetime]]:
+    rows = connection.execute(
+        text(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.oid = to_regclass(:table_name)
+            """
+        ),
+        {"table_name": MESSAGE_LOGS_TABLE},
+    )
+    partitions: List[Tuple[str, datetime]] = []
+    for (name,) in rows:
+        match = _PARTITION_NAME_RE.match(name)
+        if match:
+            partitions.append(
+                (name,
+                 datetime(int(match.group(1)), int(match.group(2)), 1,
+                          tzinfo=timezone.utc)))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+def _default_partition_has_rows(connection: Connection, month: datetime,
+                                upper: datetime) -> bool:
+    exists = connection.execute(
+        text("SELECT to_regclass(:name) IS NOT NULL"),
+        {"name": DEFAULT_PARTITION},
+    ).scalar()
+    if not exists:
+        return False
+    return bool(connection.execute(
+        text(
+            f'SELECT EXISTS (SELECT 1 FROM "{DEFAULT_PARTITION}" '
+            "WHERE timestamp >= :lower AND timestamp < :upper)"
+        ),
+        {"lower": month, "upper": upper},
+    ).scalar())
+
+
+def create_month_partition(connection: Connection, month: datetime) -> None:
+    """Create the partition for ``month``.
+
+    Postgres refuses ``CREATE TABLE ... PARTITION OF`` while the default
+    partition holds rows of that range, e.g. logs written before the month
+    was pre-created. Those rows are moved into a standalone table that is
+    then attached as the month's partition.
+    """
+    month = month_start(month)
+    upper = shift_months(month, 1)
+    name = partition_name(month)
+    bounds = f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+    if not _default_partition_has_rows(connection, month, upper):
+        connection.execute(
+            text(f'CREATE TABLE IF NOT EXISTS "{name}" '
+                 f"PARTITION OF {MESSAGE_LOGS_TABLE} {bounds}"))
+        return
+
+    connection.execute(
+        text(f'CREATE TABLE "{name}" '
+             f"(LIKE {MESSAGE_LOGS_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = connection.execute(
+        text(
+            f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" '
+            "WHERE timestamp >= :lower AND timestamp < :upper RETURNING *) "
+            f'INSERT INTO "{name}" SELECT * FROM moved'
+        ),
+        {"lower": month, "upper": upper},
+    ).rowcount
+    connection.execute(
+        text(f'ALTER TABLE {MESSAGE_LOGS_TABLE} ATTACH PARTITION "{name}" {bounds}'))
+    logging.info(
+        "Message log partitions: moved %s row(s) from %s into new partition %s.",
+        moved, DEFAULT_PARTITION, name)
+
+
+def ensure_message_log_partitions(connection: Connection,
+                                  months_ahead: int,
+                                  since: Optional[datetime] = None) -> int:
+    """Create monthly partitions from ``since`` (default: current month) up to
+    ``months_ahead`` months in the future plus the catch-all default partition.
+
+    Returns the number of monthly partitions that did not exist before.
+    """
+    if not is_partitioned(connection):
+        logging.warning(
+            "Message log partitions: %s is not partitioned, skipping maintenance.",
+            MESSAGE_LOGS_TABLE)
+        return 0
+
+    existing = {name for name, _ in list_monthly_partitions(connection)}
+    current = month_start(datetime.now(timezone.utc))
+    month = month_start(since) if since else current
+    last = shift_months(current, max(months_ahead, 0))
+    created = 0
+    while month <= last:
+        if partition_name(month) not in existing:
+            create_month_partition(connection, month)
+            created += 1
+        month = shift_months(month, 1)
+
+    connection.execute(
+        text(f'CREATE TABLE IF NOT EXISTS "{DEFAULT_PARTITION}" '
+             f"PARTITION OF {MESSAGE_LOGS_TABLE} DEFAULT"))
+    if created:
+        logging.info("Message log partitions: created %s new partition(s).",
+                     created)
+    return created
+
+
+def drop_expired_message_log_partitions(connection: Connection,
+                                        retention_months: int) -> List[str]:
+    """Drop whole monthly partitions older than the retention window.
+
+    The current month is always kept, so ``retention_months=1`` keeps the
+    current and the previous month.
+    """
+    if retention_months <= 0 or not is_partitioned(connection):
+        return []
+
+    cutoff = shift_months(month_start(datetime.now(timezone.utc)),
+                          -retention_months)
+    dropped: List[str] = []
+    for name, month in list_monthly_partitions(connection):
+        if month >= cutoff:
+            continue
+        connection.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+        dropped.append(name)
+    if dropped:
+        logging.info(
+            "Message log partitions: dropped %s partition(s) past retention: %s",
+            len(dropped), ", ".join(dropped))
+    return dropped
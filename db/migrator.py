@@ -1,10 +1,14 @@
+import hashlib
 import logging
 from dataclasses import dataclass
-from typing import Callable, List, Set
+from typing import Callable, List, Optional, Set
 
-from sqlalchemy import inspect, text
+from sqlalchemy import MetaData, inspect, text
 from sqlalchemy.engine import Connection
 
+from .log_partitions import ensure_message_log_partitions, is_partitioned
+from .models import MessageLog
+
 
 @dataclass(frozen=True)
 class Migration:
@@ -112,6 +116,116 @@ def _migration_0003_normalize_referral_codes(connection: Connection) -> None:
         )
     )
 
+
+def _migration_0004_add_keyset_pagination_indexes(connection: Connection) -> None:
+    statements = [
+        """
+        CREATE INDEX IF NOT EXISTS ix_message_logs_timestamp_log_id
+        ON message_logs (timestamp DESC, log_id DESC)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS ix_users_registration_date_user_id
+        ON users (registration_date DESC, user_id DESC)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS ix_promo_codes_created_at_id
+        ON promo_codes (created_at DESC, promo_code_id DESC)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS ix_ad_campaigns_created_at_id
+        ON ad_campaigns (created_at DESC, ad_campaign_id DESC)
+        """,
+    ]
+    for stmt in statements:
+        connection.execute(text(stmt))
+
+
+_MESSAGE_LOG_COLUMNS = (
+    "log_id, user_id, telegram_username, telegram_first_name, event_type, "
+    "content, raw_update_preview, timestamp, is_admin_event, target_user_id"
+)
+
+
+def _migration_0005_partition_message_logs(connection: Connection) -> None:
+    if is_partitioned(connection):
+        ensure_message_log_partitions(connection, months_ahead=2)
+        return
+
+    # Move the plain table (with its indexes and id sequence) out of the way so
+    # the partitioned table can be created under the original names.
+    connection.execute(text("ALTER TABLE message_logs RENAME TO message_logs_legacy"))
+    legacy_indexes = connection.execute(
+        text(
+            """
+            SELECT indexname FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = 'message_logs_legacy'
+            """
+        )
+    ).scalars().all()
+    for index_name in legacy_indexes:
+        connection.execute(
+            text(f'ALTER INDEX "{index_name}" RENAME TO "{(index_name + "_legacy")[:63]}"')
+        )
+    connection.execute(
+        text(
+            "ALTER SEQUENCE IF EXISTS message_logs_log_id_seq "
+            "RENAME TO message_logs_legacy_log_id_seq"
+        )
+    )
+
+    MessageLog.__table__.create(connection)
+    oldest = connection.execute(
+        text("SELECT MIN(timestamp) FROM message_logs_legacy")
+    ).scalar()
+    ensure_message_log_partitions(connection, months_ahead=2, since=oldest)
+
+    select_columns = _MESSAGE_LOG_COLUMNS.replace(
+        "timestamp,", "COALESCE(timestamp, NOW()),"
+    )
+    connection.execute(
+        text(
+            f"INSERT INTO message_logs ({_MESSAGE_LOG_COLUMNS}) "
+            f"SELECT {select_columns} FROM message_logs_legacy"
+        )
+    )
+    connection.execute(
+        text(
+            """
+            SELECT setval(
+                pg_get_serial_sequence('message_logs', 'log_id'),
+                COALESCE((SELECT MAX(log_id) FROM message_logs), 0) + 1,
+                false
+            )
+            """
+        )
+    )
+    connection.execute(text("DROP TABLE message_logs_legacy"))
+
+
+def _migration_0006_add_panel_link_verified_at(connection: Connection) -> None:
+    inspector = inspect(connection)
+    columns: Set[str] = {col["name"] for col in inspector.get_columns("users")}
+    if "panel_link_verified_at" not in columns:
+        connection.execute(
+            text("ALTER TABLE users ADD COLUMN panel_link_verified_at TIMESTAMPTZ")
+        )
+
+
+def _migration_0007_add_extension_job_lease(connection: Connection) -> None:
+    inspector = inspect(connection)
+    columns: Set[str] = {
+        col["name"] for col in inspector.get_columns("subscription_extension_jobs")
+    }
+    if "locked_by" not in columns:
+        connection.execute(
+            text("ALTER TABLE subscription_extension_jobs ADD COLUMN locked_by VARCHAR(64)")
+        )
+    if "locked_until" not in columns:
+        connection.execute(
+            text("ALTER TABLE subscription_extension_jobs ADD COLUMN locked_until TIMESTAMPTZ")
+        )
+
+
 MIGRATIONS: List[Migration] = [
     Migration(
         id="0001_add_channel_subscription_fields",
@@ -128,6 +242,26 @@ MIGRATIONS: List[Migration] = [
         description="Normalize referral codes to uppercase for consistent lookups",
         upgrade=_migration_0003_normalize_referral_codes,
     ),
+    Migration(
+        id="0004_add_keyset_pagination_indexes",
+        description="Add (timestamp, id) indexes backing keyset pagination in admin lists",
+        upgrade=_migration_0004_add_keyset_pagination_indexes,
+    ),
+    Migration(
+        id="0005_partition_message_logs",
+        description="Convert message_logs into a monthly range-partitioned table and move existing rows",
+        upgrade=_migration_0005_partition_message_logs,
+    ),
+    Migration(
+        id="0006_add_panel_link_verified_at",
+        description="Remember when a user's panel UUID was last verified against the panel",
+        upgrade=_migration_0006_add_panel_link_verified_at,
+    ),
+    Migration(
+        id="0007_add_extension_job_lease",
+        description="Let one worker at a time push a subscription extension job to the panel",
+        upgrade=_migration_0007_add_extension_job_lease,
+    ),
 ]
 
 
@@ -170,3 +304,61 @@ def run_database_migrations(connection: Connection) -> None:
             raise exc
         else:
             logging.info("Migrator: migration %s applied successfully", migration.id)
+
+
+def schema_fingerprint(metadata: MetaData) -> str:
+    """Hash of the model tables and the migration list.
+
+    Adding a table, column, index, constraint or migration changes it, so an
+    unchanged fingerprint means create_all and the migrations have nothing to do.
+    """
+    digest = hashlib.sha256()
+    for migration in MIGRATIONS:
+        digest.update(f"migration {migration.id}\n".encode())
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        digest.update(f"table {table.name}\n".encode())
+        for column in table.columns:
+            digest.update(
+                f"column {column.name} {column.type!r} {column.nullable}\n".encode())
+        # Indexes and constraints are sets, often unnamed: sort their descriptions
+        entries = [f"index {index.name} {[c.name for c in index.columns]} {index.unique}"
+                   for index in table.indexes]
+        entries.extend(f"constraint {type(constraint).__name__} {constraint.name} "
+                       f"{sorted(c.name for c in constraint.columns)}"
+                       for constraint in table.constraints)
+        for entry in sorted(entries):
+            digest.update(f"{entry}\n".encode())
+    return digest.hexdigest()
+
+
+def read_schema_fingerprint(connection: Connection) -> Optional[str]:
+    """Fingerprint stored by the last successful schema upgrade, if any."""
+    if connection.execute(text("SELECT to_regclass('schema_version')")).scalar() is None:
+        return None
+    return connection.execute(
+        text("SELECT fingerprint FROM schema_version WHERE id = 1")
+    ).scalar()
+
+
+def store_schema_fingerprint(connection: Connection, fingerprint: str) -> None:
+    connection.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                id SMALLINT PRIMARY KEY,
+                fingerprint VARCHAR(64) NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+            """
+        )
+    )
+    connection.execute(
+        text(
+            """
+            INSERT INTO schema_version (id, fingerprint) VALUES (1, :fingerprint)
+            ON CONFLICT (id) DO UPDATE
+                SET fingerprint = EXCLUDED.fingerprint, updated_at = NOW()
+            """
+        ),
+        {"fingerprint": fingerprint},
+    )
@@ -1,8 +1,8 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Float, ForeignKey, UniqueConstraint, Text, BigInteger
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Float, ForeignKey, UniqueConstraint, Text, BigInteger, Index
 from sqlalchemy.orm import relationship, DeclarativeBase
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.sql import func
-from datetime import datetime
+from datetime import datetime, timezone
 
 
 class Base(AsyncAttrs, DeclarativeBase):
@@ -21,6 +21,8 @@ class User(Base):
                                server_default=func.now())
     is_banned = Column(Boolean, default=False)
     panel_user_uuid = Column(String, nullable=True, unique=True, index=True)
+    # When panel_user_uuid was last confirmed against the panel
+    panel_link_verified_at = Column(DateTime(timezone=True), nullable=True)
     referral_code = Column(String(16), nullable=True, unique=True, index=True)
     referred_by_id = Column(BigInteger,
                             ForeignKey("users.user_id"),
@@ -50,6 +52,11 @@ class User(Base):
         back_populates="target_user",
         cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_users_registration_date_user_id",
+              registration_date.desc(), user_id.desc()),
+    )
+
     def __repr__(self):
         return f"<User(user_id={self.user_id}, username='{self.username}')>"
 
@@ -168,6 +175,11 @@ class PromoCode(Base):
     payments_where_used = relationship("Payment",
                                        back_populates="promo_code_used")
 
+    __table_args__ = (
+        Index("ix_promo_codes_created_at_id",
+              created_at.desc(), promo_code_id.desc()),
+    )
+
 
 class PromoCodeActivation(Base):
     __tablename__ = "promo_code_activations"
@@ -192,9 +204,11 @@ class PromoCodeActivation(Base):
 
 
 class MessageLog(Base):
+    # Range-partitioned by month on ``timestamp`` (see db/log_partitions.py),
+    # so the partition key is part of the primary key.
     __tablename__ = "message_logs"
 
-    log_id = Column(Integer, primary_key=True, autoincrement=True)
+    log_id = Column(BigInteger, primary_key=True, autoincrement=True)
     user_id = Column(BigInteger,
                      ForeignKey("users.user_id"),
                      nullable=True,
@@ -205,6 +219,9 @@ class MessageLog(Base):
     content = Column(Text, nullable=True)
     raw_update_preview = Column(Text, nullable=True)
     timestamp = Column(DateTime(timezone=True),
+                       primary_key=True,
+                       nullable=False,
+                       default=lambda: datetime.now(timezone.utc),
                        server_default=func.now(),
                        index=True)
     is_admin_event = Column(Boolean, default=False)
@@ -220,6 +237,12 @@ class MessageLog(Base):
                                foreign_keys=[target_user_id],
                                back_populates="message_logs_targeted")
 
+    __table_args__ = (
+        Index("ix_message_logs_timestamp_log_id",
+              timestamp.desc(), log_id.desc()),
+        {"postgresql_partition_by": 'RANGE ("timestamp")'},
+    )
+
 
 class PanelSyncStatus(Base):
     __tablename__ = "panel_sync_status"
@@ -250,6 +273,11 @@ class AdCampaign(Base):
         cascade="all, delete-orphan",
     )
 
+    __table_args__ = (
+        Index("ix_ad_campaigns_created_at_id",
+              created_at.desc(), ad_campaign_id.desc()),
+    )
+
     def __repr__(self):
         return f"<AdCampaign(id={self.ad_campaign_id}, source='{self.source}', start_param='{self.start_param}', cost={self.cost})>"
 
@@ -264,3 +292,132 @@ class AdAttribution(Base):
 
     user = relationship("User")
     campaign = relationship("AdCampaign", back_populates="attributions")
+
+
+class InboundEvent(Base):
+    """Provider webhook stored before processing (durable inbox)."""
+    __tablename__ = "inbound_events"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    provider = Column(String(32), nullable=False)
+    event_id = Column(String(255), nullable=False)
+    event_type = Column(String(128), nullable=True)
+    # Raw request body (or a JSON document for form-encoded providers)
+    body = Column(Text, nullable=False)
+    # pending -> processing -> done; failed is retried until it becomes dead
+    status = Column(String(16), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("provider", "event_id", name="uq_inbound_events_provider_event"),
+        Index("ix_inbound_events_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<InboundEvent(id={self.id}, provider='{self.provider}', event_id='{self.event_id}', status='{self.status}')>"
+
+
+class OutboxEvent(Base):
+    """Side effect recorded in the same transaction as the change that caused it."""
+    __tablename__ = "outbox_events"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    kind = Column(String(64), nullable=False)
+    payload = Column(Text, nullable=False)
+    # Optional key that makes enqueueing the same effect twice a no-op
+    dedupe_key = Column(String(255), nullable=True)
+    # pending -> processing -> done; failed is retried until it becomes dead
+    status = Column(String(16), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("dedupe_key", name="uq_outbox_events_dedupe_key"),
+        Index("ix_outbox_events_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<OutboxEvent(id={self.id}, kind='{self.kind}', status='{self.status}')>"
+
+
+class RenewalAttempt(Base):
+    """One auto-renew charge attempt for a subscription billing cycle."""
+    __tablename__ = "renewal_attempts"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    subscription_id = Column(Integer,
+                             ForeignKey("subscriptions.subscription_id", ondelete="CASCADE"),
+                             nullable=False)
+    user_id = Column(BigInteger, nullable=False, index=True)
+    # end_date of the subscription being renewed; identifies the billing cycle
+    cycle_end_date = Column(DateTime(timezone=True), nullable=False)
+    provider = Column(String(32), nullable=False)
+    # processing -> initiated | failed
+    status = Column(String(16), nullable=False, default="processing")
+    provider_payment_id = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_renewal_attempts_subscription_cycle", "subscription_id", "cycle_end_date"),
+    )
+
+    def __repr__(self):
+        return f"<RenewalAttempt(id={self.id}, subscription_id={self.subscription_id}, status='{self.status}')>"
+
+
+class SubscriptionExtensionJob(Base):
+    """An admin-triggered extension of every active subscription by N days."""
+    __tablename__ = "subscription_extension_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    days = Column(Integer, nullable=False)
+    reason = Column(String, nullable=True)
+    created_by = Column(BigInteger, nullable=True)
+    # pending -> applied (DB updated, panel push running) -> done | completed_with_errors
+    status = Column(String(24), nullable=False, default="pending", index=True)
+    total = Column(Integer, nullable=False, default=0)
+    pushed = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    applied_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    # Lease of the worker pushing the job to the panel; one pusher at a time
+    locked_by = Column(String(64), nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<SubscriptionExtensionJob(id={self.id}, days={self.days}, status='{self.status}')>"
+
+
+class SubscriptionExtensionItem(Base):
+    """A subscription extended by a job and the state of its panel push."""
+    __tablename__ = "subscription_extension_items"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    job_id = Column(Integer,
+                    ForeignKey("subscription_extension_jobs.id", ondelete="CASCADE"),
+                    nullable=False)
+    subscription_id = Column(Integer,
+                             ForeignKey("subscriptions.subscription_id", ondelete="CASCADE"),
+                             nullable=False)
+    panel_user_uuid = Column(String, nullable=False)
+    # pending -> sending -> done | failed; sending/failed are re-pushed with an absolute expireAt
+    status = Column(String(16), nullable=False, default="pending")
+
+    __table_args__ = (
+        Index("ix_subscription_extension_items_job_status", "job_id", "status", "id"),
+    )
+
+    def __repr__(self):
+        return f"<SubscriptionExtensionItem(id={self.id}, job_id={self.job_id}, status='{self.status}')>"
@@ -0,0 +1,87 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+@dataclass
+class PoolWaitStats:
+    """Running totals of how long checkouts waited for a connection."""
+    checkouts: int = 0
+    timeouts: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    def record(self, waited: float, timed_out: bool) -> None:
+        self.checkouts += 1
+        self.total_wait_seconds += waited
+        if waited > self.max_wait_seconds:
+            self.max_wait_seconds = waited
+        if timed_out:
+            self.timeouts += 1
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that measures the time spent obtaining a connection.
+
+    The measured time includes waiting for a connection to be returned and
+    opening a new one when the pool grows into its overflow.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+        self._stats_lock = threading.Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            with self._stats_lock:
+                self.wait_stats.record(time.perf_counter() - started,
+                                       timed_out)
+
+    def recreate(self):
+        new_pool = super().recreate()
+        new_pool.wait_stats = self.wait_stats
+        return new_pool
+
+
+def get_pool_stats(engine: Optional[Any]) -> Dict[str, Any]:
+    """Snapshot of connection pool usage for an (async) engine."""
+    if engine is None:
+        return {}
+    pool = engine.pool
+    stats: Dict[str, Any] = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # QueuePool reports negative overflow while the pool is still filling up.
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": getattr(pool, "_max_overflow", 0),
+    }
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        checkouts = wait_stats.checkouts
+        stats.update({
+            "checkouts": checkouts,
+            "timeouts": wait_stats.timeouts,
+            "avg_wait_ms": (wait_stats.total_wait_seconds / checkouts * 1000
+                            if checkouts else 0.0),
+            "max_wait_ms": wait_stats.max_wait_seconds * 1000,
+        })
+    return stats
@@ -0,0 +1,137 @@
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from db.query_metrics import dal_caller
+
+# Problem kinds counted in ``violations``
+BUDGET_EXCEEDED = "budget_exceeded"
+IDENTICAL_STATEMENT = "identical_statement"
+REPEATED_STATEMENT = "repeated_statement"
+
+_STATEMENT_PREVIEW_CHARS = 160
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """A unit of work ran more statements than its budget (strict mode only)."""
+
+
+class QueryTally:
+    """Statements issued in one unit of work: an update, a webhook request..."""
+
+    def __init__(self, name: str, budget: int, parent: Optional["QueryTally"] = None):
+        self.name = name
+        self.budget = budget
+        self.parent = parent
+        self.closed = False
+        self.total = 0
+        self.callers: Counter = Counter()
+        # statement text -> {parameters repr -> count}
+        self.statements: Dict[str, Counter] = {}
+
+    def record(self, statement: str, parameters: str, caller: str) -> None:
+        tally: Optional[QueryTally] = self
+        while tally is not None:
+            # Tasks spawned inside a unit inherit it and may outlive it
+            if not tally.closed:
+                tally.total += 1
+                tally.callers[caller] += 1
+                tally.statements.setdefault(statement, Counter())[parameters] += 1
+            tally = tally.parent
+
+    def problems(self, repeat_threshold: int) -> List[Tuple[str, str]]:
+        """``(kind, description)`` of everything worth flagging in this unit."""
+        found: List[Tuple[str, str]] = []
+        if 0 < self.budget < self.total:
+            top = ", ".join(f"{caller}={count}"
+                            for caller, count in self.callers.most_common(5))
+            found.append((BUDGET_EXCEEDED,
+                          f"{self.total} statements, budget {self.budget} ({top})"))
+        for statement, by_parameters in self.statements.items():
+            preview = " ".join(statement.split())[:_STATEMENT_PREVIEW_CHARS]
+            identical = max(by_parameters.values())
+            if identical > 1:
+                found.append((IDENTICAL_STATEMENT,
+                              f"same statement and parameters x{identical}: {preview}"))
+            if 0 < repeat_threshold <= len(by_parameters):
+                found.append((REPEATED_STATEMENT,
+                              f"statement run for {len(by_parameters)} parameter sets "
+                              f"(possible N+1): {preview}"))
+        return found
+
+
+class _QueryBudgetState:
+
+    def __init__(self, repeat_threshold: int, strict: bool):
+        self.repeat_threshold = repeat_threshold
+        self.strict = strict
+
+
+_state: Optional[_QueryBudgetState] = None
+_current_tally: ContextVar[Optional[QueryTally]] = ContextVar("query_budget_tally",
+                                                              default=None)
+# (kind, unit name) -> occurrences since the last take_violations()
+violations: Counter = Counter()
+
+
+def install_query_budget(engine: Engine, repeat_threshold: int,
+                         strict: bool) -> None:
+    """Count the statements on ``engine`` into the current ``query_scope``.
+
+    ``engine`` is the sync engine (``AsyncEngine.sync_engine`` for asyncio).
+    The context variable reaches SQLAlchemy's greenlet, so the listener sees
+    the unit of work of the coroutine that awaited the query.
+    """
+    global _state
+    _state = _QueryBudgetState(repeat_threshold, strict)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                               executemany):
+        tally = _current_tally.get()
+        if tally is not None:
+            tally.record(statement, repr(parameters), dal_caller())
+
+
+def _report(tally: QueryTally, state: _QueryBudgetState) -> None:
+    problems = tally.problems(state.repeat_threshold)
+    for kind, description in problems:
+        violations[(kind, tally.name)] += 1
+        logging.warning(f"Query budget: {tally.name}: {description}")
+    if state.strict and any(kind == BUDGET_EXCEEDED for kind, _ in problems):
+        raise QueryBudgetExceeded(
+            f"{tally.name} ran {tally.total} statements (budget {tally.budget})")
+
+
+@contextmanager
+def query_scope(name: str, budget: int) -> Iterator[Optional[QueryTally]]:
+    """Count the statements of one unit of work and flag it when it is over budget.
+
+    Does nothing unless ``install_query_budget`` ran. Scopes nest: a
+    statement counts towards every enclosing scope. In strict mode an
+    exceeded budget raises QueryBudgetExceeded when the scope ends.
+    """
+    state = _state
+    if state is None:
+        yield None
+        return
+    tally = QueryTally(name, budget, parent=_current_tally.get())
+    token = _current_tally.set(tally)
+    try:
+        yield tally
+    finally:
+        _current_tally.reset(token)
+        tally.closed = True
+    _report(tally, state)
+
+
+def take_violations() -> Counter:
+    """Violations recorded so far, clearing the counter."""
+    taken = Counter(violations)
+    violations.clear()
+    return taken
@@ -0,0 +1,54 @@
+import sys
+import time
+from typing import Callable, Optional
+
+import greenlet
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QueryObserver = Callable[[str, float], None]
+
+_DAL_PREFIX = "db.dal."
+_MAX_FRAMES = 80
+
+
+def dal_caller() -> str:
+    """``<dal module>.<function>`` that issued the statement being executed.
+
+    With the async engine the statement runs in a greenlet whose own stack
+    stops at SQLAlchemy internals; the awaiting coroutines (DAL function,
+    service, handler) are on the parent greenlet's suspended stack.
+    """
+    current = greenlet.getcurrent()
+    frame = sys._getframe(2)
+    glet: Optional[greenlet.greenlet] = current
+    seen = 0
+    while glet is not None and seen < _MAX_FRAMES:
+        while frame is not None and seen < _MAX_FRAMES:
+            module = frame.f_globals.get("__name__", "")
+            if module.startswith(_DAL_PREFIX):
+                return f"{module[len(_DAL_PREFIX):]}.{frame.f_code.co_name}"
+            frame = frame.f_back
+            seen += 1
+        glet = glet.parent
+        frame = glet.gr_frame if glet is not None else None
+    return "other"
+
+
+def install_query_timing(engine: Engine, observe: QueryObserver) -> None:
+    """Report the execution time of every statement on ``engine`` to ``observe``.
+
+    ``engine`` is the sync engine (``AsyncEngine.sync_engine`` for asyncio).
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                               executemany):
+        context._query_timing = (time.perf_counter(), dal_caller())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                              executemany):
+        started = getattr(context, "_query_timing", None)
+        if started is not None:
+            observe(started[1], time.perf_counter() - started[0])
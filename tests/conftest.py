@@ -0,0 +1,71 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, TypeVar
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
+                                    create_async_engine)
+from sqlalchemy.pool import NullPool
+
+# config.settings refuses to load without a bot token
+os.environ.setdefault("BOT_TOKEN", "test-token")
+
+T = TypeVar("T")
+
+# DAL tests need Postgres (ON CONFLICT, SKIP LOCKED, NULLS FIRST, ...). Every
+# table of that database is emptied before each test, so point this at a
+# database used for nothing else.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+class PostgresDatabase:
+    """Runs test scenarios against TEST_DATABASE_URL with the app's session setup."""
+
+    def __init__(self, url: str):
+        from db.database_setup import _asyncpg_url
+
+        self.url = _asyncpg_url(url)
+
+    def run(self, scenario: Callable[[async_sessionmaker], Awaitable[T]]) -> T:
+        return asyncio.run(self._run(scenario))
+
+    async def _run(self, scenario: Callable[[async_sessionmaker], Awaitable[T]]) -> T:
+        from db.database_setup import PrimarySession
+        from db.models import Base
+
+        engine = create_async_engine(self.url, poolclass=NullPool)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                tables = ", ".join(f'"{table.name}"'
+                                   for table in Base.metadata.sorted_tables)
+                await conn.execute(
+                    text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+            session_factory = async_sessionmaker(
+                bind=engine,
+                class_=AsyncSession,
+                sync_session_class=PrimarySession,
+                expire_on_commit=False,
+                autoflush=False,
+            )
+            return await scenario(session_factory)
+        finally:
+            await engine.dispose()
+
+
+@pytest.fixture
+def pg() -> PostgresDatabase:
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    return PostgresDatabase(TEST_DATABASE_URL)
+
+
+@pytest.fixture
+def make_settings():
+    from config.settings import Settings
+
+    def build(**overrides: Any):
+        return Settings(**overrides)
+
+    return build
@@ -0,0 +1,62 @@
+import pytest
+
+from bot.utils import circuit_breaker
+from bot.utils.circuit_breaker import (STATE_CLOSED, STATE_HALF_OPEN,
+                                       STATE_OPEN, CircuitBreaker)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_threshold_consecutive_failures(clock):
+    breaker = CircuitBreaker("panel", failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # resets the streak
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == STATE_CLOSED
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    assert breaker.times_opened == 1
+    assert not breaker.allow()
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = CircuitBreaker("panel", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow()
+    assert breaker.state == STATE_HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+    assert breaker.allow()
+
+
+def test_half_open_probe_failure_reopens(clock):
+    breaker = CircuitBreaker("panel", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    assert breaker.times_opened == 2
+    clock[0] += 29
+    assert not breaker.allow()
+    clock[0] += 1
+    assert breaker.allow()
+
+
+def test_lost_probe_only_blocks_for_reset_timeout(clock):
+    breaker = CircuitBreaker("panel", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow()  # probe never reports back
+    clock[0] += 30
+    assert breaker.allow()
@@ -0,0 +1,24 @@
+from bot.utils.http_transport import HttpTransport, endpoint_label, parse_timeouts
+
+
+def test_parse_timeouts_skips_bad_entries():
+    assert parse_timeouts(" Panel:45, payment:7.5,broken,zero:0,:3,x:abc") == {
+        "panel": 45.0,
+        "payment": 7.5,
+    }
+    assert parse_timeouts(None) == {}
+
+
+def test_configured_timeouts_override_defaults(make_settings):
+    transport = HttpTransport(make_settings(HTTP_TIMEOUTS="payment:5"))
+    assert transport.timeout("payment").total == 5.0
+    assert transport.timeout("panel").total == 30.0
+    # Unknown operations get the panel timeout
+    assert transport.timeout("other").total == 30.0
+
+
+def test_endpoint_label_hides_record_ids():
+    assert endpoint_label(
+        "/api/users/0b5c7a52-8d0e-4a55-9a6f-1c2b3d4e5f60/reset") == "/api/users/:id/reset"
+    assert endpoint_label("/api/users/42") == "/api/users/:id"
+    assert endpoint_label("/api/system/stats") == "/api/system/stats"
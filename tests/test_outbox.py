@@ -0,0 +1,156 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+
+from bot.services.outbox_service import OutboxService
+from db.dal.outbox_dal import (STATUS_DEAD, STATUS_DONE, STATUS_FAILED,
+                               STATUS_PENDING, STATUS_PROCESSING,
+                               claim_due_effects, enqueue_effect)
+from db.models import OutboxEvent
+
+
+def _outbox(session_factory, make_settings) -> OutboxService:
+    settings = make_settings(OUTBOX_MAX_ATTEMPTS=3,
+                             OUTBOX_RETRY_BASE_SECONDS=5,
+                             OUTBOX_RETRY_MAX_SECONDS=8)
+    return OutboxService(settings, session_factory)
+
+
+async def _add_effect(session_factory, *, kind="notify", status=STATUS_PENDING,
+                      attempts=0, next_attempt_at=None, locked_until=None) -> int:
+    now = datetime.now(timezone.utc)
+    effect = OutboxEvent(kind=kind, payload=json.dumps({"user_id": 1}),
+                         status=status, attempts=attempts,
+                         next_attempt_at=next_attempt_at or now - timedelta(seconds=1),
+                         locked_until=locked_until)
+    async with session_factory() as session:
+        session.add(effect)
+        await session.commit()
+    return effect.id
+
+
+async def _effect(session_factory, row_id) -> OutboxEvent:
+    async with session_factory() as session:
+        return await session.get(OutboxEvent, row_id)
+
+
+async def _kinds(session_factory):
+    async with session_factory() as session:
+        result = await session.execute(
+            select(OutboxEvent.kind, func.count()).group_by(OutboxEvent.kind))
+        return dict(result.all())
+
+
+def test_enqueue_dedupes_and_wakes_dispatcher_on_commit(pg, make_settings):
+
+    async def scenario(session_factory):
+        outbox = _outbox(session_factory, make_settings)
+        outbox._listen()
+        try:
+            async with session_factory() as session:
+                first = await enqueue_effect(session, "notify", {"a": 1},
+                                             dedupe_key="payment:1:notify")
+                await session.rollback()
+            # Rolled back: nothing stored and nobody woken
+            assert not outbox._wakeup.is_set()
+
+            async with session_factory() as session:
+                first = await enqueue_effect(session, "notify", {"a": 1},
+                                             dedupe_key="payment:1:notify")
+                again = await enqueue_effect(session, "notify", {"a": 2},
+                                             dedupe_key="payment:1:notify")
+                assert not outbox._wakeup.is_set()
+                await session.commit()
+            assert first is not None and again is None
+            assert outbox._wakeup.is_set()
+        finally:
+            outbox._unlisten()
+        return await _kinds(session_factory)
+
+    assert pg.run(scenario) == {"notify": 1}
+
+
+def test_claim_leases_due_effects(pg):
+
+    async def scenario(session_factory):
+        now = datetime.now(timezone.utc)
+        pending = await _add_effect(session_factory)
+        await _add_effect(session_factory, status=STATUS_FAILED, attempts=1,
+                          next_attempt_at=now + timedelta(minutes=1))
+        abandoned = await _add_effect(session_factory, status=STATUS_PROCESSING,
+                                      attempts=1,
+                                      locked_until=now - timedelta(seconds=1))
+        await _add_effect(session_factory, status=STATUS_PROCESSING, attempts=1,
+                          locked_until=now + timedelta(minutes=1))
+        await _add_effect(session_factory, status=STATUS_DEAD)
+
+        async with session_factory() as session:
+            effects = await claim_due_effects(session, limit=10, lease_seconds=30)
+            await session.commit()
+        assert sorted(effect.id for effect in effects) == [pending, abandoned]
+        assert (await _effect(session_factory, abandoned)).attempts == 2
+        assert (await _effect(session_factory, pending)).locked_until > now + timedelta(seconds=20)
+
+    pg.run(scenario)
+
+
+def test_handler_writes_commit_with_completion_mark(pg, make_settings):
+
+    async def handler(session, payload):
+        await enqueue_effect(session, "follow_up", payload)
+
+    async def scenario(session_factory):
+        outbox = _outbox(session_factory, make_settings)
+        outbox.register_handler("notify", handler)
+        effect_id = await _add_effect(session_factory, status=STATUS_PROCESSING,
+                                      attempts=1)
+        await outbox._process(await _effect(session_factory, effect_id))
+        assert (await _effect(session_factory, effect_id)).status == STATUS_DONE
+        return await _kinds(session_factory)
+
+    assert pg.run(scenario) == {"notify": 1, "follow_up": 1}
+
+
+def test_failed_handler_rolls_back_and_retries_with_backoff(pg, make_settings):
+
+    async def handler(session, payload):
+        await enqueue_effect(session, "follow_up", payload)
+        raise RuntimeError("telegram down")
+
+    async def scenario(session_factory):
+        outbox = _outbox(session_factory, make_settings)
+        outbox.register_handler("notify", handler)
+        for attempts, delay in [(1, 5), (2, 8)]:  # 10s is capped at 8s
+            effect_id = await _add_effect(session_factory, status=STATUS_PROCESSING,
+                                          attempts=attempts)
+            before = datetime.now(timezone.utc)
+            await outbox._process(await _effect(session_factory, effect_id))
+            effect = await _effect(session_factory, effect_id)
+            assert effect.status == STATUS_FAILED
+            assert effect.last_error == "RuntimeError: telegram down"
+            retry_in = (effect.next_attempt_at - before).total_seconds()
+            assert delay - 1 <= retry_in <= delay + 1
+
+        effect_id = await _add_effect(session_factory, status=STATUS_PROCESSING,
+                                      attempts=3)
+        await outbox._process(await _effect(session_factory, effect_id))
+        assert (await _effect(session_factory, effect_id)).status == STATUS_DEAD
+        return await _kinds(session_factory)
+
+    # The handler's own writes were rolled back each time
+    assert pg.run(scenario) == {"notify": 3}
+
+
+def test_unknown_kind_is_retried(pg, make_settings):
+
+    async def scenario(session_factory):
+        outbox = _outbox(session_factory, make_settings)
+        effect_id = await _add_effect(session_factory, kind="removed",
+                                      status=STATUS_PROCESSING, attempts=1)
+        await outbox._process(await _effect(session_factory, effect_id))
+        return await _effect(session_factory, effect_id)
+
+    effect = pg.run(scenario)
+    assert effect.status == STATUS_FAILED
+    assert effect.last_error.startswith("LookupError")
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import BigInteger, Column, DateTime, MetaData, Table, select
+
+from bot.utils.pagination import (PageRef, build_keyset_page, decode_cursor,
+                                  encode_cursor)
+from db.dal.pagination import SEEK_AT, SEEK_NEXT, SEEK_PREV, apply_keyset
+
+_metadata = MetaData()
+_rows = Table(
+    "test_keyset_rows",
+    _metadata,
+    Column("id", BigInteger, primary_key=True),
+    Column("created_at", DateTime(timezone=True), nullable=True),
+)
+
+PAGE_SIZE = 3
+
+
+@pytest.mark.parametrize("cursor", [
+    (datetime(2025, 3, 4, 5, 6, 7, 891011, tzinfo=timezone.utc), 42),
+    (datetime(1970, 1, 1, tzinfo=timezone.utc), 0),
+    (None, 123456789),
+])
+def test_cursor_round_trip(cursor):
+    token = encode_cursor(cursor)
+    assert ":" not in token
+    assert decode_cursor(token) == cursor
+
+
+def test_naive_timestamp_is_treated_as_utc():
+    naive = datetime(2025, 3, 4, 5, 6, 7)
+    assert decode_cursor(encode_cursor((naive, 1))) == (
+        naive.replace(tzinfo=timezone.utc), 1)
+
+
+@pytest.mark.parametrize("token", ["", "abc", "zz.", "1.!", None])
+def test_decode_rejects_garbage(token):
+    assert decode_cursor(token) is None
+
+
+def test_page_ref_token_round_trip():
+    ref = PageRef(page=3, direction=SEEK_PREV,
+                  cursor=(datetime(2025, 1, 2, tzinfo=timezone.utc), 7))
+    assert PageRef.parse(ref.token()) == ref
+    undated = PageRef(page=1, direction=SEEK_NEXT, cursor=(None, 9))
+    assert PageRef.parse(undated.token()) == undated
+
+
+@pytest.mark.parametrize("raw", [None, "", "5", "x:n:1.1", "2:q:1.1", "2:n:bad"])
+def test_page_ref_parse_falls_back_to_first_page(raw):
+    # Legacy bare page numbers and broken tokens open the first page
+    assert PageRef.parse(raw) == PageRef()
+
+
+_ROWS = [{"id": row_id, "created_at": None} for row_id in (3, 8, 11)] + [
+    # Equal timestamps make the id tie-breaker matter
+    {"id": row_id, "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc)
+     + timedelta(hours=row_id // 2)}
+    for row_id in (1, 2, 4, 5, 6, 7, 9, 10)
+]
+
+
+def _expected_order():
+    undated = sorted((r for r in _ROWS if r["created_at"] is None),
+                     key=lambda r: -r["id"])
+    dated = sorted((r for r in _ROWS if r["created_at"] is not None),
+                   key=lambda r: (r["created_at"], r["id"]), reverse=True)
+    return [r["id"] for r in undated + dated]
+
+
+def _key(row):
+    return row.created_at, row.id
+
+
+async def _load(session, ref: PageRef):
+    stmt = apply_keyset(select(_rows), _rows.c.created_at, _rows.c.id,
+                        cursor=ref.cursor, direction=ref.direction,
+                        limit=PAGE_SIZE + 1)
+    rows = list(await session.execute(stmt))
+    if ref.cursor is not None and ref.direction == SEEK_PREV:
+        rows.reverse()
+    return build_keyset_page(rows, ref, PAGE_SIZE, _key)
+
+
+def _run_with_rows(pg, scenario):
+
+    async def run(session_factory):
+        async with session_factory() as session:
+            conn = await session.connection()
+            await conn.run_sync(_metadata.drop_all)
+            await conn.run_sync(_metadata.create_all)
+            await session.execute(_rows.insert(), _ROWS)
+            try:
+                return await scenario(session)
+            finally:
+                await session.rollback()
+
+    return pg.run(run)
+
+
+def test_keyset_pages_forward_and_back_cover_every_row(pg):
+    expected = _expected_order()
+    assert expected[:3] == [11, 8, 3]
+
+    async def scenario(session):
+        pages = []
+        ref = PageRef()
+        while True:
+            page = await _load(session, ref)
+            pages.append([row.id for row in page.items])
+            if page.next_ref is None:
+                break
+            # Go through callback data like the handlers do
+            ref = PageRef.parse(page.next_ref.token())
+
+        back = []
+        while True:
+            page = await _load(session, ref)
+            back.append([row.id for row in page.items])
+            if page.prev_ref is None:
+                break
+            ref = PageRef.parse(page.prev_ref.token())
+        return pages, back
+
+    pages, back = _run_with_rows(pg, scenario)
+    assert [row_id for ids in pages for row_id in ids] == expected
+    assert back == list(reversed(pages))
+
+
+def test_seek_at_rerenders_the_same_page(pg):
+
+    async def scenario(session):
+        first = await _load(session, PageRef())
+        second = await _load(session, PageRef.parse(first.next_ref.token()))
+        assert second.anchor_ref.direction == SEEK_AT
+        again = await _load(session, PageRef.parse(second.anchor_ref.token()))
+        return [r.id for r in second.items], [r.id for r in again.items]
+
+    second, again = _run_with_rows(pg, scenario)
+    assert again == second
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from db.dal.payment_dal import (OPEN_PAYMENT_STATUSES, allowed_source_statuses,
+                                transition_payment_status)
+from db.models import Payment, User
+
+
+@pytest.mark.parametrize("status", [
+    "succeeded", "canceled", "pending", "failed", "pending_yookassa", "failed_timeout"
+])
+def test_known_statuses_come_from_open_ones(status):
+    assert allowed_source_statuses(status) == OPEN_PAYMENT_STATUSES
+
+
+def test_unknown_status_has_no_sources():
+    assert allowed_source_statuses("refunded") == ()
+
+
+class _NoQuerySession:
+
+    async def execute(self, *args, **kwargs):
+        raise AssertionError("no statement expected")
+
+
+def test_unknown_status_leaves_payment_untouched():
+    result = asyncio.run(
+        transition_payment_status(_NoQuerySession(), 1, "chargeback"))
+    assert result is None
+
+
+def _run_with_payments(pg, scenario):
+
+    async def run(session_factory):
+        async with session_factory() as session:
+            session.add(User(user_id=1))
+            await session.flush()
+            for payment_id, status in [(1, "pending_yookassa"), (2, "succeeded"),
+                                       (3, "pendingXyookassa"), (4, "active")]:
+                session.add(Payment(payment_id=payment_id, user_id=1, amount=1.0,
+                                    currency="RUB", status=status))
+            await session.commit()
+        return await scenario(session_factory)
+
+    return pg.run(run)
+
+
+async def _transition(session_factory, payment_id, new_status, **kwargs):
+    async with session_factory() as session:
+        payment = await transition_payment_status(session, payment_id,
+                                                  new_status, **kwargs)
+        await session.commit()
+        return payment
+
+
+async def _status(session_factory, payment_id):
+    async with session_factory() as session:
+        return (await session.get(Payment, payment_id)).status
+
+
+def test_open_payment_moves_once(pg):
+
+    async def scenario(session_factory):
+        payment = await _transition(session_factory, 1, "succeeded",
+                                    provider_payment_id="p-1")
+        assert payment is not None and payment.provider_payment_id == "p-1"
+        # A duplicate webhook finds the payment already final
+        assert await _transition(session_factory, 1, "succeeded") is None
+        assert await _transition(session_factory, 1, "canceled") is None
+        assert await _status(session_factory, 1) == "succeeded"
+
+    _run_with_payments(pg, scenario)
+
+
+def test_final_payment_is_not_reopened(pg):
+
+    async def scenario(session_factory):
+        assert await _transition(session_factory, 2, "pending") is None
+        assert await _transition(session_factory, 2, "failed_card_declined") is None
+        assert await _status(session_factory, 2) == "succeeded"
+
+    _run_with_payments(pg, scenario)
+
+
+def test_pending_prefix_is_matched_literally(pg):
+
+    async def scenario(session_factory):
+        # "_" in the prefix must not act as a LIKE wildcard
+        assert await _transition(session_factory, 3, "succeeded") is None
+        assert await _transition(session_factory, 4, "expired") is not None
+        assert await _transition(session_factory, 99, "succeeded") is None
+
+    _run_with_payments(pg, scenario)
+
+
+def test_concurrent_transitions_have_one_winner(pg):
+
+    async def scenario(session_factory):
+        results = await asyncio.gather(
+            _transition(session_factory, 1, "succeeded"),
+            _transition(session_factory, 1, "canceled"),
+        )
+        assert sum(result is not None for result in results) == 1
+
+    _run_with_payments(pg, scenario)
+
+
+def test_yookassa_id_is_only_filled_when_missing(pg):
+
+    async def scenario(session_factory):
+        payment = await _transition(session_factory, 1, "waiting_for_capture",
+                                    yookassa_payment_id="yk-1")
+        assert payment.yookassa_payment_id == "yk-1"
+        payment = await _transition(session_factory, 1, "succeeded",
+                                    yookassa_payment_id="yk-2")
+        assert payment.yookassa_payment_id == "yk-1"
+
+    _run_with_payments(pg, scenario)
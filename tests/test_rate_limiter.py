@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from bot.utils import rate_limiter
+from bot.utils.rate_limiter import TokenBucket, parse_rate_limits
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", fake.sleep)
+    return fake
+
+
+def test_burst_then_throttled_to_rate(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+
+    async def main():
+        for _ in range(5):
+            await bucket.acquire()
+
+    asyncio.run(main())
+    # Three tokens from the burst, then one every 1/rate seconds
+    assert clock.sleeps == [pytest.approx(0.5), pytest.approx(0.5)]
+
+
+def test_tokens_refill_while_idle(clock):
+    bucket = TokenBucket(rate=1)
+
+    async def main():
+        await bucket.acquire()
+        clock.now += 5
+        await bucket.acquire()
+
+    asyncio.run(main())
+    assert clock.sleeps == []
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_parse_rate_limits_skips_bad_entries():
+    assert parse_rate_limits(" YooKassa:5, panel:0.5,broken,zero:0,:3,x:abc") == {
+        "yookassa": 5.0,
+        "panel": 0.5,
+    }
+    assert parse_rate_limits(None) == {}
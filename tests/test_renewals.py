@@ -0,0 +1,244 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from bot.services.renewal_scheduler import (RenewalScheduler,
+                                            renewal_idempotence_key)
+from db.dal import renewal_dal
+from db.dal.renewal_dal import (STATUS_FAILED, STATUS_INITIATED,
+                                STATUS_PROCESSING, STATUS_SKIPPED,
+                                STATUS_UNKNOWN, claim_due_renewals)
+from db.models import RenewalAttempt, Subscription, User
+
+CLAIM = dict(limit=10, window_hours=24, charge_provider="yookassa",
+             max_attempts=5, retry_after_seconds=3600, lease_seconds=600)
+
+
+def test_idempotence_key_is_stable_per_cycle_and_failure_count():
+    cycle = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+    key = renewal_idempotence_key(7, cycle, 0)
+    # A charge with an unknown outcome is retried with the same key
+    assert renewal_idempotence_key(7, cycle, 0) == key
+    others = {
+        renewal_idempotence_key(7, cycle, 1),
+        renewal_idempotence_key(8, cycle, 0),
+        renewal_idempotence_key(7, cycle + timedelta(days=30), 0),
+    }
+    assert key not in others and len(others) == 3
+    assert len(key) == 36
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(microsecond=0)
+
+
+async def _add_subscription(session_factory, subscription_id, *,
+                            ends_in=timedelta(hours=2), **fields):
+    values = dict(subscription_id=subscription_id, user_id=subscription_id,
+                  panel_user_uuid=f"u-{subscription_id}",
+                  panel_subscription_uuid=f"s-{subscription_id}",
+                  end_date=_now() + ends_in, is_active=True,
+                  auto_renew_enabled=True, provider="yookassa")
+    values.update(fields)
+    async with session_factory() as session:
+        session.add(User(user_id=subscription_id))
+        await session.flush()
+        session.add(Subscription(**values))
+        await session.commit()
+    return values["end_date"]
+
+
+async def _add_attempt(session_factory, subscription_id, cycle_end_date, status,
+                       *, age):
+    stamp = _now() - age
+    async with session_factory() as session:
+        session.add(RenewalAttempt(subscription_id=subscription_id,
+                                   user_id=subscription_id,
+                                   cycle_end_date=cycle_end_date,
+                                   provider="yookassa", status=status,
+                                   started_at=stamp,
+                                   finished_at=None if status == STATUS_PROCESSING else stamp))
+        await session.commit()
+
+
+async def _claim(session_factory, **overrides):
+    async with session_factory() as session:
+        claimed = await claim_due_renewals(session, **{**CLAIM, **overrides})
+        await session.commit()
+        return claimed
+
+
+async def _claimed_ids(session_factory, **overrides):
+    return sorted(sub.subscription_id
+                  for _, sub in await _claim(session_factory, **overrides))
+
+
+def test_only_due_auto_renew_subscriptions_are_claimed(pg):
+
+    async def scenario(session_factory):
+        await _add_subscription(session_factory, 1)
+        await _add_subscription(session_factory, 2, ends_in=timedelta(days=3))
+        await _add_subscription(session_factory, 3, ends_in=timedelta(hours=-1))
+        await _add_subscription(session_factory, 4, auto_renew_enabled=False)
+        await _add_subscription(session_factory, 5, is_active=False)
+        await _add_subscription(session_factory, 6, provider="tribute")
+        await _add_subscription(session_factory, 7, provider=None)
+
+        assert await _claimed_ids(session_factory) == [1, 7]
+        async with session_factory() as session:
+            attempts = (await session.execute(
+                select(RenewalAttempt).order_by(RenewalAttempt.id))).scalars().all()
+        return [(a.subscription_id, a.status, a.provider) for a in attempts]
+
+    assert pg.run(scenario) == [(1, STATUS_PROCESSING, "yookassa"),
+                                (7, STATUS_PROCESSING, "yookassa")]
+
+
+def test_claimed_cycle_is_leased_until_the_attempt_goes_stale(pg):
+
+    async def scenario(session_factory):
+        end_date = await _add_subscription(session_factory, 1)
+        await _add_attempt(session_factory, 1, end_date, STATUS_PROCESSING,
+                           age=timedelta(minutes=5))
+        assert await _claimed_ids(session_factory) == []
+        # The worker died: once the lease is over the cycle is claimed again
+        assert await _claimed_ids(session_factory, lease_seconds=60) == [1]
+
+    pg.run(scenario)
+
+
+def test_concurrent_claims_never_share_a_subscription(pg):
+
+    async def scenario(session_factory):
+        for subscription_id in (1, 2):
+            await _add_subscription(session_factory, subscription_id,
+                                    ends_in=timedelta(hours=subscription_id))
+        async with session_factory() as first, session_factory() as second:
+            mine = await claim_due_renewals(first, **{**CLAIM, "limit": 1})
+            theirs = await asyncio.wait_for(
+                claim_due_renewals(second, **CLAIM), timeout=5)
+            await second.commit()
+            await first.commit()
+        return ([sub.subscription_id for _, sub in mine],
+                [sub.subscription_id for _, sub in theirs])
+
+    assert pg.run(scenario) == ([1], [2])
+
+
+@pytest.mark.parametrize("status", [STATUS_INITIATED, STATUS_SKIPPED])
+def test_initiated_or_skipped_cycle_is_not_charged_again(pg, status):
+
+    async def scenario(session_factory):
+        end_date = await _add_subscription(session_factory, 1)
+        await _add_attempt(session_factory, 1, end_date, status, age=timedelta(days=1))
+        return await _claimed_ids(session_factory)
+
+    assert pg.run(scenario) == []
+
+
+@pytest.mark.parametrize("status", [STATUS_FAILED, STATUS_UNKNOWN])
+def test_failures_wait_for_retry_and_stop_at_max_attempts(pg, status):
+
+    async def scenario(session_factory):
+        end_date = await _add_subscription(session_factory, 1)
+        await _add_attempt(session_factory, 1, end_date, status,
+                           age=timedelta(minutes=10))
+        assert await _claimed_ids(session_factory) == []
+        assert await _claimed_ids(session_factory, retry_after_seconds=60) == [1]
+
+        end_date = await _add_subscription(session_factory, 2)
+        for _ in range(2):
+            await _add_attempt(session_factory, 2, end_date, status,
+                               age=timedelta(hours=2))
+        # An abandoned attempt counts towards the limit too
+        await _add_attempt(session_factory, 2, end_date, STATUS_PROCESSING,
+                           age=timedelta(hours=2))
+        assert await _claimed_ids(session_factory, max_attempts=3) == []
+
+    pg.run(scenario)
+
+
+def test_new_cycle_is_independent_of_old_attempts(pg):
+
+    async def scenario(session_factory):
+        await _add_subscription(session_factory, 1)
+        await _add_attempt(session_factory, 1, _now() - timedelta(days=30),
+                           STATUS_INITIATED, age=timedelta(days=30))
+        return await _claimed_ids(session_factory)
+
+    assert pg.run(scenario) == [1]
+
+
+class _FakeSubscriptions:
+    """Answers renewal charges from a script and records the keys used."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.keys = []
+
+    async def initiate_subscription_renewal(self, session, sub, idempotence_key=None):
+        self.keys.append(idempotence_key)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+async def _charge_next(scheduler, session_factory):
+    claimed = await _claim(session_factory)
+    assert len(claimed) == 1
+    attempt, sub = claimed[0]
+    await scheduler._charge(attempt.id, sub.subscription_id, sub.end_date)
+    async with session_factory() as session:
+        return await session.get(RenewalAttempt, attempt.id)
+
+
+async def _let_retry_time_pass(session_factory):
+    async with session_factory() as session:
+        await session.execute(
+            update(RenewalAttempt).values(
+                started_at=RenewalAttempt.started_at - timedelta(hours=2),
+                finished_at=RenewalAttempt.finished_at - timedelta(hours=2)))
+        await session.commit()
+
+
+def test_key_only_changes_after_a_definite_refusal_or_cancel(pg, make_settings):
+    subscriptions = _FakeSubscriptions(
+        asyncio.TimeoutError(),
+        (False, None, "YooKassa API error 400: invalid_request"),
+        (True, "pay-1", None),
+        (True, "pay-2", None),
+    )
+
+    async def scenario(session_factory):
+        scheduler = RenewalScheduler(
+            make_settings(AUTO_RENEW_PROVIDER_RATE_LIMITS=""), session_factory,
+            subscriptions)
+        await _add_subscription(session_factory, 1)
+
+        assert (await _charge_next(scheduler, session_factory)).status == STATUS_UNKNOWN
+        await _let_retry_time_pass(session_factory)
+        assert (await _charge_next(scheduler, session_factory)).status == STATUS_FAILED
+        await _let_retry_time_pass(session_factory)
+        initiated = await _charge_next(scheduler, session_factory)
+        assert initiated.status == STATUS_INITIATED
+        assert await _claim(session_factory) == []
+
+        # The payment is canceled later: the cycle is released
+        async with session_factory() as session:
+            failed = await renewal_dal.fail_initiated_attempt(
+                session, 1, "pay-1", "payment canceled (card_expired)")
+            assert await renewal_dal.fail_initiated_attempt(
+                session, 1, "pay-1", "repeated notification") is None
+            await session.commit()
+        assert failed.id == initiated.id and failed.status == STATUS_FAILED
+        await _let_retry_time_pass(session_factory)
+        assert (await _charge_next(scheduler, session_factory)).status == STATUS_INITIATED
+
+    pg.run(scenario)
+    timed_out, refused, initiated, after_cancel = subscriptions.keys
+    assert refused == timed_out
+    assert initiated != refused
+    assert after_cancel not in (timed_out, initiated)
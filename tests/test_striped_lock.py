@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from bot.utils.striped_lock import StripedLock
+
+
+def _keys_on_different_stripes(lock: StripedLock):
+    first = "user:1"
+    for n in range(2, 1000):
+        other = f"user:{n}"
+        if lock._index(other) != lock._index(first):
+            return first, other
+    raise AssertionError("no second stripe found")
+
+
+def test_same_key_is_serialized():
+    lock = StripedLock(stripes=8)
+    active = 0
+    peak = 0
+
+    async def worker():
+        nonlocal active, peak
+        async with lock.hold("user:1"):
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def main():
+        await asyncio.gather(*(worker() for _ in range(5)))
+
+    asyncio.run(main())
+    assert peak == 1
+
+
+def test_keys_on_different_stripes_run_concurrently():
+    lock = StripedLock(stripes=8)
+    first, second = _keys_on_different_stripes(lock)
+
+    async def main():
+        entered = asyncio.Event()
+
+        async def holder():
+            async with lock.hold(first):
+                entered.set()
+                await asyncio.sleep(0.05)
+
+        task = asyncio.create_task(holder())
+        await entered.wait()
+        async with lock.hold(second):
+            # Got in while the other stripe is still held
+            assert not task.done()
+        await task
+
+    asyncio.run(main())
+
+
+def test_multiple_keys_in_any_order_do_not_deadlock():
+    lock = StripedLock(stripes=8)
+    first, second = _keys_on_different_stripes(lock)
+
+    async def worker(keys):
+        for _ in range(20):
+            async with lock.hold(*keys):
+                await asyncio.sleep(0)
+
+    async def main():
+        await asyncio.wait_for(
+            asyncio.gather(worker((first, second)), worker((second, first))),
+            timeout=2)
+
+    asyncio.run(main())
+
+
+def test_empty_keys_and_bad_stripe_count():
+    lock = StripedLock(stripes=4)
+
+    async def main():
+        async with lock.hold("", None):
+            pass
+
+    asyncio.run(main())
+    with pytest.raises(ValueError):
+        StripedLock(stripes=0)
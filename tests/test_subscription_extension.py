@@ -0,0 +1,174 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+
+from bot.services.subscription_extension_service import \
+    SubscriptionExtensionService
+from db.dal import subscription_extension_dal
+from db.dal.subscription_extension_dal import (ITEM_DONE, ITEM_SENDING,
+                                               JOB_APPLIED, JOB_DONE)
+from db.models import (Subscription, SubscriptionExtensionItem,
+                       SubscriptionExtensionJob, User)
+
+
+class _FakePanel:
+
+    def __init__(self):
+        self.extended = []
+        self.updated = []
+
+    async def bulk_extend_users_expiration(self, user_uuids, days):
+        self.extended.append((list(user_uuids), days))
+        return {"failed": []}
+
+    async def apply_user_updates(self, updates):
+        self.updated.append(dict(updates))
+        return {"failed": []}
+
+
+async def _applied_job(session_factory, user_ids, days=3):
+    async with session_factory() as session:
+        for user_id in user_ids:
+            session.add(User(user_id=user_id))
+        await session.flush()
+        for user_id in user_ids:
+            session.add(Subscription(
+                subscription_id=user_id, user_id=user_id,
+                panel_user_uuid=f"u-{user_id}",
+                panel_subscription_uuid=f"s-{user_id}",
+                end_date=datetime.now(timezone.utc) + timedelta(days=10),
+                is_active=True))
+        await session.flush()
+        job = await subscription_extension_dal.create_job(session, days, None, None)
+        await subscription_extension_dal.apply_job(session, job.id)
+        await session.commit()
+        return job.id
+
+
+async def _acquire(session_factory, job_id, owner, lease_seconds=60):
+    async with session_factory() as session:
+        acquired = await subscription_extension_dal.acquire_job_lease(
+            session, job_id, owner, lease_seconds)
+        await session.commit()
+        return acquired
+
+
+async def _item_statuses(session_factory, job_id):
+    async with session_factory() as session:
+        rows = await session.execute(
+            select(SubscriptionExtensionItem.status).where(
+                SubscriptionExtensionItem.job_id == job_id))
+        return sorted(rows.scalars().all())
+
+
+def test_job_lease_has_one_holder_until_it_expires_or_is_released(pg):
+
+    async def scenario(session_factory):
+        job_id = await _applied_job(session_factory, [1])
+        assert await _acquire(session_factory, job_id, "a")
+        assert not await _acquire(session_factory, job_id, "b")
+        # The holder renews its own lease
+        assert await _acquire(session_factory, job_id, "a")
+
+        async with session_factory() as session:
+            await subscription_extension_dal.release_job_lease(session, job_id, "b")
+            await session.commit()
+        assert not await _acquire(session_factory, job_id, "b")
+
+        async with session_factory() as session:
+            await session.execute(
+                update(SubscriptionExtensionJob).where(
+                    SubscriptionExtensionJob.id == job_id).values(
+                        locked_until=datetime.now(timezone.utc) - timedelta(seconds=1)))
+            await session.commit()
+        assert await _acquire(session_factory, job_id, "b")
+        assert not await _acquire(session_factory, job_id, "a")
+
+        async with session_factory() as session:
+            await subscription_extension_dal.release_job_lease(session, job_id, "b")
+            await session.commit()
+        assert await _acquire(session_factory, job_id, "a")
+
+    pg.run(scenario)
+
+
+def test_worker_does_not_push_a_job_leased_by_another_worker(pg, make_settings):
+
+    async def scenario(session_factory):
+        job_id = await _applied_job(session_factory, [1, 2])
+        async with session_factory() as session:
+            await subscription_extension_dal.claim_pending_items(session, job_id, 1)
+            await session.commit()
+        assert await _acquire(session_factory, job_id, "other-replica")
+
+        panel = _FakePanel()
+        service = SubscriptionExtensionService(
+            make_settings(), session_factory, panel)
+        assert service.resume(job_id)
+        await asyncio.sleep(0.5)
+        await service.close()
+
+        assert panel.extended == [] and panel.updated == []
+        assert await _item_statuses(session_factory, job_id) == ["pending", ITEM_SENDING]
+
+    pg.run(scenario)
+
+
+def test_expired_lease_is_taken_over_and_sending_items_get_absolute_expiry(
+        pg, make_settings):
+
+    async def scenario(session_factory):
+        job_id = await _applied_job(session_factory, [1, 2], days=3)
+        async with session_factory() as session:
+            sending = await subscription_extension_dal.claim_pending_items(
+                session, job_id, 1)
+            await session.execute(
+                update(SubscriptionExtensionJob).where(
+                    SubscriptionExtensionJob.id == job_id).values(
+                        locked_by="crashed-replica",
+                        locked_until=datetime.now(timezone.utc) - timedelta(seconds=1)))
+            await session.commit()
+
+        panel = _FakePanel()
+        service = SubscriptionExtensionService(
+            make_settings(), session_factory, panel)
+        await service._run(job_id, None)
+
+        [(_, sending_uuid)] = sending
+        # The item the crashed replica may have pushed is never extended relatively
+        assert panel.extended == [(["u-2"], 3)]
+        assert [list(batch) for batch in panel.updated] == [[sending_uuid]]
+        assert await _item_statuses(session_factory, job_id) == [ITEM_DONE, ITEM_DONE]
+        async with session_factory() as session:
+            job = await subscription_extension_dal.get_job(session, job_id)
+            assert job.status == JOB_DONE
+            assert job.locked_by is None and job.locked_until is None
+
+    pg.run(scenario)
+
+
+def test_job_finished_by_the_lease_holder_is_not_pushed_again(pg, make_settings):
+
+    async def scenario(session_factory):
+        job_id = await _applied_job(session_factory, [1])
+        assert await _acquire(session_factory, job_id, "other-replica")
+        async with session_factory() as session:
+            await session.execute(
+                update(SubscriptionExtensionJob).where(
+                    SubscriptionExtensionJob.id == job_id).values(status=JOB_DONE))
+            await session.commit()
+
+        panel = _FakePanel()
+        service = SubscriptionExtensionService(
+            make_settings(), session_factory, panel)
+        await service._run(job_id, None)
+        assert panel.extended == [] and panel.updated == []
+
+        async with session_factory() as session:
+            assert (await subscription_extension_dal.get_unfinished_job_ids(
+                session)) == []
+            job = await subscription_extension_dal.get_job(session, job_id)
+            assert job.status != JOB_APPLIED
+
+    pg.run(scenario)
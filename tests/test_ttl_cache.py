@@ -0,0 +1,60 @@
+import pytest
+
+from bot.utils import ttl_cache
+from bot.utils.ttl_cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire_but_stay_available_as_stale(clock):
+    cache = TTLCache(ttl_seconds=10)
+    cache.set("a", 1)
+    clock[0] += 9
+    assert cache.get("a") == 1
+    clock[0] += 1
+    assert cache.get("a") is None
+    assert cache.get("a", allow_stale=True) == 1
+
+
+def test_per_entry_ttl_and_disabled_cache(clock):
+    cache = TTLCache(ttl_seconds=10)
+    cache.set("short", 1, ttl=1)
+    clock[0] += 2
+    assert cache.get("short") is None
+
+    disabled = TTLCache(ttl_seconds=0)
+    disabled.set("a", 1)
+    assert len(disabled) == 0
+
+
+def test_oldest_written_entry_is_evicted(clock):
+    cache = TTLCache(ttl_seconds=10, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("a", 3)  # rewriting moves it to the back
+    cache.set("c", 4)
+    assert cache.get("b") is None
+    assert cache.get("a") == 3
+    assert cache.get("c") == 4
+
+
+def test_copy_values_isolates_callers(clock):
+    cache = TTLCache(ttl_seconds=10, copy_values=True)
+    value = {"tags": ["a"]}
+    cache.set("k", value)
+    value["tags"].append("changed by writer")
+    got = cache.get("k")
+    got["tags"].append("changed by reader")
+    assert cache.get("k") == {"tags": ["a"]}
+
+
+def test_values_are_shared_without_copy_values(clock):
+    cache = TTLCache(ttl_seconds=10)
+    value = {"tags": []}
+    cache.set("k", value)
+    assert cache.get("k") is value
@@ -0,0 +1,232 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from bot.services.webhook_inbox_service import (PermanentEventError,
+                                                WebhookInboxService)
+from db.dal.inbound_event_dal import (STATUS_DEAD, STATUS_DONE, STATUS_FAILED,
+                                      STATUS_PENDING, STATUS_PROCESSING,
+                                      claim_due_events, store_inbound_event)
+from db.models import InboundEvent
+
+
+async def _add_event(session_factory, row_id, *, provider="yookassa",
+                     status=STATUS_PENDING, attempts=0, next_attempt_at=None,
+                     locked_until=None):
+    now = datetime.now(timezone.utc)
+    async with session_factory() as session:
+        session.add(InboundEvent(id=row_id, provider=provider,
+                                 event_id=f"evt-{row_id}", body="{}",
+                                 status=status, attempts=attempts,
+                                 next_attempt_at=next_attempt_at or now - timedelta(seconds=1),
+                                 locked_until=locked_until))
+        await session.commit()
+
+
+async def _event(session_factory, row_id) -> InboundEvent:
+    async with session_factory() as session:
+        return await session.get(InboundEvent, row_id)
+
+
+async def _claim(session_factory, **kwargs):
+    async with session_factory() as session:
+        events = await claim_due_events(session, **kwargs)
+        await session.commit()
+        return sorted(event.id for event in events)
+
+
+def test_duplicate_deliveries_are_stored_once(pg):
+
+    async def scenario(session_factory):
+        async with session_factory() as session:
+            first = await store_inbound_event(session, provider="yookassa",
+                                              event_id="evt-1", body="{}")
+            again = await store_inbound_event(session, provider="yookassa",
+                                              event_id="evt-1", body="{}")
+            other = await store_inbound_event(session, provider="tribute",
+                                              event_id="evt-1", body="{}")
+            await session.commit()
+        return first, again, other
+
+    first, again, other = pg.run(scenario)
+    assert first is not None and other is not None
+    assert again is None
+
+
+def test_claim_picks_due_and_abandoned_events(pg):
+
+    async def scenario(session_factory):
+        now = datetime.now(timezone.utc)
+        await _add_event(session_factory, 1)
+        await _add_event(session_factory, 2, status=STATUS_FAILED, attempts=1)
+        await _add_event(session_factory, 3, status=STATUS_FAILED, attempts=1,
+                         next_attempt_at=now + timedelta(minutes=5))
+        await _add_event(session_factory, 4, status=STATUS_PROCESSING, attempts=1,
+                         locked_until=now - timedelta(seconds=1))
+        await _add_event(session_factory, 5, status=STATUS_PROCESSING, attempts=1,
+                         locked_until=now + timedelta(minutes=5))
+        await _add_event(session_factory, 6, status=STATUS_DONE)
+        await _add_event(session_factory, 7, status=STATUS_DEAD)
+
+        assert await _claim(session_factory, limit=10, lease_seconds=60) == [1, 2, 4]
+        claimed = await _event(session_factory, 4)
+        assert claimed.status == STATUS_PROCESSING
+        assert claimed.attempts == 2
+        assert claimed.locked_until > now + timedelta(seconds=50)
+        # Leased now, so a second claim finds nothing
+        assert await _claim(session_factory, limit=10, lease_seconds=60) == []
+
+    pg.run(scenario)
+
+
+def test_concurrent_claims_skip_locked_events(pg):
+
+    async def scenario(session_factory):
+        for row_id in (1, 2):
+            await _add_event(session_factory, row_id)
+        async with session_factory() as first, session_factory() as second:
+            # The first claim holds its row lock until it commits
+            mine = await claim_due_events(first, limit=1, lease_seconds=60)
+            theirs = await asyncio.wait_for(
+                claim_due_events(second, limit=10, lease_seconds=60), timeout=5)
+            await second.commit()
+            await first.commit()
+        return [e.id for e in mine], [e.id for e in theirs]
+
+    mine, theirs = pg.run(scenario)
+    assert mine == [1]
+    assert theirs == [2]
+
+
+def test_claim_respects_limit_and_provider_filters(pg):
+
+    async def scenario(session_factory):
+        await _add_event(session_factory, 1, provider="tribute")
+        await _add_event(session_factory, 2, provider="yookassa")
+        await _add_event(session_factory, 3, provider="yookassa")
+
+        assert await _claim(session_factory, limit=1, lease_seconds=60,
+                            exclude_providers=("tribute", )) == [2]
+        assert await _claim(session_factory, limit=10, lease_seconds=60,
+                            provider="tribute") == [1]
+        assert await _claim(session_factory, limit=10, lease_seconds=60) == [3]
+
+    pg.run(scenario)
+
+
+def _service(session_factory, make_settings):
+    settings = make_settings(WEBHOOK_INBOX_MAX_ATTEMPTS=3,
+                             WEBHOOK_INBOX_RETRY_BASE_SECONDS=10,
+                             WEBHOOK_INBOX_RETRY_MAX_SECONDS=15)
+    return WebhookInboxService(settings, session_factory)
+
+
+async def _process(service, session_factory, row_id):
+    await service._process(await _event(session_factory, row_id))
+    return await _event(session_factory, row_id)
+
+
+def test_success_marks_event_done(pg, make_settings):
+    seen = []
+
+    async def processor(event):
+        seen.append(event.event_id)
+
+    async def scenario(session_factory):
+        service = _service(session_factory, make_settings)
+        service.register_processor("yookassa", processor)
+        await _add_event(session_factory, 1, status=STATUS_PROCESSING, attempts=1)
+        return await _process(service, session_factory, 1)
+
+    event = pg.run(scenario)
+    assert seen == ["evt-1"]
+    assert event.status == STATUS_DONE
+    assert event.locked_until is None
+
+
+def test_failures_back_off_exponentially_then_dead_letter(pg, make_settings):
+
+    async def processor(event):
+        raise RuntimeError("provider API down")
+
+    async def scenario(session_factory):
+        service = _service(session_factory, make_settings)
+        service.register_processor("yookassa", processor)
+        for attempts, delay in [(1, 10), (2, 15)]:  # 20s is capped at 15s
+            await _add_event(session_factory, attempts, status=STATUS_PROCESSING,
+                             attempts=attempts)
+            before = datetime.now(timezone.utc)
+            event = await _process(service, session_factory, attempts)
+            assert event.status == STATUS_FAILED
+            assert event.last_error == "RuntimeError: provider API down"
+            retry_in = (event.next_attempt_at - before).total_seconds()
+            assert delay - 1 <= retry_in <= delay + 1
+
+        await _add_event(session_factory, 3, status=STATUS_PROCESSING, attempts=3)
+        assert (await _process(service, session_factory, 3)).status == STATUS_DEAD
+
+    pg.run(scenario)
+
+
+def test_permanent_error_dead_letters_at_once(pg, make_settings):
+
+    async def processor(event):
+        raise PermanentEventError("payment not found")
+
+    async def scenario(session_factory):
+        service = _service(session_factory, make_settings)
+        service.register_processor("yookassa", processor)
+        await _add_event(session_factory, 1, status=STATUS_PROCESSING, attempts=1)
+        assert (await _process(service, session_factory, 1)).status == STATUS_DEAD
+
+        # An unknown provider is retried: its processor may come with a deploy
+        await _add_event(session_factory, 2, provider="unknown",
+                         status=STATUS_PROCESSING, attempts=1)
+        event = await _process(service, session_factory, 2)
+        assert event.status == STATUS_FAILED
+        assert event.last_error.startswith("LookupError")
+
+    pg.run(scenario)
+
+
+def test_batch_failures_are_recorded_per_event(pg, make_settings):
+
+    async def batch_processor(events):
+        return {events[0].id: RuntimeError("bad row")}
+
+    async def scenario(session_factory):
+        service = _service(session_factory, make_settings)
+        service.register_batch_processor("tribute", batch_processor, batch_size=10)
+        for row_id in (1, 2):
+            await _add_event(session_factory, row_id, provider="tribute",
+                             status=STATUS_PROCESSING, attempts=1)
+        events = [await _event(session_factory, 1), await _event(session_factory, 2)]
+        await service._process_batch("tribute", events)
+        return ((await _event(session_factory, 1)).status,
+                (await _event(session_factory, 2)).status)
+
+    assert pg.run(scenario) == (STATUS_FAILED, STATUS_DONE)
+
+
+def test_inline_processing_reraises(make_settings):
+    service = WebhookInboxService(make_settings(WEBHOOK_INBOX_ENABLED=False),
+                                  async_session_factory=None)
+
+    async def processor(event):
+        raise RuntimeError("boom")
+
+    service.register_processor("yookassa", processor)
+    with pytest.raises(RuntimeError):
+        asyncio.run(service.submit("yookassa", "evt-1", "{}"))
+    with pytest.raises(LookupError):
+        asyncio.run(service.submit("unknown", "evt-2", "{}"))
+
+    handled = []
+
+    async def ok(event):
+        handled.append(event.event_id)
+
+    service.register_processor("yookassa", ok)
+    assert asyncio.run(service.submit("yookassa", "evt-3", "{}")) is True
+    assert handled == ["evt-3"]